@@ -0,0 +1,313 @@
+"""End-to-end benchmarks for the RUNE action pipeline.
+
+Run from the repository root::
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --compare bench.json --threshold 0.25
+
+Every benchmark reports latency statistics in milliseconds. Results are emitted as JSON so two
+runs (for example, two releases) can be diffed; ``--compare`` does that diff and exits non-zero
+when any benchmark's median regressed by more than ``--threshold``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SRC_DIR = REPO_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from rune import mediator, orchestrator, registry  # noqa: E402
+from rune.models import (  # noqa: E402
+    MediatorResult,
+    TransportResult,
+    build_message_metadata,
+    build_observability,
+)
+from rune.payload import PayloadTemplate  # noqa: E402
+from rune.transport_ssh import run_remote_plugin_ssh  # noqa: E402
+
+FANOUT_SIZES = (10, 100, 1000)
+DISCOVERY_PLUGINS = 500
+SIMULATED_TRANSPORT_LATENCY = 0.005
+LARGE_OUTPUT_BYTES = 4 * 1024 * 1024
+
+Benchmark = Callable[[], None]
+
+
+def _bpcs_output(output_data: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "message_metadata": build_message_metadata(),
+        "observability": build_observability(),
+        "payload": {"result": "success", "output_data": output_data},
+        "error": None,
+    }
+
+
+def _large_output() -> str:
+    line = "Dec 20 12:00:00 node kernel: synthetic log line for benchmark purposes\n"
+    lines = line * (LARGE_OUTPUT_BYTES // len(line))
+    return json.dumps(_bpcs_output({"log": lines, "entries": lines.count("\n")}))
+
+
+@contextmanager
+def _patched(module: Any, name: str, value: Any) -> Iterator[None]:
+    original = getattr(module, name)
+    setattr(module, name, value)
+    try:
+        yield
+    finally:
+        setattr(module, name, original)
+
+
+def _timeit(func: Benchmark, iterations: int, warmup: int) -> dict[str, float | int]:
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter_ns()
+        func()
+        samples.append((time.perf_counter_ns() - started) / 1_000_000)
+    samples.sort()
+    median = statistics.median(samples)
+    return {
+        "iterations": iterations,
+        "min_ms": round(samples[0], 4),
+        "median_ms": round(median, 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        "max_ms": round(samples[-1], 4),
+        "stdev_ms": round(statistics.stdev(samples), 4) if len(samples) > 1 else 0.0,
+        "ops_per_s": round(1000 / median, 2) if median else 0.0,
+    }
+
+
+def bench_build_payload() -> Benchmark:
+    params = {"service": "docker", "lines": 500, "paths": ["/var/log/syslog"]}
+    return lambda: orchestrator._build_payload("noop", "node-1", params)
+
+
+def bench_render_payload_template() -> Benchmark:
+    # One fan-out node's request once the shared template exists, JSON encoding included.
+    params = {"service": "docker", "lines": 500, "paths": ["/var/log/syslog"]}
+    template = PayloadTemplate("noop", params)
+    return lambda: template.render("node-1")
+
+
+def _normalize_bench(stdout: str) -> Benchmark:
+    result = TransportResult(stdout=stdout, stderr="", exit_code=0)
+    return lambda: mediator._normalize_transport_output(
+        action="gather-logs", node="node-1", transport="ssh", transport_result=result
+    )
+
+
+def bench_normalize_small() -> Benchmark:
+    return _normalize_bench(json.dumps(_bpcs_output({"echo": True})))
+
+
+def bench_normalize_large() -> Benchmark:
+    return _normalize_bench(_large_output())
+
+
+def bench_run_action_fake_transport() -> Benchmark:
+    canned = MediatorResult(
+        status="success",
+        action="noop",
+        node="node-1",
+        transport="ssh",
+        plugin_output=_bpcs_output({"echo": True}),
+        error=None,
+    )
+
+    def run() -> None:
+        with _patched(orchestrator, "execute_action", lambda **_: canned):
+            orchestrator.run_action(
+                action="noop", node="node-1", use_ssm=False, dry_run=False, params={}
+            )
+
+    return run
+
+
+def bench_noop_plugin() -> Benchmark:
+    plugin = REPO_ROOT / "plugins" / "noop.sh"
+    payload = orchestrator._build_payload("noop", "local", {"mode": "easy"})
+    return lambda: run_remote_plugin_ssh("local", plugin, payload)
+
+
+def bench_cli_list_actions() -> Benchmark:
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR))
+    command = [sys.executable, "-m", "rune.rune_cli", "list-actions", "--output", "json"]
+    return lambda: subprocess.run(command, env=env, capture_output=True, check=True)
+
+
+def _discovery_tree() -> tuple[Path, Path]:
+    root = Path(tempfile.mkdtemp(prefix="rune-bench-"))
+    plugins = root / "plugins"
+    plugins.mkdir()
+    for index in range(DISCOVERY_PLUGINS):
+        (plugins / f"action-{index:04d}.sh").write_text(
+            "#!/usr/bin/env bash\n"
+            f"# rune:action action-{index:04d}\n"
+            "# rune:description Synthetic plugin for discovery benchmarks.\n"
+            "# rune:param target string required Target to act on.\n"
+            "echo '{}'\n"
+        )
+    return plugins, root / "manifest.json"
+
+
+def bench_discovery_cold() -> Benchmark:
+    plugins, _ = _discovery_tree()
+    return lambda: registry.discover_actions([plugins])
+
+
+def bench_discovery_cached() -> Benchmark:
+    plugins, cache = _discovery_tree()
+    registry.discover_actions([plugins], cache)
+    return lambda: registry.discover_actions([plugins], cache)
+
+
+def _fanout_bench(size: int) -> Benchmark:
+    stdout = json.dumps(_bpcs_output({"echo": True}))
+
+    async def fake_transport(**_: Any) -> TransportResult:
+        await asyncio.sleep(SIMULATED_TRANSPORT_LATENCY)
+        return TransportResult(stdout=stdout, stderr="", exit_code=0)
+
+    nodes = [f"node-{index:05d}" for index in range(size)]
+
+    def run() -> None:
+        with _patched(mediator, "run_remote_plugin_ssh_async", fake_transport):
+            orchestrator.run_action_fanout(
+                action="noop",
+                nodes=nodes,
+                use_ssm=False,
+                dry_run=False,
+                params={},
+                concurrency=orchestrator.DEFAULT_CONCURRENCY,
+            )
+
+    return run
+
+
+# name -> (factory, iterations, quick iterations)
+BENCHMARKS: dict[str, tuple[Callable[[], Benchmark], int, int]] = {
+    "build_payload": (bench_build_payload, 5000, 500),
+    "render_payload_template": (bench_render_payload_template, 5000, 500),
+    "normalize_output_small": (bench_normalize_small, 5000, 500),
+    "normalize_output_4mb": (bench_normalize_large, 30, 5),
+    "run_action_fake_transport": (bench_run_action_fake_transport, 2000, 200),
+    "noop_plugin_local_ssh": (bench_noop_plugin, 30, 5),
+    "cli_cold_start_list_actions": (bench_cli_list_actions, 20, 3),
+    f"discover_{DISCOVERY_PLUGINS}_plugins_uncached": (bench_discovery_cold, 20, 3),
+    f"discover_{DISCOVERY_PLUGINS}_plugins_manifest": (bench_discovery_cached, 50, 5),
+    **{
+        f"fanout_{size}_nodes": ((lambda size=size: _fanout_bench(size)), 5, 2)
+        for size in FANOUT_SIZES
+    },
+}
+
+
+def run_benchmarks(names: list[str], quick: bool) -> dict[str, Any]:
+    results: dict[str, Any] = {}
+    for name in names:
+        factory, iterations, quick_iterations = BENCHMARKS[name]
+        func = factory()
+        count = quick_iterations if quick else iterations
+        results[name] = _timeit(func, iterations=count, warmup=1 if quick else 3)
+        if name.startswith("fanout_"):
+            size = int(name.split("_")[1])
+            results[name]["nodes_per_s"] = round(size * 1000 / results[name]["median_ms"], 1)
+        print(f"{name:32s} median {results[name]['median_ms']:>10.3f} ms", file=sys.stderr)
+    return results
+
+
+def _environment() -> dict[str, Any]:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any], threshold: float) -> list[str]:
+    """Return a description of every benchmark whose median regressed beyond ``threshold``."""
+
+    regressions = []
+    for name, stats in current["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous or not previous.get("median_ms"):
+            continue
+        change = stats["median_ms"] / previous["median_ms"] - 1
+        print(f"{name:32s} {change:+8.1%}", file=sys.stderr)
+        if change > threshold:
+            regressions.append(
+                f"{name}: median {previous['median_ms']} ms -> {stats['median_ms']} ms "
+                f"({change:+.1%})"
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="RUNE pipeline benchmarks")
+    parser.add_argument("--output", type=Path, help="Write JSON results to this file")
+    parser.add_argument("--quick", action="store_true", help="Run a reduced iteration count")
+    parser.add_argument(
+        "--filter", default="", help="Only run benchmarks whose name contains this text"
+    )
+    parser.add_argument("--compare", type=Path, help="Baseline JSON results to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Allowed median slowdown before --compare fails (default: 0.2 = 20%%)",
+    )
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    report = {"environment": _environment(), "results": run_benchmarks(names, args.quick)}
+    serialized = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(serialized + "\n", encoding="utf-8")
+    else:
+        print(serialized)
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare(baseline, report, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
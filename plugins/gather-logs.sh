@@ -0,0 +1,81 @@
+#!/usr/bin/env bash
+# rune:action gather-logs
+# rune:description Package system logs into a compressed archive returned as an artifact.
+# rune:version 1.0.0
+# rune:timeout 300
+# rune:idempotent true
+# rune:cache-ttl 300
+# rune:param extra_paths array Additional log files or directories to include.
+# rune:param since string Start of the journal excerpt, as accepted by journalctl --since.
+# rune:param include_journal boolean Include a journalctl excerpt (default "true").
+set -euo pipefail
+
+SCRIPT_DIR=$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)
+
+if [[ -f "${SCRIPT_DIR}/rune_bpcs.sh" ]]; then
+  # shellcheck source=/dev/null
+  source "${SCRIPT_DIR}/rune_bpcs.sh"
+elif [[ -f "${SCRIPT_DIR}/lib/rune_bpcs.sh" ]]; then
+  # shellcheck source=/dev/null
+  source "${SCRIPT_DIR}/lib/rune_bpcs.sh"
+else
+  echo "gather-logs.sh: could not locate rune_bpcs.sh" >&2
+  exit 2
+fi
+
+rune_init
+
+DEFAULT_PATHS=(/var/log/syslog /var/log/messages /var/log/kern.log /var/log/dmesg)
+SINCE="$(rune_param since "1 hour ago")"
+INCLUDE_JOURNAL="$(rune_param include_journal "true")"
+
+EXTRA_JSON="$(rune_param_json extra_paths "[]")"
+if ! mapfile -t EXTRA_PATHS < <(jq -r 'if type == "array" then .[] | tostring else error end' <<<"${EXTRA_JSON}" 2>/dev/null); then
+  rune_error 1 "Invalid parameter: extra_paths must be an array of paths" '{"parameter":"extra_paths"}'
+fi
+
+STAGING=$(mktemp -d "${TMPDIR:-/tmp}/rune-gather-logs.XXXXXX")
+trap 'rm -rf "${STAGING}"' EXIT
+
+# The archive is built from the original files, so large logs are never copied before
+# compression. Unreadable or missing paths are reported rather than failing the action.
+INCLUDED=()
+SKIPPED=()
+for path in "${DEFAULT_PATHS[@]}" "${EXTRA_PATHS[@]}"; do
+  [[ -n "${path}" ]] || continue
+  if [[ -r "${path}" && ( -f "${path}" || -d "${path}" ) ]]; then
+    INCLUDED+=("$(realpath -- "${path}")")
+  elif [[ " ${DEFAULT_PATHS[*]} " != *" ${path} "* ]]; then
+    SKIPPED+=("${path}")
+  fi
+done
+
+TAR_ARGS=("${INCLUDED[@]}")
+ENTRIES=${#INCLUDED[@]}
+if [[ "${INCLUDE_JOURNAL}" == "true" ]] && command -v journalctl >/dev/null 2>&1; then
+  if journalctl --no-pager --since "${SINCE}" >"${STAGING}/journal.log" 2>/dev/null \
+    && [[ -s "${STAGING}/journal.log" ]]; then
+    TAR_ARGS+=(-C "${STAGING}" journal.log)
+    ENTRIES=$((ENTRIES + 1))
+  fi
+fi
+
+if [[ "${ENTRIES}" -eq 0 ]]; then
+  DETAILS="$(jq -nc '$ARGS.positional | {skipped: .}' --args "${SKIPPED[@]}")"
+  rune_error 2 "No readable logs found" "${DETAILS}"
+fi
+
+ARCHIVE="${STAGING}/logs.tar.gz"
+if ! tar -czf "${ARCHIVE}" "${TAR_ARGS[@]}" 2>"${STAGING}/tar.err"; then
+  DETAILS="$(jq -nc --rawfile err "${STAGING}/tar.err" '{stderr: $err}')"
+  rune_error 2 "Failed to create log archive" "${DETAILS}"
+fi
+rune_artifact_add "${ARCHIVE}" logs.tar.gz
+
+OUTPUT_DATA="$(jq -nc \
+  --arg artifact_path "${RUNE_ARTIFACT_DIR}/logs.tar.gz" \
+  --argjson entries "${ENTRIES}" \
+  '{artifact_path: $artifact_path, entries_collected: $entries, skipped: $ARGS.positional}' \
+  --args "${SKIPPED[@]}"
+)"
+rune_ok "Logs collected" "${OUTPUT_DATA}"
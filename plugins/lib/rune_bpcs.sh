@@ -9,6 +9,10 @@
 # This library supports:
 # - Easy mode: rune_ok / rune_error / rune_finish generate full BPCS output
 # - Advanced mode: build your own BPCS JSON and call rune_emit
+#
+# Process creation dominates the runtime of small plugins, so the library keeps jq forks to a
+# minimum: rune_init parses stdin with a single jq call, lookups are served from the
+# associative arrays below, and each output helper builds its document with one jq call.
 
 # Global state populated during initialization (rune_init).
 RUNE_INPUT_JSON=""
@@ -16,12 +20,31 @@ RUNE_MESSAGE_METADATA="{}"
 RUNE_OBSERVABILITY="{}"
 RUNE_INPUT_PARAMETERS_JSON="{}"
 RUNE_CONTEXT_JSON="{}"
+# Job deadline from quality_of_service.deadline_unix_ms (epoch milliseconds); empty if unset.
+RUNE_DEADLINE_MS=""
+
+# Lookup tables populated by rune_init. The *_JSON arrays hold compact JSON values, the others
+# hold the string form returned by rune_param / rune_ctx / rune_meta / rune_obs.
+# RUNE_PARAMS and RUNE_CTX only contain keys whose value is neither null nor false.
+declare -gA RUNE_PARAMS=()
+declare -gA RUNE_PARAMS_JSON=()
+declare -gA RUNE_CTX=()
+declare -gA RUNE_CTX_JSON=()
+declare -gA RUNE_META=()
+declare -gA RUNE_OBS=()
+declare -gA _RUNE_OBS_FALSY=()
 
 # Output accumulator state for rune_out / rune_err / rune_finish.
 RUNE_OUT_FIELDS=()
 RUNE_ERROR_CODE=0
 RUNE_ERROR_MESSAGE=""
 
+# Artifact directory provided by the transport (a private temporary directory is created on
+# first use when the plugin runs standalone) and the compact JSON declarations recorded by
+# rune_artifact_add.
+RUNE_ARTIFACT_DIR="${RUNE_ARTIFACT_DIR-}"
+RUNE_ARTIFACTS=()
+
 # -----------------------
 # Internal helpers
 # -----------------------
@@ -44,6 +67,16 @@ _rune_now_iso8601_utc() {
   printf '%s' "$ts"
 }
 
+_rune_set_uuid() {
+  # Store a UUID in the variable named by $1 without forking when the kernel provides one.
+  local -n _rune_uuid_ref="$1"
+  if [[ -r /proc/sys/kernel/random/uuid ]]; then
+    read -r _rune_uuid_ref < /proc/sys/kernel/random/uuid
+  else
+    _rune_uuid_ref=$(_rune_uuid)
+  fi
+}
+
 _rune_uuid() {
   if command -v uuidgen >/dev/null 2>&1; then
     uuidgen
@@ -100,32 +133,74 @@ _rune_emit_bootstrap_error() {
   else
     details_json="{}"
   fi
-  local details
-  details=$(_rune_safe_json_object "$details_json" "{}")
 
-  local now id trace span
-  now=$(_rune_now_iso8601_utc)
-  id=$(_rune_uuid)
-  trace="trace-$id"
-  span="span-$id"
+  local id
+  _rune_set_uuid id
 
   jq -nc \
-    --arg now "$now" \
     --arg id "$id" \
-    --arg trace "$trace" \
-    --arg span "$span" \
     --arg msg "$message" \
-    --argjson details "$details" \
+    --arg details "$details_json" \
     --argjson code "$code" \
-    '{
-      message_metadata: {version:"1.0", message_id:$id, created_at:$now},
+    "${_RUNE_JQ_DEFS}"'
+    {
+      message_metadata: {version:"1.0", message_id:$id, created_at:_rune_now},
       payload: null,
-      observability: {trace_id:$trace, span_id:$span},
-      error: {code: ($code|tonumber), message: $msg, details: $details}
+      observability: {trace_id:("trace-" + $id), span_id:("span-" + $id)},
+      error: {code: ($code|tonumber), message: $msg, details: _rune_object($details)}
     }'
   exit "$code"
 }
 
+# jq definitions shared by the single-pass helpers below.
+# - _rune_now: ISO 8601 UTC timestamp with millisecond precision
+# - _rune_object($raw): parse $raw as a JSON object, falling back to {}
+# - _rune_str: the string form used by rune_param / rune_ctx / rune_meta / rune_obs
+# - _rune_kv: build an object of string values from KEY=VALUE positional arguments
+_RUNE_JQ_DEFS='
+def _rune_now:
+  now as $t
+  | ($t | floor | strftime("%Y-%m-%dT%H:%M:%S"))
+    + "." + ("00" + (($t * 1000 | floor) % 1000 | tostring))[-3:] + "Z";
+def _rune_object($raw):
+  if $raw == "" then {}
+  else ($raw | try fromjson catch {}) | if type == "object" then . else {} end
+  end;
+def _rune_str:
+  if type == "string" then gsub("\u0000"; "")
+  elif type == "object" or type == "array" then tojson
+  else tostring
+  end;
+def _rune_kv:
+  reduce $ARGS.positional[] as $pair ({};
+    ($pair | split("=")) as $parts
+    | (if ($parts | length) > 1 then $parts[1:] | join("=") else $pair end) as $value
+    | if $parts[0] == "" then . else . + {($parts[0]): $value} end);
+def _rune_message($kind; $code; $msg; $data):
+  if $kind == "ok" then
+    {
+      message_metadata: $mm,
+      payload: {
+        result: "success",
+        output_data: (
+          if ($msg != "" and ($data|has("message")|not)) then ($data + {message:$msg})
+          else $data
+          end
+        )
+      },
+      observability: $obs,
+      error: null
+    }
+  else
+    {
+      message_metadata: $mm,
+      payload: null,
+      observability: $obs,
+      error: {code: ($code|tonumber), message: $msg, details: $data}
+    }
+  end;
+'
+
 _rune_validate_bpcs_output() {
   # Validate that stdin is a BPCS output message.
   # Returns 0 if valid, 1 otherwise.
@@ -168,70 +243,154 @@ rune_init() {
     return 0
   fi
 
-  local raw
-  raw=$(cat)
+  local raw=""
+  IFS= read -r -d '' raw || true
+  while [[ "$raw" == *$'\n' ]]; do
+    raw="${raw%$'\n'}"
+  done
 
   if [[ -z "${raw}" ]]; then
     _rune_emit_bootstrap_error 1 "Invalid input: empty stdin" '{"reason":"stdin was empty"}'
   fi
 
-  # Validate JSON and require an object at the top level.
-  if ! echo "$raw" | jq -e 'type=="object"' >/dev/null 2>&1; then
+  local gen_id
+  _rune_set_uuid gen_id
+
+  # One jq pass validates the input and extracts everything the lookups need, as a
+  # NUL-delimited stream: "ok", the five normalized documents, the job deadline, then one
+  # (section, key, string value, JSON value) record per parameter, context, metadata
+  # and observability entry.
+  local -a fields=()
+  mapfile -d '' -t fields < <(
+    jq -j --arg gen_id "$gen_id" "${_RUNE_JQ_DEFS}"'
+      def _rune_records($section):
+        to_entries[]
+        | select(.key != "")
+        | [$section, (.key | gsub("\u0000"; "")), (.value | _rune_str), (.value | tojson)][];
+      def _rune_section: if type == "object" then . else {} end;
+
+      if type != "object" then empty else
+        . as $input
+        | (($input.message_metadata // {}) | _rune_section
+            | .version = (.version // "1.0")
+            | .message_id = (.message_id // $gen_id)
+            | .created_at = (.created_at // _rune_now)) as $mm
+        | (($input.observability // {}) | _rune_section
+            | .trace_id = (.trace_id // ("trace-" + $gen_id))
+            | .span_id = (.span_id // ("span-" + $gen_id))) as $obs
+        | (($input.payload.input_parameters? // $input.payload.data.input_parameters? // {})
+            | _rune_section) as $params
+        | (($input.payload.context? // {}) | _rune_section) as $ctx
+        | (($input.quality_of_service // {}) | _rune_section | .deadline_unix_ms
+            | if type == "number" then floor | tostring else "" end) as $deadline
+        | [
+            "ok",
+            ($input | tojson),
+            ($mm | tojson),
+            ($obs | tojson),
+            ($params | tojson),
+            ($ctx | tojson),
+            $deadline,
+            ($params | _rune_records("P")),
+            ($ctx | _rune_records("C")),
+            ($mm | _rune_records("M")),
+            ($obs | _rune_records("O"))
+          ]
+        | map(. + "\u0000")
+        | add
+      end
+    ' <<<"$raw" 2>/dev/null
+  )
+
+  if [[ "${fields[0]-}" != "ok" ]]; then
     _rune_emit_bootstrap_error 1 "Invalid input: expected a JSON object" '{"reason":"stdin was not valid JSON object"}'
   fi
 
-  RUNE_INPUT_JSON=$(echo "$raw" | jq -c '.')
-
-  # Extract and normalize message_metadata.
-  local now gen_id
-  now=$(_rune_now_iso8601_utc)
-  gen_id=$(_rune_uuid)
-
-  RUNE_MESSAGE_METADATA=$(
-    echo "$RUNE_INPUT_JSON" | jq -c \
-      --arg now "$now" \
-      --arg gen_id "$gen_id" \
-      '(.message_metadata // {})
-       | (if type!="object" then {} else . end)
-       | .version = (.version // "1.0")
-       | .message_id = (.message_id // $gen_id)
-       | .created_at = (.created_at // $now)'
-  )
+  RUNE_INPUT_JSON="${fields[1]}"
+  RUNE_MESSAGE_METADATA="${fields[2]}"
+  RUNE_OBSERVABILITY="${fields[3]}"
+  RUNE_INPUT_PARAMETERS_JSON="${fields[4]}"
+  RUNE_CONTEXT_JSON="${fields[5]}"
+  RUNE_DEADLINE_MS="${fields[6]}"
+
+  local i section key str json
+  for ((i = 7; i + 3 < ${#fields[@]}; i += 4)); do
+    section="${fields[i]}"
+    key="${fields[i + 1]}"
+    str="${fields[i + 2]}"
+    json="${fields[i + 3]}"
+    case "$section" in
+      P)
+        if [[ "$json" != "null" && "$json" != "false" ]]; then
+          RUNE_PARAMS["$key"]="$str"
+          RUNE_PARAMS_JSON["$key"]="$json"
+        fi
+        ;;
+      C)
+        if [[ "$json" != "null" && "$json" != "false" ]]; then
+          RUNE_CTX["$key"]="$str"
+          RUNE_CTX_JSON["$key"]="$json"
+        fi
+        ;;
+      M) RUNE_META["$key"]="$str" ;;
+      O)
+        RUNE_OBS["$key"]="$str"
+        if [[ "$json" == "null" || "$json" == "false" ]]; then
+          _RUNE_OBS_FALSY["$key"]=1
+        fi
+        ;;
+    esac
+  done
+}
 
-  # Extract and normalize observability.
-  RUNE_OBSERVABILITY=$(
-    echo "$RUNE_INPUT_JSON" | jq -c \
-      --arg gen_id "$gen_id" \
-      '(.observability // {})
-       | (if type!="object" then {} else . end)
-       | .trace_id = (.trace_id // ("trace-" + $gen_id))
-       | .span_id  = (.span_id  // ("span-"  + $gen_id))'
-  )
+# Internal: print a caller-supplied default JSON value in compact form.
+_rune_default_json() {
+  local default_json="$1"
+  # Scalars and empty containers are already compact; anything else goes through jq, which
+  # also reports invalid defaults exactly as an inline lookup would.
+  if [[ "$default_json" =~ ^(null|true|false|\{\}|\[\]|-?[0-9]+|\"[^\"\\]*\")$ ]]; then
+    printf '%s\n' "$default_json"
+  else
+    jq -c '.' <<<"$default_json"
+  fi
+}
 
-  # Extract payload.input_parameters and payload.context.
-  RUNE_INPUT_PARAMETERS_JSON=$(_rune_safe_json_object "$(echo "$RUNE_INPUT_JSON" | jq -c '.payload.input_parameters // {}')" "{}")
-  RUNE_CONTEXT_JSON=$(_rune_safe_json_object "$(echo "$RUNE_INPUT_JSON" | jq -c '.payload.context // {}')" "{}")
+# Print the milliseconds left before the job deadline (0 once it has passed), or nothing when
+# the input carries no deadline. Useful for bounding external commands, e.g.
+#   timeout "$(( $(rune_remaining_ms) / 1000 ))" journalctl ...
+rune_remaining_ms() {
+  [[ -n "$RUNE_DEADLINE_MS" ]] || return 0
+  local now_ms
+  if [[ -n "${EPOCHREALTIME-}" ]]; then
+    now_ms="${EPOCHREALTIME//[.,]/}"
+    now_ms=$((10#$now_ms / 1000))
+  else
+    now_ms=$(date +%s%3N)
+  fi
+  local remaining=$((RUNE_DEADLINE_MS - now_ms))
+  echo $((remaining > 0 ? remaining : 0))
 }
 
 # Return a parameter as a string. Objects/arrays are returned as compact JSON text.
 rune_param() {
   local key="$1"
   local default_value="${2-}"
-  echo "$RUNE_INPUT_JSON" | jq -r --arg key "$key" --arg dflt "$default_value" '
-    (.payload.input_parameters[$key] // $dflt)
-    | if type=="object" or type=="array" then tojson
-      elif type=="boolean" then (if . then "true" else "false" end)
-      elif type=="number" then tostring
-      else .
-      end
-  '
+  if [[ -n "$key" && -n "${RUNE_PARAMS[$key]+set}" ]]; then
+    printf '%s\n' "${RUNE_PARAMS[$key]}"
+  else
+    printf '%s\n' "$default_value"
+  fi
 }
 
 # Return a parameter as JSON (compact). default_json must be valid JSON (e.g. "null", "{}", "[]", "\"text\"").
 rune_param_json() {
   local key="$1"
   local default_json="${2:-null}"
-  echo "$RUNE_INPUT_JSON" | jq -c --arg key "$key" --argjson dflt "$default_json" '(.payload.input_parameters[$key] // $dflt)'
+  if [[ -n "$key" && -n "${RUNE_PARAMS_JSON[$key]+set}" ]]; then
+    printf '%s\n' "${RUNE_PARAMS_JSON[$key]}"
+  else
+    _rune_default_json "$default_json"
+  fi
 }
 
 rune_all_params() {
@@ -242,21 +401,22 @@ rune_all_params() {
 rune_ctx() {
   local key="$1"
   local default_value="${2-}"
-  echo "$RUNE_INPUT_JSON" | jq -r --arg key "$key" --arg dflt "$default_value" '
-    (.payload.context[$key] // $dflt)
-    | if type=="object" or type=="array" then tojson
-      elif type=="boolean" then (if . then "true" else "false" end)
-      elif type=="number" then tostring
-      else .
-      end
-  '
+  if [[ -n "$key" && -n "${RUNE_CTX[$key]+set}" ]]; then
+    printf '%s\n' "${RUNE_CTX[$key]}"
+  else
+    printf '%s\n' "$default_value"
+  fi
 }
 
 # Return a context value as JSON (compact).
 rune_ctx_json() {
   local key="$1"
   local default_json="${2:-null}"
-  echo "$RUNE_INPUT_JSON" | jq -c --arg key "$key" --argjson dflt "$default_json" '(.payload.context[$key] // $dflt)'
+  if [[ -n "$key" && -n "${RUNE_CTX_JSON[$key]+set}" ]]; then
+    printf '%s\n' "${RUNE_CTX_JSON[$key]}"
+  else
+    _rune_default_json "$default_json"
+  fi
 }
 
 rune_all_ctx() {
@@ -269,16 +429,18 @@ rune_meta() {
   local default_value="${2-}"
 
   local v
-  v=$(echo "$RUNE_MESSAGE_METADATA" | jq -r --arg key "$key" 'if has($key) then .[$key] else empty end')
-  if [[ -n "$v" && "$v" != "null" ]]; then
-    echo "$v"
-    return 0
-  fi
+  if [[ -n "$key" ]]; then
+    v="${RUNE_META[$key]-}"
+    if [[ -n "$v" && "$v" != "null" ]]; then
+      echo "$v"
+      return 0
+    fi
 
-  v=$(echo "$RUNE_OBSERVABILITY" | jq -r --arg key "$key" 'if has($key) then .[$key] else empty end')
-  if [[ -n "$v" && "$v" != "null" ]]; then
-    echo "$v"
-    return 0
+    v="${RUNE_OBS[$key]-}"
+    if [[ -n "$v" && "$v" != "null" ]]; then
+      echo "$v"
+      return 0
+    fi
   fi
 
   echo "$default_value"
@@ -288,7 +450,98 @@ rune_meta() {
 rune_obs() {
   local key="$1"
   local default_value="${2-}"
-  echo "$RUNE_OBSERVABILITY" | jq -r --arg key "$key" --arg dflt "$default_value" '.[$key] // $dflt'
+  if [[ -n "$key" && -n "${RUNE_OBS[$key]+set}" && -z "${_RUNE_OBS_FALSY[$key]+set}" ]]; then
+    printf '%s\n' "${RUNE_OBS[$key]}"
+  else
+    printf '%s\n' "$default_value"
+  fi
+}
+
+# Internal: emit a BPCS message with a single jq call and print it on stdout.
+#   _rune_emit_message ok|error CODE MESSAGE json DATA_JSON
+#   _rune_emit_message ok|error CODE MESSAGE kv [KEY=VALUE ...]
+# DATA_JSON must be an object; invalid values are replaced with {}.
+_rune_emit_message() {
+  local kind="$1"
+  local code="$2"
+  local message="$3"
+  local source="$4"
+  shift 4
+
+  local data_json="{}"
+  if [[ "$source" == "json" ]]; then
+    data_json="${1-}"
+    set --
+  fi
+
+  local artifacts_json
+  printf -v artifacts_json '%s,' "${RUNE_ARTIFACTS[@]}"
+  artifacts_json="[${artifacts_json%,}]"
+
+  jq -nc \
+    --argjson mm "$RUNE_MESSAGE_METADATA" \
+    --argjson obs "$RUNE_OBSERVABILITY" \
+    --arg kind "$kind" \
+    --argjson code "$code" \
+    --arg msg "$message" \
+    --arg source "$source" \
+    --arg data "$data_json" \
+    --argjson artifacts "$artifacts_json" \
+    "${_RUNE_JQ_DEFS}"'
+      _rune_message($kind; $code; $msg;
+        if $source == "kv" then _rune_kv else _rune_object($data) end)
+      | if $kind == "ok" and ($artifacts | length) > 0 then
+          .payload.output_data.artifacts //= $artifacts
+        else . end
+    ' --args "$@"
+}
+
+# Move FILE into the artifact directory as NAME (default: the file's basename) and declare it.
+# Declared artifacts are added to output_data.artifacts by rune_ok, rune_ok_kv and rune_finish
+# as {"name", "size", "sha256"} objects; the orchestrator transfers them out of band and adds
+# the local path. Names may only contain letters, digits, ".", "_" and "-".
+#   rune_artifact_add "$tmp/logs.tar.gz"
+#   echo "${RUNE_ARTIFACT_DIR}/logs.tar.gz"
+rune_artifact_add() {
+  local source="$1"
+  local name="${2:-${1##*/}}"
+  if [[ ! "$name" =~ ^[A-Za-z0-9_-][A-Za-z0-9._-]*$ ]]; then
+    echo "rune_artifact_add: invalid artifact name: ${name}" >&2
+    return 1
+  fi
+  if [[ ! -f "$source" ]]; then
+    echo "rune_artifact_add: not a regular file: ${source}" >&2
+    return 1
+  fi
+  local entry
+  for entry in "${RUNE_ARTIFACTS[@]}"; do
+    if [[ "$entry" == "{\"name\":\"${name}\","* ]]; then
+      echo "rune_artifact_add: artifact already declared: ${name}" >&2
+      return 1
+    fi
+  done
+
+  if [[ -z "$RUNE_ARTIFACT_DIR" ]]; then
+    RUNE_ARTIFACT_DIR=$(mktemp -d "${TMPDIR:-/tmp}/rune-artifacts.XXXXXX") || return 1
+  fi
+  mkdir -p "$RUNE_ARTIFACT_DIR" || return 1
+  local target="${RUNE_ARTIFACT_DIR}/${name}"
+  if [[ "$source" -ef "$target" ]] || mv -f "$source" "$target"; then :; else return 1; fi
+
+  local size sum
+  size=$(wc -c <"$target") || return 1
+  if command -v sha256sum >/dev/null 2>&1; then
+    sum=$(sha256sum "$target") || return 1
+  else
+    sum=$(shasum -a 256 "$target") || return 1
+  fi
+  RUNE_ARTIFACTS+=("{\"name\":\"${name}\",\"size\":$((size)),\"sha256\":\"${sum%% *}\"}")
+}
+
+# Print the declared artifacts as a compact JSON array (for advanced mode output).
+rune_artifacts_json() {
+  local IFS=,
+  printf '[%s]\n' "${RUNE_ARTIFACTS[*]}"
 }
 
 # Emit a BPCS success message and exit 0.
@@ -302,29 +555,7 @@ rune_ok() {
     output_json="{}"
   fi
 
-  local output_data
-  output_data=$(_rune_safe_json_object "$output_json" "{}")
-
-  jq -nc \
-    --argjson mm "$RUNE_MESSAGE_METADATA" \
-    --argjson obs "$RUNE_OBSERVABILITY" \
-    --arg msg "$status_message" \
-    --argjson data "$output_data" \
-    '{
-      message_metadata: $mm,
-      payload: {
-        result: "success",
-        output_data: (
-          if ($msg != "" and ($data|has("message")|not)) then
-            ($data + {message:$msg})
-          else
-            $data
-          end
-        )
-      },
-      observability: $obs,
-      error: null
-    }'
+  _rune_emit_message ok 0 "$status_message" json "$output_json"
   exit 0
 }
 
@@ -340,21 +571,7 @@ rune_error() {
     details_json="{}"
   fi
 
-  local details
-  details=$(_rune_safe_json_object "$details_json" "{}")
-
-  jq -nc \
-    --argjson mm "$RUNE_MESSAGE_METADATA" \
-    --argjson obs "$RUNE_OBSERVABILITY" \
-    --arg msg "$message" \
-    --argjson details "$details" \
-    --argjson code "$code" \
-    '{
-      message_metadata: $mm,
-      payload: null,
-      observability: $obs,
-      error: {code: ($code|tonumber), message: $msg, details: $details}
-    }'
+  _rune_emit_message error "$code" "$message" json "$details_json"
   exit "$code"
 }
 
@@ -394,23 +611,21 @@ _rune_build_kv_json() {
   "${jq_args[@]}" "$jq_prog"
 }
 
-# Success helper that builds payload.output_data from key=value pairs and delegates to rune_ok.
+# Success helper that builds payload.output_data from key=value pairs and exits 0.
 rune_ok_kv() {
   local message="$1"
   shift || true
-  local output_data_json
-  output_data_json=$(_rune_build_kv_json "$@")
-  rune_ok "$message" "$output_data_json"
+  _rune_emit_message ok 0 "$message" kv "$@"
+  exit 0
 }
 
-# Error helper that builds error.details from key=value pairs and delegates to rune_error.
+# Error helper that builds error.details from key=value pairs and exits with the code.
 rune_error_kv() {
   local code="$1"
   local message="$2"
   shift 2 || true
-  local details_json
-  details_json=$(_rune_build_kv_json "$@")
-  rune_error "$code" "$message" "$details_json"
+  _rune_emit_message error "$code" "$message" kv "$@"
+  exit "$code"
 }
 rune_fail_kv() { rune_error_kv "$@"; }
 
@@ -447,14 +662,14 @@ rune_err() {
 # - Otherwise, emit rune_ok(success_message, output_data_from_rune_out)
 rune_finish() {
   local success_message="${1:-success}"
-  local data_json
-  data_json=$(_rune_build_kv_json "${RUNE_OUT_FIELDS[@]}")
 
   if [ "${RUNE_ERROR_CODE}" -ne 0 ]; then
     local msg="${RUNE_ERROR_MESSAGE:-error}"
-    rune_error "${RUNE_ERROR_CODE}" "$msg" "$data_json"
+    _rune_emit_message error "${RUNE_ERROR_CODE}" "$msg" kv "${RUNE_OUT_FIELDS[@]}"
+    exit "${RUNE_ERROR_CODE}"
   else
-    rune_ok "$success_message" "$data_json"
+    _rune_emit_message ok 0 "$success_message" kv "${RUNE_OUT_FIELDS[@]}"
+    exit 0
   fi
 }
 
@@ -468,21 +683,60 @@ rune_emit() {
   local json="$1"
   local exit_code="${2-}"
 
-  local compact
-  compact=$(echo "$json" | _rune_compact_json) || {
-    echo "rune_emit: output is not valid JSON" >&2
-    exit 2
-  }
+  # One jq call compacts, validates and derives the default exit code. It prints the status
+  # ("json" for unparseable input, "bpcs" for invalid BPCS, otherwise the exit code) followed
+  # by the compact document.
+  local -a lines=()
+  mapfile -t lines < <(
+    jq -rc '
+      if . == null or . == false then "json"
+      elif (
+        type=="object"
+        and (.message_metadata|type=="object")
+        and (.message_metadata.version|type=="string")
+        and (.message_metadata.message_id|type=="string")
+        and (.message_metadata.created_at|type=="string")
+        and (has("payload"))
+        and (has("observability"))
+        and (.observability|type=="object")
+        and (.observability.trace_id|type=="string")
+        and (.observability.span_id|type=="string")
+        and (has("error"))
+        and (
+          if .error == null then
+            (.payload|type=="object")
+            and (.payload.result=="success")
+            and (.payload.output_data|type=="object")
+          else
+            (.payload == null)
+            and (.error|type=="object")
+            and (.error.code|type=="number")
+            and (.error.message|type=="string")
+            and (.error.details|type=="object")
+          end
+        )
+      ) then
+        (if .error == null then 0 else (.error.code // 100) end), .
+      else "bpcs"
+      end
+    ' <<<"$json" 2>/dev/null
+  )
 
-  if ! echo "$compact" | _rune_validate_bpcs_output; then
-    echo "rune_emit: output is not valid BPCS output" >&2
-    exit 2
-  fi
+  case "${lines[0]-json}" in
+    json)
+      echo "rune_emit: output is not valid JSON" >&2
+      exit 2
+      ;;
+    bpcs)
+      echo "rune_emit: output is not valid BPCS output" >&2
+      exit 2
+      ;;
+  esac
 
-  echo "$compact"
+  echo "${lines[1]}"
 
   if [[ -z "$exit_code" ]]; then
-    exit_code=$(echo "$compact" | jq -r 'if .error==null then 0 else (.error.code // 100) end')
+    exit_code="${lines[0]}"
   fi
 
   exit "$exit_code"
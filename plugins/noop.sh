@@ -1,4 +1,12 @@
 #!/usr/bin/env bash
+# rune:action noop
+# rune:description No-op plugin used for connectivity and contract testing.
+# rune:version 1.0.0
+# rune:timeout 30
+# rune:max-retries 1
+# rune:retry-delay-ms 500
+# rune:param mode string Response style: "easy" (default) or "advanced".
+# rune:param fail boolean Force an error response when "true".
 set -euo pipefail
 
 SCRIPT_DIR=$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)
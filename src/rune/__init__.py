@@ -2,11 +2,33 @@
 
 from __future__ import annotations
 
-from importlib.metadata import PackageNotFoundError, version
+from typing import Any
 
 __all__ = ["__version__"]
 
-try:
-    __version__ = version("rune")
-except PackageNotFoundError:  # pragma: no cover - during editable installs
-    __version__ = "0.0.0"
+
+def __getattr__(name: str) -> Any:
+    # Resolved on first access: scanning installed distributions via importlib.metadata
+    # costs tens of milliseconds, which every CLI invocation would otherwise pay.
+    if name == "__version__":
+        resolved = _resolve_version()
+        globals()["__version__"] = resolved
+        return resolved
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _resolve_version() -> str:
+    try:
+        # Written by the hatch version build hook when building a wheel or sdist.
+        from rune._version import __version__ as baked_version
+    except ImportError:
+        pass
+    else:
+        return str(baked_version)
+
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version("rune")
+    except PackageNotFoundError:  # pragma: no cover - during editable installs
+        return "0.0.0"
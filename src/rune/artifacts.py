@@ -0,0 +1,198 @@
+"""Local artifact directory for files plugins return out of band.
+
+The BPCS document on stdout is parsed in memory, so it is the wrong channel for log archives
+and other bulk diagnostics. A plugin instead writes such files into ``$RUNE_ARTIFACT_DIR`` and
+declares them in ``payload.output_data.artifacts`` as ``{"name", "size", "sha256"}`` entries.
+The transport brings the files back (streamed as a gzip'd tarball from remote nodes) into a
+per-request directory under :func:`artifact_root`, and the mediator replaces each declaration
+with a reference that also carries the local ``path``, after checking size and checksum.
+
+Files are copied in fixed-size chunks and hashed while they are written, so the orchestrator's
+memory use does not depend on artifact size.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import tarfile
+from pathlib import Path
+from typing import IO, Any
+
+__all__ = [
+    "ArtifactError",
+    "artifact_root",
+    "declared_artifacts",
+    "remote_request_dir",
+    "request_dir",
+    "request_id",
+    "unpack_archive",
+    "verify_directory",
+]
+
+ARTIFACT_ROOT_ENV = "RUNE_ARTIFACT_ROOT"
+
+# Shell-expanded on the remote node, so it may reference remote environment variables.
+DEFAULT_REMOTE_ARTIFACT_DIR = "${XDG_CACHE_HOME:-$HOME/.cache}/rune/artifacts"
+REMOTE_ARTIFACT_DIR_ENV = "RUNE_REMOTE_ARTIFACT_DIR"
+
+# Environment variable through which plugins learn where to write their artifacts.
+PLUGIN_ARTIFACT_DIR_ENV = "RUNE_ARTIFACT_DIR"
+
+CHUNK_SIZE = 1024 * 1024
+
+_NAME = re.compile(r"[A-Za-z0-9._-]+")
+_SHA256 = re.compile(r"[0-9a-f]{64}")
+
+
+class ArtifactError(Exception):
+    """An artifact could not be transferred or does not match its declaration."""
+
+
+def artifact_root() -> Path:
+    """Return the local directory that holds one subdirectory of artifacts per request."""
+
+    configured = os.environ.get(ARTIFACT_ROOT_ENV)
+    if configured:
+        return Path(configured)
+    data_home = os.environ.get("XDG_DATA_HOME") or Path.home() / ".local" / "share"
+    return Path(data_home) / "rune" / "artifacts"
+
+
+def request_id(payload: dict[str, Any]) -> str:
+    """Return the directory name for the request ``payload``: its sanitized message id."""
+
+    metadata = payload.get("message_metadata")
+    message_id = metadata.get("message_id") if isinstance(metadata, dict) else None
+    if isinstance(message_id, str) and _NAME.fullmatch(message_id) and message_id[0] != ".":
+        return message_id
+    return hashlib.sha256(str(message_id).encode()).hexdigest()[:32]
+
+
+def request_dir(payload: dict[str, Any]) -> Path:
+    """Return the local artifact directory for the request ``payload``."""
+
+    return artifact_root() / request_id(payload)
+
+
+def remote_request_dir(payload: dict[str, Any]) -> str:
+    """Return the (shell-expanded) artifact directory for ``payload`` on a remote node."""
+
+    base = os.environ.get(REMOTE_ARTIFACT_DIR_ENV, DEFAULT_REMOTE_ARTIFACT_DIR).rstrip("/")
+    return f"{base}/{request_id(payload)}"
+
+
+def declared_artifacts(plugin_output: dict[str, Any] | None) -> list[dict[str, Any]] | None:
+    """Return the artifacts declared in ``payload.output_data.artifacts``, or ``None``.
+
+    Raises :class:`ArtifactError` when the declaration is malformed: names must be plain file
+    names, ``size`` a non-negative integer and ``sha256`` a lowercase hex digest.
+    """
+
+    payload = plugin_output.get("payload") if isinstance(plugin_output, dict) else None
+    output_data = payload.get("output_data") if isinstance(payload, dict) else None
+    declared = output_data.get("artifacts") if isinstance(output_data, dict) else None
+    if not declared:
+        return None
+    if not isinstance(declared, list):
+        raise ArtifactError("output_data.artifacts must be a list")
+
+    names: set[str] = set()
+    for entry in declared:
+        if not isinstance(entry, dict):
+            raise ArtifactError("artifact declarations must be objects")
+        name, size, digest = entry.get("name"), entry.get("size"), entry.get("sha256")
+        if not isinstance(name, str) or not _NAME.fullmatch(name) or name[0] == ".":
+            raise ArtifactError(f"invalid artifact name: {name!r}")
+        if name in names:
+            raise ArtifactError(f"artifact {name} is declared twice")
+        if not isinstance(size, int) or isinstance(size, bool) or size < 0:
+            raise ArtifactError(f"artifact {name} has an invalid size")
+        if not isinstance(digest, str) or not _SHA256.fullmatch(digest):
+            raise ArtifactError(f"artifact {name} has an invalid sha256")
+        names.add(name)
+    return declared
+
+
+def _reference(directory: Path, entry: dict[str, Any], size: int, digest: str) -> dict[str, Any]:
+    name = entry["name"]
+    if size != entry["size"] or digest != entry["sha256"]:
+        raise ArtifactError(f"artifact {name} does not match its declared size and sha256")
+    return {**entry, "path": str(directory / name)}
+
+
+def _copy(source: IO[bytes], target: IO[bytes]) -> tuple[int, str]:
+    """Copy ``source`` to ``target`` chunk by chunk; return the byte count and sha256."""
+
+    digest = hashlib.sha256()
+    size = 0
+    while chunk := source.read(CHUNK_SIZE):
+        digest.update(chunk)
+        target.write(chunk)
+        size += len(chunk)
+    return size, digest.hexdigest()
+
+
+def _hash_file(path: Path) -> tuple[int, str]:
+    digest = hashlib.sha256()
+    size = 0
+    with path.open("rb") as handle:
+        while chunk := handle.read(CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
+
+def verify_directory(directory: Path, declared: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Check files a plugin wrote directly into ``directory`` and return their references."""
+
+    references = []
+    for entry in declared:
+        path = directory / entry["name"]
+        try:
+            size, digest = _hash_file(path)
+        except OSError as exc:
+            raise ArtifactError(f"artifact {entry['name']} is missing: {exc}") from exc
+        references.append(_reference(directory, entry, size, digest))
+    return references
+
+
+def unpack_archive(
+    archive_path: Path, directory: Path, declared: list[dict[str, Any]]
+) -> list[dict[str, Any]]:
+    """Extract the declared files from a gzip'd tarball into ``directory`` and verify them.
+
+    Only regular files whose names were declared are extracted; anything else in the archive
+    (links, directories, undeclared files) is ignored. Each file is hashed while it is written
+    and only renamed into place once it matches its declaration.
+    """
+
+    wanted = {entry["name"]: entry for entry in declared}
+    references: dict[str, dict[str, Any]] = {}
+    directory.mkdir(parents=True, exist_ok=True)
+    try:
+        with tarfile.open(archive_path, mode="r|gz") as archive:
+            for member in archive:
+                name = member.name.removeprefix("./")
+                entry = wanted.get(name)
+                if entry is None or name in references or not member.isfile():
+                    continue
+                source = archive.extractfile(member)
+                if source is None:
+                    continue
+                partial = directory / f".{name}.part"
+                try:
+                    with partial.open("wb") as target:
+                        size, digest = _copy(source, target)
+                    references[name] = _reference(directory, entry, size, digest)
+                    os.replace(partial, directory / name)
+                finally:
+                    partial.unlink(missing_ok=True)
+    except (tarfile.TarError, EOFError, OSError) as exc:
+        raise ArtifactError(f"could not unpack artifacts: {exc}") from exc
+
+    missing = [name for name in wanted if name not in references]
+    if missing:
+        raise ArtifactError(f"artifacts missing from transfer: {', '.join(missing)}")
+    return [references[entry["name"]] for entry in declared]
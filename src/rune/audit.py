@@ -0,0 +1,357 @@
+"""Append-only NDJSON audit log of executed actions.
+
+Every result returned by ``run_action`` is appended as one line::
+
+    {"recorded_at": "2026-10-17T06:58:01.402113Z", "requester": "alice@runner01",
+     "client": null, "params_sha256": "4f1a...", "result": {...}}
+
+``result`` is :meth:`OrchestrationResult.to_dict`. Parameters are recorded only as a hash of
+their canonical JSON, so secrets passed as parameters do not end up in the log.
+
+Recording must not slow down the execution path, so :meth:`AuditLog.record` only serializes the
+record and enqueues the line; serializing up front also keeps later changes to the caller's
+dicts out of the log. A background writer thread takes every queued line at once and appends
+the batch with a single ``write``. A failed write is reported as a :class:`RuntimeWarning` and
+its records are dropped; the writer carries on with the next batch. Durability is a policy:
+
+- ``fsync="always"``: the file is fsynced after every batch (group commit), so a record is on
+  disk before the writer moves on to the next batch.
+- ``fsync=<milliseconds>``: at most that long passes between a write and its fsync.
+- ``fsync="never"``: flushing is left to the operating system.
+
+When the file would grow beyond ``max_bytes`` it is renamed to a timestamped segment, which is
+gzip-compressed, and a new file is started. Only the newest ``backups`` segments are kept.
+
+Set ``RUNE_AUDIT_LOG`` to enable the process-wide log used by the orchestrator;
+``RUNE_AUDIT_FSYNC``, ``RUNE_AUDIT_MAX_BYTES`` and ``RUNE_AUDIT_BACKUPS`` tune it.
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+import warnings
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from rune import codec
+
+__all__ = [
+    "AuditLog",
+    "close_default_log",
+    "current_requester",
+    "get_default_log",
+    "params_hash",
+    "requester",
+]
+
+AUDIT_LOG_ENV = "RUNE_AUDIT_LOG"
+AUDIT_FSYNC_ENV = "RUNE_AUDIT_FSYNC"
+AUDIT_MAX_BYTES_ENV = "RUNE_AUDIT_MAX_BYTES"
+AUDIT_BACKUPS_ENV = "RUNE_AUDIT_BACKUPS"
+
+DEFAULT_FSYNC_MS = 1000
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+DEFAULT_BACKUPS = 10
+
+_COMPRESS_CHUNK_SIZE = 1024 * 1024
+
+# Upper bound on records serialized into a single write.
+_MAX_BATCH = 4096
+
+# (requester, client) for records made in the current context; None means the local user.
+_REQUESTER: ContextVar[tuple[str, str | None] | None] = ContextVar(
+    "rune_requester", default=None
+)
+_LOCAL_USER: str | None = None
+
+
+def _local_user() -> str:
+    global _LOCAL_USER
+    if _LOCAL_USER is None:
+        import getpass
+        import socket
+
+        try:
+            user = getpass.getuser()
+        except (KeyError, OSError):
+            user = str(os.getuid())
+        _LOCAL_USER = f"{user}@{socket.gethostname()}"
+    return _LOCAL_USER
+
+
+@contextmanager
+def requester(identity: str, client: str | None = None) -> Iterator[None]:
+    """Attribute records made inside the block to ``identity`` connecting from ``client``."""
+
+    token = _REQUESTER.set((identity, client))
+    try:
+        yield
+    finally:
+        _REQUESTER.reset(token)
+
+
+def current_requester() -> tuple[str, str | None]:
+    """Return ``(requester, client)`` for the current context; defaults to ``user@host``."""
+
+    return _REQUESTER.get() or (_local_user(), None)
+
+
+def params_hash(params: dict[str, Any]) -> str:
+    """SHA-256 of the canonical JSON form of ``params``; key order does not matter."""
+
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _parse_fsync(value: str | None) -> float | None:
+    """Map ``RUNE_AUDIT_FSYNC`` to an fsync interval in seconds (None disables fsync)."""
+
+    if value is None or value == "":
+        return DEFAULT_FSYNC_MS / 1000
+    if value == "always":
+        return 0.0
+    if value == "never":
+        return None
+    try:
+        return max(int(value.removesuffix("ms")), 0) / 1000
+    except ValueError:
+        raise ValueError(
+            f"{AUDIT_FSYNC_ENV} must be 'always', 'never' or milliseconds, got {value!r}"
+        ) from None
+
+
+class AuditLog:
+    """NDJSON audit log appended by a background writer thread."""
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        fsync: str | int = DEFAULT_FSYNC_MS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backups: int = DEFAULT_BACKUPS,
+    ) -> None:
+        self.path = Path(path)
+        self.fsync_interval = _parse_fsync(str(fsync))
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "ab", buffering=0)
+        self._size = os.fstat(self._file.fileno()).st_size
+        self._queue: queue.SimpleQueue[bytes | threading.Event | None] = queue.SimpleQueue()
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._unsynced_since: float | None = None
+        self._writer = threading.Thread(target=self._run, name="rune-audit", daemon=True)
+        self._writer.start()
+
+    @classmethod
+    def from_env(cls, path: Path) -> AuditLog:
+        """Create a log at ``path`` tuned by the ``RUNE_AUDIT_*`` environment variables."""
+
+        return cls(
+            path,
+            fsync=os.environ.get(AUDIT_FSYNC_ENV) or DEFAULT_FSYNC_MS,
+            max_bytes=int(os.environ.get(AUDIT_MAX_BYTES_ENV) or DEFAULT_MAX_BYTES),
+            backups=int(os.environ.get(AUDIT_BACKUPS_ENV) or DEFAULT_BACKUPS),
+        )
+
+    def record(self, result: dict[str, Any], params: dict[str, Any]) -> None:
+        """Queue ``result`` (an :meth:`OrchestrationResult.to_dict`) for appending.
+
+        The line is serialized here, so changes the caller makes to ``result`` or ``params``
+        afterwards are not recorded. Never blocks on I/O.
+        """
+
+        if self._closed:
+            return
+        identity, client = current_requester()
+        self._queue.put(_encode(time.time(), result, identity, client, params))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every record queued so far is written (and fsynced unless disabled)."""
+
+        if self._closed:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: float | None = 10.0) -> None:
+        """Write outstanding records, stop the writer thread and close the file."""
+
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout)
+
+    def segments(self) -> list[Path]:
+        """Rotated, compressed segments, oldest first."""
+
+        return sorted(self.path.parent.glob(f"{self.path.name}.*.gz"))
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                first = self._queue.get(timeout=self._sync_wait())
+            except queue.Empty:
+                try:
+                    self._sync(force=True)
+                except OSError as exc:
+                    self._write_failed(0, exc)
+                continue
+            entries: list[bytes] = []
+            waiters: list[threading.Event] = []
+            item: bytes | threading.Event | None = first
+            while True:
+                if item is None:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    entries.append(item)
+                if len(entries) >= _MAX_BATCH:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                if entries:
+                    self._write(b"".join(entries))
+                self._sync(force=bool(waiters) or stopping)
+            except OSError as exc:
+                self._write_failed(len(entries), exc)
+            finally:
+                for waiter in waiters:
+                    waiter.set()
+        self._file.close()
+
+    def _write_failed(self, count: int, exc: OSError) -> None:
+        # Nothing left to fsync for the failed batch; keep the writer alive for the next one.
+        self._unsynced_since = None
+        records = f"{count} record(s) to" if count else "pending records to"
+        warnings.warn(
+            f"could not write {records} audit log {self.path}: {exc}",
+            RuntimeWarning,
+            stacklevel=1,
+        )
+
+    def _sync_wait(self) -> float | None:
+        """Seconds until pending writes are due for an fsync; None when nothing is pending."""
+
+        if self._unsynced_since is None or self.fsync_interval is None:
+            return None
+        return max(self._unsynced_since + self.fsync_interval - time.monotonic(), 0)
+
+    def _sync(self, force: bool = False) -> None:
+        if self._unsynced_since is None or self.fsync_interval is None:
+            return
+        if force or time.monotonic() - self._unsynced_since >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._unsynced_since = None
+
+    def _write(self, data: bytes) -> None:
+        if self._file.closed:
+            # A failed rotation could not reopen the log; try again.
+            self._reopen()
+        if self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._size += len(data)
+        if self._unsynced_since is None:
+            self._unsynced_since = time.monotonic()
+        self._sync()
+
+    def _rotate(self) -> None:
+        self._sync(force=True)
+        self._file.close()
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        segment = self.path.with_name(f"{self.path.name}.{stamp}")
+        try:
+            os.replace(self.path, segment)
+        finally:
+            self._reopen()
+        _compress(segment)
+        segments = self.segments()
+        for old in segments[: max(len(segments) - self.backups, 0)]:
+            old.unlink(missing_ok=True)
+
+    def _reopen(self) -> None:
+        self._file = open(self.path, "ab", buffering=0)
+        self._size = os.fstat(self._file.fileno()).st_size
+
+
+def _encode(
+    recorded_at: float,
+    result: dict[str, Any],
+    identity: str,
+    client: str | None,
+    params: dict[str, Any],
+) -> bytes:
+    stamp = datetime.fromtimestamp(recorded_at, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    record = {
+        "recorded_at": stamp,
+        "requester": identity,
+        "client": client,
+        "params_sha256": params_hash(params),
+        "result": result,
+    }
+    return codec.dumps(record) + b"\n"
+
+
+def _compress(segment: Path) -> None:
+    import gzip
+    import shutil
+
+    compressed = segment.with_name(f"{segment.name}.gz")
+    with segment.open("rb") as source, gzip.open(compressed, "wb") as target:
+        shutil.copyfileobj(source, target, _COMPRESS_CHUNK_SIZE)
+    segment.unlink()
+
+
+_DEFAULT_LOG: AuditLog | None = None
+_DEFAULT_LOCK = threading.Lock()
+_ATEXIT_REGISTERED = False
+
+
+def get_default_log() -> AuditLog | None:
+    """Return the process-wide log at ``$RUNE_AUDIT_LOG``, or None when auditing is off."""
+
+    global _DEFAULT_LOG, _ATEXIT_REGISTERED
+    configured = os.environ.get(AUDIT_LOG_ENV)
+    if not configured:
+        return None
+    with _DEFAULT_LOCK:
+        if _DEFAULT_LOG is None or _DEFAULT_LOG.path != Path(configured):
+            if _DEFAULT_LOG is not None:
+                _DEFAULT_LOG.close()
+            _DEFAULT_LOG = AuditLog.from_env(Path(configured))
+            if not _ATEXIT_REGISTERED:
+                # The writer is a daemon thread; without this, queued records die with it.
+                atexit.register(close_default_log)
+                _ATEXIT_REGISTERED = True
+        return _DEFAULT_LOG
+
+
+def close_default_log() -> None:
+    """Flush and close the process-wide log, if one was opened."""
+
+    global _DEFAULT_LOG
+    with _DEFAULT_LOCK:
+        if _DEFAULT_LOG is not None:
+            _DEFAULT_LOG.close()
+            _DEFAULT_LOG = None
@@ -0,0 +1,266 @@
+"""Concurrent execution of newline-delimited JSON requests (``rune batch``).
+
+Each input line is one request object::
+
+    {"action": "noop", "node": "web-1", "params": {"mode": "fast"}, "id": "job-17"}
+
+``action`` and ``node`` are required. ``params``, ``use_ssm``, ``dry_run``, ``use_cache`` and
+``max_retries`` are optional and default to the batch-wide settings; ``id`` is an opaque
+client reference echoed back. Each result is written as soon as its request finishes, so output
+order follows completion order. Every output line is an orchestration result with an extra
+``batch`` object holding the input ``line`` number and ``id``. Input is read only as fast as
+workers free up, so arbitrarily long streams run in bounded memory.
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO
+
+from rune import codec
+from rune.models import (
+    OrchestrationResult,
+    StructuredError,
+    build_message_metadata,
+    build_observability,
+)
+from rune.orchestrator import DEFAULT_CONCURRENCY, run_action_async
+
+__all__ = [
+    "BatchInputError",
+    "BatchRequest",
+    "BatchSummary",
+    "parse_request",
+    "run_batch",
+    "run_batch_async",
+]
+
+_FIELDS = frozenset(
+    {"action", "node", "params", "use_ssm", "dry_run", "use_cache", "max_retries", "id"}
+)
+
+
+class BatchInputError(Exception):
+    """The request stream could not be read."""
+
+
+@dataclass(slots=True)
+class BatchRequest:
+    """One parsed input line."""
+
+    line: int
+    action: str
+    node: str
+    params: dict[str, Any] = field(default_factory=dict)
+    use_ssm: bool = False
+    dry_run: bool = False
+    use_cache: bool = False
+    max_retries: int | None = None
+    request_id: str | None = None
+
+
+@dataclass(slots=True)
+class BatchSummary:
+    """Outcome counts for a whole batch; ``invalid`` lines are also counted as ``failed``."""
+
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    invalid: int = 0
+    duration_ms: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize the summary for JSON emission."""
+
+        return {
+            "total": self.total,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "invalid": self.invalid,
+            "duration_ms": round(self.duration_ms, 3),
+        }
+
+
+def parse_request(raw: bytes | str, line: int, defaults: dict[str, Any]) -> BatchRequest:
+    """Parse one NDJSON line; ``defaults`` supplies the batch-wide flags.
+
+    Raises ``ValueError`` describing the first problem found.
+    """
+
+    try:
+        document = codec.loads(raw)
+    except codec.JSONDecodeError as exc:
+        raise ValueError(f"invalid JSON: {exc}") from None
+    if not isinstance(document, dict):
+        raise ValueError("request must be a JSON object")
+    unknown = sorted(set(document) - _FIELDS)
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)}")
+
+    values = {**defaults, **document}
+    for name in ("action", "node"):
+        if not isinstance(values.get(name), str) or not values[name]:
+            raise ValueError(f"'{name}' must be a non-empty string")
+    if not isinstance(values.setdefault("params", {}), dict):
+        raise ValueError("'params' must be an object")
+    for name in ("use_ssm", "dry_run", "use_cache"):
+        if not isinstance(values.setdefault(name, False), bool):
+            raise ValueError(f"'{name}' must be a boolean")
+    max_retries = values.get("max_retries")
+    if max_retries is not None and (
+        not isinstance(max_retries, int) or isinstance(max_retries, bool) or max_retries < 0
+    ):
+        raise ValueError("'max_retries' must be a non-negative integer")
+    request_id = values.get("id")
+    if request_id is not None and not isinstance(request_id, str):
+        raise ValueError("'id' must be a string")
+
+    return BatchRequest(
+        line=line,
+        action=values["action"],
+        node=values["node"],
+        params=values["params"],
+        use_ssm=values["use_ssm"],
+        dry_run=values["dry_run"],
+        use_cache=values["use_cache"],
+        max_retries=max_retries,
+        request_id=request_id,
+    )
+
+
+def _failed(
+    action: Any, node: Any, transport: str, code: int, message: str
+) -> OrchestrationResult:
+    return OrchestrationResult(
+        status="failed",
+        action=action if isinstance(action, str) else "",
+        node=node if isinstance(node, str) else "",
+        transport=transport,
+        message_metadata=build_message_metadata(),
+        observability=build_observability(),
+        plugin_output=None,
+        error=StructuredError(code=code, message=message),
+    )
+
+
+def _reference(raw: bytes) -> tuple[Any, Any, Any]:
+    """Best-effort action, node and id of a line that failed validation."""
+
+    try:
+        document = codec.loads(raw)
+    except codec.JSONDecodeError:
+        return None, None, None
+    if not isinstance(document, dict):
+        return None, None, None
+    return document.get("action"), document.get("node"), document.get("id")
+
+
+async def run_batch_async(
+    stream: BinaryIO,
+    emit: Callable[[dict[str, Any]], None],
+    *,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    defaults: dict[str, Any] | None = None,
+) -> BatchSummary:
+    """Execute every request read from ``stream`` with at most ``concurrency`` in flight.
+
+    ``emit`` receives each result document as soon as its request completes. Invalid lines
+    produce a failed result with error code 400 instead of aborting the batch. A failure to read
+    ``stream`` raises :class:`BatchInputError`; errors raised by ``emit`` propagate unchanged.
+    """
+
+    import asyncio
+
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    defaults = defaults or {}
+    transport = "ssm" if defaults.get("use_ssm") else "ssh"
+    summary = BatchSummary()
+    started = time.monotonic()
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks: set[asyncio.Task[None]] = set()
+    # Errors raised by ``emit`` inside request tasks; the first one stops the batch.
+    emit_errors: list[Exception] = []
+
+    def _emit(result: OrchestrationResult, line: int, request_id: Any) -> None:
+        if result.status == "failed":
+            summary.failed += 1
+        else:
+            summary.succeeded += 1
+        document = result.to_dict()
+        document["batch"] = {"line": line, "id": request_id}
+        emit(document)
+
+    async def _run(request: BatchRequest) -> None:
+        try:
+            result = await run_action_async(
+                action=request.action,
+                node=request.node,
+                use_ssm=request.use_ssm,
+                dry_run=request.dry_run,
+                params=request.params,
+                use_cache=request.use_cache,
+                max_retries=request.max_retries,
+            )
+        except Exception as exc:
+            transport_name = "ssm" if request.use_ssm else "ssh"
+            result = _failed(request.action, request.node, transport_name, 500, str(exc))
+        finally:
+            semaphore.release()
+        try:
+            _emit(result, request.line, request.request_id)
+        except Exception as exc:
+            emit_errors.append(exc)
+
+    line = 0
+    while not emit_errors:
+        # Blocking reads run off the loop so completions keep streaming while input trickles in.
+        try:
+            raw = await asyncio.to_thread(stream.readline)
+        except OSError as exc:
+            raise BatchInputError(str(exc)) from exc
+        if not raw:
+            break
+        line += 1
+        if not raw.strip():
+            continue
+        summary.total += 1
+        try:
+            request = parse_request(raw, line, defaults)
+        except ValueError as exc:
+            summary.invalid += 1
+            action, node, request_id = _reference(raw)
+            failed = _failed(action, node, transport, 400, f"line {line}: {exc}")
+            _emit(failed, line, request_id if isinstance(request_id, str) else None)
+            continue
+
+        await semaphore.acquire()
+        task = asyncio.create_task(_run(request))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks)
+    if emit_errors:
+        raise emit_errors[0]
+    summary.duration_ms = (time.monotonic() - started) * 1000
+    return summary
+
+
+def run_batch(
+    stream: BinaryIO,
+    emit: Callable[[dict[str, Any]], None],
+    *,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    defaults: dict[str, Any] | None = None,
+) -> BatchSummary:
+    """Blocking wrapper around :func:`run_batch_async`."""
+
+    import asyncio
+
+    return asyncio.run(
+        run_batch_async(stream, emit, concurrency=concurrency, defaults=defaults)
+    )
@@ -0,0 +1,103 @@
+"""Content-addressed plugin bundles shipped to and cached on remote nodes."""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import tarfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+__all__ = ["PluginBundle", "build_bundle", "clear_bundle_memo"]
+
+# Shell-expanded on the remote node, so it may reference remote environment variables.
+DEFAULT_REMOTE_CACHE_DIR = "${XDG_CACHE_HOME:-$HOME/.cache}/rune/bundles"
+
+_CHUNK_SIZE = 1024 * 1024
+
+# (arcname, mtime_ns, size) for every file in the bundle, in archive order.
+_Signature = tuple[tuple[str, int, int], ...]
+
+
+@dataclass(frozen=True, slots=True)
+class PluginBundle:
+    """A plugin together with the shared libraries it sources, addressed by content hash."""
+
+    digest: str
+    entrypoint: str
+    files: tuple[tuple[str, Path], ...]
+
+    def archive(self) -> bytes:
+        """Return a deterministic gzip'd tarball of the bundle files."""
+
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz", format=tarfile.PAX_FORMAT) as archive:
+            for arcname, path in self.files:
+                info = archive.gettarinfo(str(path), arcname=arcname)
+                info.uid = info.gid = 0
+                info.uname = info.gname = ""
+                info.mtime = 0
+                with path.open("rb") as handle:
+                    archive.addfile(info, handle)
+        return buffer.getvalue()
+
+
+_MEMO: dict[Path, tuple[_Signature, PluginBundle]] = {}
+_MEMO_LOCK = threading.Lock()
+
+
+def build_bundle(plugin_path: Path) -> PluginBundle:
+    """Return the bundle for ``plugin_path``, hashing files only when they have changed.
+
+    A bundle contains the plugin itself plus every ``*.sh`` file in the sibling ``lib/``
+    directory. The sha256 digest covers file names and contents, so it is stable across
+    machines and checkouts. Digests are memoized on each file's mtime and size.
+    """
+
+    key = plugin_path.resolve()
+    files = _bundle_files(key)
+    signature = _signature(files)
+    with _MEMO_LOCK:
+        cached = _MEMO.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    bundle = PluginBundle(digest=_hash_files(files), entrypoint=key.name, files=files)
+    with _MEMO_LOCK:
+        _MEMO[key] = (signature, bundle)
+    return bundle
+
+
+def clear_bundle_memo() -> None:
+    """Forget every memoized bundle digest."""
+
+    with _MEMO_LOCK:
+        _MEMO.clear()
+
+
+def _bundle_files(plugin_path: Path) -> tuple[tuple[str, Path], ...]:
+    files = [(plugin_path.name, plugin_path)]
+    lib_dir = plugin_path.parent / "lib"
+    if lib_dir.is_dir():
+        files.extend((f"lib/{library.name}", library) for library in sorted(lib_dir.glob("*.sh")))
+    return tuple(files)
+
+
+def _signature(files: tuple[tuple[str, Path], ...]) -> _Signature:
+    signature = []
+    for arcname, path in files:
+        stat = path.stat()
+        signature.append((arcname, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _hash_files(files: tuple[tuple[str, Path], ...]) -> str:
+    digest = hashlib.sha256()
+    for arcname, path in files:
+        # Length-prefix each member so names and contents cannot run into each other.
+        digest.update(f"{arcname}\0{path.stat().st_size}\0".encode())
+        with path.open("rb") as handle:
+            while chunk := handle.read(_CHUNK_SIZE):
+                digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,143 @@
+"""Bounded capture of plugin stdout and stderr.
+
+A plugin that floods a stream must not be able to exhaust the orchestrator's memory, least of
+all during fan-out where many captures run at once. Each stream is read in chunks and capped at
+a per-stream byte limit: bytes beyond the cap are drained and dropped, and the result is marked
+truncated. Up to ``spill_threshold`` bytes are kept in memory as ``bytes``; larger output is
+written to an anonymous temporary file and returned as a :class:`SpilledOutput`.
+
+Limits are read from the environment on every capture:
+
+- ``RUNE_MAX_STDOUT_BYTES`` (default 64 MiB)
+- ``RUNE_MAX_STDERR_BYTES`` (default 1 MiB)
+- ``RUNE_CAPTURE_SPILL_BYTES`` (default 1 MiB)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO
+
+__all__ = ["CaptureLimits", "SpilledOutput", "capture_limits", "read_stream"]
+
+MAX_STDOUT_ENV = "RUNE_MAX_STDOUT_BYTES"
+MAX_STDERR_ENV = "RUNE_MAX_STDERR_BYTES"
+SPILL_THRESHOLD_ENV = "RUNE_CAPTURE_SPILL_BYTES"
+
+DEFAULT_MAX_STDOUT_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_STDERR_BYTES = 1024 * 1024
+DEFAULT_SPILL_THRESHOLD = 1024 * 1024
+
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True, slots=True)
+class CaptureLimits:
+    """Per-stream byte caps and the in-memory threshold beyond which output spills to disk."""
+
+    max_stdout_bytes: int = DEFAULT_MAX_STDOUT_BYTES
+    max_stderr_bytes: int = DEFAULT_MAX_STDERR_BYTES
+    spill_threshold: int = DEFAULT_SPILL_THRESHOLD
+
+
+def _env_bytes(name: str, default: int) -> int:
+    try:
+        return max(int(os.environ[name]), 0)
+    except (KeyError, ValueError):
+        return default
+
+
+def capture_limits() -> CaptureLimits:
+    """Return the limits configured in the environment."""
+
+    return CaptureLimits(
+        max_stdout_bytes=_env_bytes(MAX_STDOUT_ENV, DEFAULT_MAX_STDOUT_BYTES),
+        max_stderr_bytes=_env_bytes(MAX_STDERR_ENV, DEFAULT_MAX_STDERR_BYTES),
+        spill_threshold=_env_bytes(SPILL_THRESHOLD_ENV, DEFAULT_SPILL_THRESHOLD),
+    )
+
+
+class SpilledOutput:
+    """Captured output that outgrew the in-memory threshold, held in an anonymous file.
+
+    Supports the parts of the ``bytes`` interface the mediator relies on (``len``, truth value
+    and :meth:`isspace`) without reading the file back into memory.
+    """
+
+    __slots__ = ("_file", "_size")
+
+    def __init__(self) -> None:
+        self._file: BinaryIO = tempfile.TemporaryFile(prefix="rune-output-")
+        self._size = 0
+
+    def write(self, data: bytes | bytearray) -> None:
+        self._file.write(data)
+        self._size += len(data)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __repr__(self) -> str:
+        return f"<SpilledOutput {self._size} bytes>"
+
+    def open(self) -> BinaryIO:
+        """Return the underlying file, positioned at the start."""
+
+        self._file.flush()
+        self._file.seek(0)
+        return self._file
+
+    def read(self) -> bytes:
+        """Load the whole output into memory."""
+
+        return self.open().read()
+
+    def isspace(self) -> bool:
+        """Whether the output is non-empty and only whitespace, checked chunk by chunk."""
+
+        handle = self.open()
+        seen = False
+        while chunk := handle.read(CHUNK_SIZE):
+            if not chunk.isspace():
+                return False
+            seen = True
+        return seen
+
+    def close(self) -> None:
+        self._file.close()
+
+
+async def read_stream(
+    stream: asyncio.StreamReader, max_bytes: int, spill_threshold: int
+) -> tuple[bytes | SpilledOutput, bool]:
+    """Read ``stream`` to EOF, keeping at most ``max_bytes``.
+
+    Returns the captured output and whether anything was dropped. The stream is always drained
+    so a writer blocked on a full pipe can finish.
+    """
+
+    buffer = bytearray()
+    spilled: SpilledOutput | None = None
+    kept = 0
+    truncated = False
+    while chunk := await stream.read(CHUNK_SIZE):
+        if kept + len(chunk) > max_bytes:
+            chunk = chunk[: max_bytes - kept]
+            truncated = True
+            if not chunk:
+                continue
+        kept += len(chunk)
+        if spilled is None and kept > spill_threshold:
+            spilled = SpilledOutput()
+            spilled.write(buffer)
+            buffer = bytearray()
+        if spilled is None:
+            buffer += chunk
+        else:
+            spilled.write(chunk)
+    if spilled is not None:
+        return spilled, truncated
+    return bytes(buffer), truncated
@@ -0,0 +1,84 @@
+"""JSON codec used on RUNE's hot paths.
+
+Uses ``orjson`` when it is installed and falls back to the standard library otherwise. Both
+backends produce and accept UTF-8 ``bytes`` so transports, the mediator and the CLI can pass
+plugin output around without decoding it to ``str`` first. Set ``RUNE_JSON_CODEC=json`` to
+force the standard library backend.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from json import JSONDecodeError
+from typing import IO, Any
+
+__all__ = ["JSONDecodeError", "backend", "dumps", "load", "loads"]
+
+CODEC_ENV = "RUNE_JSON_CODEC"
+
+_UNRESOLVED = object()
+_orjson: Any = _UNRESOLVED
+
+
+def _fast_backend() -> Any:
+    """Return the orjson module, or None when it is unavailable or disabled.
+
+    Resolved on first use: importing orjson costs more than serializing a small document, so
+    CLI paths that never touch plugin output should not pay for it.
+    """
+
+    global _orjson
+    if _orjson is _UNRESOLVED:
+        if os.environ.get(CODEC_ENV, "auto") == "json":
+            _orjson = None
+        else:
+            try:
+                import orjson
+            except ImportError:  # pragma: no cover - depends on the environment
+                _orjson = None
+            else:
+                _orjson = orjson
+    return _orjson
+
+
+def backend() -> str:
+    """Name of the backend used by :func:`loads` and :func:`dumps` (``orjson`` or ``json``)."""
+
+    return "orjson" if _fast_backend() is not None else "json"
+
+
+def loads(data: bytes | bytearray | memoryview | str) -> Any:
+    """Parse a JSON document. Raises :class:`JSONDecodeError` on invalid input."""
+
+    fast = _fast_backend()
+    if fast is not None:
+        return fast.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def load(handle: IO[bytes]) -> Any:
+    """Parse a JSON document from a binary file object."""
+
+    return loads(handle.read())
+
+
+def dumps(obj: Any, *, pretty: bool = False, fast: bool = True) -> bytes:
+    """Serialize ``obj`` to compact (or two-space indented) UTF-8 JSON bytes.
+
+    Pass ``fast=False`` for small documents to stay on the standard library encoder.
+    """
+
+    encoder = _fast_backend() if fast else None
+    if encoder is not None:
+        try:
+            encoded: bytes = encoder.dumps(obj, option=encoder.OPT_INDENT_2 if pretty else 0)
+            return encoded
+        except TypeError:
+            # Integers beyond 64 bits and non-string keys are valid for the stdlib encoder.
+            pass
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode()
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
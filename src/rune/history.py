@@ -0,0 +1,365 @@
+"""Indexed execution history in a local SQLite database.
+
+Every result returned by ``run_action`` is stored as one row of the ``executions`` table. The
+row holds the full result document plus copies of the fields incidents are searched by
+(node, action, status, transport, ``trace_id``, ``message_id``) and the time it was recorded.
+Each of those columns is indexed, so lookups such as "what ran on node X in the last hour" or
+"everything under trace T" stay fast across many thousands of executions. SQLite appends the
+row id to every index, so filtered rows come back newest first without a sort.
+
+Like the audit log (:mod:`rune.audit`), :meth:`HistoryStore.record` only builds the row,
+serializing the result so later changes to it are not stored, and enqueues it. A background
+writer thread drains the queue and inserts each batch in a single transaction.
+The database uses WAL mode, so ``rune history`` can read while runs are being written.
+
+Set ``RUNE_HISTORY_DB`` to enable the process-wide store used by the orchestrator.
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import queue
+import re
+import threading
+import time
+import warnings
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from rune import codec
+
+if TYPE_CHECKING:
+    import sqlite3
+
+__all__ = [
+    "HistoryError",
+    "HistoryQuery",
+    "HistoryStore",
+    "close_default_store",
+    "get_default_store",
+    "parse_time",
+    "query",
+]
+
+HISTORY_DB_ENV = "RUNE_HISTORY_DB"
+
+# Upper bound on rows inserted in one transaction.
+_MAX_BATCH = 4096
+
+# Rows fetched from SQLite at a time while streaming query results.
+_FETCH_SIZE = 256
+
+_BUSY_TIMEOUT_S = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS executions (
+    id INTEGER PRIMARY KEY,
+    recorded_at REAL NOT NULL,
+    node TEXT NOT NULL,
+    action TEXT NOT NULL,
+    status TEXT NOT NULL,
+    transport TEXT,
+    trace_id TEXT,
+    message_id TEXT,
+    duration_ms REAL,
+    result BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS executions_recorded_at ON executions (recorded_at);
+CREATE INDEX IF NOT EXISTS executions_node ON executions (node);
+CREATE INDEX IF NOT EXISTS executions_action ON executions (action);
+CREATE INDEX IF NOT EXISTS executions_status ON executions (status);
+CREATE INDEX IF NOT EXISTS executions_trace_id ON executions (trace_id);
+CREATE INDEX IF NOT EXISTS executions_message_id ON executions (message_id);
+"""
+
+_INSERT = (
+    "INSERT INTO executions (recorded_at, node, action, status, transport, trace_id,"
+    " message_id, duration_ms, result) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+_COLUMNS = (
+    "id",
+    "recorded_at",
+    "node",
+    "action",
+    "status",
+    "transport",
+    "trace_id",
+    "message_id",
+    "duration_ms",
+)
+
+_DURATION_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)([smhd])$")
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+class HistoryError(Exception):
+    """Raised when the history database cannot be read or a query is invalid."""
+
+
+def parse_time(value: str, now: float | None = None) -> float:
+    """Parse ``30m``/``2h``/``1d`` (that long ago) or an ISO 8601 timestamp to epoch seconds.
+
+    Timestamps without a timezone are taken as UTC.
+    """
+
+    match = _DURATION_PATTERN.match(value.strip())
+    if match:
+        amount, unit = match.groups()
+        return (time.time() if now is None else now) - float(amount) * _DURATION_UNITS[unit]
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        raise HistoryError(
+            f"invalid time {value!r}, expected a duration such as 30m, 2h or 1d,"
+            " or an ISO 8601 timestamp"
+        ) from None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _connect(path: Path, *, readonly: bool = False) -> sqlite3.Connection:
+    import sqlite3
+
+    if readonly:
+        connection = sqlite3.connect(
+            f"{path.resolve().as_uri()}?mode=ro", uri=True, timeout=_BUSY_TIMEOUT_S
+        )
+    else:
+        # Opened by the constructor, then used only by the writer thread.
+        connection = sqlite3.connect(
+            path, timeout=_BUSY_TIMEOUT_S, isolation_level=None, check_same_thread=False
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        # WAL with synchronous=NORMAL only risks the last transactions on power loss.
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(_SCHEMA)
+    return connection
+
+
+# Queue entry: the row to insert (see _row).
+_Entry = tuple[Any, ...]
+
+
+class HistoryStore:
+    """SQLite execution history written by a background thread."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._queue: queue.SimpleQueue[_Entry | threading.Event | None] = queue.SimpleQueue()
+        self._closed = False
+        self._close_lock = threading.Lock()
+        # Open (and create the schema) up front so a bad path fails here, not in the thread.
+        connection = _connect(self.path)
+        self._writer = threading.Thread(
+            target=self._run, args=(connection,), name="rune-history", daemon=True
+        )
+        self._writer.start()
+
+    def record(self, result: dict[str, Any]) -> None:
+        """Queue ``result`` (an :meth:`OrchestrationResult.to_dict`) for insertion.
+
+        The row is built here, so changes the caller makes to ``result`` afterwards are not
+        stored.
+        """
+
+        if self._closed:
+            return
+        self._queue.put(_row(time.time(), result))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every result queued so far is committed."""
+
+        if self._closed:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: float | None = 10.0) -> None:
+        """Commit outstanding results, stop the writer thread and close the database."""
+
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout)
+
+    def _run(self, connection: sqlite3.Connection) -> None:
+        stopping = False
+        while not stopping:
+            item: _Entry | threading.Event | None = self._queue.get()
+            rows: list[tuple[Any, ...]] = []
+            waiters: list[threading.Event] = []
+            while True:
+                if item is None:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    rows.append(item)
+                if len(rows) >= _MAX_BATCH:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if rows:
+                self._insert(connection, rows)
+            for waiter in waiters:
+                waiter.set()
+        # Refresh the planner's statistics so time-range queries pick the right index.
+        connection.execute("PRAGMA optimize")
+        connection.close()
+
+    def _insert(self, connection: sqlite3.Connection, rows: list[tuple[Any, ...]]) -> None:
+        import sqlite3
+
+        try:
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.executemany(_INSERT, rows)
+        except sqlite3.Error as exc:
+            warnings.warn(
+                f"could not write {len(rows)} result(s) to history {self.path}: {exc}",
+                RuntimeWarning,
+                stacklevel=1,
+            )
+
+
+def _row(recorded_at: float, result: dict[str, Any]) -> tuple[Any, ...]:
+    metadata = result.get("message_metadata") or {}
+    observability = result.get("observability") or {}
+    spans = observability.get("spans") or [{}]
+    return (
+        recorded_at,
+        result["node"],
+        result["action"],
+        result["status"],
+        result.get("transport"),
+        observability.get("trace_id"),
+        metadata.get("message_id"),
+        spans[0].get("duration_ms"),
+        codec.dumps(result),
+    )
+
+
+@dataclass(slots=True)
+class HistoryQuery:
+    """Filters for :func:`query`; unset fields match everything."""
+
+    node: str | None = None
+    action: str | None = None
+    status: str | None = None
+    trace_id: str | None = None
+    message_id: str | None = None
+    since: float | None = None
+    until: float | None = None
+    before_id: int | None = None
+    limit: int | None = 100
+
+    def to_sql(self, include_result: bool) -> tuple[str, list[Any]]:
+        """Build the SELECT statement and its parameters, newest rows first."""
+
+        clauses: list[str] = []
+        params: list[Any] = []
+        for column in ("node", "action", "status", "trace_id", "message_id"):
+            value = getattr(self, column)
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if self.since is not None:
+            clauses.append("recorded_at >= ?")
+            params.append(self.since)
+        if self.until is not None:
+            clauses.append("recorded_at < ?")
+            params.append(self.until)
+        if self.before_id is not None:
+            clauses.append("id < ?")
+            params.append(self.before_id)
+        columns = ", ".join(_COLUMNS + (("result",) if include_result else ()))
+        sql = f"SELECT {columns} FROM executions"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id DESC"
+        if self.limit is not None:
+            sql += " LIMIT ?"
+            params.append(self.limit)
+        return sql, params
+
+
+def query(
+    path: Path, filters: HistoryQuery, *, include_result: bool = False
+) -> Iterator[dict[str, Any]]:
+    """Yield matching executions newest first, fetching rows from SQLite as they are consumed.
+
+    Each row has ``id``, ``recorded_at`` (ISO 8601, UTC) and the indexed fields; with
+    ``include_result`` it also carries the stored ``result`` document. Pass the ``id`` of the
+    last row as ``before_id`` to fetch the next page.
+    """
+
+    import sqlite3
+
+    if not Path(path).exists():
+        raise HistoryError(f"history database {path} does not exist")
+    sql, params = filters.to_sql(include_result)
+    try:
+        connection = _connect(Path(path), readonly=True)
+    except sqlite3.Error as exc:
+        raise HistoryError(f"cannot open history database {path}: {exc}") from exc
+    try:
+        cursor = connection.execute(sql, params)
+        while rows := cursor.fetchmany(_FETCH_SIZE):
+            for row in rows:
+                entry = dict(zip(_COLUMNS, row))
+                entry["recorded_at"] = datetime.fromtimestamp(
+                    entry["recorded_at"], timezone.utc
+                ).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+                if include_result:
+                    entry["result"] = codec.loads(row[len(_COLUMNS)])
+                yield entry
+    except sqlite3.Error as exc:
+        raise HistoryError(f"cannot read history database {path}: {exc}") from exc
+    finally:
+        connection.close()
+
+
+_DEFAULT_STORE: HistoryStore | None = None
+_DEFAULT_LOCK = threading.Lock()
+_ATEXIT_REGISTERED = False
+
+
+def get_default_store() -> HistoryStore | None:
+    """Return the process-wide store at ``$RUNE_HISTORY_DB``, or None when history is off."""
+
+    global _DEFAULT_STORE, _ATEXIT_REGISTERED
+    configured = os.environ.get(HISTORY_DB_ENV)
+    if not configured:
+        return None
+    with _DEFAULT_LOCK:
+        if _DEFAULT_STORE is None or _DEFAULT_STORE.path != Path(configured):
+            if _DEFAULT_STORE is not None:
+                _DEFAULT_STORE.close()
+            _DEFAULT_STORE = HistoryStore(Path(configured))
+            if not _ATEXIT_REGISTERED:
+                # The writer is a daemon thread; without this, queued results die with it.
+                atexit.register(close_default_store)
+                _ATEXIT_REGISTERED = True
+        return _DEFAULT_STORE
+
+
+def close_default_store() -> None:
+    """Commit and close the process-wide store, if one was opened."""
+
+    global _DEFAULT_STORE
+    with _DEFAULT_LOCK:
+        if _DEFAULT_STORE is not None:
+            _DEFAULT_STORE.close()
+            _DEFAULT_STORE = None
@@ -0,0 +1,405 @@
+"""Node inventory with indexed attribute and tag selectors.
+
+An inventory file lists nodes with attributes such as ``region``, ``role``, ``bastion`` and
+``transport`` plus a set of ``tags``. JSON and YAML files hold a list of node objects (or an
+object with a ``nodes`` list); CSV files have one node per row with a ``name`` column and an
+optional ``tags`` column separated by ``;`` or whitespace. YAML needs PyYAML
+(``pip install 'rune[inventory]'``).
+
+Selectors pick nodes by comma-separated terms, all of which must match:
+
+- ``role=nomad`` or ``region=us-east-1|us-west-2``: attribute equals (one of) the values
+- ``role!=nomad``: attribute differs, or is not set
+- ``tag:canary``: node carries the tag
+- ``!<term>``: negates a term, e.g. ``!tag:canary``
+- ``name=web-01``: the node itself; ``*`` matches every node
+
+Every ``attribute=value`` pair and every tag is indexed as a bitmap with one bit per node, so a
+selector is resolved with a few big-integer ANDs regardless of fleet size. Pairs held by only a
+few nodes (such as unique addresses) are stored as position lists instead, to keep memory
+proportional to the data.
+
+Parsing a large inventory costs far more than resolving a selector, so the compiled index is
+pickled to ``$XDG_CACHE_HOME/rune/inventory`` (override with ``RUNE_INVENTORY_CACHE_DIR``) and
+reused while the source file's mtime and size are unchanged.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import re
+from array import array
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import compress
+from pathlib import Path
+from typing import Any
+
+__all__ = [
+    "Inventory",
+    "InventoryError",
+    "InventoryNode",
+    "default_inventory_path",
+    "load_inventory",
+    "parse_selector",
+]
+
+INVENTORY_ENV = "RUNE_INVENTORY"
+CACHE_DIR_ENV = "RUNE_INVENTORY_CACHE_DIR"
+
+# Bump when the pickled layout changes so stale caches are rebuilt.
+_CACHE_FORMAT = 1
+
+# Keys held by fewer than one node in this many are stored as position lists, not bitmaps.
+_SPARSE_RATIO = 64
+
+_TAG_SPLIT = re.compile(r"[;,\s]+")
+_TERM = re.compile(r"^(?P<key>[A-Za-z_][\w.-]*)\s*(?P<op>!=|=)\s*(?P<value>.*)$")
+
+# Maps the characters of ``bin()`` output to 0/1 bytes for :func:`itertools.compress`.
+_BITS = bytes.maketrans(b"01", b"\x00\x01")
+
+
+class InventoryError(Exception):
+    """Raised for unreadable inventories and invalid selectors."""
+
+
+@dataclass(frozen=True, slots=True)
+class InventoryNode:
+    """One inventory entry: a node name, its string attributes and its tags."""
+
+    name: str
+    attributes: dict[str, str] = field(default_factory=dict)
+    tags: tuple[str, ...] = ()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"name": self.name, **self.attributes, "tags": list(self.tags)}
+
+
+@dataclass(frozen=True, slots=True)
+class _Term:
+    key: str
+    values: tuple[str, ...]
+    negated: bool
+
+
+@lru_cache(maxsize=256)
+def parse_selector(selector: str) -> tuple[_Term, ...]:
+    """Parse a selector into its terms; raises :class:`InventoryError` when malformed."""
+
+    terms: list[_Term] = []
+    for raw in selector.split(","):
+        text = raw.strip()
+        negated = text.startswith("!")
+        text = text[1:].strip() if negated else text
+        if text == "*":
+            terms.append(_Term("*", (), negated))
+            continue
+        if text.startswith("tag:") and len(text) > 4:
+            terms.append(_Term("tag:", (text[4:].strip(),), negated))
+            continue
+        match = _TERM.match(text)
+        values = tuple(v.strip() for v in match.group("value").split("|")) if match else ()
+        if not match or not all(values):
+            raise InventoryError(
+                f"invalid selector term {raw.strip()!r}: expected key=value, key!=value,"
+                " tag:name or *, optionally prefixed with !"
+            )
+        if match.group("op") == "!=":
+            negated = not negated
+        terms.append(_Term(match.group("key"), values, negated))
+    return tuple(terms)
+
+
+class Inventory:
+    """Nodes in file order plus bitmap indexes over their attributes and tags."""
+
+    def __init__(self, nodes: Iterable[InventoryNode]) -> None:
+        self._nodes: list[InventoryNode] | None = []
+        positions: dict[str, int] = {}
+        members: dict[str, list[int]] = {}
+        for node in nodes:
+            if node.name in positions:
+                raise InventoryError(f"node {node.name!r} is listed more than once")
+            position = len(self._nodes)
+            positions[node.name] = position
+            self._nodes.append(node)
+            for key, value in node.attributes.items():
+                members.setdefault(f"{key}={value}", []).append(position)
+            for tag in node.tags:
+                members.setdefault(f"tag:{tag}", []).append(position)
+        self.names = list(positions)
+        self._positions: dict[str, int] | None = positions
+        self._keys = frozenset(key.partition("=")[0] for key in members) | {"name"}
+        # Dense keys are ints used as bitsets, sparse keys arrays of node positions, and keys held
+        # by a single node (addresses, serials) plain positions, which keeps the cache compact.
+        self._unique: dict[str, int] = {}
+        self._index: dict[str, int | array[int]] = {}
+        for key, members_of in members.items():
+            if len(members_of) == 1:
+                self._unique[key] = members_of[0]
+            elif len(members_of) * _SPARSE_RATIO < len(self.names):
+                self._index[key] = array("I", members_of)
+            else:
+                self._index[key] = _bitmap(members_of, len(self.names))
+        self._all = (1 << len(self.names)) - 1
+        self._records: bytes | None = None
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Node details are pickled as one opaque blob and only unpickled when asked for, so
+        # loading a cached inventory to resolve a selector does not rebuild every node.
+        records = self._records
+        if records is None:
+            records = pickle.dumps(
+                [(node.attributes, node.tags) for node in self.nodes],
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        return {
+            "names": self.names,
+            "keys": self._keys,
+            "index": self._index,
+            "unique": self._unique,
+            "records": records,
+        }
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.names = state["names"]
+        self._keys = state["keys"]
+        self._index = state["index"]
+        self._unique = state["unique"]
+        self._records = state["records"]
+        self._all = (1 << len(self.names)) - 1
+        self._nodes = None
+        self._positions = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def nodes(self) -> list[InventoryNode]:
+        """Every entry, in inventory order."""
+
+        if self._nodes is None:
+            assert self._records is not None
+            self._nodes = [
+                InventoryNode(name=name, attributes=attributes, tags=tags)
+                for name, (attributes, tags) in zip(self.names, pickle.loads(self._records))
+            ]
+        return self._nodes
+
+    def node(self, name: str) -> InventoryNode:
+        """Return the entry for ``name``; raises :class:`KeyError` when unknown."""
+
+        return self.nodes[self._position_map()[name]]
+
+    def select(self, selector: str) -> list[str]:
+        """Names of the nodes matching ``selector``, in inventory order."""
+
+        mask = self.match(selector)
+        if mask == self._all:
+            return list(self.names)
+        if mask.bit_count() * _SPARSE_RATIO < len(self.names):
+            # Few matches: peel off set bits instead of expanding the whole bitmap.
+            positions = []
+            while mask:
+                lowest = mask & -mask
+                positions.append(lowest.bit_length() - 1)
+                mask ^= lowest
+            return [self.names[position] for position in positions]
+        bits = bin(mask)[:1:-1].encode().translate(_BITS)
+        return list(compress(self.names, bits))
+
+    def match(self, selector: str) -> int:
+        """Bitmap of the nodes matching ``selector``: bit ``i`` is the ``i``-th node."""
+
+        mask = self._all
+        for term in parse_selector(selector):
+            if term.key == "*":
+                selected = self._all
+            elif term.key == "tag:":
+                selected = self._lookup(f"tag:{term.values[0]}")
+            elif term.key not in self._keys:
+                raise InventoryError(f"unknown attribute {term.key!r} in selector")
+            elif term.key == "name":
+                positions = self._position_map()
+                selected = 0
+                for value in term.values:
+                    if value in positions:
+                        selected |= 1 << positions[value]
+            else:
+                selected = 0
+                for value in term.values:
+                    selected |= self._lookup(f"{term.key}={value}")
+            mask &= self._all ^ selected if term.negated else selected
+        return mask
+
+    def _position_map(self) -> dict[str, int]:
+        if self._positions is None:
+            self._positions = {name: position for position, name in enumerate(self.names)}
+        return self._positions
+
+    def _lookup(self, key: str) -> int:
+        entry = self._index.get(key)
+        if entry is None:
+            position = self._unique.get(key)
+            return 0 if position is None else 1 << position
+        if isinstance(entry, int):
+            return entry
+        return _bitmap(entry, len(self.names))
+
+
+def _bitmap(positions: Iterable[int], size: int) -> int:
+    buffer = bytearray((size + 7) // 8)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def default_inventory_path() -> Path | None:
+    """The inventory named by ``RUNE_INVENTORY``, if set."""
+
+    configured = os.environ.get(INVENTORY_ENV)
+    return Path(configured).expanduser() if configured else None
+
+
+def _default_cache_dir() -> Path:
+    override = os.environ.get(CACHE_DIR_ENV)
+    if override:
+        return Path(override).expanduser()
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "rune" / "inventory"
+
+
+def load_inventory(path: Path, cache_dir: Path | None = None, use_cache: bool = True) -> Inventory:
+    """Load and index the inventory at ``path``, reusing the compiled cache when it is fresh."""
+
+    path = Path(path).resolve()
+    try:
+        stat = path.stat()
+    except OSError as exc:
+        raise InventoryError(f"cannot read inventory {path}: {exc}") from exc
+    signature = (_CACHE_FORMAT, str(path), stat.st_mtime_ns, stat.st_size)
+    cache_path = None
+    if use_cache:
+        digest = hashlib.sha256(str(path).encode()).hexdigest()[:32]
+        cache_path = (cache_dir or _default_cache_dir()) / f"{digest}.pickle"
+        cached = _read_cache(cache_path, signature)
+        if cached is not None:
+            return cached
+
+    inventory = Inventory(_parse(path))
+    if cache_path is not None:
+        _write_cache(cache_path, signature, inventory)
+    return inventory
+
+
+def _read_cache(cache_path: Path, signature: tuple[Any, ...]) -> Inventory | None:
+    import mmap
+
+    try:
+        with cache_path.open("rb") as handle:
+            # Unpickle straight from the mapped file rather than reading it into a copy first.
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                cached_signature, inventory = pickle.loads(mapped)
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError, AttributeError, TypeError):
+        return None
+    if cached_signature != signature or not isinstance(inventory, Inventory):
+        return None
+    return inventory
+
+
+def _write_cache(cache_path: Path, signature: tuple[Any, ...], inventory: Inventory) -> None:
+    # Like the plugin manifest, the cache is an optimisation: write failures are ignored.
+    temporary = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        cache_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        with temporary.open("wb") as handle:
+            pickle.dump((signature, inventory), handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, cache_path)
+    except OSError:
+        try:
+            temporary.unlink()
+        except OSError:
+            pass
+
+
+def _parse(path: Path) -> list[InventoryNode]:
+    suffix = path.suffix.lower()
+    try:
+        if suffix == ".csv":
+            return _parse_csv(path)
+        if suffix == ".json":
+            from rune import codec
+
+            return _parse_entries(codec.loads(path.read_bytes()), path)
+        if suffix in {".yaml", ".yml"}:
+            return _parse_entries(_load_yaml(path), path)
+    except OSError as exc:
+        raise InventoryError(f"cannot read inventory {path}: {exc}") from exc
+    except ValueError as exc:
+        raise InventoryError(f"cannot parse inventory {path}: {exc}") from exc
+    raise InventoryError(f"unsupported inventory format {path.suffix!r}; use .json, .csv or .yaml")
+
+
+def _load_yaml(path: Path) -> Any:
+    try:
+        import yaml
+    except ImportError:
+        raise InventoryError(
+            "YAML inventories require PyYAML (pip install 'rune[inventory]')"
+        ) from None
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    try:
+        with path.open("rb") as handle:
+            return yaml.load(handle, Loader=loader)
+    except yaml.YAMLError as exc:
+        raise ValueError(str(exc)) from exc
+
+
+def _parse_csv(path: Path) -> list[InventoryNode]:
+    import csv
+
+    with path.open(newline="", encoding="utf-8") as handle:
+        reader = csv.DictReader(handle)
+        if reader.fieldnames is None or "name" not in reader.fieldnames:
+            raise InventoryError(f"inventory {path} has no 'name' column")
+        return [_node(row, path, line) for line, row in enumerate(reader, start=2)]
+
+
+def _parse_entries(document: Any, path: Path) -> list[InventoryNode]:
+    if isinstance(document, dict):
+        document = document.get("nodes")
+    if not isinstance(document, list):
+        raise InventoryError(f"inventory {path} must be a list of nodes or have a 'nodes' list")
+    return [_node(entry, path, index) for index, entry in enumerate(document, start=1)]
+
+
+def _node(entry: Any, path: Path, where: int) -> InventoryNode:
+    if not isinstance(entry, dict):
+        raise InventoryError(f"{path}: entry {where} is not an object")
+    name = entry.get("name")
+    if not isinstance(name, str) or not name.strip():
+        raise InventoryError(f"{path}: entry {where} has no name")
+    raw_tags = entry.get("tags") or []
+    if isinstance(raw_tags, str):
+        raw_tags = _TAG_SPLIT.split(raw_tags)
+    if not isinstance(raw_tags, list):
+        raise InventoryError(f"{path}: tags of {name!r} must be a list or a string")
+    attributes: dict[str, str] = {}
+    for key, value in entry.items():
+        if key in {"name", "tags"} or value is None or value == "":
+            continue
+        if isinstance(value, (dict, list)):
+            raise InventoryError(f"{path}: attribute {key!r} of {name!r} must be a scalar")
+        attributes[str(key)] = _text(value)
+    tags = tuple(dict.fromkeys(str(tag).strip() for tag in raw_tags if str(tag).strip()))
+    return InventoryNode(name=name.strip(), attributes=attributes, tags=tags)
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
@@ -2,18 +2,118 @@
 
 from __future__ import annotations
 
-import json
+import asyncio
+import random
+import time
 from pathlib import Path
 from typing import Any
 
+from rune import artifacts, codec, metrics, tracing
+from rune.capture import SpilledOutput
 from rune.models import MediatorResult, StructuredError, TransportResult
-from rune.transport_ssh import run_remote_plugin_ssh
-from rune.transport_ssm import run_remote_plugin_ssm
+from rune.transport_ssh import (
+    collect_artifacts,
+    collect_artifacts_async,
+    run_remote_plugin_ssh,
+    run_remote_plugin_ssh_async,
+)
+from rune.transport_ssm import run_remote_plugin_ssm, run_remote_plugin_ssm_async
 
 SUPPORTED_TRANSPORTS = {"ssh", "ssm"}
 
+# Transport-level failures: 124 is a transport timeout, 255 an SSH connection failure.
+RETRYABLE_EXIT_CODES = frozenset({124, 255})
+MAX_RETRIES = 10
+MAX_RETRY_DELAY_MS = 30_000
+
+
+def _retry_policy(payload: dict[str, Any]) -> tuple[int, int]:
+    """Return ``(max_retries, retry_delay_ms)`` from the RCS ``quality_of_service`` block."""
+
+    qos = payload.get("quality_of_service")
+    if not isinstance(qos, dict):
+        return 0, 0
+    try:
+        max_retries = int(qos.get("max_retries", 0))
+        retry_delay_ms = int(qos.get("retry_delay_ms", 0))
+    except (TypeError, ValueError):
+        return 0, 0
+    return min(max(max_retries, 0), MAX_RETRIES), max(retry_delay_ms, 0)
+
+
+def _deadline(payload: dict[str, Any]) -> float | None:
+    """Return the job deadline (epoch seconds) from ``quality_of_service.deadline_unix_ms``."""
+
+    qos = payload.get("quality_of_service")
+    if not isinstance(qos, dict):
+        return None
+    try:
+        return int(qos["deadline_unix_ms"]) / 1000
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _remaining(deadline: float | None) -> float | None:
+    return None if deadline is None else deadline - time.time()
+
+
+def _is_retryable(transport_result: TransportResult) -> bool:
+    """Only failures to reach or hear back from the plugin are retried, never plugin errors.
+
+    A transport exit code (124 or 255) is retried unless the plugin still wrote a complete BPCS
+    document: an error the plugin signaled itself, under whatever exit code, is final.
+    """
+
+    stdout = transport_result.stdout
+    if not stdout or stdout.isspace():
+        return True
+    if transport_result.exit_code not in RETRYABLE_EXIT_CODES:
+        return False
+    if transport_result.stdout_truncated:
+        return True
+    try:
+        return _bpcs_violation(_load_output(stdout)) is not None
+    except (codec.JSONDecodeError, UnicodeDecodeError):
+        return True
+
+
+def _backoff_delay(retry_delay_ms: int, retry: int) -> float:
+    """Seconds to wait before retry number ``retry`` (1-based): exponential with equal jitter."""
+
+    ceiling: int = min(retry_delay_ms * 2 ** (retry - 1), MAX_RETRY_DELAY_MS)
+    return (ceiling / 2 + random.uniform(0, ceiling / 2)) / 1000
+
+
+def _record_attempt(
+    attempts: list[dict[str, Any]], started: float, transport_result: TransportResult
+) -> bool:
+    """Append the attempt's outcome to ``attempts`` and return whether it may be retried."""
+
+    retryable = _is_retryable(transport_result)
+    attempts.append(
+        {
+            "attempt": len(attempts) + 1,
+            "exit_code": transport_result.exit_code,
+            "duration_ms": round((time.monotonic() - started) * 1000, 3),
+            "retryable": retryable,
+        }
+    )
+    return retryable
+
+
+# Label values for `rune_protocol_violations_total`, keyed by the error message.
+_VIOLATION_REASONS = {
+    "Unsupported transport": "unsupported_transport",
+    "Empty response from plugin": "empty_response",
+    "Malformed JSON from plugin": "malformed_json",
+    "Missing required BPCS fields": "missing_fields",
+    "Invalid payload result field": "invalid_result",
+    "Plugin output exceeded the capture limit": "output_truncated",
+}
+
 
 def _protocol_violation(action: str, node: str, transport: str, message: str) -> MediatorResult:
+    metrics.PROTOCOL_VIOLATIONS.inc(_VIOLATION_REASONS.get(message, "other"))
     error = StructuredError(code=400, message=message)
     return MediatorResult(
         status="failed",
@@ -25,6 +125,71 @@ def _protocol_violation(action: str, node: str, transport: str, message: str) ->
     )
 
 
+def _declared_artifacts(result: MediatorResult) -> list[dict[str, Any]] | None:
+    """Artifacts to collect for ``result``; only successful SSH runs transfer artifacts."""
+
+    if result.status != "success" or result.transport != "ssh":
+        return None
+    return artifacts.declared_artifacts(result.plugin_output)
+
+
+def _attach_artifacts(result: MediatorResult, references: list[dict[str, Any]]) -> None:
+    assert result.plugin_output is not None
+    result.plugin_output["payload"]["output_data"]["artifacts"] = references
+
+
+def _artifact_failure(result: MediatorResult, exc: artifacts.ArtifactError) -> MediatorResult:
+    error = StructuredError(
+        code=502, message="Artifact transfer failed", details={"reason": str(exc)}
+    )
+    return MediatorResult(
+        status="failed",
+        action=result.action,
+        node=result.node,
+        transport=result.transport,
+        plugin_output=result.plugin_output,
+        error=error,
+    )
+
+
+def _collect_artifacts(
+    result: MediatorResult, payload: dict[str, Any], deadline: float | None
+) -> MediatorResult:
+    try:
+        declared = _declared_artifacts(result)
+        if declared:
+            with tracing.span("mediator.artifacts", count=len(declared)):
+                references = collect_artifacts(
+                    node=result.node,
+                    payload=payload,
+                    declared=declared,
+                    timeout=_remaining(deadline),
+                )
+            _attach_artifacts(result, references)
+    except artifacts.ArtifactError as exc:
+        return _artifact_failure(result, exc)
+    return result
+
+
+async def _collect_artifacts_async(
+    result: MediatorResult, payload: dict[str, Any], deadline: float | None
+) -> MediatorResult:
+    try:
+        declared = _declared_artifacts(result)
+        if declared:
+            with tracing.span("mediator.artifacts", count=len(declared)):
+                references = await collect_artifacts_async(
+                    node=result.node,
+                    payload=payload,
+                    declared=declared,
+                    timeout=_remaining(deadline),
+                )
+            _attach_artifacts(result, references)
+    except artifacts.ArtifactError as exc:
+        return _artifact_failure(result, exc)
+    return result
+
+
 def execute_action(
     action: str,
     node: str,
@@ -32,58 +197,170 @@ def execute_action(
     payload: dict[str, Any],
     transport: str,
 ) -> MediatorResult:
-    """Execute a plugin via the selected transport and normalize its output."""
+    """Execute a plugin via the selected transport and normalize its output.
+
+    Transport failures are retried up to ``quality_of_service.max_retries`` times with
+    exponential backoff starting at ``retry_delay_ms``; every attempt is recorded on the result.
+    Attempts and backoff never run past ``quality_of_service.deadline_unix_ms``: each attempt's
+    transport timeout is the time remaining until that deadline.
+
+    Artifacts declared by a successful plugin are collected into the local artifact directory
+    and their declarations replaced with references carrying the local ``path``; a failed or
+    mismatching transfer fails the result with code 502.
+    """
 
     if transport not in SUPPORTED_TRANSPORTS:
         return _protocol_violation(action, node, transport, "Unsupported transport")
 
-    if transport == "ssh":
-        transport_result = run_remote_plugin_ssh(
-            node=node, plugin_path=plugin_path, input_json=payload
-        )
-    else:
-        transport_result = run_remote_plugin_ssm(
-            node=node, plugin_path=plugin_path, input_json=payload
-        )
+    max_retries, retry_delay_ms = _retry_policy(payload)
+    deadline = _deadline(payload)
+    attempts: list[dict[str, Any]] = []
+    while True:
+        started = time.monotonic()
+        timeout = _remaining(deadline)
+        with tracing.span("mediator.attempt", attempt=len(attempts) + 1) as attributes:
+            if transport == "ssh":
+                transport_result = run_remote_plugin_ssh(
+                    node=node, plugin_path=plugin_path, input_json=payload, timeout=timeout
+                )
+            else:
+                transport_result = run_remote_plugin_ssm(
+                    node=node, plugin_path=plugin_path, input_json=payload, timeout=timeout
+                )
+            attributes["exit_code"] = transport_result.exit_code
+        metrics.TRANSPORT_DURATION.observe(time.monotonic() - started, transport)
+        if not _record_attempt(attempts, started, transport_result) or len(attempts) > max_retries:
+            break
+        delay = _backoff_delay(retry_delay_ms, len(attempts))
+        if deadline is not None and time.time() + delay >= deadline:
+            break
+        # This attempt is discarded; release any spill files backing its output.
+        transport_result.close()
+        with tracing.span("mediator.backoff"):
+            time.sleep(delay)
 
-    return _normalize_transport_output(
-        action=action,
-        node=node,
-        transport=transport,
-        transport_result=transport_result,
-    )
+    with tracing.span("mediator.parse_output"):
+        try:
+            result = _normalize_transport_output(
+                action=action,
+                node=node,
+                transport=transport,
+                transport_result=transport_result,
+            )
+        finally:
+            transport_result.close()
+    result = _collect_artifacts(result, payload, deadline)
+    result.attempts = attempts
+    return result
 
 
-def _normalize_transport_output(
+async def execute_action_async(
     action: str,
     node: str,
+    plugin_path: Path,
+    payload: dict[str, Any],
     transport: str,
-    transport_result: TransportResult,
 ) -> MediatorResult:
-    raw_output = transport_result.stdout.strip()
-    if not raw_output:
-        return _protocol_violation(action, node, transport, "Empty response from plugin")
+    """Async counterpart of :func:`execute_action` for use inside an event loop."""
 
-    try:
-        parsed_output = json.loads(raw_output)
-    except json.JSONDecodeError:
-        return _protocol_violation(action, node, transport, "Malformed JSON from plugin")
+    if transport not in SUPPORTED_TRANSPORTS:
+        return _protocol_violation(action, node, transport, "Unsupported transport")
 
-    message_metadata = parsed_output.get("message_metadata")
-    observability = parsed_output.get("observability")
+    max_retries, retry_delay_ms = _retry_policy(payload)
+    deadline = _deadline(payload)
+    attempts: list[dict[str, Any]] = []
+    while True:
+        started = time.monotonic()
+        timeout = _remaining(deadline)
+        with tracing.span("mediator.attempt", attempt=len(attempts) + 1) as attributes:
+            if transport == "ssh":
+                transport_result = await run_remote_plugin_ssh_async(
+                    node=node, plugin_path=plugin_path, input_json=payload, timeout=timeout
+                )
+            else:
+                transport_result = await run_remote_plugin_ssm_async(
+                    node=node, plugin_path=plugin_path, input_json=payload, timeout=timeout
+                )
+            attributes["exit_code"] = transport_result.exit_code
+        metrics.TRANSPORT_DURATION.observe(time.monotonic() - started, transport)
+        if not _record_attempt(attempts, started, transport_result) or len(attempts) > max_retries:
+            break
+        delay = _backoff_delay(retry_delay_ms, len(attempts))
+        if deadline is not None and time.time() + delay >= deadline:
+            break
+        # This attempt is discarded; release any spill files backing its output.
+        transport_result.close()
+        with tracing.span("mediator.backoff"):
+            await asyncio.sleep(delay)
+
+    with tracing.span("mediator.parse_output"):
+        try:
+            result = _normalize_transport_output(
+                action=action,
+                node=node,
+                transport=transport,
+                transport_result=transport_result,
+            )
+        finally:
+            transport_result.close()
+    result = await _collect_artifacts_async(result, payload, deadline)
+    result.attempts = attempts
+    return result
+
+
+def _load_output(raw_output: str | bytes | SpilledOutput) -> Any:
+    """Parse plugin stdout, reading it back from disk if it was spilled."""
+
+    if isinstance(raw_output, (str, bytes)):
+        return codec.loads(raw_output)
+    return codec.load(raw_output.open())
+
+
+def _bpcs_violation(parsed_output: Any) -> str | None:
+    """Return why ``parsed_output`` is not a BPCS document, or ``None`` when it is one."""
+
+    if not isinstance(parsed_output, dict):
+        return "Missing required BPCS fields"
     payload = parsed_output.get("payload")
     if (
-        not isinstance(message_metadata, dict)
-        or not isinstance(observability, dict)
+        not isinstance(parsed_output.get("message_metadata"), dict)
+        or not isinstance(parsed_output.get("observability"), dict)
         or not isinstance(payload, dict)
     ):
-        return _protocol_violation(action, node, transport, "Missing required BPCS fields")
+        return "Missing required BPCS fields"
+    if payload.get("result") not in {"success", "error", "dry_run"}:
+        return "Invalid payload result field"
+    return None
+
+
+def _normalize_transport_output(
+    action: str,
+    node: str,
+    transport: str,
+    transport_result: TransportResult,
+) -> MediatorResult:
+    # Parse the transport's buffer as-is: JSON tolerates surrounding whitespace, so there is
+    # no need to copy a potentially multi-megabyte output just to strip it. Output that was
+    # spilled to disk is parsed from its file; stderr is never read here.
+    raw_output = transport_result.stdout
+    metrics.OUTPUT_BYTES.observe(len(raw_output), action)
+    if transport_result.stdout_truncated:
+        return _protocol_violation(
+            action, node, transport, "Plugin output exceeded the capture limit"
+        )
+    if not raw_output or raw_output.isspace():
+        return _protocol_violation(action, node, transport, "Empty response from plugin")
+
+    try:
+        parsed_output = _load_output(raw_output)
+    except (codec.JSONDecodeError, UnicodeDecodeError):
+        return _protocol_violation(action, node, transport, "Malformed JSON from plugin")
 
-    result_value = payload.get("result")
-    if result_value not in {"success", "error", "dry_run"}:
-        return _protocol_violation(action, node, transport, "Invalid payload result field")
+    violation = _bpcs_violation(parsed_output)
+    if violation is not None:
+        return _protocol_violation(action, node, transport, violation)
 
-    if transport_result.exit_code == 0 and result_value == "success":
+    if transport_result.exit_code == 0 and parsed_output["payload"]["result"] == "success":
         return MediatorResult(
             status="success",
             action=action,
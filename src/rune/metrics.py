@@ -0,0 +1,337 @@
+"""Prometheus metrics for actions, transports and plugin output.
+
+Recording is on the hot path of every action, so it must not serialize concurrent requests.
+Each metric keeps one shard of values per thread: recording updates the calling thread's shard
+without taking a lock, and only :meth:`MetricsRegistry.render` (a scrape) walks every shard
+under the metric's lock. Shards of exited threads are folded into a retired shard, so a
+thread-per-connection server does not accumulate them.
+
+``rune serve`` exposes the metrics on ``GET /metrics``. CLI invocations have no scraper, so
+with ``RUNE_METRICS_TEXTFILE`` set they add their samples to a node_exporter textfile
+collector file instead. All series are counters or histogram components, so totals from
+successive processes are summed.
+"""
+
+from __future__ import annotations
+
+import abc
+import contextlib
+import math
+import os
+import threading
+import weakref
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator, Sequence
+from pathlib import Path
+from typing import TypeVar
+
+__all__ = [
+    "ACTION_DURATION",
+    "ACTION_EXECUTIONS",
+    "OUTPUT_BYTES",
+    "PROTOCOL_VIOLATIONS",
+    "REGISTRY",
+    "TRANSPORT_DURATION",
+    "Counter",
+    "Histogram",
+    "MetricsRegistry",
+    "parse_textfile",
+    "write_textfile",
+]
+
+TEXTFILE_ENV = "RUNE_METRICS_TEXTFILE"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+Labels = tuple[str, ...]
+
+
+class _ThreadShard:
+    """Per-thread owner of a shard; its collection signals that the thread has exited."""
+
+    __slots__ = ("values", "__weakref__")
+
+    def __init__(self) -> None:
+        self.values: dict[Labels, list[float]] = {}
+
+
+class _Metric(abc.ABC):
+    """Base of the metric types: labelled values kept in per-thread shards."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._live: list[dict[Labels, list[float]]] = []
+        self._retired: dict[Labels, list[float]] = {}
+
+    def _shard(self) -> dict[Labels, list[float]]:
+        try:
+            values: dict[Labels, list[float]] = self._local.owner.values
+            return values
+        except AttributeError:
+            owner = _ThreadShard()
+            with self._lock:
+                self._live.append(owner.values)
+            weakref.finalize(owner, self._retire, owner.values)
+            self._local.owner = owner
+            return owner.values
+
+    def _retire(self, values: dict[Labels, list[float]]) -> None:
+        with self._lock:
+            self._live = [shard for shard in self._live if shard is not values]
+            _merge_into(self._retired, values.items())
+
+    def _snapshot(self) -> dict[Labels, list[float]]:
+        merged: dict[Labels, list[float]] = {}
+        with self._lock:
+            _merge_into(merged, self._retired.items())
+            for shard in self._live:
+                # list() guards against the owning thread inserting a new label set meanwhile.
+                _merge_into(merged, list(shard.items()))
+        return merged
+
+    def _check(self, labels: Labels) -> None:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+
+    def series_names(self) -> frozenset[str]:
+        """Sample names this metric renders (histograms add ``_bucket``, ``_sum``, ``_count``)."""
+
+        return frozenset({self.name})
+
+    @abc.abstractmethod
+    def samples(self) -> Iterator[tuple[str, float]]:
+        """Yield ``(series, value)`` pairs in exposition order."""
+
+
+_MetricT = TypeVar("_MetricT", bound=_Metric)
+
+
+def _merge_into(
+    target: dict[Labels, list[float]], items: Iterable[tuple[Labels, list[float]]]
+) -> None:
+    for labels, values in items:
+        current = target.get(labels)
+        if current is None:
+            target[labels] = list(values)
+        else:
+            for index, value in enumerate(values):
+                current[index] += value
+
+
+class Counter(_Metric):
+    """Monotonic counter with a fixed set of label names."""
+
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        """Add ``amount`` to the series identified by ``labels`` (in ``labelnames`` order)."""
+
+        shard = self._shard()
+        values = shard.get(labels)
+        if values is None:
+            self._check(labels)
+            shard[labels] = [amount]
+        else:
+            values[0] += amount
+
+    def value(self, *labels: str) -> float:
+        """Current total for ``labels`` across all threads."""
+
+        return self._snapshot().get(labels, [0])[0]
+
+    def samples(self) -> Iterator[tuple[str, float]]:
+        for labels, values in sorted(self._snapshot().items()):
+            yield _series(self.name, self.labelnames, labels), values[0]
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed upper bounds; ``+Inf`` is implicit."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        buckets: Sequence[float],
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Record ``value`` in the series identified by ``labels``."""
+
+        shard = self._shard()
+        values = shard.get(labels)
+        if values is None:
+            self._check(labels)
+            # Per-bucket (non-cumulative) counts, then +Inf, sum and count.
+            values = shard[labels] = [0] * (len(self.buckets) + 3)
+        values[bisect_left(self.buckets, value)] += 1
+        values[-2] += value
+        values[-1] += 1
+
+    def series_names(self) -> frozenset[str]:
+        return frozenset(f"{self.name}{suffix}" for suffix in ("_bucket", "_sum", "_count"))
+
+    def count(self, *labels: str) -> int:
+        """Number of observations for ``labels`` across all threads."""
+
+        return int(self._snapshot().get(labels, [0])[-1])
+
+    def samples(self) -> Iterator[tuple[str, float]]:
+        labelnames = (*self.labelnames, "le")
+        for labels, values in sorted(self._snapshot().items()):
+            cumulative = 0.0
+            for bound, hits in zip((*self.buckets, math.inf), values[:-2]):
+                cumulative += hits
+                le = "+Inf" if bound == math.inf else _format(bound)
+                yield _series(f"{self.name}_bucket", labelnames, (*labels, le)), cumulative
+            yield _series(f"{self.name}_sum", self.labelnames, labels), values[-2]
+            yield _series(f"{self.name}_count", self.labelnames, labels), values[-1]
+
+
+def _series(name: str, labelnames: Labels, labels: Labels) -> str:
+    if not labelnames:
+        return name
+    pairs = ",".join(
+        f'{key}="{_escape(value)}"' for key, value in zip(labelnames, labels, strict=True)
+    )
+    return f"{name}{{{pairs}}}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Register and return a counter."""
+
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DURATION_BUCKETS,
+    ) -> Histogram:
+        """Register and return a histogram."""
+
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric: _MetricT) -> _MetricT:
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self, extra: dict[str, float] | None = None) -> str:
+        """Render every metric in the Prometheus text exposition format (version 0.0.4).
+
+        ``extra`` holds additional samples keyed by series (used to merge textfiles); they are
+        added to this process's values for the same series.
+        """
+
+        pending = dict(extra or {})
+        lines: list[str] = []
+        for name, metric in sorted(self._metrics.items()):
+            series: dict[str, float] = {}
+            for key, value in metric.samples():
+                series[key] = value + pending.pop(key, 0)
+            names = metric.series_names()
+            for key in [k for k in pending if k.partition("{")[0] in names]:
+                series[key] = pending.pop(key)
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(f"{key} {_format(value)}" for key, value in series.items())
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def parse_textfile(text: str) -> dict[str, float]:
+    """Parse sample lines written by :meth:`MetricsRegistry.render`, skipping comments."""
+
+    samples: dict[str, float] = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        key, _, value = line.rpartition(" ")
+        with contextlib.suppress(ValueError):
+            samples[key] = float(value)
+    return samples
+
+
+def write_textfile(path: Path, registry: MetricsRegistry | None = None) -> None:
+    """Add this process's samples to the node_exporter textfile at ``path``.
+
+    The file is rewritten atomically under an exclusive lock so concurrent CLI processes do not
+    lose each other's increments.
+    """
+
+    import fcntl
+
+    registry = registry or REGISTRY
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(f"{path}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            previous = parse_textfile(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            previous = {}
+        temporary = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        temporary.write_text(registry.render(previous), encoding="utf-8")
+        os.replace(temporary, path)
+
+
+REGISTRY = MetricsRegistry()
+
+ACTION_EXECUTIONS = REGISTRY.counter(
+    "rune_action_executions_total",
+    "Actions run through the orchestrator, by outcome.",
+    ("action", "transport", "status"),
+)
+ACTION_DURATION = REGISTRY.histogram(
+    "rune_action_duration_seconds",
+    "End-to-end time of run_action, including cache lookups, retries and backoff.",
+    ("action", "transport"),
+)
+TRANSPORT_DURATION = REGISTRY.histogram(
+    "rune_transport_duration_seconds",
+    "Time spent in a single transport attempt.",
+    ("transport",),
+)
+OUTPUT_BYTES = REGISTRY.histogram(
+    "rune_plugin_output_bytes",
+    "Size of the raw plugin output returned by the transport.",
+    ("action",),
+    buckets=BYTES_BUCKETS,
+)
+PROTOCOL_VIOLATIONS = REGISTRY.counter(
+    "rune_protocol_violations_total",
+    "Plugin or transport responses rejected by the mediator, by reason.",
+    ("reason",),
+)
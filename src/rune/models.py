@@ -2,11 +2,12 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import datetime, timezone
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import Any
-from uuid import uuid4
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from rune.capture import SpilledOutput
 
 __all__ = [
     "ActionMetadata",
@@ -14,6 +15,7 @@ __all__ = [
     "TransportResult",
     "MediatorResult",
     "OrchestrationResult",
+    "FanoutResult",
     "build_message_metadata",
     "build_observability",
 ]
@@ -26,6 +28,18 @@ class ActionMetadata:
     name: str
     description: str
     plugin_path: Path
+    version: str = "0.0.0"
+    timeout: float | None = None
+    params: dict[str, dict[str, Any]] = field(default_factory=dict)
+    idempotent: bool = False
+    cache_ttl: float | None = None
+    max_retries: int = 0
+    retry_delay_ms: int = 1000
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize the metadata for JSON emission."""
+
+        return {**asdict(self), "plugin_path": str(self.plugin_path)}
 
 
 @dataclass(slots=True)
@@ -44,11 +58,37 @@ class StructuredError:
 
 @dataclass(slots=True)
 class TransportResult:
-    """Raw output from a transport call without protocol interpretation."""
+    """Raw output from a transport call without protocol interpretation.
+
+    ``stdout`` is kept as the undecoded bytes the plugin wrote whenever the transport has them.
+    Captured streams are bounded (see :mod:`rune.capture`): output beyond the in-memory
+    threshold is a :class:`~rune.capture.SpilledOutput`, and ``*_truncated`` report that bytes
+    beyond a stream's cap were dropped. Process stderr stays undecoded until
+    :meth:`stderr_text` is called.
+    """
 
-    stdout: str
-    stderr: str
+    stdout: str | bytes | SpilledOutput
+    stderr: str | bytes | SpilledOutput
     exit_code: int
+    stdout_truncated: bool = False
+    stderr_truncated: bool = False
+
+    def stderr_text(self) -> str:
+        """Return stderr decoded as text, reading it back from disk if it was spilled."""
+
+        stderr = self.stderr
+        if isinstance(stderr, str):
+            return stderr
+        if not isinstance(stderr, bytes):
+            stderr = stderr.read()
+        return stderr.decode(errors="replace")
+
+    def close(self) -> None:
+        """Release temporary files backing spilled streams."""
+
+        for stream in (self.stdout, self.stderr):
+            if not isinstance(stream, (str, bytes)):
+                stream.close()
 
 
 @dataclass(slots=True)
@@ -61,6 +101,7 @@ class MediatorResult:
     transport: str
     plugin_output: dict[str, Any] | None
     error: StructuredError | None
+    attempts: list[dict[str, Any]] = field(default_factory=list)
 
     def to_dict(self) -> dict[str, Any]:
         """Convert the mediator result into an EPS-style dictionary."""
@@ -72,6 +113,7 @@ class MediatorResult:
             "transport": self.transport,
             "plugin_output": self.plugin_output,
             "error": self.error.to_dict() if self.error else None,
+            "attempts": self.attempts,
         }
 
 
@@ -103,9 +145,73 @@ class OrchestrationResult:
         }
 
 
+@dataclass(slots=True)
+class FanoutResult:
+    """Aggregate result of running one action against many nodes."""
+
+    action: str
+    results: list[OrchestrationResult]
+    duration_ms: float
+
+    def summary(self) -> dict[str, Any]:
+        """Summarize per-node outcomes by status."""
+
+        by_status: dict[str, int] = {}
+        for result in self.results:
+            by_status[result.status] = by_status.get(result.status, 0) + 1
+        return {
+            "action": self.action,
+            "total": len(self.results),
+            "succeeded": by_status.get("success", 0) + by_status.get("dry_run", 0),
+            "failed": by_status.get("failed", 0),
+            "by_status": by_status,
+            "failed_nodes": [r.node for r in self.results if r.status == "failed"],
+            "duration_ms": round(self.duration_ms, 3),
+        }
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize every per-node result plus the aggregate summary."""
+
+        return {
+            "summary": self.summary(),
+            "results": [result.to_dict() for result in self.results],
+        }
+
+
+@dataclass(slots=True)
+class WaveResult(FanoutResult):
+    """Result of a rolling-wave run: per-node results plus the waves and any abort."""
+
+    waves: list[dict[str, Any]]
+    skipped: list[str]
+    aborted_reason: str | None = None
+
+    def summary(self) -> dict[str, Any]:
+        """Fan-out summary extended with the skipped nodes and whether the run was aborted."""
+
+        summary = FanoutResult.summary(self)
+        summary["skipped"] = len(self.skipped)
+        summary["aborted"] = self.aborted_reason is not None
+        return summary
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize the summary, the waves, the abort reason, skipped nodes and results."""
+
+        return {
+            "summary": self.summary(),
+            "waves": self.waves,
+            "aborted_reason": self.aborted_reason,
+            "skipped_nodes": self.skipped,
+            "results": [result.to_dict() for result in self.results],
+        }
+
+
 def build_message_metadata() -> dict[str, Any]:
     """Construct the Runtime Communication Specification message metadata."""
 
+    from datetime import datetime, timezone
+    from uuid import uuid4
+
     return {
         "version": "1.0",
         "message_id": str(uuid4()),
@@ -116,4 +222,6 @@ def build_message_metadata() -> dict[str, Any]:
 def build_observability() -> dict[str, Any]:
     """Construct observability tracing identifiers."""
 
+    from uuid import uuid4
+
     return {"trace_id": str(uuid4()), "span_id": str(uuid4())}
@@ -2,75 +2,100 @@
 
 from __future__ import annotations
 
-from pathlib import Path
+import copy
+import time
 from typing import Any
 
-from rune.mediator import execute_action
+from rune import audit, history, metrics, registry, tracing
 from rune.models import (
     ActionMetadata,
+    FanoutResult,
     MediatorResult,
     OrchestrationResult,
     StructuredError,
     build_message_metadata,
     build_observability,
 )
+from rune.payload import RequestPayload, template_for, template_scope
+from rune.singleflight import AsyncSingleFlight, SingleFlight
 
-PLUGINS_DIR = Path(__file__).resolve().parent.parent / "plugins"
-
-ACTION_REGISTRY: dict[str, ActionMetadata] = {
-    "gather-logs": ActionMetadata(
-        name="gather-logs",
-        description="Collect system logs and package them into an archive.",
-        plugin_path=PLUGINS_DIR / "gather-logs.sh",
-    ),
-    "restart-docker": ActionMetadata(
-        name="restart-docker",
-        description="Restart the Docker daemon via systemd.",
-        plugin_path=PLUGINS_DIR / "restart-docker.sh",
-    ),
-    "restart-nomad": ActionMetadata(
-        name="restart-nomad",
-        description="Restart the Nomad agent and optionally summarize jobs.",
-        plugin_path=PLUGINS_DIR / "restart-nomad.sh",
-    ),
-    "noop": ActionMetadata(
-        name="noop",
-        description="No-op plugin used for connectivity and contract testing.",
-        plugin_path=PLUGINS_DIR / "noop.sh",
-    ),
-}
+DEFAULT_CONCURRENCY = 32
+
+# Job budget in seconds for actions whose plugin header does not declare `rune:timeout`.
+DEFAULT_ACTION_TIMEOUT = 60.0
+
+# The mediator pulls in both transports (asyncio, subprocess, bundling); it is imported on first
+# execution so that `rune list-actions` and dry runs never load transport code.
+_MEDIATOR_EXPORTS = frozenset({"execute_action", "execute_action_async"})
+
+# Identical requests already executing are joined instead of reaching the node again. Blocking
+# callers coalesce across threads; async callers coalesce within their event loop.
+_IN_FLIGHT: SingleFlight[tuple[str, MediatorResult]] = SingleFlight()
+_IN_FLIGHT_ASYNC: AsyncSingleFlight[tuple[str, MediatorResult]] = AsyncSingleFlight()
+
+
+def __getattr__(name: str) -> Any:
+    if name == "ACTION_REGISTRY":
+        return registry.get_registry()
+    if name == "PLUGINS_DIR":
+        return registry.PLUGINS_DIR
+    if name in _MEDIATOR_EXPORTS:
+        from rune import mediator
+
+        value = getattr(mediator, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _mediator_export(name: str) -> Any:
+    """Return a mediator entry point, honouring replacements set on this module."""
+
+    if name in globals():
+        return globals()[name]
+    return __getattr__(name)
 
 
 def list_actions() -> list[ActionMetadata]:
-    """Return available actions registered with the orchestrator."""
+    """Return available actions discovered from the plugin search path."""
 
-    return list(ACTION_REGISTRY.values())
+    return list(registry.get_registry().values())
 
 
-def _build_payload(action: str, node: str, params: dict[str, Any]) -> dict[str, Any]:
-    message_metadata = build_message_metadata()
-    observability = build_observability()
+def _quality_of_service(metadata: ActionMetadata, max_retries: int | None) -> dict[str, Any]:
+    """Build the RCS ``quality_of_service`` block, including the job's overall deadline.
+
+    The action timeout budgets the whole job, retries included; plugins can read the deadline
+    to bound their own work.
+    """
+
+    timeout_ms = round((metadata.timeout or DEFAULT_ACTION_TIMEOUT) * 1000)
     return {
-        "message_metadata": message_metadata,
-        "routing": {
-            "event_type": action,
-            "source_module": "orchestrator",
-            "target_node": node,
-        },
-        "payload": {
-            "schema_version": "rcs_v1",
-            "content_type": "application/json",
-            "data": {"input_parameters": params},
-        },
-        "observability": observability,
+        "max_retries": metadata.max_retries if max_retries is None else max_retries,
+        "retry_delay_ms": metadata.retry_delay_ms,
+        "timeout_ms": timeout_ms,
+        "deadline_unix_ms": time.time_ns() // 1_000_000 + timeout_ms,
     }
 
 
+def _build_payload(
+    action: str,
+    node: str,
+    params: dict[str, Any],
+    quality_of_service: dict[str, Any] | None = None,
+) -> RequestPayload:
+    """Build the RCS request for ``node``, pre-encoded (see :mod:`rune.payload`).
+
+    Inside a fan-out the node-independent part is encoded once and shared by every node.
+    """
+
+    return template_for(action, params, quality_of_service).render(node)
+
+
 def _dry_run_output(action: str, node: str, params: dict[str, Any]) -> dict[str, Any]:
-    payload = _build_payload(action, node, params)
     return {
-        "message_metadata": payload["message_metadata"],
-        "observability": payload["observability"],
+        "message_metadata": build_message_metadata(),
+        "observability": build_observability(),
         "payload": {
             "result": "dry_run",
             "output_data": {
@@ -83,18 +108,16 @@ def _dry_run_output(action: str, node: str, params: dict[str, Any]) -> dict[str,
     }
 
 
-def run_action(
+def _preflight(
     action: str,
     node: str,
-    use_ssm: bool,
+    transport: str,
     dry_run: bool,
     params: dict[str, Any],
-) -> OrchestrationResult:
-    """Validate and execute a registered action."""
+) -> OrchestrationResult | None:
+    """Resolve requests that never reach the mediator (unknown actions and dry runs)."""
 
-    metadata = ACTION_REGISTRY.get(action)
-    transport = "ssm" if use_ssm else "ssh"
-    if not metadata:
+    if action not in registry.get_registry():
         message_metadata = build_message_metadata()
         observability = build_observability()
         error = StructuredError(code=404, message=f"Unknown action '{action}'")
@@ -122,16 +145,85 @@ def run_action(
             error=None,
         )
 
-    payload = _build_payload(action, node, params)
-    mediator_result: MediatorResult = execute_action(
+    return None
+
+
+def _cache_key_for(
+    metadata: ActionMetadata,
+    node: str,
+    transport: str,
+    params: dict[str, Any],
+    use_cache: bool,
+) -> str | None:
+    """Return the result cache key when this request may be served from the cache."""
+
+    if not (use_cache and metadata.idempotent and metadata.cache_ttl):
+        return None
+    return _request_key(metadata.name, node, transport, params)
+
+
+def _request_key(action: str, node: str, transport: str, params: dict[str, Any]) -> str:
+    from rune.result_cache import cache_key
+
+    return cache_key(action, node, transport, params)
+
+
+def _cache_hit(action: str, node: str, transport: str, key: str) -> OrchestrationResult | None:
+    from rune.result_cache import get_default_cache
+
+    entry = get_default_cache().get(key)
+    if entry is None:
+        return None
+    observability = build_observability()
+    observability["cache"] = {
+        "hit": True,
+        "key": key,
+        "age_ms": round((time.time() - entry.stored_at) * 1000, 3),
+        "ttl_remaining_ms": round(max(entry.expires_at - time.time(), 0) * 1000, 3),
+    }
+    return OrchestrationResult(
+        status=entry.status,
         action=action,
         node=node,
-        plugin_path=metadata.plugin_path,
-        payload=payload,
         transport=transport,
+        message_metadata=build_message_metadata(),
+        observability=observability,
+        # Each hit gets its own copy so a caller mutating its result cannot alter later hits.
+        plugin_output=copy.deepcopy(entry.plugin_output),
+        error=None,
     )
 
+
+def _cache_store(result: OrchestrationResult, metadata: ActionMetadata, key: str) -> None:
+    from rune.result_cache import get_default_cache
+
+    stored = result.status == "success"
+    if stored:
+        assert metadata.cache_ttl is not None
+        plugin_output = copy.deepcopy(result.plugin_output)
+        get_default_cache().put(key, result.status, plugin_output, metadata.cache_ttl)
+    result.observability["cache"] = {"hit": False, "key": key, "stored": stored}
+
+
+def _finalize(
+    action: str,
+    node: str,
+    transport: str,
+    payload: dict[str, Any],
+    mediator_result: MediatorResult,
+    coalesced_with: str | None = None,
+) -> OrchestrationResult:
     status = "success" if mediator_result.status == "success" else "failed"
+    plugin_output = mediator_result.plugin_output
+    attempts = mediator_result.attempts
+    if coalesced_with is not None:
+        # The caller keeps its own metadata but records which execution answered it. It also
+        # gets its own copy of the shared output, so callers cannot see each other's changes.
+        payload["observability"]["coalesced_with"] = coalesced_with
+        plugin_output = copy.deepcopy(plugin_output)
+        attempts = [dict(attempt) for attempt in attempts]
+    if attempts:
+        payload["observability"]["attempts"] = attempts
     return OrchestrationResult(
         status=status,
         action=action,
@@ -139,6 +231,243 @@ def run_action(
         transport=transport,
         message_metadata=payload["message_metadata"],
         observability=payload["observability"],
-        plugin_output=mediator_result.plugin_output,
+        plugin_output=plugin_output,
         error=mediator_result.error,
     )
+
+
+def run_action(
+    action: str,
+    node: str,
+    use_ssm: bool,
+    dry_run: bool,
+    params: dict[str, Any],
+    use_cache: bool = False,
+    max_retries: int | None = None,
+) -> OrchestrationResult:
+    """Validate and execute a registered action.
+
+    With ``use_cache``, idempotent actions that declare a ``cache_ttl`` may be answered from
+    the result cache; hits carry ``observability["cache"]["hit"] = True``. A request identical
+    to one already executing (same action, node, transport and params) waits for and shares
+    that execution's result; ``observability["coalesced_with"]`` names its message id.
+
+    Transport failures are retried per the action's ``max_retries`` / ``retry_delay_ms``
+    (``max_retries`` overrides the former); ``observability["attempts"]`` lists each attempt.
+    ``observability["spans"]`` times each phase of the request (see :mod:`rune.tracing`).
+    With ``RUNE_AUDIT_LOG`` set, the result is appended to the audit log (see :mod:`rune.audit`);
+    with ``RUNE_HISTORY_DB`` set, it is stored in the execution history (see :mod:`rune.history`).
+    """
+
+    with tracing.trace("run_action") as trace:
+        result = _run_action(action, node, use_ssm, dry_run, params, use_cache, max_retries)
+    return _complete(trace, result, params)
+
+
+def _run_action(
+    action: str,
+    node: str,
+    use_ssm: bool,
+    dry_run: bool,
+    params: dict[str, Any],
+    use_cache: bool,
+    max_retries: int | None,
+) -> OrchestrationResult:
+    transport = "ssm" if use_ssm else "ssh"
+    with tracing.span("orchestrator.preflight"):
+        early_result = _preflight(action, node, transport, dry_run, params)
+    if early_result is not None:
+        return early_result
+
+    metadata = registry.get_registry()[action]
+    key = _cache_key_for(metadata, node, transport, params, use_cache)
+    if key is not None:
+        with tracing.span("orchestrator.cache_lookup"):
+            cached = _cache_hit(action, node, transport, key)
+        if cached is not None:
+            return cached
+
+    with tracing.span("orchestrator.build_payload"):
+        payload = _build_payload(action, node, params, _quality_of_service(metadata, max_retries))
+
+    def execute() -> tuple[str, MediatorResult]:
+        mediator_result = _mediator_export("execute_action")(
+            action=action,
+            node=node,
+            plugin_path=metadata.plugin_path,
+            payload=payload,
+            transport=transport,
+        )
+        return payload["message_metadata"]["message_id"], mediator_result
+
+    with tracing.span("orchestrator.execute") as attributes:
+        (leader_id, mediator_result), shared = _IN_FLIGHT.do(
+            key or _request_key(action, node, transport, params), execute
+        )
+        attributes["coalesced"] = shared
+    result = _finalize(
+        action, node, transport, payload, mediator_result, leader_id if shared else None
+    )
+    if key is not None and not shared:
+        with tracing.span("orchestrator.cache_store"):
+            _cache_store(result, metadata, key)
+    return result
+
+
+def _complete(
+    trace: tracing.Trace, result: OrchestrationResult, params: dict[str, Any]
+) -> OrchestrationResult:
+    """Attach the request's spans, record metrics, and export the trace, audit and history."""
+
+    spans = trace.attach(result.observability)
+    transport = result.transport or "none"
+    metrics.ACTION_EXECUTIONS.inc(result.action, transport, result.status)
+    metrics.ACTION_DURATION.observe(spans[0]["duration_ms"] / 1000, result.action, transport)
+    export_path = tracing.export_file()
+    if export_path is not None:
+        tracing.export_otlp(result.to_dict(), export_path)
+    audit_log = audit.get_default_log()
+    if audit_log is not None:
+        audit_log.record(result.to_dict(), params)
+    history_store = history.get_default_store()
+    if history_store is not None:
+        history_store.record(result.to_dict())
+    return result
+
+
+async def run_action_async(
+    action: str,
+    node: str,
+    use_ssm: bool,
+    dry_run: bool,
+    params: dict[str, Any],
+    use_cache: bool = False,
+    max_retries: int | None = None,
+) -> OrchestrationResult:
+    """Async counterpart of :func:`run_action` for use inside an event loop."""
+
+    with tracing.trace("run_action") as trace:
+        result = await _run_action_async(
+            action, node, use_ssm, dry_run, params, use_cache, max_retries
+        )
+    return _complete(trace, result, params)
+
+
+async def _run_action_async(
+    action: str,
+    node: str,
+    use_ssm: bool,
+    dry_run: bool,
+    params: dict[str, Any],
+    use_cache: bool,
+    max_retries: int | None,
+) -> OrchestrationResult:
+    transport = "ssm" if use_ssm else "ssh"
+    with tracing.span("orchestrator.preflight"):
+        early_result = _preflight(action, node, transport, dry_run, params)
+    if early_result is not None:
+        return early_result
+
+    metadata = registry.get_registry()[action]
+    key = _cache_key_for(metadata, node, transport, params, use_cache)
+    if key is not None:
+        with tracing.span("orchestrator.cache_lookup"):
+            cached = _cache_hit(action, node, transport, key)
+        if cached is not None:
+            return cached
+
+    with tracing.span("orchestrator.build_payload"):
+        payload = _build_payload(action, node, params, _quality_of_service(metadata, max_retries))
+
+    async def execute() -> tuple[str, MediatorResult]:
+        mediator_result = await _mediator_export("execute_action_async")(
+            action=action,
+            node=node,
+            plugin_path=metadata.plugin_path,
+            payload=payload,
+            transport=transport,
+        )
+        return payload["message_metadata"]["message_id"], mediator_result
+
+    with tracing.span("orchestrator.execute") as attributes:
+        (leader_id, mediator_result), shared = await _IN_FLIGHT_ASYNC.do(
+            key or _request_key(action, node, transport, params), execute
+        )
+        attributes["coalesced"] = shared
+    result = _finalize(
+        action, node, transport, payload, mediator_result, leader_id if shared else None
+    )
+    if key is not None and not shared:
+        with tracing.span("orchestrator.cache_store"):
+            _cache_store(result, metadata, key)
+    return result
+
+
+async def run_action_fanout_async(
+    action: str,
+    nodes: list[str],
+    use_ssm: bool,
+    dry_run: bool,
+    params: dict[str, Any],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    use_cache: bool = False,
+    max_retries: int | None = None,
+) -> FanoutResult:
+    """Run an action against many nodes with at most ``concurrency`` in flight.
+
+    Results are returned in the order of ``nodes`` regardless of completion order.
+    """
+
+    import asyncio
+
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    started = time.monotonic()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _run_one(node: str) -> OrchestrationResult:
+        async with semaphore:
+            return await run_action_async(
+                action=action,
+                node=node,
+                use_ssm=use_ssm,
+                dry_run=dry_run,
+                params=params,
+                use_cache=use_cache,
+                max_retries=max_retries,
+            )
+
+    # Every node's request shares one template, so the parameters are encoded only once.
+    with template_scope():
+        results = await asyncio.gather(*(_run_one(node) for node in nodes))
+    duration_ms = (time.monotonic() - started) * 1000
+    return FanoutResult(action=action, results=list(results), duration_ms=duration_ms)
+
+
+def run_action_fanout(
+    action: str,
+    nodes: list[str],
+    use_ssm: bool,
+    dry_run: bool,
+    params: dict[str, Any],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    use_cache: bool = False,
+    max_retries: int | None = None,
+) -> FanoutResult:
+    """Blocking wrapper around :func:`run_action_fanout_async`."""
+
+    import asyncio
+
+    return asyncio.run(
+        run_action_fanout_async(
+            action=action,
+            nodes=nodes,
+            use_ssm=use_ssm,
+            dry_run=dry_run,
+            params=params,
+            concurrency=concurrency,
+            use_cache=use_cache,
+            max_retries=max_retries,
+        )
+    )
@@ -0,0 +1,225 @@
+"""Pre-encoded RCS request payloads.
+
+Requests for the same action and parameters differ only in a handful of fields: the target
+node, the message and trace identifiers, the creation time and the job deadline. A
+:class:`PayloadTemplate` encodes everything else, including ``input_parameters`` however large,
+once. :meth:`PayloadTemplate.render` then builds a node's request dict and produces its JSON by
+splicing the per-node values between the pre-encoded byte segments. The bytes are identical to
+``codec.dumps`` of the dict, and transports send them as is (see :func:`encode_request`), or
+send the shared segments once for many nodes (see :func:`split_request`).
+
+Fan-out and wave runs open a :func:`template_scope` so that all of their nodes share one
+template: inside the scope, :func:`template_for` returns the template already built for the
+same action, parameters and quality of service.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from rune import codec
+from rune.models import build_message_metadata, build_observability
+
+__all__ = [
+    "PayloadTemplate",
+    "RequestPayload",
+    "encode_request",
+    "split_request",
+    "template_for",
+    "template_scope",
+]
+
+# Per-node fields in the order they appear in the encoded document.
+_FIELDS = ("message_id", "created_at", "target_node", "trace_id", "span_id", "deadline_unix_ms")
+
+_SHARED: ContextVar[dict[tuple[Any, ...], PayloadTemplate] | None] = ContextVar(
+    "rune_payload_templates", default=None
+)
+
+
+class RequestPayload(dict[str, Any]):
+    """An RCS request dict carrying the JSON it was rendered as.
+
+    ``encoded`` is ``segments`` (shared by every request of the template) interleaved with
+    ``spliced`` (this request's per-node fields). The request must not be modified after
+    rendering, or ``encoded`` no longer matches it.
+    """
+
+    __slots__ = ("encoded", "segments", "spliced")
+
+    encoded: bytes
+    segments: tuple[bytes, ...]
+    spliced: tuple[bytes, ...]
+
+
+class PayloadTemplate:
+    """The node-independent part of an action's requests, encoded once."""
+
+    def __init__(
+        self,
+        action: str,
+        params: dict[str, Any],
+        quality_of_service: dict[str, Any] | None = None,
+    ) -> None:
+        self.action = action
+        self.params = params
+        # The deadline is per request; it is recomputed from ``timeout_ms`` on every render.
+        self._qos = (
+            None
+            if quality_of_service is None
+            else {k: v for k, v in quality_of_service.items() if k != "deadline_unix_ms"}
+        )
+        # Encode the request with random placeholders, then cut the bytes at each of them.
+        marker = os.urandom(8).hex()
+        fields = _FIELDS if self._qos is not None else _FIELDS[:-1]
+        placeholders = {field: f"{marker}:{field}" for field in fields}
+        skeleton = self._assemble(
+            {
+                **build_message_metadata(),
+                "message_id": placeholders["message_id"],
+                "created_at": placeholders["created_at"],
+            },
+            {"trace_id": placeholders["trace_id"], "span_id": placeholders["span_id"]},
+            placeholders["target_node"],
+            placeholders.get("deadline_unix_ms"),
+        )
+        encoded = codec.dumps(skeleton)
+        segments: list[bytes] = []
+        for field in fields:
+            head, found, encoded = encoded.partition(f'"{placeholders[field]}"'.encode())
+            if not found:  # pragma: no cover - the skeleton always contains every placeholder
+                raise AssertionError(f"placeholder for {field} missing from the template")
+            segments.append(head)
+        segments.append(encoded)
+        self._segments = tuple(segments)
+
+    def render(self, node: str) -> RequestPayload:
+        """Build the request for ``node``, with fresh identifiers and deadline, and its JSON."""
+
+        message_metadata = build_message_metadata()
+        observability = build_observability()
+        deadline = None
+        if self._qos is not None:
+            deadline = time.time_ns() // 1_000_000 + self._qos["timeout_ms"]
+        request = self._assemble(message_metadata, observability, node, deadline)
+        values = {
+            "message_id": message_metadata["message_id"],
+            "created_at": message_metadata["created_at"],
+            "target_node": node,
+            "trace_id": observability["trace_id"],
+            "span_id": observability["span_id"],
+            "deadline_unix_ms": deadline,
+        }
+
+        segments = self._segments
+        spliced = []
+        for field in _FIELDS[: len(segments) - 1]:
+            value = values[field]
+            if field == "target_node":
+                spliced.append(codec.dumps(value))
+            elif field == "deadline_unix_ms":
+                spliced.append(str(value).encode())
+            else:
+                # Identifiers and ISO timestamps are plain ASCII and never need escaping.
+                spliced.append(f'"{value}"'.encode())
+        parts = [segments[0]]
+        for value_bytes, segment in zip(spliced, segments[1:]):
+            parts += (value_bytes, segment)
+        request.encoded = b"".join(parts)
+        request.segments = segments
+        request.spliced = tuple(spliced)
+        return request
+
+    def _assemble(
+        self,
+        message_metadata: dict[str, Any],
+        observability: dict[str, Any],
+        node: str,
+        deadline: Any,
+    ) -> RequestPayload:
+        # Same keys, in the same order, as the request the orchestrator has always built. Every
+        # request gets its own containers, so editing one node's request leaves the others (and
+        # the encoded segments) alone; only values nested inside the parameters are shared.
+        request = RequestPayload(
+            message_metadata=message_metadata,
+            routing={
+                "event_type": self.action,
+                "source_module": "orchestrator",
+                "target_node": node,
+            },
+            payload={
+                "schema_version": "rcs_v1",
+                "content_type": "application/json",
+                "data": {"input_parameters": dict(self.params)},
+            },
+            observability=observability,
+        )
+        if self._qos is not None:
+            request["quality_of_service"] = {**self._qos, "deadline_unix_ms": deadline}
+        return request
+
+
+@contextmanager
+def template_scope() -> Iterator[None]:
+    """Share templates between requests built in this block, including tasks started in it."""
+
+    token = _SHARED.set({})
+    try:
+        yield
+    finally:
+        _SHARED.reset(token)
+
+
+def template_for(
+    action: str,
+    params: dict[str, Any],
+    quality_of_service: dict[str, Any] | None = None,
+) -> PayloadTemplate:
+    """Return the scope's template for this request, or a new one outside a scope.
+
+    Parameters are matched by identity: a fan-out passes the same dict for every node, and the
+    template keeps it alive so the id cannot be reused within the scope.
+    """
+
+    shared = _SHARED.get()
+    if shared is None:
+        return PayloadTemplate(action, params, quality_of_service)
+    invariant = (
+        None
+        if quality_of_service is None
+        else tuple(
+            (key, value)
+            for key, value in quality_of_service.items()
+            if key != "deadline_unix_ms"
+        )
+    )
+    key = (action, id(params), invariant)
+    template = shared.get(key)
+    if template is None:
+        template = shared[key] = PayloadTemplate(action, params, quality_of_service)
+    return template
+
+
+def encode_request(request: dict[str, Any]) -> bytes:
+    """JSON for ``request``, reusing the encoding of a rendered :class:`RequestPayload`."""
+
+    if isinstance(request, RequestPayload):
+        return request.encoded
+    return codec.dumps(request)
+
+
+def split_request(request: dict[str, Any]) -> tuple[tuple[bytes, ...], tuple[bytes, ...]]:
+    """JSON for ``request`` as node-independent segments and the values spliced between them.
+
+    Requests rendered from templates with the same action, parameters and quality of service
+    have equal segments. A plain dict is a single segment with no values.
+    """
+
+    if isinstance(request, RequestPayload):
+        return request.segments, request.spliced
+    return (codec.dumps(request),), ()
@@ -0,0 +1,311 @@
+"""Action registry built by discovering plugins on disk.
+
+Plugins declare themselves with a block of ``# rune:`` comment lines at the top of the script::
+
+    #!/usr/bin/env bash
+    # rune:action restart-service
+    # rune:description Restart a systemd unit.
+    # rune:version 1.2.0
+    # rune:timeout 60
+    # rune:param service string required Unit to restart.
+    # rune:param wait boolean Block until the unit reports active.
+
+Read-only diagnostics may add ``# rune:idempotent true`` and ``# rune:cache-ttl SECONDS`` to let
+callers reuse a recent result (see :mod:`rune.result_cache`). ``# rune:max-retries N`` and
+``# rune:retry-delay-ms MS`` set the default retry policy for transport failures.
+
+Scanning and parsing every plugin on each invocation would make ``rune list-actions`` grow with
+the size of the plugin tree, so the parsed headers are persisted to a manifest cache. A cached
+directory is reused while its mtime (entries added, removed or renamed) and each plugin's
+mtime and size are unchanged; only new or modified plugins are parsed again.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import warnings
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+from rune.models import ActionMetadata
+
+__all__ = [
+    "PLUGINS_DIR",
+    "discover_actions",
+    "get_registry",
+    "parse_plugin_header",
+    "plugin_directories",
+    "reload_registry",
+]
+
+PLUGINS_DIR = Path(__file__).resolve().parent.parent.parent / "plugins"
+PLUGIN_PATH_ENV = "RUNE_PLUGIN_PATH"
+MANIFEST_CACHE_ENV = "RUNE_MANIFEST_CACHE"
+
+PLUGIN_SUFFIX = ".sh"
+HEADER_PREFIX = "# rune:"
+PARAM_TYPES = frozenset({"string", "integer", "number", "boolean", "array", "object"})
+
+_MANIFEST_FORMAT = 3
+
+_REGISTRY: dict[str, ActionMetadata] | None = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def plugin_directories() -> list[Path]:
+    """Return the plugin search path: ``RUNE_PLUGIN_PATH`` entries, then the bundled plugins.
+
+    When two directories provide the same action name, the earlier directory wins.
+    """
+
+    directories = [
+        Path(entry).expanduser()
+        for entry in os.environ.get(PLUGIN_PATH_ENV, "").split(os.pathsep)
+        if entry
+    ]
+    directories.append(PLUGINS_DIR)
+    return list(dict.fromkeys(path.resolve() for path in directories))
+
+
+def _default_cache_path() -> Path:
+    override = os.environ.get(MANIFEST_CACHE_ENV)
+    if override:
+        return Path(override).expanduser()
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "rune" / "manifest.json"
+
+
+def get_registry() -> dict[str, ActionMetadata]:
+    """Return the process-wide action registry, discovering plugins on first use."""
+
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            _REGISTRY = discover_actions(plugin_directories(), _default_cache_path())
+        return _REGISTRY
+
+
+def reload_registry() -> dict[str, ActionMetadata]:
+    """Discard the in-process registry and rediscover plugins."""
+
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        _REGISTRY = None
+    return get_registry()
+
+
+def discover_actions(
+    directories: Iterable[Path], cache_path: Path | None = None
+) -> dict[str, ActionMetadata]:
+    """Discover the actions provided by plugins in ``directories``.
+
+    ``cache_path`` names the manifest cache; pass ``None`` to always scan.
+    """
+
+    manifest = _load_manifest(cache_path) if cache_path is not None else {}
+    cached_dirs: dict[str, Any] = manifest.get("directories", {})
+    # Directories outside this search path stay cached for invocations with another path.
+    fresh_dirs: dict[str, Any] = dict(cached_dirs)
+    changed = False
+
+    registry: dict[str, ActionMetadata] = {}
+    for directory in directories:
+        key = str(directory)
+        try:
+            dir_mtime = directory.stat().st_mtime_ns
+        except OSError:
+            changed = fresh_dirs.pop(key, None) is not None or changed
+            continue
+
+        cached = cached_dirs.get(key)
+        entry, dir_changed = _refresh_directory(directory, dir_mtime, cached)
+        changed = changed or dir_changed
+        fresh_dirs[key] = entry
+
+        for filename, record in sorted(entry["files"].items()):
+            if record.get("error"):
+                warnings.warn(
+                    f"skipping plugin {directory / filename}: {record['error']}",
+                    RuntimeWarning,
+                    stacklevel=2,
+                )
+                continue
+            action = record.get("action")
+            if action is not None and action["name"] not in registry:
+                registry[action["name"]] = _metadata_from_record(action, directory / filename)
+
+    if cache_path is not None and changed:
+        _write_manifest(cache_path, {"format": _MANIFEST_FORMAT, "directories": fresh_dirs})
+    return dict(sorted(registry.items()))
+
+
+def parse_plugin_header(path: Path) -> dict[str, Any] | None:
+    """Parse the ``# rune:`` header of ``path``.
+
+    Returns ``None`` for files without an ``action`` entry (shared libraries, helpers) and
+    raises ``ValueError`` for malformed headers.
+    """
+
+    fields: dict[str, Any] = {"params": {}}
+    with path.open(encoding="utf-8", errors="replace") as handle:
+        for raw_line in handle:
+            line = raw_line.strip()
+            if not line or line.startswith("#!"):
+                continue
+            if not line.startswith("#"):
+                break
+            if not line.startswith(HEADER_PREFIX):
+                continue
+            key, _, value = line[len(HEADER_PREFIX) :].partition(" ")
+            value = value.strip()
+            if key == "param":
+                name, schema = _parse_param(value)
+                fields["params"][name] = schema
+            elif key in {"action", "description", "version"}:
+                fields[key] = value
+            elif key == "timeout":
+                fields["timeout"] = _parse_seconds(key, value)
+            elif key == "cache-ttl":
+                fields["cache_ttl"] = _parse_seconds(key, value)
+            elif key == "idempotent":
+                fields["idempotent"] = _parse_bool(key, value)
+            elif key in {"max-retries", "retry-delay-ms"}:
+                fields[key.replace("-", "_")] = _parse_count(key, value)
+            else:
+                raise ValueError(f"unknown header key 'rune:{key}'")
+
+    if not fields.get("action"):
+        return None
+    return {
+        "name": fields["action"],
+        "description": fields.get("description", ""),
+        "version": fields.get("version", "0.0.0"),
+        "timeout": fields.get("timeout"),
+        "params": fields["params"],
+        "idempotent": fields.get("idempotent", False),
+        "cache_ttl": fields.get("cache_ttl"),
+        "max_retries": fields.get("max_retries", 0),
+        "retry_delay_ms": fields.get("retry_delay_ms", 1000),
+    }
+
+
+def _parse_param(value: str) -> tuple[str, dict[str, Any]]:
+    parts = value.split(maxsplit=2)
+    if len(parts) < 2:
+        raise ValueError(f"'rune:param {value}' must name a parameter and its type")
+    name, param_type = parts[0], parts[1]
+    if param_type not in PARAM_TYPES:
+        raise ValueError(f"parameter '{name}' has unknown type '{param_type}'")
+    description = parts[2] if len(parts) == 3 else ""
+    required = description == "required" or description.startswith("required ")
+    if required:
+        description = description[len("required") :].strip()
+    return name, {"type": param_type, "required": required, "description": description}
+
+
+def _parse_seconds(key: str, value: str) -> float:
+    try:
+        seconds = float(value)
+    except ValueError:
+        raise ValueError(f"{key} '{value}' is not a number of seconds") from None
+    if seconds <= 0:
+        raise ValueError(f"{key} must be positive, got {value}")
+    return seconds
+
+
+def _parse_count(key: str, value: str) -> int:
+    if not value.isdigit():
+        raise ValueError(f"{key} must be a non-negative integer, got '{value}'")
+    return int(value)
+
+
+def _parse_bool(key: str, value: str) -> bool:
+    if value in {"true", "false"}:
+        return value == "true"
+    raise ValueError(f"{key} must be 'true' or 'false', got '{value}'")
+
+
+def _refresh_directory(
+    directory: Path, dir_mtime: int, cached: dict[str, Any] | None
+) -> tuple[dict[str, Any], bool]:
+    """Return the up-to-date manifest entry for ``directory`` and whether it changed."""
+
+    cached_files: dict[str, Any] = cached["files"] if cached else {}
+    if cached is not None and cached.get("mtime_ns") == dir_mtime:
+        filenames = list(cached_files)
+    else:
+        filenames = sorted(
+            entry.name
+            for entry in os.scandir(directory)
+            if entry.name.endswith(PLUGIN_SUFFIX) and entry.is_file()
+        )
+
+    changed = cached is None or cached.get("mtime_ns") != dir_mtime
+    files: dict[str, Any] = {}
+    # Plain string paths: building a pathlib.Path per plugin costs more than the stat itself.
+    prefix = os.path.join(directory, "")
+    for filename in filenames:
+        try:
+            stat = os.stat(prefix + filename)
+        except OSError:
+            changed = True
+            continue
+        record = cached_files.get(filename)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if record is None or (record["mtime_ns"], record["size"]) != signature:
+            record = _parse_record(directory / filename, stat.st_mtime_ns, stat.st_size)
+            changed = True
+        files[filename] = record
+    return {"mtime_ns": dir_mtime, "files": files}, changed
+
+
+def _parse_record(path: Path, mtime_ns: int, size: int) -> dict[str, Any]:
+    record: dict[str, Any] = {"mtime_ns": mtime_ns, "size": size, "action": None}
+    try:
+        record["action"] = parse_plugin_header(path)
+    except (OSError, ValueError) as exc:
+        record["error"] = str(exc)
+    return record
+
+
+def _metadata_from_record(action: dict[str, Any], plugin_path: Path) -> ActionMetadata:
+    return ActionMetadata(
+        name=action["name"],
+        description=action["description"],
+        plugin_path=plugin_path,
+        version=action["version"],
+        timeout=action["timeout"],
+        params=action["params"],
+        idempotent=action["idempotent"],
+        cache_ttl=action["cache_ttl"],
+        max_retries=action["max_retries"],
+        retry_delay_ms=action["retry_delay_ms"],
+    )
+
+
+def _load_manifest(cache_path: Path) -> dict[str, Any]:
+    try:
+        manifest = json.loads(cache_path.read_bytes())
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("format") != _MANIFEST_FORMAT:
+        return {}
+    return manifest
+
+
+def _write_manifest(cache_path: Path, manifest: dict[str, Any]) -> None:
+    # The cache is an optimisation: a read-only or missing home directory must not break
+    # discovery, so write failures are ignored and the next run simply scans again.
+    temporary = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary.write_text(json.dumps(manifest, separators=(",", ":")), encoding="utf-8")
+        os.replace(temporary, cache_path)
+    except OSError:
+        try:
+            temporary.unlink()
+        except OSError:
+            pass
@@ -0,0 +1,251 @@
+"""TTL cache for results of idempotent diagnostic actions.
+
+Only actions whose metadata declares ``idempotent`` and a ``cache_ttl`` are cached, and only
+successful results are stored, so mutating actions such as restarts always execute. Entries
+live in a bounded in-memory LRU and, when a directory is configured, in one JSON file per key
+so separate CLI processes share hits.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from rune import codec
+
+__all__ = [
+    "CacheEntry",
+    "ResultCache",
+    "cache_key",
+    "default_cache_dir",
+    "get_default_cache",
+    "set_default_cache",
+]
+
+CACHE_DIR_ENV = "RUNE_RESULT_CACHE_DIR"
+CACHE_SIZE_ENV = "RUNE_RESULT_CACHE_SIZE"
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_DISK_ENTRIES = 4096
+
+
+@dataclass(frozen=True, slots=True)
+class CacheEntry:
+    """A stored action result and its validity window (epoch seconds)."""
+
+    key: str
+    stored_at: float
+    expires_at: float
+    status: str
+    plugin_output: dict[str, Any] | None
+
+
+def cache_key(action: str, node: str, transport: str, params: dict[str, Any]) -> str:
+    """Return the cache key for a request; parameter order does not matter."""
+
+    canonical = json.dumps(
+        [action, node, transport, params], sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ResultCache:
+    """LRU result cache with optional disk persistence."""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        directory: Path | None = None,
+        max_disk_entries: int = DEFAULT_MAX_DISK_ENTRIES,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self._clock = clock
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CacheEntry | None:
+        """Return the live entry for ``key``, or ``None`` on a miss or expiry."""
+
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at > now:
+                    self._entries.move_to_end(key)
+                    return entry
+                del self._entries[key]
+
+        entry = self._read_disk(key, now)
+        if entry is not None:
+            self._remember(entry)
+        return entry
+
+    def put(
+        self,
+        key: str,
+        status: str,
+        plugin_output: dict[str, Any] | None,
+        ttl: float,
+    ) -> CacheEntry:
+        """Store a result for ``ttl`` seconds."""
+
+        now = self._clock()
+        entry = CacheEntry(
+            key=key,
+            stored_at=now,
+            expires_at=now + ttl,
+            status=status,
+            plugin_output=plugin_output,
+        )
+        self._remember(entry)
+        self._write_disk(entry)
+        return entry
+
+    def clear(self) -> None:
+        """Drop every entry, including the on-disk copies."""
+
+        with self._lock:
+            self._entries.clear()
+        if self.directory is not None and self.directory.is_dir():
+            for path in self.directory.glob("*.json"):
+                self._discard(path)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _remember(self, entry: CacheEntry) -> None:
+        with self._lock:
+            self._entries[entry.key] = entry
+            self._entries.move_to_end(entry.key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _read_disk(self, key: str, now: float) -> CacheEntry | None:
+        if self.directory is None:
+            return None
+        path = self.directory / f"{key}.json"
+        try:
+            entry = CacheEntry(**codec.loads(path.read_bytes()))
+        except FileNotFoundError:
+            return None
+        except (OSError, TypeError, ValueError):
+            self._discard(path)
+            return None
+        if entry.expires_at <= now:
+            self._discard(path)
+            return None
+        # Reads refresh the mtime so disk pruning evicts the least recently used entries.
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return entry
+
+    def _write_disk(self, entry: CacheEntry) -> None:
+        if self.directory is None:
+            return
+        path = self.directory / f"{entry.key}.json"
+        temporary = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            temporary.write_bytes(codec.dumps(asdict(entry)))
+            os.replace(temporary, path)
+        except OSError:
+            # Disk persistence is best effort; the in-memory entry still serves this process.
+            self._discard(temporary)
+            return
+        self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        assert self.directory is not None
+        files = []
+        for candidate in os.scandir(self.directory):
+            if candidate.name.endswith(".json"):
+                try:
+                    files.append((candidate.stat().st_mtime_ns, candidate.path))
+                except OSError:
+                    continue
+        if len(files) <= self.max_disk_entries:
+            return
+        files.sort()
+        for _, path in files[: len(files) - self.max_disk_entries]:
+            self._discard(Path(path))
+
+    @staticmethod
+    def _discard(path: Path) -> None:
+        with contextlib.suppress(OSError):
+            path.unlink()
+
+
+_DEFAULT_CACHE: ResultCache | None = None
+_DEFAULT_CACHE_LOCK = threading.Lock()
+
+
+def default_cache_dir() -> Path:
+    """Directory used for shared on-disk entries (``RUNE_RESULT_CACHE_DIR`` overrides it)."""
+
+    override = os.environ.get(CACHE_DIR_ENV)
+    if override:
+        return Path(override).expanduser()
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "rune" / "results"
+
+
+def _env_max_entries() -> int:
+    """``RUNE_RESULT_CACHE_SIZE``, or the default when it is unset or not a positive integer."""
+
+    raw = os.environ.get(CACHE_SIZE_ENV)
+    if not raw:
+        return DEFAULT_MAX_ENTRIES
+    try:
+        value = int(raw)
+    except ValueError:
+        value = 0
+    if value < 1:
+        warnings.warn(
+            f"ignoring {CACHE_SIZE_ENV}={raw!r}: expected a positive integer; "
+            f"using {DEFAULT_MAX_ENTRIES}",
+            RuntimeWarning,
+            stacklevel=2,
+        )
+        return DEFAULT_MAX_ENTRIES
+    return value
+
+
+def get_default_cache() -> ResultCache:
+    """Return the process-wide cache.
+
+    It is memory-only unless ``RUNE_RESULT_CACHE_DIR`` is set or a persistent cache was
+    installed with :func:`set_default_cache`.
+    """
+
+    global _DEFAULT_CACHE
+    with _DEFAULT_CACHE_LOCK:
+        if _DEFAULT_CACHE is None:
+            _DEFAULT_CACHE = ResultCache(
+                max_entries=_env_max_entries(),
+                directory=default_cache_dir() if os.environ.get(CACHE_DIR_ENV) else None,
+            )
+        return _DEFAULT_CACHE
+
+
+def set_default_cache(cache: ResultCache | None) -> None:
+    """Replace the process-wide cache; ``None`` resets it to the environment defaults."""
+
+    global _DEFAULT_CACHE
+    with _DEFAULT_CACHE_LOCK:
+        _DEFAULT_CACHE = cache
@@ -3,12 +3,16 @@
 from __future__ import annotations
 
 import argparse
-import json
+import os
 import sys
-from dataclasses import asdict
-from typing import Any
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
-from rune.orchestrator import list_actions, run_action
+from rune import codec, tracing
+from rune.orchestrator import DEFAULT_CONCURRENCY, list_actions, run_action, run_action_fanout
+
+if TYPE_CHECKING:
+    from rune.inventory import Inventory
 
 
 def _build_parser() -> argparse.ArgumentParser:
@@ -19,16 +23,96 @@ def _build_parser() -> argparse.ArgumentParser:
 
     run_parser = subparsers.add_parser("run", help="Run an orchestration action")
     run_parser.add_argument("action", help="Action name")
-    run_parser.add_argument(
+    target_group = run_parser.add_mutually_exclusive_group(required=True)
+    target_group.add_argument(
         "--node",
-        required=True,
         help="Target node hostname or identifier",
     )
+    target_group.add_argument(
+        "--nodes",
+        metavar="NODE[,NODE...]",
+        help="Comma-separated list of target nodes to fan out to",
+    )
+    target_group.add_argument(
+        "--nodes-file",
+        type=Path,
+        metavar="PATH",
+        help="File with one target node per line ('#' starts a comment)",
+    )
+    target_group.add_argument(
+        "--select",
+        metavar="SELECTOR",
+        help="Target the inventory nodes matching SELECTOR, e.g. 'role=nomad,!tag:canary'",
+    )
+    run_parser.add_argument(
+        "--inventory",
+        type=Path,
+        metavar="PATH",
+        help="Inventory file --select resolves against (default: $RUNE_INVENTORY)",
+    )
+    run_parser.add_argument(
+        "--concurrency",
+        type=_positive_int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Maximum nodes executed in parallel during fan-out (default: {DEFAULT_CONCURRENCY})",
+    )
+    run_parser.add_argument(
+        "--wave-size",
+        type=_wave_size,
+        metavar="N|P%",
+        help="Roll out to the target nodes in waves of N nodes or P percent of the fleet",
+    )
+    run_parser.add_argument(
+        "--canary",
+        type=_non_negative_int,
+        default=0,
+        metavar="N",
+        help="Run a canary wave of N nodes to completion before the other waves",
+    )
+    run_parser.add_argument(
+        "--advance-at",
+        type=_fraction,
+        default=0.8,
+        metavar="FRACTION",
+        help="Start the next wave once this share of the current one finished (default: 0.8)",
+    )
+    run_parser.add_argument(
+        "--max-failure-rate",
+        type=_fraction,
+        default=0.2,
+        metavar="FRACTION",
+        help="Abort remaining waves when more recent nodes than this failed (default: 0.2)",
+    )
+    run_parser.add_argument(
+        "--failure-window",
+        type=_positive_int,
+        default=20,
+        metavar="N",
+        help="Number of most recently finished nodes the failure rate covers (default: 20)",
+    )
     run_parser.add_argument(
         "--use-ssm",
         action="store_true",
         help="Use SSM transport instead of SSH",
     )
+    run_parser.add_argument(
+        "--max-retries",
+        type=_non_negative_int,
+        default=None,
+        metavar="N",
+        help="Retry transport failures up to N times (default: the action's own policy)",
+    )
+    run_parser.add_argument(
+        "--trace-file",
+        type=Path,
+        metavar="PATH",
+        help="Append per-phase timing spans to PATH as OTLP/JSON lines",
+    )
+    run_parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Reuse a recent result for idempotent actions that declare a cache TTL",
+    )
     run_parser.add_argument(
         "--dry-run",
         action="store_true",
@@ -56,9 +140,228 @@ def _build_parser() -> argparse.ArgumentParser:
         help="Output formatting",
     )
 
+    batch_parser = subparsers.add_parser(
+        "batch", help="Run newline-delimited JSON requests, streaming results as they finish"
+    )
+    batch_parser.add_argument(
+        "--input",
+        type=Path,
+        metavar="PATH",
+        help="Read requests from PATH instead of stdin",
+    )
+    batch_parser.add_argument(
+        "--concurrency",
+        type=_positive_int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Maximum requests executed in parallel (default: {DEFAULT_CONCURRENCY})",
+    )
+    batch_parser.add_argument(
+        "--use-ssm",
+        action="store_true",
+        help="Default to the SSM transport for requests that do not set use_ssm",
+    )
+    batch_parser.add_argument(
+        "--max-retries",
+        type=_non_negative_int,
+        default=None,
+        metavar="N",
+        help="Default retry limit for requests that do not set max_retries",
+    )
+    batch_parser.add_argument(
+        "--trace-file",
+        type=Path,
+        metavar="PATH",
+        help="Append per-phase timing spans to PATH as OTLP/JSON lines",
+    )
+    batch_parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Default use_cache to true for idempotent actions",
+    )
+    batch_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Default dry_run to true",
+    )
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="Serve the JSON API over local HTTP or a Unix socket"
+    )
+    serve_parser.add_argument(
+        "--host",
+        default=None,
+        help="Address to listen on (default: 127.0.0.1)",
+    )
+    serve_parser.add_argument(
+        "--port",
+        type=_non_negative_int,
+        default=None,
+        help="TCP port to listen on (default: 8470)",
+    )
+    serve_parser.add_argument(
+        "--socket",
+        type=Path,
+        metavar="PATH",
+        help="Listen on a Unix socket instead of TCP",
+    )
+    serve_parser.add_argument(
+        "--drain-timeout",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="How long shutdown waits for running requests (default: 30)",
+    )
+    serve_parser.add_argument(
+        "--access-log",
+        action="store_true",
+        help="Log every request to stderr",
+    )
+
+    inventory_parser = subparsers.add_parser(
+        "inventory", help="List inventory nodes, optionally filtered by a selector"
+    )
+    inventory_parser.add_argument(
+        "--select",
+        default="*",
+        metavar="SELECTOR",
+        help="Only nodes matching SELECTOR (default: every node)",
+    )
+    inventory_parser.add_argument(
+        "--inventory",
+        type=Path,
+        metavar="PATH",
+        help="Inventory file to read (default: $RUNE_INVENTORY)",
+    )
+    inventory_parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Print each node's attributes and tags instead of just its name",
+    )
+    inventory_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse the inventory file even when a fresh compiled index is cached",
+    )
+    inventory_parser.add_argument(
+        "--output",
+        choices=["json", "pretty"],
+        default="json",
+        help="Output formatting",
+    )
+
+    history_parser = subparsers.add_parser(
+        "history", help="Query stored execution results, newest first"
+    )
+    history_parser.add_argument("--node", help="Only executions on this node")
+    history_parser.add_argument("--action", help="Only executions of this action")
+    history_parser.add_argument("--status", help="Only executions with this status")
+    history_parser.add_argument("--trace-id", help="Only executions with this trace id")
+    history_parser.add_argument("--message-id", help="Only the execution with this message id")
+    history_parser.add_argument(
+        "--since",
+        metavar="TIME",
+        help="Only executions recorded at or after TIME (30m, 2h, 1d or an ISO 8601 timestamp)",
+    )
+    history_parser.add_argument(
+        "--until",
+        metavar="TIME",
+        help="Only executions recorded before TIME (same formats as --since)",
+    )
+    history_parser.add_argument(
+        "--limit",
+        type=_non_negative_int,
+        default=100,
+        help="Maximum rows to print, 0 for no limit (default: 100)",
+    )
+    history_parser.add_argument(
+        "--before",
+        type=_positive_int,
+        metavar="ID",
+        help="Only rows older than the row with this id (the last id of the previous page)",
+    )
+    history_parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Include the stored result document in each row",
+    )
+    history_parser.add_argument(
+        "--db",
+        type=Path,
+        metavar="PATH",
+        help="History database to read (default: $RUNE_HISTORY_DB)",
+    )
+
     return parser
 
 
+def _positive_int(raw: str) -> int:
+    try:
+        value = int(raw)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"invalid integer value: '{raw}'") from exc
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
+def _non_negative_int(raw: str) -> int:
+    try:
+        value = int(raw)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"invalid integer value: '{raw}'") from exc
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"must not be negative, got {value}")
+    return value
+
+
+def _fraction(raw: str) -> float:
+    try:
+        value = float(raw)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid fraction: '{raw}'") from None
+    if not 0 <= value <= 1:
+        raise argparse.ArgumentTypeError(f"must be between 0 and 1, got {raw}")
+    return value
+
+
+def _wave_size(raw: str) -> tuple[int | None, float | None]:
+    """Parse ``N`` into ``(N, None)`` and ``P%`` into ``(None, P)``."""
+
+    try:
+        if raw.endswith("%"):
+            percent = float(raw[:-1])
+            if 0 < percent <= 100:
+                return None, percent
+        elif int(raw) >= 1:
+            return int(raw), None
+    except ValueError:
+        pass
+    raise argparse.ArgumentTypeError(
+        f"invalid wave size: '{raw}' (expected a node count or a percentage such as 10%)"
+    )
+
+
+def _parse_nodes(raw_nodes: str | None, nodes_file: Path | None) -> list[str]:
+    """Collect fan-out targets, dropping blanks and duplicates while keeping order."""
+
+    candidates: list[str] = []
+    if raw_nodes is not None:
+        candidates = raw_nodes.split(",")
+    elif nodes_file is not None:
+        try:
+            lines = nodes_file.read_text(encoding="utf-8").splitlines()
+        except OSError as exc:
+            raise argparse.ArgumentTypeError(
+                f"cannot read nodes file '{nodes_file}': {exc}"
+            ) from exc
+        candidates = [line.split("#", maxsplit=1)[0] for line in lines]
+
+    nodes = list(dict.fromkeys(node.strip() for node in candidates if node.strip()))
+    if not nodes:
+        raise argparse.ArgumentTypeError("no target nodes given")
+    return nodes
+
+
 def _parse_params(raw_params: list[str] | None) -> dict[str, Any]:
     params: dict[str, Any] = {}
     if not raw_params:
@@ -72,49 +375,294 @@ def _parse_params(raw_params: list[str] | None) -> dict[str, Any]:
     return params
 
 
-def _print_output(data: dict[str, Any], mode: str) -> None:
-    if mode == "pretty":
-        print(json.dumps(data, indent=2))
-    else:
-        print(json.dumps(data))
+def _use_shared_result_cache() -> None:
+    """Back the result cache with disk so hits are shared between CLI invocations."""
 
+    from rune import result_cache
 
-def main(argv: list[str] | None = None) -> int:
-    parser = _build_parser()
+    result_cache.set_default_cache(
+        result_cache.ResultCache(
+            max_entries=result_cache.get_default_cache().max_entries,
+            directory=result_cache.default_cache_dir(),
+        )
+    )
+
+
+def _batch(args: argparse.Namespace) -> int:
+    from rune.batch import BatchInputError, run_batch
+
+    if args.cache:
+        _use_shared_result_cache()
+    defaults = {
+        "use_ssm": bool(args.use_ssm),
+        "dry_run": bool(args.dry_run),
+        "use_cache": bool(args.cache),
+        "max_retries": args.max_retries,
+    }
+
+    def emit(document: dict[str, Any]) -> None:
+        _print_output(document, "json", fast=document["status"] != "dry_run")
+
+    source = "<stdin>" if args.input is None else str(args.input)
     try:
-        args = parser.parse_args(argv)
-    except SystemExit as exc:  # argparse uses SystemExit for validation errors
-        if exc.code and exc.code != 0:
-            return 2
-        raise
+        stream = sys.stdin.buffer if args.input is None else args.input.open("rb")
+    except OSError as exc:
+        print(f"rune: error: cannot read batch input '{source}': {exc}", file=sys.stderr)
+        return 2
+    try:
+        summary = run_batch(stream, emit, concurrency=args.concurrency, defaults=defaults)
+    except BatchInputError as exc:
+        print(f"rune: error: cannot read batch input '{source}': {exc}", file=sys.stderr)
+        return 2
+    except OSError as exc:
+        # Failed writes of result lines, e.g. EPIPE when the output is piped to head.
+        print(f"rune: error: cannot write batch output: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        if args.input is not None:
+            stream.close()
+    return 0 if summary.failed == 0 else 1
+
+
+def _write_metrics_textfile() -> None:
+    """Add this invocation's metrics to the node_exporter textfile named by the environment."""
+
+    from rune import metrics
+
+    path = os.environ.get(metrics.TEXTFILE_ENV)
+    if not path:
+        return
+    try:
+        metrics.write_textfile(Path(path).expanduser())
+    except OSError as exc:
+        print(f"rune: warning: cannot write metrics textfile '{path}': {exc}", file=sys.stderr)
+
+
+def _serve(parser: argparse.ArgumentParser, args: argparse.Namespace) -> int:
+    # The server pulls in http.server and the transports; keep them off other commands' path.
+    from rune import server
+
+    if args.socket is not None and (args.host is not None or args.port is not None):
+        parser.print_usage()
+        print("rune: error: --socket cannot be combined with --host/--port", file=sys.stderr)
+        return 2
+    address: tuple[str, int] | Path = args.socket or (
+        args.host or server.DEFAULT_HOST,
+        server.DEFAULT_PORT if args.port is None else args.port,
+    )
+    drain_timeout = args.drain_timeout
+    if drain_timeout is None:
+        drain_timeout = server.DEFAULT_DRAIN_TIMEOUT
+    return server.serve(address, drain_timeout=drain_timeout, access_log=args.access_log)
+
+
+def _load_inventory(path: Path | None, use_cache: bool = True) -> Inventory:
+    """Load the inventory at ``path`` or ``$RUNE_INVENTORY``; raises ``InventoryError``."""
+
+    from rune import inventory
+
+    path = path or inventory.default_inventory_path()
+    if path is None:
+        raise inventory.InventoryError(
+            f"no inventory; pass --inventory or set {inventory.INVENTORY_ENV}"
+        )
+    return inventory.load_inventory(path, use_cache=use_cache)
+
+
+def _select_nodes(selector: str, path: Path | None) -> list[str]:
+    from rune.inventory import InventoryError
+
+    try:
+        nodes = _load_inventory(path).select(selector)
+    except InventoryError as exc:
+        raise argparse.ArgumentTypeError(str(exc)) from exc
+    if not nodes:
+        raise argparse.ArgumentTypeError(f"selector '{selector}' matched no inventory nodes")
+    return nodes
+
+
+def _inventory(args: argparse.Namespace) -> int:
+    from rune.inventory import InventoryError
+
+    try:
+        loaded = _load_inventory(args.inventory, use_cache=not args.no_cache)
+        names = loaded.select(args.select)
+    except InventoryError as exc:
+        print(f"rune: error: {exc}", file=sys.stderr)
+        return 2
+    nodes = [loaded.node(name).to_dict() for name in names] if args.full else names
+    _print_output({"count": len(names), "nodes": nodes}, args.output)
+    return 0
 
-    if args.command == "list-actions":
-        actions = [
-            {**asdict(action), "plugin_path": str(action.plugin_path)}
-            for action in list_actions()
-        ]
-        _print_output({"actions": actions}, args.output)
-        return 0
 
+def _history(args: argparse.Namespace) -> int:
+    from rune import history
+
+    path = args.db or os.environ.get(history.HISTORY_DB_ENV)
+    if not path:
+        print(
+            f"rune: error: no history database; pass --db or set {history.HISTORY_DB_ENV}",
+            file=sys.stderr,
+        )
+        return 2
+    try:
+        filters = history.HistoryQuery(
+            node=args.node,
+            action=args.action,
+            status=args.status,
+            trace_id=args.trace_id,
+            message_id=args.message_id,
+            since=None if args.since is None else history.parse_time(args.since),
+            until=None if args.until is None else history.parse_time(args.until),
+            before_id=args.before,
+            limit=args.limit or None,
+        )
+        # Rows are printed as SQLite yields them, so large ranges never sit in memory.
+        for row in history.query(Path(path), filters, include_result=args.full):
+            _print_output(row, "json")
+    except history.HistoryError as exc:
+        print(f"rune: error: {exc}", file=sys.stderr)
+        return 2
+    return 0
+
+
+def _print_output(data: dict[str, Any], mode: str, fast: bool = True) -> None:
+    encoded = codec.dumps(data, pretty=mode == "pretty", fast=fast) + b"\n"
+    buffer = getattr(sys.stdout, "buffer", None)
+    if buffer is None:
+        sys.stdout.write(encoded.decode())
+        return
+    # Write the encoded bytes straight to the binary stream instead of decoding them again.
+    sys.stdout.flush()
+    buffer.write(encoded)
+    buffer.flush()
+
+
+def _run_waves(
+    parser: argparse.ArgumentParser,
+    args: argparse.Namespace,
+    nodes: list[str],
+    params: dict[str, Any],
+) -> int:
+    from rune.waves import WavePlan, run_action_waves
+
+    size, percent = args.wave_size
+    try:
+        plan = WavePlan(
+            size=size,
+            percent=percent,
+            canary=args.canary,
+            advance_at=args.advance_at,
+            max_failure_rate=args.max_failure_rate,
+            window=args.failure_window,
+        )
+    except ValueError as exc:
+        parser.print_usage()
+        print(f"rune: error: {exc}", file=sys.stderr)
+        return 2
+    result = run_action_waves(
+        action=args.action,
+        nodes=nodes,
+        use_ssm=bool(args.use_ssm),
+        dry_run=bool(args.dry_run),
+        params=params,
+        plan=plan,
+        concurrency=args.concurrency,
+        use_cache=bool(args.cache),
+        max_retries=args.max_retries,
+    )
+    _print_output(result.to_dict(), args.output, fast=not args.dry_run)
+    summary = result.summary()
+    return 0 if summary["failed"] == 0 and not summary["aborted"] else 1
+
+
+def _run(parser: argparse.ArgumentParser, args: argparse.Namespace) -> int:
+    nodes: list[str] | None
     try:
         params = _parse_params(args.params)
+        if args.select is not None:
+            nodes = _select_nodes(args.select, args.inventory)
+        else:
+            nodes = None if args.node else _parse_nodes(args.nodes, args.nodes_file)
     except argparse.ArgumentTypeError as exc:
         parser.print_usage()
         print(f"rune: error: {exc}", file=sys.stderr)
         return 2
 
-    result = run_action(
+    if args.wave_size is not None and nodes is None:
+        parser.print_usage()
+        print(
+            "rune: error: --wave-size requires --nodes, --nodes-file or --select", file=sys.stderr
+        )
+        return 2
+
+    if args.cache:
+        _use_shared_result_cache()
+
+    if nodes is None:
+        result = run_action(
+            action=args.action,
+            node=args.node,
+            use_ssm=bool(args.use_ssm),
+            dry_run=bool(args.dry_run),
+            params=params,
+            use_cache=bool(args.cache),
+            max_retries=args.max_retries,
+        )
+        _print_output(result.to_dict(), args.output, fast=not args.dry_run)
+        if result.status in {"success", "dry_run"}:
+            return 0
+        return 1
+
+    if args.wave_size is not None:
+        return _run_waves(parser, args, nodes, params)
+
+    fanout = run_action_fanout(
         action=args.action,
-        node=args.node,
+        nodes=nodes,
         use_ssm=bool(args.use_ssm),
         dry_run=bool(args.dry_run),
         params=params,
+        concurrency=args.concurrency,
+        use_cache=bool(args.cache),
+        max_retries=args.max_retries,
     )
+    _print_output(fanout.to_dict(), args.output, fast=not args.dry_run)
+    return 0 if fanout.summary()["failed"] == 0 else 1
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = _build_parser()
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit as exc:  # argparse uses SystemExit for validation errors
+        if exc.code and exc.code != 0:
+            return 2
+        raise
 
-    _print_output(result.to_dict(), args.output)
-    if result.status in {"success", "dry_run"}:
+    if args.command == "list-actions":
+        actions = [action.to_dict() for action in list_actions()]
+        _print_output({"actions": actions}, args.output, fast=False)
         return 0
-    return 1
+
+    if args.command == "serve":
+        return _serve(parser, args)
+
+    if args.command == "history":
+        return _history(args)
+
+    if args.command == "inventory":
+        return _inventory(args)
+
+    if getattr(args, "trace_file", None) is not None:
+        tracing.set_export_file(args.trace_file)
+
+    if args.command == "batch":
+        exit_code = _batch(args)
+    else:
+        exit_code = _run(parser, args)
+    _write_metrics_textfile()
+    return exit_code
 
 
 if __name__ == "__main__":  # pragma: no cover
@@ -0,0 +1,454 @@
+"""Long-running JSON API for RUNE (``rune serve``).
+
+Every CLI invocation pays for interpreter start-up, imports, plugin discovery and fresh SSH
+connections. The server pays them once: the action registry, the plugin bundle memo, the result
+cache and the SSH connection pool live as long as the process and are shared by all requests.
+
+Endpoints (JSON unless noted):
+
+``GET /v1/health``
+    Liveness, uptime and the number of requests in flight.
+``GET /v1/actions``
+    The document printed by ``rune list-actions --output json``.
+``POST /v1/run``
+    Run an action on ``node``, or fan out to ``nodes``; returns the same document as ``rune run``.
+``POST /v1/reload``
+    Rediscover plugins. ``SIGHUP`` does the same.
+``GET /metrics``
+    Prometheus metrics in the text exposition format (see :mod:`rune.metrics`).
+
+The API has no authentication. It binds to loopback by default, and a Unix socket is created
+with mode ``0600`` so only its owner can connect. Audit records name the requester from the
+``X-Rune-Requester`` header (``anonymous`` without it) and the peer: its address, or the uid
+of a Unix socket peer. On ``SIGTERM`` or ``SIGINT`` the server stops
+accepting connections, lets requests already executing finish (up to the drain timeout) and
+exits.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import http.server
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from rune import audit, codec, metrics, registry
+from rune.models import StructuredError
+from rune.orchestrator import DEFAULT_CONCURRENCY, list_actions, run_action, run_action_fanout
+
+__all__ = ["DEFAULT_DRAIN_TIMEOUT", "DEFAULT_HOST", "DEFAULT_PORT", "RuneServer", "serve"]
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8470
+DEFAULT_DRAIN_TIMEOUT = 30.0
+
+MAX_BODY_BYTES = 1024 * 1024
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_RUN_FIELDS = frozenset(
+    {
+        "action",
+        "node",
+        "nodes",
+        "params",
+        "use_ssm",
+        "dry_run",
+        "use_cache",
+        "max_retries",
+        "concurrency",
+    }
+)
+
+
+class _RequestError(Exception):
+    """A request the server refuses, answered with ``status`` and an error envelope."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class _AppServer(socketserver.BaseServer):
+    """A socket server that hands its requests to the :class:`RuneServer` owning it."""
+
+    app: RuneServer
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    server: _AppServer
+    protocol_version = "HTTP/1.1"
+    server_version = "rune"
+    # Idle keep-alive connections are dropped after this many seconds.
+    timeout = 30
+
+    _ROUTES = {
+        ("GET", "/v1/health"): "health",
+        ("GET", "/v1/actions"): "actions",
+        ("POST", "/v1/run"): "run",
+        ("POST", "/v1/reload"): "reload",
+        ("GET", "/metrics"): "metrics",
+    }
+
+    def do_GET(self) -> None:  # noqa: N802 - name fixed by BaseHTTPRequestHandler
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:  # noqa: N802 - name fixed by BaseHTTPRequestHandler
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str) -> None:
+        app = self.server.app
+        path = self.path.partition("?")[0]
+        route = self._ROUTES.get((method, path))
+        try:
+            if route is None:
+                known = any(known_path == path for _, known_path in self._ROUTES)
+                raise _RequestError(405 if known else 404, f"no route for {method} {path}")
+            if route == "metrics":
+                self._send_bytes(200, metrics.REGISTRY.render().encode(), METRICS_CONTENT_TYPE)
+                return
+            body = self._read_body() if method == "POST" else None
+            identity = self.headers.get("X-Rune-Requester") or "anonymous"
+            with audit.requester(identity, self._client()):
+                status, document = app.handle(route, body)
+        except _RequestError as exc:
+            status = exc.status
+            document = {"error": StructuredError(code=exc.status, message=str(exc)).to_dict()}
+        except Exception as exc:
+            self.log_error("unhandled error in %s %s: %r", method, path, exc)
+            status = 500
+            document = {"error": StructuredError(code=500, message=str(exc)).to_dict()}
+        self._send(status, document)
+
+    def _read_body(self) -> Any:
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            raise _RequestError(400, "invalid Content-Length") from None
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            raise _RequestError(413, f"request body exceeds {MAX_BODY_BYTES} bytes")
+        raw = self.rfile.read(length) if length else b"{}"
+        try:
+            return codec.loads(raw)
+        except codec.JSONDecodeError as exc:
+            raise _RequestError(400, f"request body is not valid JSON: {exc}") from None
+
+    def _send(self, status: int, document: dict[str, Any]) -> None:
+        self._send_bytes(status, codec.dumps(document), "application/json")
+
+    def _send_bytes(self, status: int, encoded: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(encoded)))
+        if status == 503:
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def address_string(self) -> str:
+        peer = self._peer_address()
+        return "unix" if peer is None else peer
+
+    def _peer_address(self) -> str | None:
+        # Unix socket peers have no address tuple (accept() returns an empty string), whatever
+        # the stubs say about client_address.
+        address: object = self.client_address
+        return str(address[0]) if isinstance(address, tuple) else None
+
+    def _client(self) -> str:
+        """Peer description for audit records: ``tcp:<address>`` or ``unix:uid=<uid>``."""
+
+        peer = self._peer_address()
+        if peer is not None:
+            return f"tcp:{peer}"
+        try:
+            credentials = self.connection.getsockopt(
+                socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+            )
+        except (AttributeError, OSError):
+            # SO_PEERCRED is Linux-only.
+            return "unix"
+        _, uid, _ = struct.unpack("3i", credentials)
+        return f"unix:uid={uid}"
+
+    def log_request(self, code: int | str = "-", size: int | str = "-") -> None:
+        if self.server.app.access_log:
+            super().log_request(code, size)
+
+
+class _TCPServer(http.server.ThreadingHTTPServer, _AppServer):
+    block_on_close = False
+
+    def server_bind(self) -> None:
+        # HTTPServer.server_bind resolves the host's FQDN, which can stall on broken DNS.
+        socketserver.TCPServer.server_bind(self)
+        host, port = self.server_address[:2]
+        self.server_name, self.server_port = str(host), int(port)
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer, _AppServer):
+    daemon_threads = True
+    block_on_close = False
+
+    def server_bind(self) -> None:
+        assert isinstance(self.server_address, str)
+        path = Path(self.server_address)
+        if path.is_socket():
+            _remove_stale_socket(path)
+        old_umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(old_umask)
+
+
+def _remove_stale_socket(path: Path) -> None:
+    """Unlink a socket left behind by a dead server; refuse to steal a live one."""
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(path))
+    except OSError:
+        path.unlink(missing_ok=True)
+    else:
+        raise OSError(f"another server is already listening on {path}")
+    finally:
+        probe.close()
+
+
+class RuneServer:
+    """HTTP/JSON front end over the orchestrator with graceful draining.
+
+    ``address`` is a ``(host, port)`` tuple for TCP (port ``0`` picks a free port) or a
+    filesystem path for a Unix socket. Requests are served on one thread each, so identical
+    concurrent requests are coalesced by the orchestrator as usual.
+    """
+
+    def __init__(
+        self,
+        address: tuple[str, int] | str | Path,
+        *,
+        drain_timeout: float = DEFAULT_DRAIN_TIMEOUT,
+        access_log: bool = False,
+    ) -> None:
+        self.drain_timeout = drain_timeout
+        self.access_log = access_log
+        self.requests_served = 0
+        if isinstance(address, tuple):
+            self._httpd: _AppServer = _TCPServer(address, _Handler)
+        else:
+            self._httpd = _UnixServer(str(address), _Handler)
+        self._httpd.app = self
+        self._state = threading.Condition()
+        self._in_flight = 0
+        self._serving = False
+        self._draining = False
+        self._closed = threading.Event()
+        self._started = time.monotonic()
+
+    @property
+    def address(self) -> tuple[str, int] | str:
+        """The bound address; for TCP this includes the port actually assigned."""
+
+        address = self._httpd.server_address
+        if isinstance(address, str):
+            return address
+        assert isinstance(address, tuple)
+        return str(address[0]), int(address[1])
+
+    @property
+    def url(self) -> str:
+        address = self.address
+        if isinstance(address, str):
+            return f"unix:{address}"
+        return f"http://{address[0]}:{address[1]}"
+
+    def warm(self) -> None:
+        """Load the registry and the execution path before the first request arrives."""
+
+        registry.get_registry()
+        from rune import mediator  # noqa: F401 - imported for its side effect of loading
+
+        codec.backend()
+
+    def serve_forever(self) -> None:
+        """Serve until :meth:`shutdown` is called, then wait for it to finish draining."""
+
+        with self._state:
+            if self._draining:
+                return
+            self._serving = True
+        self._httpd.serve_forever(poll_interval=0.25)
+        self._closed.wait()
+
+    def shutdown(self) -> bool:
+        """Stop accepting requests and wait up to ``drain_timeout`` for running ones.
+
+        Returns whether every in-flight request finished. Must not be called from the thread
+        running :meth:`serve_forever`.
+        """
+
+        with self._state:
+            if self._draining:
+                first = False
+            else:
+                first = self._draining = True
+        if not first:
+            self._closed.wait()
+            return self._in_flight == 0
+
+        if self._serving:
+            self._httpd.shutdown()
+        deadline = time.monotonic() + self.drain_timeout
+        with self._state:
+            while self._in_flight and (remaining := deadline - time.monotonic()) > 0:
+                self._state.wait(remaining)
+            drained = self._in_flight == 0
+        self._httpd.server_close()
+        if isinstance(self._httpd.server_address, str):
+            Path(self._httpd.server_address).unlink(missing_ok=True)
+        self._closed.set()
+        return drained
+
+    def handle(self, route: str, body: Any) -> tuple[int, dict[str, Any]]:
+        """Run ``route`` with the decoded request ``body``; returns (HTTP status, document)."""
+
+        if route == "health":
+            return 200, self._health()
+        with self._state:
+            if self._draining:
+                raise _RequestError(503, "server is shutting down")
+            self._in_flight += 1
+        try:
+            if route == "actions":
+                return 200, {"actions": [action.to_dict() for action in list_actions()]}
+            if route == "reload":
+                return 200, {"actions": len(registry.reload_registry())}
+            return 200, self._run(body)
+        finally:
+            with self._state:
+                self._in_flight -= 1
+                self.requests_served += 1
+                self._state.notify_all()
+
+    def _health(self) -> dict[str, Any]:
+        with self._state:
+            return {
+                "status": "draining" if self._draining else "ok",
+                "in_flight": self._in_flight,
+                "requests_served": self.requests_served,
+                "uptime_s": round(time.monotonic() - self._started, 3),
+            }
+
+    def _run(self, body: Any) -> dict[str, Any]:
+        request = _parse_run_request(body)
+        common = {
+            "action": request["action"],
+            "use_ssm": request["use_ssm"],
+            "dry_run": request["dry_run"],
+            "params": request["params"],
+            "use_cache": request["use_cache"],
+            "max_retries": request["max_retries"],
+        }
+        if request["nodes"] is not None:
+            fanout = run_action_fanout(
+                nodes=request["nodes"], concurrency=request["concurrency"], **common
+            )
+            return fanout.to_dict()
+        return run_action(node=request["node"], **common).to_dict()
+
+
+def _parse_run_request(body: Any) -> dict[str, Any]:
+    """Validate a ``/v1/run`` body, raising :class:`_RequestError` (400) when it is malformed."""
+
+    if not isinstance(body, dict):
+        raise _RequestError(400, "request body must be a JSON object")
+    unknown = sorted(set(body) - _RUN_FIELDS)
+    if unknown:
+        raise _RequestError(400, f"unknown fields: {', '.join(unknown)}")
+
+    action = body.get("action")
+    if not isinstance(action, str) or not action:
+        raise _RequestError(400, "'action' must be a non-empty string")
+
+    node, nodes = body.get("node"), body.get("nodes")
+    if (node is None) == (nodes is None):
+        raise _RequestError(400, "exactly one of 'node' or 'nodes' is required")
+    if node is not None and (not isinstance(node, str) or not node):
+        raise _RequestError(400, "'node' must be a non-empty string")
+    if nodes is not None:
+        if not isinstance(nodes, list) or not all(isinstance(n, str) and n for n in nodes):
+            raise _RequestError(400, "'nodes' must be a list of non-empty strings")
+        nodes = list(dict.fromkeys(nodes))
+        if not nodes:
+            raise _RequestError(400, "'nodes' must not be empty")
+
+    params = body.get("params", {})
+    if not isinstance(params, dict):
+        raise _RequestError(400, "'params' must be an object")
+
+    flags = {}
+    for name in ("use_ssm", "dry_run", "use_cache"):
+        value = body.get(name, False)
+        if not isinstance(value, bool):
+            raise _RequestError(400, f"'{name}' must be a boolean")
+        flags[name] = value
+
+    max_retries = body.get("max_retries")
+    if max_retries is not None and not _is_int(max_retries, minimum=0):
+        raise _RequestError(400, "'max_retries' must be a non-negative integer")
+    concurrency = body.get("concurrency", DEFAULT_CONCURRENCY)
+    if not _is_int(concurrency, minimum=1):
+        raise _RequestError(400, "'concurrency' must be a positive integer")
+
+    return {
+        "action": action,
+        "node": node,
+        "nodes": nodes,
+        "params": params,
+        "max_retries": max_retries,
+        "concurrency": concurrency,
+        **flags,
+    }
+
+
+def _is_int(value: Any, *, minimum: int) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value >= minimum
+
+
+def serve(
+    address: tuple[str, int] | str | Path,
+    *,
+    drain_timeout: float = DEFAULT_DRAIN_TIMEOUT,
+    access_log: bool = False,
+) -> int:
+    """Run a :class:`RuneServer` in the foreground until ``SIGTERM`` or ``SIGINT``."""
+
+    server = RuneServer(address, drain_timeout=drain_timeout, access_log=access_log)
+    server.warm()
+
+    def _stop(signum: int, frame: Any) -> None:
+        # shutdown() blocks until serve_forever() returns, so it cannot run on this thread.
+        threading.Thread(target=server.shutdown, name="rune-serve-shutdown").start()
+
+    def _reload(signum: int, frame: Any) -> None:
+        threading.Thread(target=registry.reload_registry, name="rune-serve-reload").start()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    with contextlib.suppress(AttributeError):  # SIGHUP does not exist on Windows
+        signal.signal(signal.SIGHUP, _reload)
+
+    print(f"rune serve: listening on {server.url}", file=sys.stderr, flush=True)
+    server.serve_forever()
+    print("rune serve: stopped", file=sys.stderr, flush=True)
+    return 0
@@ -0,0 +1,120 @@
+"""Single-flight coalescing of identical concurrent calls.
+
+While a call for a key is in flight, later callers with the same key wait for it and receive its
+result (or exception) instead of starting their own. Once the call finishes the key is released,
+so the next caller executes again; nothing is cached.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Awaitable, Callable
+from typing import Any, Generic, TypeVar
+
+__all__ = ["AsyncSingleFlight", "SingleFlight"]
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("done", "error", "result", "waiters")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+class _LeaderCancelledError(Exception):
+    """The leader of an async call was cancelled before it finished; followers take over."""
+
+
+class SingleFlight(Generic[T]):
+    """Coalesce identical blocking calls made from different threads."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+
+    def do(self, key: str, func: Callable[[], T]) -> tuple[T, bool]:
+        """Run ``func`` unless a call for ``key`` is in flight.
+
+        Returns the result and whether it came from another caller's execution.
+        """
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight(Generic[T]):
+    """Coalesce identical coroutine calls running on the same event loop."""
+
+    def __init__(self) -> None:
+        # Keyed by loop as well: futures cannot be awaited from another loop.
+        self._calls: dict[tuple[Any, str], Any] = {}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """Await ``func()`` unless a call for ``key`` is in flight on this loop.
+
+        Returns the result and whether it came from another caller's execution. Cancelling a
+        follower does not cancel the shared call, and cancelling the leader does not cancel its
+        followers: the first of them to wake up runs ``func`` in its place.
+        """
+
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+        while (future := self._calls.get(flight_key)) is not None:
+            try:
+                return await asyncio.shield(future), True
+            except _LeaderCancelledError:
+                continue
+
+        future = self._calls[flight_key] = loop.create_future()
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelledError())
+            future.exception()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Mark the exception retrieved in case no follower was waiting for it.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self._calls[flight_key]
+        return result, False
+
+    def __len__(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,227 @@
+"""Per-phase timing spans for the observability block.
+
+``run_action`` opens a trace for each request; the orchestrator, mediator and transports wrap
+their phases in :func:`span`. Spans are timed with the monotonic ``perf_counter`` clock and
+nest through a :class:`contextvars.ContextVar`, so concurrent requests in threads or asyncio
+tasks never see each other's spans. When the request finishes they are attached to
+``observability["spans"]``::
+
+    {"name": "transport.exec", "span_id": "9f0c...", "parent_span_id": "1b2e...",
+     "start_ms": 1.402, "duration_ms": 35.117, "attributes": {"exit_code": 0}}
+
+``start_ms`` is the offset from the start of the request. The first span is the request itself.
+It reuses ``observability["span_id"]`` and also carries the wall-clock ``start_unix_nano``.
+
+Set ``RUNE_TRACE_FILE`` (or call :func:`set_export_file`) to append every finished trace to
+a file as one OTLP/JSON ``ExportTraceServiceRequest`` per line, the format read by the
+OpenTelemetry Collector's ``otlpjsonfile`` receiver.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any
+
+__all__ = ["Trace", "export_file", "export_otlp", "set_export_file", "span", "trace"]
+
+TRACE_FILE_ENV = "RUNE_TRACE_FILE"
+
+_SPAN_KIND_INTERNAL = 1
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+
+_ROOT_PARENT = ""
+
+
+class Trace:
+    """Spans collected for one request."""
+
+    __slots__ = ("name", "spans", "_origin_ns", "_origin_unix_ns")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._origin_ns = time.perf_counter_ns()
+        self._origin_unix_ns = time.time_ns()
+        # (name, span_id, parent_span_id, start_ns, end_ns, attributes); "" parents the root.
+        self.spans: list[tuple[str, str, str, int, int, dict[str, Any]]] = []
+
+    def attach(self, observability: dict[str, Any]) -> list[dict[str, Any]]:
+        """Close the trace and store its spans in ``observability["spans"]``."""
+
+        end_ns = time.perf_counter_ns()
+        root_id = str(observability.get("span_id", ""))
+        spans: list[dict[str, Any]] = [
+            {
+                "name": self.name,
+                "span_id": root_id,
+                "parent_span_id": None,
+                "start_ms": 0.0,
+                "duration_ms": _ms(end_ns - self._origin_ns),
+                "start_unix_nano": self._origin_unix_ns,
+            }
+        ]
+        for name, span_id, parent, start_ns, stop_ns, attributes in sorted(
+            self.spans, key=lambda entry: entry[3]
+        ):
+            entry: dict[str, Any] = {
+                "name": name,
+                "span_id": span_id,
+                "parent_span_id": parent or root_id,
+                "start_ms": _ms(start_ns - self._origin_ns),
+                "duration_ms": _ms(stop_ns - start_ns),
+            }
+            if attributes:
+                entry["attributes"] = attributes
+            spans.append(entry)
+        observability["spans"] = spans
+        return spans
+
+
+_TRACE: ContextVar[Trace | None] = ContextVar("rune_trace", default=None)
+_PARENT: ContextVar[str] = ContextVar("rune_span_parent", default=_ROOT_PARENT)
+
+
+def _ms(nanoseconds: int) -> float:
+    return round(nanoseconds / 1_000_000, 3)
+
+
+@contextmanager
+def trace(name: str) -> Iterator[Trace]:
+    """Collect the spans recorded in this context (and tasks it starts) into a new trace."""
+
+    current = Trace(name)
+    trace_token = _TRACE.set(current)
+    parent_token = _PARENT.set(_ROOT_PARENT)
+    try:
+        yield current
+    finally:
+        _PARENT.reset(parent_token)
+        _TRACE.reset(trace_token)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[dict[str, Any]]:
+    """Time the enclosed block as a child of the current span.
+
+    Yields the span's attribute dict so the block can record outcomes such as exit codes.
+    Outside a trace this only costs a context variable lookup.
+    """
+
+    current = _TRACE.get()
+    if current is None:
+        yield attributes
+        return
+
+    parent = _PARENT.get()
+    span_id = os.urandom(8).hex()
+    token = _PARENT.set(span_id)
+    started = time.perf_counter_ns()
+    try:
+        yield attributes
+    except BaseException:
+        attributes["error"] = True
+        raise
+    finally:
+        stopped = time.perf_counter_ns()
+        _PARENT.reset(token)
+        current.spans.append((name, span_id, parent, started, stopped, attributes))
+
+
+_EXPORT_FILE: Path | None = None
+_EXPORT_LOCK = threading.Lock()
+
+
+def set_export_file(path: Path | None) -> None:
+    """Export finished traces to ``path``; ``None`` falls back to ``RUNE_TRACE_FILE``."""
+
+    global _EXPORT_FILE
+    _EXPORT_FILE = path
+
+
+def export_file() -> Path | None:
+    """Return where finished traces are exported, if anywhere."""
+
+    if _EXPORT_FILE is not None:
+        return _EXPORT_FILE
+    configured = os.environ.get(TRACE_FILE_ENV)
+    return Path(configured).expanduser() if configured else None
+
+
+def export_otlp(result: dict[str, Any], path: Path) -> None:
+    """Append the spans of a serialized orchestration result to ``path`` as OTLP/JSON."""
+
+    from rune import codec
+
+    observability = result.get("observability") or {}
+    spans = observability.get("spans")
+    if not spans:
+        return
+    trace_id = str(observability.get("trace_id", "")).replace("-", "")
+    root_attributes = {
+        "rune.action": result.get("action"),
+        "rune.node": result.get("node"),
+        "rune.transport": result.get("transport"),
+        "rune.status": result.get("status"),
+    }
+    origin_ns = spans[0]["start_unix_nano"]
+    failed = result.get("status") == "failed"
+
+    otlp_spans = []
+    for index, entry in enumerate(spans):
+        start_ns = origin_ns + round(entry["start_ms"] * 1_000_000)
+        attributes = root_attributes if index == 0 else entry.get("attributes", {})
+        errored = failed if index == 0 else bool(attributes.get("error"))
+        otlp_spans.append(
+            {
+                "traceId": trace_id,
+                "spanId": _otlp_span_id(entry["span_id"]),
+                "parentSpanId": _otlp_span_id(entry["parent_span_id"] or ""),
+                "name": entry["name"],
+                "kind": _SPAN_KIND_INTERNAL,
+                "startTimeUnixNano": str(start_ns),
+                "endTimeUnixNano": str(start_ns + round(entry["duration_ms"] * 1_000_000)),
+                "attributes": [
+                    {"key": key, "value": _otlp_value(value)}
+                    for key, value in attributes.items()
+                    if value is not None
+                ],
+                "status": {"code": _STATUS_ERROR if errored else _STATUS_OK},
+            }
+        )
+
+    document = {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [{"key": "service.name", "value": {"stringValue": "rune"}}]
+                },
+                "scopeSpans": [{"scope": {"name": "rune"}, "spans": otlp_spans}],
+            }
+        ]
+    }
+    line = codec.dumps(document) + b"\n"
+    with _EXPORT_LOCK:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("ab") as handle:
+            handle.write(line)
+
+
+def _otlp_span_id(span_id: str) -> str:
+    # Child spans already use 8 random bytes; the root reuses a UUID, truncated to 8 bytes.
+    return span_id.replace("-", "")[:16]
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
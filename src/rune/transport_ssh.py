@@ -2,41 +2,643 @@
 
 from __future__ import annotations
 
-import json
-import subprocess
+import asyncio
+import hashlib
+import math
+import os
+import shlex
+import signal
+import tempfile
+import threading
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
+from rune import artifacts, tracing
+from rune.bundle import DEFAULT_REMOTE_CACHE_DIR, PluginBundle, build_bundle
+from rune.capture import capture_limits, read_stream
 from rune.models import TransportResult
+from rune.payload import encode_request
 
 DEFAULT_TIMEOUT = 60
 
+# Seconds remote timeout(1) waits after SIGTERM before sending SIGKILL to the plugin's group.
+REMOTE_KILL_GRACE = 5
+
+SSH_MODE_ENV = "RUNE_SSH_MODE"
+SSH_OPTIONS_ENV = "RUNE_SSH_OPTIONS"
+REMOTE_CACHE_DIR_ENV = "RUNE_REMOTE_BUNDLE_DIR"
+
+# Exit code used by OpenSSH itself for connection failures; reused for staging failures.
+SSH_FAILURE_EXIT_CODE = 255
+
+# Printed by the remote side when the requested bundle is not in the node's cache.
+BUNDLE_MISSING_MARKER = "rune-bundle-missing"
+
+# Exit code of the artifact fetch when the plugin left no artifact directory on the node.
+ARTIFACTS_MISSING_EXIT_CODE = 3
+
+
+@dataclass(slots=True)
+class SshPoolConfig:
+    """Tuning knobs for :class:`SshConnectionPool`."""
+
+    control_dir: Path | None = None
+    idle_timeout: float = 300.0
+    max_sessions_per_host: int = 8
+    health_check_interval: float = 30.0
+    connect_timeout: float = 10.0
+    ssh_binary: str = "ssh"
+    ssh_options: tuple[str, ...] = ()
+
+
+@dataclass(slots=True)
+class _HostState:
+    control_path: Path
+    in_use: int = 0
+    alive: bool = False
+    starting: bool = False
+    last_used: float = 0.0
+    last_checked: float = 0.0
+
+
+@dataclass(slots=True)
+class _PoolStats:
+    masters_started: int = 0
+    health_checks: int = 0
+    evictions: int = 0
+    sessions: int = 0
+    peak_sessions: dict[str, int] = field(default_factory=dict)
+
+
+class SshConnectionPool:
+    """Per-node pool of OpenSSH ControlMaster connections.
+
+    Each node gets one master connection whose control socket lives in ``control_dir``. Sessions
+    are multiplexed over it, so only the first action against a node pays the TCP, key exchange
+    and authentication cost. Masters are re-validated with ``ssh -O check`` at most every
+    ``health_check_interval`` seconds and closed with ``ssh -O exit`` after
+    ``idle_timeout`` seconds without sessions. ``ControlPersist`` is set to the same idle timeout
+    so masters left behind by short-lived CLI processes still expire on their own, while a
+    stable ``control_dir`` lets the next process pick them up.
+
+    The pool is safe to share between threads and event loops: its bookkeeping is guarded by a
+    :class:`threading.Lock` and waiters back off with :func:`asyncio.sleep` rather than blocking.
+    """
+
+    def __init__(self, config: SshPoolConfig | None = None) -> None:
+        self.config = config or SshPoolConfig()
+        if self.config.max_sessions_per_host < 1:
+            raise ValueError("max_sessions_per_host must be at least 1")
+        self.control_dir = self.config.control_dir or _default_control_dir()
+        self.control_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self.stats = _PoolStats()
+        self._hosts: dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+        self._last_eviction = time.monotonic()
+
+    def base_command(self, node: str) -> list[str]:
+        """Return the ``ssh`` argv prefix that multiplexes over the node's master."""
+
+        state = self._state(node)
+        return [
+            self.config.ssh_binary,
+            "-S",
+            str(state.control_path),
+            "-o",
+            "ControlMaster=no",
+            "-o",
+            "BatchMode=yes",
+            "-o",
+            f"ConnectTimeout={int(self.config.connect_timeout)}",
+            *self.config.ssh_options,
+            node,
+        ]
+
+    @asynccontextmanager
+    async def session(self, node: str) -> AsyncIterator[list[str]]:
+        """Reserve a session slot on ``node`` and yield the argv prefix for it."""
+
+        if time.monotonic() - self._last_eviction >= min(self.config.idle_timeout, 30.0):
+            await self.evict_idle()
+
+        with tracing.span("transport.connect", node=node):
+            state = await self._acquire(node)
+        try:
+            yield self.base_command(node)
+        finally:
+            with self._lock:
+                state.in_use -= 1
+                state.last_used = time.monotonic()
+
+    async def evict_idle(self) -> int:
+        """Close masters that have had no sessions for ``idle_timeout`` seconds."""
+
+        now = time.monotonic()
+        self._last_eviction = now
+        with self._lock:
+            idle = [
+                (node, state)
+                for node, state in self._hosts.items()
+                if state.alive
+                and state.in_use == 0
+                and not state.starting
+                and now - state.last_used >= self.config.idle_timeout
+            ]
+            for _, state in idle:
+                state.starting = True
+
+        for node, state in idle:
+            await self._control(node, state, "exit")
+            with self._lock:
+                state.alive = False
+                state.starting = False
+                self.stats.evictions += 1
+        return len(idle)
+
+    async def aclose(self) -> None:
+        """Close every master connection owned by the pool."""
+
+        with self._lock:
+            hosts = [(node, state) for node, state in self._hosts.items() if state.alive]
+        for node, state in hosts:
+            await self._control(node, state, "exit")
+            state.alive = False
+
+    def close(self) -> None:
+        """Blocking wrapper around :meth:`aclose`."""
+
+        asyncio.run(self.aclose())
+
+    def _state(self, node: str) -> _HostState:
+        with self._lock:
+            state = self._hosts.get(node)
+            if state is None:
+                digest = hashlib.sha256(
+                    "\0".join((node, *self.config.ssh_options)).encode()
+                ).hexdigest()[:20]
+                state = _HostState(control_path=self.control_dir / digest)
+                self._hosts[node] = state
+            return state
+
+    async def _acquire(self, node: str) -> _HostState:
+        state = self._state(node)
+        delay = 0.002
+        while True:
+            with self._lock:
+                if not state.starting and state.in_use < self.config.max_sessions_per_host:
+                    state.in_use += 1
+                    self.stats.sessions += 1
+                    peak = self.stats.peak_sessions.get(node, 0)
+                    self.stats.peak_sessions[node] = max(peak, state.in_use)
+                    stale = time.monotonic() - state.last_checked
+                    needs_check = not state.alive or stale >= self.config.health_check_interval
+                    if needs_check:
+                        state.starting = True
+                    break
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+        if needs_check:
+            try:
+                await self._ensure_master(node, state)
+            except BaseException:
+                with self._lock:
+                    state.in_use -= 1
+                raise
+            finally:
+                with self._lock:
+                    state.starting = False
+        return state
+
+    async def _ensure_master(self, node: str, state: _HostState) -> None:
+        if state.control_path.exists():
+            self.stats.health_checks += 1
+            if await self._control(node, state, "check") == 0:
+                state.alive = True
+                state.last_checked = time.monotonic()
+                return
+            # Leftover socket from a dead master would stop a new one from binding.
+            state.control_path.unlink(missing_ok=True)
+
+        command = [
+            self.config.ssh_binary,
+            "-M",
+            "-N",
+            "-f",
+            "-S",
+            str(state.control_path),
+            "-o",
+            f"ControlPersist={int(self.config.idle_timeout)}s",
+            "-o",
+            "BatchMode=yes",
+            "-o",
+            f"ConnectTimeout={int(self.config.connect_timeout)}",
+            *self.config.ssh_options,
+            node,
+        ]
+        exit_code = await _run_quiet(command, timeout=self.config.connect_timeout + 5)
+        state.alive = exit_code == 0
+        state.last_checked = time.monotonic()
+        if state.alive:
+            self.stats.masters_started += 1
+        # When the master cannot be started, sessions fall back to direct connections
+        # (ControlMaster=no) and surface the real SSH error through their exit code.
+
+    async def _control(self, node: str, state: _HostState, operation: str) -> int:
+        command = [
+            self.config.ssh_binary,
+            "-S",
+            str(state.control_path),
+            "-O",
+            operation,
+            *self.config.ssh_options,
+            node,
+        ]
+        return await _run_quiet(command, timeout=self.config.connect_timeout)
+
+
+_DEFAULT_POOL: SshConnectionPool | None = None
+_DEFAULT_POOL_LOCK = threading.Lock()
+
+
+def get_default_pool() -> SshConnectionPool:
+    """Return the process-wide pool used when no explicit pool is supplied."""
+
+    global _DEFAULT_POOL
+    with _DEFAULT_POOL_LOCK:
+        if _DEFAULT_POOL is None:
+            options = tuple(shlex.split(os.environ.get(SSH_OPTIONS_ENV, "")))
+            _DEFAULT_POOL = SshConnectionPool(SshPoolConfig(ssh_options=options))
+        return _DEFAULT_POOL
+
+
+async def run_remote_plugin_ssh_async(
+    node: str,
+    plugin_path: Path,
+    input_json: dict[str, Any],
+    *,
+    pool: SshConnectionPool | None = None,
+    timeout: float | None = None,
+) -> TransportResult:
+    """Execute the plugin on ``node`` over SSH without blocking the event loop.
+
+    With ``RUNE_SSH_MODE=remote`` (or an explicit ``pool``) the plugin and its ``lib/`` helpers
+    are executed from a content-addressed cache on the node (uploaded on first use) through a
+    pooled, multiplexed OpenSSH connection. Otherwise
+    the MVP behaviour applies: the plugin is assumed to be available locally and SSH is
+    simulated by invoking the script directly. Both paths capture stdout, stderr, and exit code
+    to match the transport contract.
+
+    ``timeout`` (seconds, default :data:`DEFAULT_TIMEOUT`) bounds the whole call. On expiry the
+    local process group is killed and, remotely, the plugin's process group is killed by
+    ``timeout(1)``; the result has exit code 124.
+    """
+
+    timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+    input_bytes = encode_request(input_json)
+    if pool is None and not _remote_mode():
+        # Local plugins write artifacts straight into the local artifact directory.
+        env = {
+            **os.environ,
+            artifacts.PLUGIN_ARTIFACT_DIR_ENV: str(artifacts.request_dir(input_json)),
+        }
+        with tracing.span("transport.exec") as attributes:
+            result = await _run_process(["bash", str(plugin_path)], input_bytes, timeout, env=env)
+            attributes["exit_code"] = result.exit_code
+        return result
+
+    pool = pool or get_default_pool()
+    try:
+        with tracing.span("transport.bundle"):
+            bundle = build_bundle(plugin_path)
+    except OSError as exc:
+        return TransportResult(stdout="", stderr=str(exc), exit_code=SSH_FAILURE_EXIT_CODE)
+
+    deadline = time.monotonic() + timeout
+    artifact_dir = artifacts.remote_request_dir(input_json)
+    async with pool.session(node) as base_command:
+        return await _run_bundle(base_command, bundle, input_bytes, deadline, artifact_dir)
+
 
 def run_remote_plugin_ssh(
-    node: str, plugin_path: Path, input_json: dict[str, Any]
+    node: str,
+    plugin_path: Path,
+    input_json: dict[str, Any],
+    *,
+    pool: SshConnectionPool | None = None,
+    timeout: float | None = None,
 ) -> TransportResult:
-    """Execute the plugin using SSH semantics.
+    """Blocking wrapper around :func:`run_remote_plugin_ssh_async`.
 
-    For the MVP we assume the plugin is available locally and simulate SSH by invoking the
-    script directly. The function still captures stdout, stderr, and exit code to match the
-    transport contract.
+    Must not be called from a running event loop; use the async variant there.
     """
 
+    return asyncio.run(
+        run_remote_plugin_ssh_async(node, plugin_path, input_json, pool=pool, timeout=timeout)
+    )
+
+
+async def collect_artifacts_async(
+    node: str,
+    payload: dict[str, Any],
+    declared: list[dict[str, Any]],
+    *,
+    pool: SshConnectionPool | None = None,
+    timeout: float | None = None,
+) -> list[dict[str, Any]]:
+    """Bring the artifacts a plugin run declared into the local artifact directory.
+
+    ``payload`` is the request the plugin was run with; it identifies the artifact directory on
+    both sides. Remotely, the directory is streamed back as a gzip'd tarball over a pooled
+    session, spooled to disk in chunks, unpacked and removed from the node. Locally the plugin
+    already wrote into the local directory, so the files are only verified. Returns one
+    reference (``name``, ``size``, ``sha256``, ``path``) per declaration and raises
+    :class:`~rune.artifacts.ArtifactError` when a file is missing or does not match.
+    """
+
+    directory = artifacts.request_dir(payload)
+    if pool is None and not _remote_mode():
+        return await asyncio.to_thread(artifacts.verify_directory, directory, declared)
+
+    pool = pool or get_default_pool()
+    deadline = time.monotonic() + (DEFAULT_TIMEOUT if timeout is None else timeout)
+    async with pool.session(node) as base_command:
+        with tracing.span("transport.artifacts") as attributes:
+            received = await _fetch_artifacts(
+                base_command, artifacts.remote_request_dir(payload), directory, deadline
+            )
+            attributes["bytes"] = received
     try:
-        completed = subprocess.run(
-            ["bash", str(plugin_path)],
-            input=json.dumps(input_json),
-            text=True,
-            capture_output=True,
-            timeout=DEFAULT_TIMEOUT,
-            check=False,
+        return await asyncio.to_thread(
+            artifacts.unpack_archive, directory / _TRANSFER_ARCHIVE, directory, declared
         )
+    finally:
+        (directory / _TRANSFER_ARCHIVE).unlink(missing_ok=True)
+
+
+def collect_artifacts(
+    node: str,
+    payload: dict[str, Any],
+    declared: list[dict[str, Any]],
+    *,
+    pool: SshConnectionPool | None = None,
+    timeout: float | None = None,
+) -> list[dict[str, Any]]:
+    """Blocking wrapper around :func:`collect_artifacts_async`."""
+
+    return asyncio.run(
+        collect_artifacts_async(node, payload, declared, pool=pool, timeout=timeout)
+    )
+
+
+_TRANSFER_ARCHIVE = ".transfer.tar.gz"
+_FETCH_STDERR_BYTES = 64 * 1024
+
+
+async def _fetch_artifacts(
+    base_command: list[str], remote_dir: str, directory: Path, deadline: float
+) -> int:
+    """Stream ``remote_dir`` into ``directory/.transfer.tar.gz``; return the bytes received."""
+
+    script = (
+        f'd="{remote_dir}"; [ -d "$d" ] || exit {ARTIFACTS_MISSING_EXIT_CODE}; '
+        'tar -C "$d" -czf - . && rm -rf "$d"'
+    )
+    command = [*base_command, f"bash -c {shlex.quote(script)}"]
+    timeout = deadline - time.monotonic()
+    if timeout <= 0:
+        raise artifacts.ArtifactError("artifact transfer not started: deadline exceeded")
+    directory.mkdir(parents=True, exist_ok=True)
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+        )
+    except FileNotFoundError as exc:
+        raise artifacts.ArtifactError(str(exc)) from exc
+
+    assert process.stdout is not None and process.stderr is not None
+    stdout_stream, stderr_stream = process.stdout, process.stderr
+
+    async def spool() -> int:
+        received = 0
+        with (directory / _TRANSFER_ARCHIVE).open("wb") as handle:
+            while chunk := await stdout_stream.read(artifacts.CHUNK_SIZE):
+                handle.write(chunk)
+                received += len(chunk)
+        return received
+
+    try:
+        # Only tar's diagnostics arrive on stderr; the cap keeps them in memory.
+        received, (stderr, _) = await asyncio.wait_for(
+            asyncio.gather(
+                spool(), read_stream(stderr_stream, _FETCH_STDERR_BYTES, _FETCH_STDERR_BYTES)
+            ),
+            timeout=timeout,
+        )
+        exit_code = await process.wait()
+    except asyncio.TimeoutError:
+        _kill_process_group(process)
+        await process.wait()
+        raise artifacts.ArtifactError(
+            f"artifact transfer timed out after {timeout:g} seconds"
+        ) from None
+
+    if exit_code == ARTIFACTS_MISSING_EXIT_CODE:
+        raise artifacts.ArtifactError(f"no artifacts found in {remote_dir} on the node")
+    if exit_code != 0:
+        message = stderr.decode(errors="replace").strip() if isinstance(stderr, bytes) else ""
+        raise artifacts.ArtifactError(
+            f"artifact transfer failed with exit code {exit_code}: {message}"
+        )
+    return received
+
+
+async def _run_process(
+    command: list[str],
+    input_bytes: bytes,
+    timeout: float,
+    *,
+    env: dict[str, str] | None = None,
+) -> TransportResult:
+    if timeout <= 0:
         return TransportResult(
-            stdout=completed.stdout,
-            stderr=completed.stderr,
-            exit_code=completed.returncode,
+            stdout="", stderr=f"Command '{command}' not started: deadline exceeded", exit_code=124
+        )
+    try:
+        # A session of its own makes the child a process group leader, so a timeout can kill
+        # every process the plugin spawned rather than leaving grandchildren running.
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True,
+            env=env,
         )
-    except subprocess.TimeoutExpired as exc:
-        return TransportResult(stdout="", stderr=str(exc), exit_code=124)
     except FileNotFoundError as exc:
-        return TransportResult(stdout="", stderr=str(exc), exit_code=255)
+        return TransportResult(stdout="", stderr=str(exc), exit_code=SSH_FAILURE_EXIT_CODE)
+
+    try:
+        result = await asyncio.wait_for(_communicate(process, input_bytes), timeout=timeout)
+    except asyncio.TimeoutError:
+        _kill_process_group(process)
+        await process.wait()
+        message = f"Command '{command}' timed out after {timeout:g} seconds"
+        return TransportResult(stdout="", stderr=message, exit_code=124)
+    return result
+
+
+async def _communicate(process: asyncio.subprocess.Process, input_bytes: bytes) -> TransportResult:
+    """Feed stdin and capture stdout and stderr within the configured byte limits."""
+
+    assert process.stdin is not None
+    assert process.stdout is not None and process.stderr is not None
+    stdin = process.stdin
+    limits = capture_limits()
+
+    async def feed() -> None:
+        try:
+            stdin.write(input_bytes)
+            await stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # The plugin exited without reading all of its input; its output still counts.
+            pass
+        stdin.close()
+
+    _, (stdout, stdout_truncated), (stderr, stderr_truncated) = await asyncio.gather(
+        feed(),
+        read_stream(process.stdout, limits.max_stdout_bytes, limits.spill_threshold),
+        read_stream(process.stderr, limits.max_stderr_bytes, limits.spill_threshold),
+    )
+    exit_code = await process.wait()
+    return TransportResult(
+        stdout=stdout,
+        stderr=stderr,
+        exit_code=exit_code,
+        stdout_truncated=stdout_truncated,
+        stderr_truncated=stderr_truncated,
+    )
+
+
+async def _run_quiet(command: list[str], timeout: float) -> int:
+    """Run an ssh control command with all stdio detached and return its exit code."""
+
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+    except FileNotFoundError:
+        return SSH_FAILURE_EXIT_CODE
+    try:
+        return await asyncio.wait_for(process.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return 124
+
+
+def _kill_process_group(process: asyncio.subprocess.Process) -> None:
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        # The whole group already exited between the timeout and the kill.
+        pass
+
+
+def _remote_run_script(
+    bundle_dir: str, entrypoint: str, timeout: float, artifact_dir: str
+) -> str:
+    """Shell snippet that runs a cached bundle, bounded by ``timeout(1)`` when available.
+
+    ``timeout(1)`` runs the plugin in its own process group and signals the whole group, so
+    remote grandchildren are cleaned up even if the SSH connection is torn down first.
+    """
+
+    plugin = f'"$d"/{shlex.quote(entrypoint)}'
+    seconds = max(math.ceil(timeout), 1)
+    return (
+        f'd="{bundle_dir}"; '
+        f'[ -f "$d/.complete" ] || {{ echo {BUNDLE_MISSING_MARKER} >&2; exit 255; }}; '
+        f'export {artifacts.PLUGIN_ARTIFACT_DIR_ENV}="{artifact_dir}"; '
+        f"if command -v timeout >/dev/null 2>&1; then "
+        f"exec timeout -k {REMOTE_KILL_GRACE} {seconds} bash {plugin}; "
+        f"else exec bash {plugin}; fi"
+    )
+
+
+async def _run_bundle(
+    base_command: list[str],
+    bundle: PluginBundle,
+    input_bytes: bytes,
+    deadline: float,
+    artifact_dir: str,
+) -> TransportResult:
+    """Run a bundle from the node's cache, uploading it first if the node lacks it.
+
+    Execution is optimistic: the common case (bundle already cached) costs a single session.
+    Only when the remote side reports the bundle missing is the archive uploaded and the
+    plugin re-run. ``deadline`` (a ``time.monotonic()`` value) bounds all of these steps.
+    """
+
+    bundle_dir = f"{_remote_cache_dir()}/{bundle.digest}"
+
+    def run_command() -> list[str]:
+        script = _remote_run_script(
+            bundle_dir, bundle.entrypoint, deadline - time.monotonic(), artifact_dir
+        )
+        return [*base_command, f"bash -c {shlex.quote(script)}"]
+
+    async def run() -> TransportResult:
+        with tracing.span("transport.exec") as attributes:
+            result = await _run_process(run_command(), input_bytes, deadline - time.monotonic())
+            attributes["exit_code"] = result.exit_code
+        return result
+
+    result = await run()
+    if (
+        result.exit_code != SSH_FAILURE_EXIT_CODE
+        or BUNDLE_MISSING_MARKER not in result.stderr_text()
+    ):
+        return result
+
+    upload_script = (
+        f'd="{bundle_dir}"; t="$d.tmp.$$"; '
+        'mkdir -p "$t" && tar -xzf - -C "$t" && touch "$t/.complete" || exit 255; '
+        '[ -d "$d" ] || mv "$t" "$d"; rm -rf "$t"; [ -f "$d/.complete" ] || exit 255'
+    )
+    with tracing.span("transport.upload") as attributes:
+        upload = await _run_process(
+            [*base_command, f"bash -c {shlex.quote(upload_script)}"],
+            bundle.archive(),
+            deadline - time.monotonic(),
+        )
+        attributes["exit_code"] = upload.exit_code
+    if upload.exit_code != 0:
+        return upload
+    return await run()
+
+
+def _remote_mode() -> bool:
+    return os.environ.get(SSH_MODE_ENV, "local") == "remote"
+
+
+def _remote_cache_dir() -> str:
+    return os.environ.get(REMOTE_CACHE_DIR_ENV, DEFAULT_REMOTE_CACHE_DIR).rstrip("/")
+
+
+def _default_control_dir() -> Path:
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "rune" / "ssh"
+    return Path(tempfile.gettempdir()) / f"rune-ssh-{os.getuid()}"
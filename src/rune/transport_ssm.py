@@ -1,52 +1,540 @@
-"""SSM transport placeholder for MVP."""
+"""AWS Systems Manager (SSM) transport.
+
+Plugins run on managed instances through the ``AWS-RunShellScript`` document. The node is the
+managed instance ID (``i-...`` or ``mi-...``).
+
+A per-node ``SendCommand`` followed by tight ``GetCommandInvocation`` polling runs into API
+throttling at fleet scale, so calls are batched:
+
+- Calls made on the same event loop for the same plugin bundle and the same request parameters
+  within ``batch_window`` seconds share one ``SendCommand``, up to ``max_targets`` instances
+  (the API's target limit) and ``max_command_bytes`` of script. The script carries the bundle
+  and the node-independent part of the request once (see :func:`rune.payload.split_request`),
+  plus each instance's routing identifiers keyed by instance ID; the SSM agent exports
+  ``AWS_SSM_INSTANCE_ID`` so each instance assembles its own request. An instance never
+  receives another instance's parameters, and requests that differ in more than those
+  identifiers are sent in separate commands.
+- Each command is polled with paginated ``ListCommandInvocations`` calls, which report the
+  status of many instances per request. The poll interval grows while nothing changes and
+  resets when an instance finishes. Throttling errors also lengthen it.
+- Output is fetched once per finished instance with ``GetCommandInvocation`` and mapped to a
+  :class:`TransportResult`. SSM returns at most 24,000 characters of each stream; longer output
+  is marked truncated.
+
+Instances that never ran the plugin map to the exit codes the mediator retries: 124 for
+timeouts and cancellation, 255 for delivery and API failures. Artifacts are not transferred
+over SSM.
+
+The client is created with boto3 (``pip install 'rune[ssm]'``). Any object with boto3's
+``send_command``, ``list_command_invocations``, ``get_command_invocation`` and
+``cancel_command`` methods can be installed with :func:`set_default_client` or passed as
+``client``.
+"""
 
 from __future__ import annotations
 
-import json
-import os
+import asyncio
+import base64
+import math
+import re
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
+from rune import codec, tracing
+from rune.bundle import PluginBundle, build_bundle
 from rune.models import TransportResult
+from rune.payload import split_request
 
+__all__ = [
+    "SsmConfig",
+    "get_default_client",
+    "run_remote_plugin_ssm",
+    "run_remote_plugin_ssm_async",
+    "set_default_client",
+]
 
-def run_remote_plugin_ssm(
-    node: str, plugin_path: Path, input_json: dict[str, Any]
+DEFAULT_TIMEOUT = 60
+
+DOCUMENT_NAME = "AWS-RunShellScript"
+
+# Exit codes for instances that never produced plugin output; both are retried by the mediator.
+SSM_TIMEOUT_EXIT_CODE = 124
+SSM_FAILURE_EXIT_CODE = 255
+
+# GetCommandInvocation returns at most this many characters of stdout and of stderr.
+OUTPUT_LIMIT = 24_000
+
+_INSTANCE_ID = re.compile(r"^m?i-[0-9a-f]{8,17}$")
+
+_PENDING_STATUSES = frozenset({"Pending", "InProgress", "Delayed", "Cancelling"})
+_TIMEOUT_STATUSES = frozenset({"TimedOut", "Cancelled"})
+_THROTTLING_CODES = frozenset(
+    {"ThrottlingException", "Throttling", "TooManyRequestsException", "RequestLimitExceeded"}
+)
+
+# Extra time past the latest caller deadline before a command is abandoned.
+_POLL_GRACE_S = 30.0
+
+# Concurrent GetCommandInvocation calls per command.
+_FETCH_CONCURRENCY = 8
+
+
+@dataclass(frozen=True, slots=True)
+class SsmConfig:
+    """Batching and polling limits for the SSM transport."""
+
+    max_targets: int = 50
+    max_command_bytes: int = 48 * 1024
+    batch_window: float = 0.05
+    poll_initial: float = 0.5
+    poll_max: float = 10.0
+    poll_backoff: float = 1.5
+    max_send_attempts: int = 5
+
+
+class _SsmUnavailableError(Exception):
+    """The transport cannot be used at all; reported to the caller as a structured error."""
+
+
+_DEFAULT_CLIENT: Any = None
+_DEFAULT_CLIENT_LOCK = threading.Lock()
+
+
+def set_default_client(client: Any) -> None:
+    """Install the SSM client used when none is passed; ``None`` restores the boto3 default."""
+
+    global _DEFAULT_CLIENT
+    with _DEFAULT_CLIENT_LOCK:
+        _DEFAULT_CLIENT = client
+
+
+def get_default_client() -> Any:
+    """Return the process-wide SSM client, creating a boto3 client on first use."""
+
+    global _DEFAULT_CLIENT
+    with _DEFAULT_CLIENT_LOCK:
+        if _DEFAULT_CLIENT is None:
+            _DEFAULT_CLIENT = _boto3_client()
+        return _DEFAULT_CLIENT
+
+
+def _boto3_client() -> Any:
+    try:
+        import boto3
+        from botocore.config import Config
+    except ImportError:
+        message = "SSM transport requires boto3 (pip install 'rune[ssm]')"
+        raise _SsmUnavailableError(message) from None
+    session = boto3.session.Session()
+    if session.get_credentials() is None:
+        raise _SsmUnavailableError("AWS credentials not configured")
+    # botocore's adaptive mode rate-limits the client itself once throttling is seen.
+    return session.client("ssm", config=Config(retries={"mode": "adaptive", "max_attempts": 10}))
+
+
+# Open batches are keyed by bundle digest and the request's shared segments.
+_BatchKey = tuple[str, tuple[bytes, ...]]
+
+
+@dataclass(slots=True)
+class _Request:
+    node: str
+    values: tuple[bytes, ...]
+    deadline: float
+    future: asyncio.Future[TransportResult]
+    command_id: str | None = None
+
+
+@dataclass(slots=True)
+class _Batch:
+    bundle: PluginBundle
+    segments: tuple[bytes, ...]
+    requests: dict[str, _Request] = field(default_factory=dict)
+    size: int = 0
+    timer: asyncio.TimerHandle | None = None
+
+
+class _Batcher:
+    """Groups one event loop's SSM calls into multi-target commands."""
+
+    def __init__(self, client: Any, config: SsmConfig) -> None:
+        self.client = client
+        self.config = config
+        self._open: dict[_BatchKey, _Batch] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def submit(
+        self, node: str, bundle: PluginBundle, input_json: dict[str, Any], deadline: float
+    ) -> _Request:
+        loop = asyncio.get_running_loop()
+        segments, values = split_request(input_json)
+        request = _Request(node, values, deadline, loop.create_future())
+        cost = _input_cost(node, values)
+        key = (bundle.digest, segments)
+        batch = self._open.get(key)
+        if batch is not None and (
+            node in batch.requests or batch.size + cost > self.config.max_command_bytes
+        ):
+            # An instance can only appear once per command, and the script must stay small.
+            self._flush(key)
+            batch = None
+        if batch is None:
+            batch = _Batch(bundle, segments, size=_shared_cost(bundle, segments))
+            batch.timer = loop.call_later(self.config.batch_window, self._flush, key)
+            self._open[key] = batch
+        batch.requests[node] = request
+        batch.size += cost
+        if len(batch.requests) >= self.config.max_targets:
+            self._flush(key)
+        return request
+
+    async def abandon(self, request: _Request) -> None:
+        """Stop waiting for ``request`` and cancel its invocation if it was already sent."""
+
+        request.future.cancel()
+        if request.command_id is not None:
+            await self._cancel(request.command_id, request.node)
+
+    def _flush(self, key: _BatchKey) -> None:
+        batch = self._open.pop(key, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: _Batch) -> None:
+        requests = batch.requests
+        try:
+            command_id = await self._send(batch)
+        except Exception as exc:
+            # Any error from SendCommand (access, validation, throttling) fails the batch.
+            _resolve_all(requests, _failure(f"SendCommand failed: {exc}"))
+            return
+        for request in requests.values():
+            request.command_id = command_id
+        try:
+            await self._poll(command_id, requests)
+        except Exception as exc:
+            _resolve_all(requests, _failure(f"polling command {command_id} failed: {exc}"))
+
+    async def _send(self, batch: _Batch) -> str:
+        requests = batch.requests
+        latest = max(request.deadline for request in requests.values())
+        execution_timeout = max(math.ceil(latest - time.monotonic()), 1)
+        parameters = {
+            "commands": [_render_script(batch.bundle, batch.segments, requests)],
+            "executionTimeout": [str(execution_timeout)],
+        }
+        response = await self._call(
+            self.client.send_command,
+            attempts=self.config.max_send_attempts,
+            DocumentName=DOCUMENT_NAME,
+            InstanceIds=list(requests),
+            Parameters=parameters,
+            Comment=f"rune {batch.bundle.entrypoint}"[:100],
+        )
+        command_id: str = response["Command"]["CommandId"]
+        return command_id
+
+    async def _poll(self, command_id: str, requests: dict[str, _Request]) -> None:
+        config = self.config
+        give_up = max(request.deadline for request in requests.values()) + _POLL_GRACE_S
+        interval = config.poll_initial
+        fetches: set[asyncio.Task[None]] = set()
+        fetch_slots = asyncio.Semaphore(_FETCH_CONCURRENCY)
+        while True:
+            for node, request in list(requests.items()):
+                if request.future.done():
+                    # The caller gave up and has cancelled the invocation itself.
+                    del requests[node]
+            if not requests:
+                break
+            if time.monotonic() >= give_up:
+                await self._cancel(command_id, *requests)
+                _resolve_all(requests, _timeout(f"command {command_id} did not finish"))
+                break
+            await asyncio.sleep(interval)
+            try:
+                statuses = await self._statuses(command_id)
+            except Exception as exc:
+                if not _is_throttled(exc):
+                    raise
+                interval = min(interval * 2, config.poll_max)
+                continue
+            finished = [
+                (node, statuses[node])
+                for node in requests
+                if statuses.get(node, "Pending") not in _PENDING_STATUSES
+            ]
+            for node, status in finished:
+                request = requests.pop(node)
+                task = asyncio.get_running_loop().create_task(
+                    self._fetch(command_id, request, status, fetch_slots)
+                )
+                fetches.add(task)
+                task.add_done_callback(fetches.discard)
+            if finished:
+                interval = config.poll_initial
+            else:
+                interval = min(interval * config.poll_backoff, config.poll_max)
+        if fetches:
+            await asyncio.gather(*fetches)
+
+    async def _statuses(self, command_id: str) -> dict[str, str]:
+        statuses: dict[str, str] = {}
+        token: str | None = None
+        while True:
+            kwargs: dict[str, Any] = {"CommandId": command_id, "MaxResults": 50}
+            if token:
+                kwargs["NextToken"] = token
+            page = await self._call(self.client.list_command_invocations, **kwargs)
+            for invocation in page.get("CommandInvocations", []):
+                statuses[invocation["InstanceId"]] = invocation["Status"]
+            token = page.get("NextToken")
+            if not token:
+                return statuses
+
+    async def _fetch(
+        self, command_id: str, request: _Request, status: str, slots: asyncio.Semaphore
+    ) -> None:
+        async with slots:
+            try:
+                invocation = await self._call(
+                    self.client.get_command_invocation,
+                    attempts=self.config.max_send_attempts,
+                    CommandId=command_id,
+                    InstanceId=request.node,
+                )
+            except Exception as exc:
+                result = _failure(f"GetCommandInvocation failed ({status}): {exc}")
+            else:
+                result = _invocation_result(invocation)
+        if not request.future.done():
+            request.future.set_result(result)
+
+    async def _cancel(self, command_id: str, *nodes: str) -> None:
+        try:
+            await self._call(
+                self.client.cancel_command, CommandId=command_id, InstanceIds=list(nodes)
+            )
+        except Exception:
+            # Best effort: the command still stops at its execution timeout.
+            pass
+
+    async def _call(self, method: Any, *, attempts: int = 1, **kwargs: Any) -> Any:
+        """Run a blocking client call in a thread, backing off on throttling errors."""
+
+        delay = self.config.poll_initial
+        attempt = 1
+        while True:
+            try:
+                return await asyncio.to_thread(method, **kwargs)
+            except Exception as exc:
+                if attempt >= attempts or not _is_throttled(exc):
+                    raise
+            attempt += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.config.poll_max)
+
+
+_BATCHERS: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[tuple[int, SsmConfig], _Batcher]
+] = weakref.WeakKeyDictionary()
+
+
+def _batcher(client: Any, config: SsmConfig) -> _Batcher:
+    batchers = _BATCHERS.setdefault(asyncio.get_running_loop(), {})
+    key = (id(client), config)
+    batcher = batchers.get(key)
+    if batcher is None or batcher.client is not client:
+        batcher = batchers[key] = _Batcher(client, config)
+    return batcher
+
+
+async def run_remote_plugin_ssm_async(
+    node: str,
+    plugin_path: Path,
+    input_json: dict[str, Any],
+    *,
+    client: Any = None,
+    config: SsmConfig | None = None,
+    timeout: float | None = None,
 ) -> TransportResult:
-    """Simulate SSM execution of a plugin.
+    """Execute the plugin on managed instance ``node`` through SSM Run Command.
 
-    The MVP implementation validates that AWS configuration exists and otherwise returns
-    a structured error encoded as a TransportResult for the mediator to unwrap.
+    Concurrent calls on the same event loop are batched into multi-target commands (see the
+    module docstring). ``timeout`` (seconds, default :data:`DEFAULT_TIMEOUT`) becomes the
+    command's execution timeout; on expiry the result has exit code 124.
     """
 
-    _ = plugin_path  # plugin path retained for API parity
+    timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+    if not _INSTANCE_ID.match(node):
+        return _error_result(
+            input_json, 400, f"SSM target '{node}' is not a managed instance ID", "invalid target"
+        )
+    try:
+        client = client if client is not None else get_default_client()
+    except _SsmUnavailableError as exc:
+        return _error_result(input_json, 501, str(exc), "ssm unavailable")
+    try:
+        with tracing.span("transport.bundle"):
+            bundle = build_bundle(plugin_path)
+    except OSError as exc:
+        return _failure(str(exc))
+
+    deadline = time.monotonic() + timeout
+    with tracing.span("transport.exec") as attributes:
+        batcher = _batcher(client, config or SsmConfig())
+        request = batcher.submit(node, bundle, input_json, deadline)
+        try:
+            result = await asyncio.wait_for(asyncio.shield(request.future), timeout)
+        except TimeoutError:
+            await batcher.abandon(request)
+            result = _timeout(f"SSM command on {node} timed out after {timeout:g} seconds")
+        attributes["exit_code"] = result.exit_code
+    return result
+
+
+def run_remote_plugin_ssm(
+    node: str,
+    plugin_path: Path,
+    input_json: dict[str, Any],
+    *,
+    client: Any = None,
+    config: SsmConfig | None = None,
+    timeout: float | None = None,
+) -> TransportResult:
+    """Blocking wrapper around :func:`run_remote_plugin_ssm_async`.
 
-    if not _has_aws_credentials():
-        error_payload = json.dumps(
-            {
-                "message_metadata": input_json.get("message_metadata", {}),
-                "observability": input_json.get("observability", {}),
-                "payload": {"result": "error", "output_data": {}},
-                "error": {"code": 501, "message": "AWS credentials not configured"},
-            }
+    Must not be called from a running event loop; use the async variant there.
+    """
+
+    return asyncio.run(
+        run_remote_plugin_ssm_async(
+            node, plugin_path, input_json, client=client, config=config, timeout=timeout
         )
-        return TransportResult(stdout=error_payload, stderr="missing AWS credentials", exit_code=1)
+    )
+
+
+@lru_cache(maxsize=32)
+def _encoded_archive(bundle: PluginBundle) -> str:
+    return base64.encodebytes(bundle.archive()).decode()
+
 
-    error_payload = json.dumps(
+def _shared_cost(bundle: PluginBundle, segments: tuple[bytes, ...]) -> int:
+    encoded = sum(4 * math.ceil(len(segment) / 3) for segment in segments)
+    return len(_encoded_archive(bundle)) + encoded + 64 * len(segments) + 512
+
+
+def _input_cost(node: str, values: tuple[bytes, ...]) -> int:
+    return len(node) + sum(4 * math.ceil(len(value) / 3) + 3 for value in values) + 16
+
+
+def _render_script(
+    bundle: PluginBundle, segments: tuple[bytes, ...], requests: dict[str, _Request]
+) -> str:
+    """Shell script that unpacks the bundle and runs it with this instance's input.
+
+    The input is the shared segments with this instance's values spliced between them; the
+    ``case`` sets the values as positional parameters.
+    """
+
+    shared = "".join(
+        f"base64 -d > \"$d/s{index}\" <<'RUNE_INPUT' || exit 255\n"
+        f"{base64.encodebytes(segment).decode()}"
+        "RUNE_INPUT\n"
+        for index, segment in enumerate(segments)
+    )
+    cases = "".join(
+        f"{node}) set --{_quoted_values(request.values)} ;;\n"
+        for node, request in requests.items()
+    )
+    return (
+        "set -u\n"
+        'd=$(mktemp -d) || exit 255\n'
+        "trap 'rm -rf \"$d\"' EXIT\n"
+        "base64 -d > \"$d/bundle.tar.gz\" <<'RUNE_BUNDLE' || exit 255\n"
+        f"{_encoded_archive(bundle)}"
+        "RUNE_BUNDLE\n"
+        'tar -xzf "$d/bundle.tar.gz" -C "$d" || exit 255\n'
+        f"{shared}"
+        'case "${AWS_SSM_INSTANCE_ID:-}" in\n'
+        f"{cases}"
+        '*) echo "rune: no input for instance ${AWS_SSM_INSTANCE_ID:-unknown}" >&2; exit 255 ;;\n'
+        "esac\n"
+        "i=0\n"
+        'for value in "$@"; do\n'
+        '  cat "$d/s$i" && printf %s "$value" | base64 -d || exit 255\n'
+        "  i=$((i + 1))\n"
+        'done > "$d/input"\n'
+        'cat "$d/s$i" >> "$d/input" || exit 255\n'
+        f'bash "$d/{bundle.entrypoint}" < "$d/input"\n'
+    )
+
+
+def _quoted_values(values: tuple[bytes, ...]) -> str:
+    return "".join(f" '{base64.b64encode(value).decode()}'" for value in values)
+
+
+def _invocation_result(invocation: dict[str, Any]) -> TransportResult:
+    status = invocation.get("Status", "")
+    stdout = invocation.get("StandardOutputContent") or ""
+    stderr = invocation.get("StandardErrorContent") or ""
+    code = invocation.get("ResponseCode", -1)
+    if status in _TIMEOUT_STATUSES:
+        return _timeout(f"SSM invocation {status}: {stderr}".rstrip(": "))
+    if code is None or code < 0:
+        details = invocation.get("StatusDetails") or status
+        return _failure(f"SSM invocation {details}: {stderr}".rstrip(": "))
+    return TransportResult(
+        stdout=stdout,
+        stderr=stderr,
+        exit_code=code,
+        stdout_truncated=len(stdout) >= OUTPUT_LIMIT,
+        stderr_truncated=len(stderr) >= OUTPUT_LIMIT,
+    )
+
+
+def _is_throttled(exc: Exception) -> bool:
+    response = getattr(exc, "response", None)
+    if not isinstance(response, dict):
+        return False
+    return response.get("Error", {}).get("Code") in _THROTTLING_CODES
+
+
+def _resolve_all(requests: dict[str, _Request], result: TransportResult) -> None:
+    for request in requests.values():
+        if not request.future.done():
+            request.future.set_result(result)
+
+
+def _failure(message: str) -> TransportResult:
+    return TransportResult(stdout="", stderr=message, exit_code=SSM_FAILURE_EXIT_CODE)
+
+
+def _timeout(message: str) -> TransportResult:
+    return TransportResult(stdout="", stderr=message, exit_code=SSM_TIMEOUT_EXIT_CODE)
+
+
+def _error_result(
+    input_json: dict[str, Any], code: int, message: str, stderr: str
+) -> TransportResult:
+    """A structured, non-retryable error for the mediator to unwrap."""
+
+    error_payload = codec.dumps(
         {
             "message_metadata": input_json.get("message_metadata", {}),
             "observability": input_json.get("observability", {}),
             "payload": {"result": "error", "output_data": {}},
-            "error": {"code": 501, "message": "SSM transport not yet implemented"},
+            "error": {"code": code, "message": message},
         }
     )
-    return TransportResult(stdout=error_payload, stderr="ssm not implemented", exit_code=1)
-
-
-def _has_aws_credentials() -> bool:
-    """Return True if the environment exposes AWS credentials."""
-
-    for key in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN"):
-        if key in os.environ:
-            return True
-    return False
+    return TransportResult(stdout=error_payload, stderr=stderr, exit_code=1)
@@ -0,0 +1,224 @@
+"""Rolling-wave fleet execution with a failure-rate circuit breaker.
+
+:func:`run_action_waves` runs an action over many nodes in waves instead of all at once:
+
+- An optional canary wave runs first, on its own, and must finish before anything else starts.
+- The remaining nodes are split into waves of ``size`` nodes (or ``percent`` of the fleet).
+- The next wave starts once ``advance_at`` of the current wave has finished, so a few slow
+  nodes at the tail of a wave do not stall the rollout.
+- At most ``concurrency`` nodes run at once, even while waves overlap.
+- Every finished node feeds a sliding window of the last ``window`` results. Once it holds at
+  least ``min_samples`` results and more than ``max_failure_rate`` of them failed, the breaker
+  trips: no further nodes are started, nodes already running finish, and the rest are skipped.
+  The canary wave is judged on its own results regardless of ``min_samples``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any
+
+from rune.models import OrchestrationResult, WaveResult
+from rune.orchestrator import DEFAULT_CONCURRENCY, run_action_async
+from rune.payload import template_scope
+
+__all__ = ["WavePlan", "plan_waves", "run_action_waves", "run_action_waves_async"]
+
+
+@dataclass(frozen=True, slots=True)
+class WavePlan:
+    """How a fleet is split into waves and when the rollout is stopped."""
+
+    size: int | None = None
+    percent: float | None = None
+    canary: int = 0
+    advance_at: float = 0.8
+    max_failure_rate: float = 0.2
+    window: int = 20
+    min_samples: int = 5
+
+    def __post_init__(self) -> None:
+        if (self.size is None) == (self.percent is None):
+            raise ValueError("exactly one of size and percent must be set")
+        if self.size is not None and self.size < 1:
+            raise ValueError("wave size must be at least 1")
+        if self.percent is not None and not 0 < self.percent <= 100:
+            raise ValueError("wave percent must be in (0, 100]")
+        if self.canary < 0:
+            raise ValueError("canary must not be negative")
+        if not 0 < self.advance_at <= 1:
+            raise ValueError("advance_at must be in (0, 1]")
+        if not 0 <= self.max_failure_rate <= 1:
+            raise ValueError("max_failure_rate must be in [0, 1]")
+        if self.window < 1 or self.min_samples < 1:
+            raise ValueError("window and min_samples must be at least 1")
+
+    def wave_size(self, total: int) -> int:
+        """Nodes per (non-canary) wave for a fleet of ``total`` nodes."""
+
+        if self.size is not None:
+            return self.size
+        assert self.percent is not None
+        return max(math.ceil(total * self.percent / 100), 1)
+
+
+def plan_waves(nodes: list[str], plan: WavePlan) -> list[list[str]]:
+    """Split ``nodes`` into waves in input order; the canary wave, if any, comes first."""
+
+    canary = nodes[: plan.canary]
+    rest = nodes[plan.canary :]
+    size = plan.wave_size(len(nodes))
+    waves = [rest[start : start + size] for start in range(0, len(rest), size)]
+    return [canary, *waves] if canary else waves
+
+
+class _Breaker:
+    """Sliding-window failure rate over the most recently finished nodes."""
+
+    def __init__(self, plan: WavePlan) -> None:
+        self.plan = plan
+        self.recent: deque[bool] = deque(maxlen=plan.window)
+        self.reason: str | None = None
+
+    def record(self, result: OrchestrationResult) -> None:
+        self.recent.append(result.status == "failed")
+        enough = min(self.plan.min_samples, self.plan.window)
+        if self.reason is None and len(self.recent) >= enough:
+            self._check(list(self.recent), "of the last")
+
+    def judge_canary(self, results: list[OrchestrationResult]) -> None:
+        if self.reason is None and results:
+            self._check([result.status == "failed" for result in results], "of the canary")
+
+    def _check(self, failures: list[bool], scope: str) -> None:
+        rate = sum(failures) / len(failures)
+        if rate > self.plan.max_failure_rate:
+            self.reason = (
+                f"{sum(failures)} {scope} {len(failures)} nodes failed ({rate:.0%}),"
+                f" above the {self.plan.max_failure_rate:.0%} threshold"
+            )
+
+
+async def run_action_waves_async(
+    action: str,
+    nodes: list[str],
+    use_ssm: bool,
+    dry_run: bool,
+    params: dict[str, Any],
+    plan: WavePlan,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    use_cache: bool = False,
+    max_retries: int | None = None,
+) -> WaveResult:
+    """Run an action over ``nodes`` in waves, stopping early when too many nodes fail.
+
+    Results of the nodes that ran are returned in the order of ``nodes``; nodes never started
+    are listed in ``skipped``.
+    """
+
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    started = time.monotonic()
+    semaphore = asyncio.Semaphore(concurrency)
+    breaker = _Breaker(plan)
+    finished: dict[int, OrchestrationResult] = {}
+    # Nodes of an already started wave that were still queued when the breaker tripped.
+    held_back: list[int] = []
+    waves: list[dict[str, Any]] = []
+    running: set[asyncio.Task[None]] = set()
+
+    async def _run_one(index: int, node: str, wave: dict[str, Any]) -> None:
+        async with semaphore:
+            if breaker.reason is not None:
+                held_back.append(index)
+                return
+            result = await run_action_async(
+                action=action,
+                node=node,
+                use_ssm=use_ssm,
+                dry_run=dry_run,
+                params=params,
+                use_cache=use_cache,
+                max_retries=max_retries,
+            )
+        finished[index] = result
+        wave["finished"] += 1
+        wave["failed"] += result.status == "failed"
+        breaker.record(result)
+
+    offset = 0
+    planned = plan_waves(nodes, plan)
+    # As in a plain fan-out, all waves share one request template.
+    with template_scope():
+        for number, members in enumerate(planned, start=1):
+            if breaker.reason is not None:
+                break
+            is_canary = plan.canary > 0 and number == 1
+            wave = {
+                "wave": number,
+                "canary": is_canary,
+                "size": len(members),
+                "started_ms": round((time.monotonic() - started) * 1000, 3),
+                "finished": 0,
+                "failed": 0,
+            }
+            waves.append(wave)
+            tasks = [
+                asyncio.create_task(_run_one(offset + position, node, wave))
+                for position, node in enumerate(members)
+            ]
+            offset += len(members)
+            running.update(tasks)
+            if is_canary:
+                await asyncio.gather(*tasks)
+                breaker.judge_canary([finished[i] for i in range(len(members)) if i in finished])
+                continue
+            # Start the next wave once enough of this one has finished, unless the breaker trips.
+            advance_after = math.ceil(len(members) * plan.advance_at)
+            pending = set(tasks)
+            while pending and wave["finished"] < advance_after and breaker.reason is None:
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        if running:
+            await asyncio.gather(*running)
+
+    return WaveResult(
+        action=action,
+        results=[finished[index] for index in sorted(finished)],
+        duration_ms=(time.monotonic() - started) * 1000,
+        waves=waves,
+        skipped=[nodes[index] for index in sorted(held_back)] + nodes[offset:],
+        aborted_reason=breaker.reason,
+    )
+
+
+def run_action_waves(
+    action: str,
+    nodes: list[str],
+    use_ssm: bool,
+    dry_run: bool,
+    params: dict[str, Any],
+    plan: WavePlan,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    use_cache: bool = False,
+    max_retries: int | None = None,
+) -> WaveResult:
+    """Blocking wrapper around :func:`run_action_waves_async`."""
+
+    return asyncio.run(
+        run_action_waves_async(
+            action=action,
+            nodes=nodes,
+            use_ssm=use_ssm,
+            dry_run=dry_run,
+            params=params,
+            plan=plan,
+            concurrency=concurrency,
+            use_cache=use_cache,
+            max_retries=max_retries,
+        )
+    )
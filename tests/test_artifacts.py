@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import tarfile
+from pathlib import Path
+
+import pytest
+
+from rune import artifacts, mediator, orchestrator
+from rune.artifacts import ArtifactError, declared_artifacts, unpack_archive
+
+
+@pytest.fixture(autouse=True)
+def _artifact_root(monkeypatch, tmp_path: Path) -> Path:
+    root = tmp_path / "artifacts"
+    monkeypatch.setenv(artifacts.ARTIFACT_ROOT_ENV, str(root))
+    return root
+
+
+def _declaration(name: str, content: bytes) -> dict[str, object]:
+    return {"name": name, "size": len(content), "sha256": hashlib.sha256(content).hexdigest()}
+
+
+def _output(entries: object) -> dict[str, object]:
+    return {"payload": {"result": "success", "output_data": {"artifacts": entries}}}
+
+
+def _archive(path: Path, files: dict[str, bytes], link: str | None = None) -> Path:
+    with tarfile.open(path, "w:gz") as archive:
+        for name, content in files.items():
+            info = tarfile.TarInfo(f"./{name}")
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+        if link is not None:
+            info = tarfile.TarInfo(f"./{link}")
+            info.type = tarfile.SYMTYPE
+            info.linkname = "/etc/passwd"
+            archive.addfile(info)
+    return path
+
+
+def test_request_dir_uses_sanitized_message_id(_artifact_root: Path):
+    assert artifacts.request_dir({"message_metadata": {"message_id": "abc-1"}}) == (
+        _artifact_root / "abc-1"
+    )
+    unsafe = artifacts.request_id({"message_metadata": {"message_id": "../../etc"}})
+    assert len(unsafe) == 32 and "/" not in unsafe
+    assert artifacts.request_id({}) == artifacts.request_id({"message_metadata": {}})
+
+
+def test_declared_artifacts_validates_entries():
+    good = _declaration("logs.tar.gz", b"data")
+    assert declared_artifacts(_output([good])) == [good]
+    assert declared_artifacts(_output([])) is None
+    assert declared_artifacts({"payload": {"output_data": {}}}) is None
+    assert declared_artifacts(None) is None
+
+    for entries, message in [
+        ({"name": "x"}, "must be a list"),
+        ([{**good, "name": "../x"}], "invalid artifact name"),
+        ([{**good, "name": ".hidden"}], "invalid artifact name"),
+        ([good, good], "declared twice"),
+        ([{**good, "size": -1}], "invalid size"),
+        ([{**good, "size": True}], "invalid size"),
+        ([{**good, "sha256": "ABC"}], "invalid sha256"),
+    ]:
+        with pytest.raises(ArtifactError, match=message):
+            declared_artifacts(_output(entries))
+
+
+def test_unpack_archive_extracts_only_declared_files(tmp_path: Path):
+    content = b"log line\n" * 1000
+    archive = _archive(
+        tmp_path / "transfer.tar.gz",
+        {"logs.tar.gz": content, "extra.txt": b"undeclared"},
+        link="passwd",
+    )
+    target = tmp_path / "out"
+    declared = [_declaration("logs.tar.gz", content)]
+
+    references = unpack_archive(archive, target, declared)
+
+    assert references == [{**declared[0], "path": str(target / "logs.tar.gz")}]
+    assert (target / "logs.tar.gz").read_bytes() == content
+    assert sorted(path.name for path in target.iterdir()) == ["logs.tar.gz"]
+
+
+def test_unpack_archive_rejects_mismatch_and_missing_files(tmp_path: Path):
+    archive = _archive(tmp_path / "transfer.tar.gz", {"a.log": b"actual"})
+    with pytest.raises(ArtifactError, match="does not match"):
+        unpack_archive(archive, tmp_path / "out", [_declaration("a.log", b"expected")])
+    assert not list((tmp_path / "out").iterdir())
+
+    with pytest.raises(ArtifactError, match="missing from transfer: b.log"):
+        unpack_archive(archive, tmp_path / "out", [_declaration("b.log", b"")])
+
+    (tmp_path / "broken.tar.gz").write_bytes(b"not gzip")
+    with pytest.raises(ArtifactError, match="could not unpack"):
+        unpack_archive(tmp_path / "broken.tar.gz", tmp_path / "out", [])
+
+
+def test_gather_logs_returns_artifact_reference(tmp_path: Path, _artifact_root: Path):
+    log = tmp_path / "app.log"
+    log.write_text("hello\n")
+
+    result = orchestrator.run_action(
+        action="gather-logs",
+        node="localhost",
+        use_ssm=False,
+        dry_run=False,
+        params={
+            "extra_paths": [str(log), str(tmp_path / "missing.log")],
+            "include_journal": False,
+        },
+    )
+
+    assert result.status == "success", result.error
+    output_data = result.plugin_output["payload"]["output_data"]
+    assert output_data["skipped"] == [str(tmp_path / "missing.log")]
+    (reference,) = output_data["artifacts"]
+    path = Path(reference["path"])
+    assert path == _artifact_root / result.message_metadata["message_id"] / "logs.tar.gz"
+    assert output_data["artifact_path"] == str(path)
+    assert reference["size"] == path.stat().st_size
+    assert reference["sha256"] == hashlib.sha256(path.read_bytes()).hexdigest()
+    with tarfile.open(path) as archive:
+        member = next(m for m in archive.getmembers() if m.name.endswith("app.log"))
+        assert archive.extractfile(member).read() == b"hello\n"
+
+
+def test_mediator_fails_result_when_artifact_does_not_match(tmp_path: Path):
+    plugin = tmp_path / "declares.sh"
+    plugin.write_text(
+        'mkdir -p "$RUNE_ARTIFACT_DIR" && printf tampered > "$RUNE_ARTIFACT_DIR/out.bin"\n'
+        "cat <<EOF\n"
+        + json.dumps(
+            {
+                "message_metadata": {},
+                "observability": {},
+                "payload": {
+                    "result": "success",
+                    "output_data": {"artifacts": [_declaration("out.bin", b"original")]},
+                },
+                "error": None,
+            }
+        )
+        + "\nEOF\n"
+    )
+    payload = {"message_metadata": {"message_id": "m-1"}}
+
+    result = mediator.execute_action(
+        action="declares", node="localhost", plugin_path=plugin, payload=payload, transport="ssh"
+    )
+
+    assert result.status == "failed"
+    assert result.error.code == 502
+    assert "does not match" in result.error.details["reason"]
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import errno
+import gzip
+import json
+import os
+import socket
+import threading
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from rune import audit, orchestrator
+from rune.audit import AuditLog
+
+
+def _lines(path: Path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def _result(index: int) -> dict:
+    return {"status": "success", "action": "noop", "node": f"node-{index}"}
+
+
+def test_records_are_appended_with_requester_and_params_hash(tmp_path: Path):
+    log = AuditLog(tmp_path / "audit" / "rune.ndjson", fsync="always")
+    log.record(_result(1), {"b": 2, "a": 1})
+    with audit.requester("alice", "tcp:10.0.0.5"):
+        log.record(_result(2), {"a": 1, "b": 2})
+    log.close()
+
+    first, second = _lines(log.path)
+    assert first["result"] == _result(1)
+    assert first["requester"] == audit.current_requester()[0]
+    assert "@" in first["requester"]
+    assert first["client"] is None
+    assert (second["requester"], second["client"]) == ("alice", "tcp:10.0.0.5")
+    assert first["params_sha256"] == second["params_sha256"] == audit.params_hash({"a": 1, "b": 2})
+    assert first["recorded_at"].endswith("Z")
+
+
+def test_concurrent_records_are_batched_without_loss(tmp_path: Path):
+    log = AuditLog(tmp_path / "rune.ndjson", fsync="never")
+
+    def produce(worker: int) -> None:
+        for index in range(500):
+            log.record({"worker": worker, "index": index}, {})
+
+    threads = [threading.Thread(target=produce, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert log.flush(timeout=10)
+
+    records = [entry["result"] for entry in _lines(log.path)]
+    assert len(records) == 4000
+    for worker in range(8):
+        indexes = [r["index"] for r in records if r["worker"] == worker]
+        assert indexes == list(range(500))
+    log.close()
+
+
+def test_rotation_compresses_segments_and_keeps_backups(tmp_path: Path):
+    log = AuditLog(tmp_path / "rune.ndjson", fsync="never", max_bytes=400, backups=2)
+    for index in range(40):
+        log.record(_result(index), {})
+        log.flush()
+    log.close()
+
+    segments = log.segments()
+    assert len(segments) == 2
+    records = [json.loads(line) for segment in segments for line in gzip.open(segment)]
+    records += _lines(log.path)
+    nodes = [int(record["result"]["node"].removeprefix("node-")) for record in records]
+    assert nodes == list(range(nodes[0], 40)) and nodes[0] > 0
+    assert log.path.stat().st_size <= 400
+    assert not list(tmp_path.glob("rune.ndjson.*[0-9]Z"))
+
+
+def test_records_are_serialized_when_recorded(tmp_path: Path):
+    log = AuditLog(tmp_path / "rune.ndjson", fsync="never")
+    result = {"status": "success", "plugin_output": {"lines": 1}}
+    params = {"service": "docker"}
+
+    log.record(result, params)
+    result["plugin_output"]["lines"] = 2
+    params["service"] = "nomad"
+    log.close()
+
+    (record,) = _lines(log.path)
+    assert record["result"]["plugin_output"] == {"lines": 1}
+    assert record["params_sha256"] == audit.params_hash({"service": "docker"})
+
+
+class _FullDisk:
+    """File wrapper whose first ``failures`` writes fail with ENOSPC."""
+
+    def __init__(self, real: Any, failures: int = 1) -> None:
+        self.real = real
+        self.failures = failures
+
+    def write(self, data: bytes) -> int:
+        if self.failures:
+            self.failures -= 1
+            raise OSError(errno.ENOSPC, "No space left on device")
+        return self.real.write(data)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.real, name)
+
+
+def test_failed_write_is_reported_and_the_writer_keeps_going(tmp_path: Path):
+    log = AuditLog(tmp_path / "rune.ndjson", fsync="always")
+    log._file = _FullDisk(log._file)
+
+    with pytest.warns(RuntimeWarning, match="could not write 1 record"):
+        log.record(_result(1), {})
+        assert log.flush(timeout=5)
+    log.record(_result(2), {})
+    assert log.flush(timeout=5)
+    log.close()
+
+    assert [record["result"] for record in _lines(log.path)] == [_result(2)]
+
+
+def test_failed_rotation_keeps_the_log_open(monkeypatch, tmp_path: Path):
+    log = AuditLog(tmp_path / "rune.ndjson", fsync="never", max_bytes=200)
+    log.record(_result(1), {})
+    assert log.flush(timeout=5)
+
+    def replace(source: Path, target: Path) -> None:
+        raise PermissionError(errno.EACCES, "Permission denied")
+
+    with monkeypatch.context() as patched, pytest.warns(RuntimeWarning, match="audit log"):
+        patched.setattr(audit.os, "replace", replace)
+        log.record(_result(2), {})
+        assert log.flush(timeout=5)
+    log.record(_result(3), {})
+    assert log.flush(timeout=5)
+    log.close()
+
+    records = [json.loads(line) for segment in log.segments() for line in gzip.open(segment)]
+    records += _lines(log.path)
+    assert [record["result"] for record in records] == [_result(1), _result(3)]
+
+
+def test_interval_fsync_syncs_idle_writes(monkeypatch, tmp_path: Path):
+    synced = threading.Event()
+    real_fsync = audit.os.fsync
+
+    def fsync(fd: int) -> None:
+        real_fsync(fd)
+        synced.set()
+
+    monkeypatch.setattr(audit.os, "fsync", fsync)
+    log = AuditLog(tmp_path / "rune.ndjson", fsync=20)
+    log.record(_result(1), {})
+    assert synced.wait(timeout=5)
+    log.close()
+
+
+def test_invalid_fsync_policy():
+    with pytest.raises(ValueError, match="RUNE_AUDIT_FSYNC"):
+        audit._parse_fsync("sometimes")
+    assert audit._parse_fsync("250ms") == 0.25
+    assert audit._parse_fsync("never") is None
+
+
+def test_run_action_writes_default_log(monkeypatch, tmp_path: Path):
+    path = tmp_path / "audit.ndjson"
+    monkeypatch.setenv(audit.AUDIT_LOG_ENV, str(path))
+    try:
+        orchestrator.run_action(
+            action="noop", node="n", use_ssm=False, dry_run=True, params={"k": "v"}
+        )
+        log = audit.get_default_log()
+        assert log is not None and log.path == path
+        log.flush()
+    finally:
+        audit.close_default_log()
+
+    (record,) = _lines(path)
+    assert record["result"]["status"] == "dry_run"
+    assert record["result"]["node"] == "n"
+    assert record["params_sha256"] == audit.params_hash({"k": "v"})
+    monkeypatch.delenv(audit.AUDIT_LOG_ENV)
+    assert audit.get_default_log() is None
+
+
+def test_server_attributes_records_to_requester_header(monkeypatch, tmp_path: Path):
+    import http.client
+
+    from rune.server import RuneServer
+
+    path = tmp_path / "audit.ndjson"
+    monkeypatch.setenv(audit.AUDIT_LOG_ENV, str(path))
+    server = RuneServer(("127.0.0.1", 0), drain_timeout=5)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        connection = http.client.HTTPConnection(*server.address, timeout=10)
+        body = json.dumps({"action": "noop", "node": "n", "dry_run": True}).encode()
+        connection.request("POST", "/v1/run", body=body, headers={"X-Rune-Requester": "ci"})
+        assert connection.getresponse().status == 200
+        connection.close()
+    finally:
+        server.shutdown()
+        thread.join(timeout=5)
+        audit.close_default_log()
+
+    (record,) = _lines(path)
+    assert record["requester"] == "ci"
+    assert record["client"] == "tcp:127.0.0.1"
+
+
+@pytest.mark.skipif(not hasattr(socket, "SO_PEERCRED"), reason="SO_PEERCRED is Linux-only")
+def test_server_names_unix_socket_peers_by_uid(monkeypatch, tmp_path: Path):
+    from rune.server import RuneServer
+
+    path = tmp_path / "audit.ndjson"
+    monkeypatch.setenv(audit.AUDIT_LOG_ENV, str(path))
+    server = RuneServer(tmp_path / "rune.sock", drain_timeout=5)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        body = json.dumps({"action": "noop", "node": "n", "dry_run": True}).encode()
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(str(server.address))
+            client.sendall(
+                b"POST /v1/run HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            assert client.makefile("rb").readline().split()[1] == b"200"
+    finally:
+        server.shutdown()
+        thread.join(timeout=5)
+        audit.close_default_log()
+
+    (record,) = _lines(path)
+    assert record["client"] == f"unix:uid={os.getuid()}"
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+from typing import Any
+
+import pytest
+
+from rune import batch, rune_cli
+from rune.batch import parse_request, run_batch
+from rune.models import OrchestrationResult
+from rune.rune_cli import main
+
+
+def _ndjson(*requests: Any) -> io.BytesIO:
+    lines = [r if isinstance(r, str) else json.dumps(r) for r in requests]
+    return io.BytesIO("\n".join(lines).encode() + b"\n")
+
+
+def _result(**kwargs: Any) -> OrchestrationResult:
+    return OrchestrationResult(
+        status="success",
+        action=kwargs["action"],
+        node=kwargs["node"],
+        transport="ssm" if kwargs["use_ssm"] else "ssh",
+        message_metadata={},
+        observability={},
+        plugin_output={"params": kwargs["params"]},
+        error=None,
+    )
+
+
+def test_parse_request_applies_defaults_and_overrides():
+    request = parse_request(
+        b'{"action": "noop", "node": "a", "dry_run": false, "id": "r1"}',
+        3,
+        {"dry_run": True, "use_cache": True, "max_retries": 2},
+    )
+    assert request.line == 3
+    assert request.action == "noop"
+    assert request.params == {}
+    assert request.dry_run is False
+    assert request.use_cache is True
+    assert request.max_retries == 2
+    assert request.request_id == "r1"
+
+
+@pytest.mark.parametrize(
+    ("raw", "message"),
+    [
+        ("{not json", "invalid JSON"),
+        ("[1, 2]", "JSON object"),
+        ('{"node": "a"}', "'action'"),
+        ('{"action": "noop", "node": ""}', "'node'"),
+        ('{"action": "noop", "node": "a", "params": []}', "'params'"),
+        ('{"action": "noop", "node": "a", "use_ssm": 1}', "'use_ssm'"),
+        ('{"action": "noop", "node": "a", "max_retries": true}', "'max_retries'"),
+        ('{"action": "noop", "node": "a", "id": 7}', "'id'"),
+        ('{"action": "noop", "node": "a", "nodes": ["b"]}', "unknown fields: nodes"),
+    ],
+)
+def test_parse_request_rejects_invalid_lines(raw, message):
+    with pytest.raises(ValueError, match=message):
+        parse_request(raw, 1, {})
+
+
+def test_run_batch_streams_results_in_completion_order(monkeypatch):
+    emitted: list[dict[str, Any]] = []
+    fast_emitted = asyncio.Event()
+
+    async def fake_run_action_async(**kwargs: Any) -> OrchestrationResult:
+        if kwargs["node"] == "slow":
+            # The fast result must be written while this request is still running.
+            await asyncio.wait_for(fast_emitted.wait(), timeout=5)
+        return _result(**kwargs)
+
+    def emit(document: dict[str, Any]) -> None:
+        emitted.append(document)
+        if document["node"] == "fast":
+            fast_emitted.set()
+
+    monkeypatch.setattr(batch, "run_action_async", fake_run_action_async)
+    summary = run_batch(
+        _ndjson(
+            {"action": "noop", "node": "slow", "id": "first"},
+            {"action": "noop", "node": "fast", "params": {"k": "v"}, "use_ssm": True},
+        ),
+        emit,
+        concurrency=2,
+    )
+
+    assert [document["node"] for document in emitted] == ["fast", "slow"]
+    assert emitted[0]["batch"] == {"line": 2, "id": None}
+    assert emitted[0]["transport"] == "ssm"
+    assert emitted[0]["plugin_output"] == {"params": {"k": "v"}}
+    assert emitted[1]["batch"] == {"line": 1, "id": "first"}
+    assert (summary.total, summary.succeeded, summary.failed) == (2, 2, 0)
+
+
+def test_run_batch_respects_concurrency(monkeypatch):
+    in_flight = 0
+    peak = 0
+
+    async def fake_run_action_async(**kwargs: Any) -> OrchestrationResult:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return _result(**kwargs)
+
+    monkeypatch.setattr(batch, "run_action_async", fake_run_action_async)
+    emitted: list[dict[str, Any]] = []
+    requests = [{"action": "noop", "node": f"node-{index}"} for index in range(12)]
+    summary = run_batch(_ndjson(*requests), emitted.append, concurrency=3)
+
+    assert peak == 3
+    assert len(emitted) == 12
+    assert summary.succeeded == 12
+
+
+def test_run_batch_reports_invalid_lines_and_errors_without_stopping(monkeypatch):
+    async def fake_run_action_async(**kwargs: Any) -> OrchestrationResult:
+        if kwargs["node"] == "boom":
+            raise RuntimeError("transport exploded")
+        return _result(**kwargs)
+
+    monkeypatch.setattr(batch, "run_action_async", fake_run_action_async)
+    emitted: list[dict[str, Any]] = []
+    summary = run_batch(
+        _ndjson(
+            '{"action": "noop", "node": "a", "id": "bad", "extra": 1}',
+            "",
+            "not json",
+            {"action": "noop", "node": "boom"},
+            {"action": "noop", "node": "ok"},
+        ),
+        emitted.append,
+    )
+
+    by_line = {document["batch"]["line"]: document for document in emitted}
+    assert sorted(by_line) == [1, 3, 4, 5]
+    assert by_line[1]["error"]["code"] == 400
+    assert by_line[1]["batch"]["id"] == "bad"
+    assert by_line[1]["node"] == "a"
+    assert by_line[3]["error"]["message"].startswith("line 3: invalid JSON")
+    assert by_line[4]["error"] == {"code": 500, "message": "transport exploded", "details": None}
+    assert by_line[5]["status"] == "success"
+    assert summary.to_dict()["total"] == 4
+    assert (summary.succeeded, summary.failed, summary.invalid) == (1, 3, 2)
+
+
+def test_cli_batch_from_file(tmp_path, capsys):
+    requests = tmp_path / "requests.ndjson"
+    requests.write_text(
+        json.dumps({"action": "noop", "node": "alpha", "params": {"key": "value"}})
+        + "\n"
+        + json.dumps({"action": "noop", "node": "beta", "dry_run": False, "id": "b"})
+        + "\n"
+    )
+
+    exit_code = main(["batch", "--input", str(requests), "--dry-run", "--concurrency", "4"])
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert exit_code == 0
+    by_node = {line["node"]: line for line in lines}
+    assert by_node["alpha"]["status"] == "dry_run"
+    assert by_node["beta"]["status"] == "success"
+    assert by_node["beta"]["batch"] == {"line": 2, "id": "b"}
+
+
+def test_cli_batch_failure_exit_code(monkeypatch, capsys):
+    monkeypatch.setattr("sys.stdin", io.TextIOWrapper(_ndjson({"action": "unknown", "node": "a"})))
+    assert main(["batch"]) == 1
+    line = json.loads(capsys.readouterr().out)
+    assert line["error"]["code"] == 404
+
+
+def test_cli_batch_missing_input(tmp_path, capsys):
+    assert main(["batch", "--input", str(tmp_path / "missing.ndjson")]) == 2
+    assert "cannot read batch input" in capsys.readouterr().err
+
+
+def test_cli_batch_reports_output_and_input_errors_separately(monkeypatch, capsys):
+    def broken_pipe(*args: Any, **kwargs: Any) -> None:
+        raise BrokenPipeError(32, "Broken pipe")
+
+    stdin = io.TextIOWrapper(_ndjson({"action": "noop", "node": "a"}))
+    monkeypatch.setattr("sys.stdin", stdin)
+    monkeypatch.setattr(rune_cli, "_print_output", broken_pipe)
+    assert main(["batch", "--dry-run"]) == 1
+    err = capsys.readouterr().err
+    assert "cannot write batch output" in err and "batch input" not in err
+
+    class FailingInput(io.BytesIO):
+        def readline(self, size: int | None = -1) -> bytes:
+            raise OSError(5, "Input/output error")
+
+    monkeypatch.setattr("sys.stdin", io.TextIOWrapper(FailingInput()))
+    assert main(["batch", "--dry-run"]) == 2
+    assert "cannot read batch input '<stdin>'" in capsys.readouterr().err
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import io
+import os
+import tarfile
+from pathlib import Path
+
+import pytest
+
+from rune import bundle
+
+
+@pytest.fixture
+def plugin_tree(tmp_path: Path) -> Path:
+    (tmp_path / "lib").mkdir()
+    (tmp_path / "lib" / "rune_bpcs.sh").write_text("# library\n")
+    plugin = tmp_path / "action.sh"
+    plugin.write_text("echo '{}'\n")
+    bundle.clear_bundle_memo()
+    return plugin
+
+
+def test_bundle_includes_plugin_and_libraries(plugin_tree: Path):
+    result = bundle.build_bundle(plugin_tree)
+    assert result.entrypoint == "action.sh"
+    assert [arcname for arcname, _ in result.files] == ["action.sh", "lib/rune_bpcs.sh"]
+
+    with tarfile.open(fileobj=io.BytesIO(result.archive()), mode="r:gz") as archive:
+        assert archive.getnames() == ["action.sh", "lib/rune_bpcs.sh"]
+
+
+def test_bundle_archive_is_deterministic(plugin_tree: Path):
+    first = bundle.build_bundle(plugin_tree).archive()
+    os.utime(plugin_tree, ns=(1, 1))
+    assert bundle.build_bundle(plugin_tree).archive() == first
+
+
+def test_bundle_memo_skips_rehash_until_files_change(monkeypatch, plugin_tree: Path):
+    calls = []
+    original = bundle._hash_files
+    monkeypatch.setattr(
+        bundle, "_hash_files", lambda files: calls.append(files) or original(files)
+    )
+
+    first = bundle.build_bundle(plugin_tree)
+    assert bundle.build_bundle(plugin_tree) is first
+    assert len(calls) == 1
+
+    library = plugin_tree.parent / "lib" / "rune_bpcs.sh"
+    library.write_text("# library, revised\n")
+    second = bundle.build_bundle(plugin_tree)
+    assert len(calls) == 2
+    assert second.digest != first.digest
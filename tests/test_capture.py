@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+
+from rune import capture, mediator, metrics
+from rune.capture import SpilledOutput, read_stream
+from rune.transport_ssh import run_remote_plugin_ssh
+
+
+def _read(data: bytes, max_bytes: int, spill_threshold: int):
+    async def run():
+        stream = asyncio.StreamReader()
+        stream.feed_data(data)
+        stream.feed_eof()
+        return await read_stream(stream, max_bytes, spill_threshold)
+
+    return asyncio.run(run())
+
+
+def test_read_stream_keeps_small_output_in_memory():
+    assert _read(b"hello", 100, 10) == (b"hello", False)
+    assert _read(b"", 100, 10) == (b"", False)
+
+
+def test_read_stream_spills_and_truncates():
+    data = b"x" * (3 * capture.CHUNK_SIZE)
+    output, truncated = _read(data, 2 * capture.CHUNK_SIZE + 5, 100)
+    assert isinstance(output, SpilledOutput)
+    assert truncated
+    assert len(output) == 2 * capture.CHUNK_SIZE + 5
+    assert output.read() == data[: len(output)]
+    output.close()
+
+    kept, truncated = _read(data, 10, 100)
+    assert (kept, truncated) == (b"x" * 10, True)
+
+
+def test_spilled_output_isspace():
+    output = SpilledOutput()
+    assert not output and not output.isspace()
+    output.write(b" \n" * capture.CHUNK_SIZE)
+    assert output.isspace()
+    output.write(b"{}")
+    assert not output.isspace()
+    output.close()
+
+
+def test_capture_limits_from_environment(monkeypatch):
+    monkeypatch.setenv(capture.MAX_STDERR_ENV, "10")
+    monkeypatch.setenv(capture.SPILL_THRESHOLD_ENV, "not a number")
+    limits = capture.capture_limits()
+    assert limits.max_stderr_bytes == 10
+    assert limits.max_stdout_bytes == capture.DEFAULT_MAX_STDOUT_BYTES
+    assert limits.spill_threshold == capture.DEFAULT_SPILL_THRESHOLD
+
+
+def _plugin(tmp_path: Path, body: str) -> Path:
+    plugin = tmp_path / "plugin.sh"
+    plugin.write_text(body)
+    return plugin
+
+
+def test_transport_caps_noisy_stderr(monkeypatch, tmp_path: Path):
+    monkeypatch.setenv(capture.MAX_STDERR_ENV, "1000")
+    plugin = _plugin(tmp_path, "head -c 5000000 /dev/zero | tr '\\0' e >&2\necho '{}'\n")
+
+    result = run_remote_plugin_ssh("node", plugin, {})
+
+    assert result.exit_code == 0
+    assert result.stdout.strip() == b"{}"
+    assert result.stderr_truncated and not result.stdout_truncated
+    assert isinstance(result.stderr, bytes)
+    assert result.stderr_text() == "e" * 1000
+
+
+def test_mediator_parses_spilled_output(monkeypatch, tmp_path: Path):
+    monkeypatch.setenv(capture.SPILL_THRESHOLD_ENV, "1024")
+    document = {
+        "message_metadata": {},
+        "observability": {},
+        "payload": {"result": "success", "output_data": {"blob": "y" * 100_000}},
+        "error": None,
+    }
+    (tmp_path / "out.json").write_text(json.dumps(document))
+    plugin = _plugin(tmp_path, f"cat {tmp_path / 'out.json'}\n")
+
+    result = mediator.execute_action(
+        action="big", node="localhost", plugin_path=plugin, payload={}, transport="ssh"
+    )
+
+    assert result.status == "success", result.error
+    assert result.plugin_output == document
+
+
+def test_mediator_rejects_truncated_output(monkeypatch, tmp_path: Path):
+    monkeypatch.setenv(capture.MAX_STDOUT_ENV, "100")
+    plugin = _plugin(tmp_path, "printf '{\"padding\": \"%0200d\"}' 0\n")
+    before = metrics.PROTOCOL_VIOLATIONS.value("output_truncated")
+
+    result = mediator.execute_action(
+        action="big", node="localhost", plugin_path=plugin, payload={}, transport="ssh"
+    )
+
+    assert result.status == "failed"
+    assert result.error.message == "Plugin output exceeded the capture limit"
+    assert metrics.PROTOCOL_VIOLATIONS.value("output_truncated") == before + 1
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import time
 from typing import Any
 
 import rune.rune_cli as rune_cli
@@ -21,8 +23,10 @@ def _success_output() -> dict[str, Any]:
 
 def test_list_actions_contains_expected_entries():
     actions = orchestrator.list_actions()
-    names = {action.name for action in actions}
-    assert {"noop", "gather-logs", "restart-docker", "restart-nomad"}.issubset(names)
+    by_name = {action.name: action for action in actions}
+    assert "noop" in by_name
+    assert by_name["noop"].plugin_path.is_file()
+    assert set(by_name["noop"].params) == {"mode", "fail"}
 
 
 def test_run_action_dry_run_returns_payload():
@@ -74,6 +78,61 @@ def test_run_action_success_path(monkeypatch):
     assert result.plugin_output["payload"]["output_data"]["echo"]
 
 
+def test_run_action_sends_retry_policy_and_records_attempts(monkeypatch):
+    payloads: list[dict[str, Any]] = []
+    attempts = [{"attempt": 1, "exit_code": 0, "duration_ms": 1.0, "retryable": False}]
+
+    def fake_execute_action(payload: dict[str, Any], **_: Any) -> MediatorResult:
+        payloads.append(payload)
+        return MediatorResult(
+            status="success",
+            action="noop",
+            node="node1",
+            transport="ssh",
+            plugin_output=_success_output(),
+            error=None,
+            attempts=attempts,
+        )
+
+    monkeypatch.setattr(orchestrator, "execute_action", fake_execute_action)
+    result = orchestrator.run_action(
+        action="noop",
+        node="node1",
+        use_ssm=False,
+        dry_run=False,
+        params={},
+        max_retries=2,
+    )
+    noop = orchestrator.ACTION_REGISTRY["noop"]
+    qos = payloads[0]["quality_of_service"]
+    assert (qos["max_retries"], qos["retry_delay_ms"]) == (2, noop.retry_delay_ms)
+    assert result.observability["attempts"] == attempts
+
+
+def test_payload_carries_action_timeout_and_deadline(monkeypatch):
+    payloads: list[dict[str, Any]] = []
+
+    def fake_execute_action(payload: dict[str, Any], **_: Any) -> MediatorResult:
+        payloads.append(payload)
+        return MediatorResult(
+            status="success",
+            action="noop",
+            node="node1",
+            transport="ssh",
+            plugin_output=_success_output(),
+            error=None,
+        )
+
+    monkeypatch.setattr(orchestrator, "execute_action", fake_execute_action)
+    before_ms = time.time_ns() // 1_000_000
+    orchestrator.run_action(action="noop", node="node1", use_ssm=False, dry_run=False, params={})
+
+    qos = payloads[0]["quality_of_service"]
+    expected_ms = orchestrator.ACTION_REGISTRY["noop"].timeout * 1000
+    assert qos["timeout_ms"] == expected_ms
+    assert before_ms + expected_ms <= qos["deadline_unix_ms"] <= time.time() * 1000 + expected_ms
+
+
 def test_run_action_failure_propagates(monkeypatch):
     def fake_execute_action(**_: Any) -> MediatorResult:
         return MediatorResult(
@@ -155,3 +214,121 @@ def test_cli_failure_exit_code(monkeypatch, capsys):
     assert exit_code == 1
     data = json.loads(captured)
     assert data["status"] == "failed"
+
+
+def test_run_action_fanout_preserves_node_order(monkeypatch):
+    async def fake_execute_action(**kwargs: Any) -> MediatorResult:
+        failed = kwargs["node"] == "n2"
+        return MediatorResult(
+            status="failed" if failed else "success",
+            action="noop",
+            node=kwargs["node"],
+            transport="ssh",
+            plugin_output=_success_output(),
+            error=StructuredError(code=500, message="boom") if failed else None,
+        )
+
+    monkeypatch.setattr(orchestrator, "execute_action_async", fake_execute_action)
+    nodes = [f"n{i}" for i in range(10)]
+    fanout = orchestrator.run_action_fanout(
+        action="noop",
+        nodes=nodes,
+        use_ssm=False,
+        dry_run=False,
+        params={},
+        concurrency=3,
+    )
+    assert [result.node for result in fanout.results] == nodes
+    summary = fanout.summary()
+    assert summary["total"] == 10
+    assert summary["succeeded"] == 9
+    assert summary["failed_nodes"] == ["n2"]
+
+
+def test_run_action_fanout_respects_concurrency(monkeypatch):
+    state = {"active": 0, "peak": 0}
+
+    async def fake_execute_action(**kwargs: Any) -> MediatorResult:
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        return MediatorResult(
+            status="success",
+            action="noop",
+            node=kwargs["node"],
+            transport="ssh",
+            plugin_output=_success_output(),
+            error=None,
+        )
+
+    monkeypatch.setattr(orchestrator, "execute_action_async", fake_execute_action)
+    orchestrator.run_action_fanout(
+        action="noop",
+        nodes=[f"n{i}" for i in range(12)],
+        use_ssm=False,
+        dry_run=False,
+        params={},
+        concurrency=4,
+    )
+    assert state["peak"] == 4
+
+
+def test_cli_run_fanout_from_nodes_file(monkeypatch, tmp_path, capsys):
+    nodes_file = tmp_path / "nodes.txt"
+    nodes_file.write_text("alpha\n# comment\n\nbeta  # trailing\nalpha\n")
+
+    exit_code = main(["run", "noop", "--nodes-file", str(nodes_file), "--dry-run"])
+    assert exit_code == 0
+    data = json.loads(capsys.readouterr().out)
+    assert [result["node"] for result in data["results"]] == ["alpha", "beta"]
+    assert data["summary"]["total"] == 2
+    assert data["summary"]["failed"] == 0
+
+
+def test_cli_run_fanout_failure_exit_code(monkeypatch, capsys):
+    async def fake_execute_action(**kwargs: Any) -> MediatorResult:
+        return MediatorResult(
+            status="failed",
+            action="noop",
+            node=kwargs["node"],
+            transport="ssh",
+            plugin_output=None,
+            error=StructuredError(code=500, message="boom"),
+        )
+
+    monkeypatch.setattr(orchestrator, "execute_action_async", fake_execute_action)
+    exit_code = main(["run", "noop", "--nodes", "a,b", "--concurrency", "2"])
+    assert exit_code == 1
+    data = json.loads(capsys.readouterr().out)
+    assert data["summary"]["failed_nodes"] == ["a", "b"]
+
+
+def test_cli_rejects_node_and_nodes_together(capsys):
+    exit_code = main(["run", "noop", "--node", "a", "--nodes", "b"])
+    assert exit_code == 2
+
+
+def test_run_action_async_success_path(monkeypatch):
+    async def fake_execute_action(**_: Any) -> MediatorResult:
+        return MediatorResult(
+            status="success",
+            action="noop",
+            node="node1",
+            transport="ssh",
+            plugin_output=_success_output(),
+            error=None,
+        )
+
+    monkeypatch.setattr(orchestrator, "execute_action_async", fake_execute_action)
+    result = asyncio.run(
+        orchestrator.run_action_async(
+            action="noop",
+            node="node1",
+            use_ssm=False,
+            dry_run=False,
+            params={},
+        )
+    )
+    assert result.status == "success"
+    assert result.message_metadata["version"] == "1.0"
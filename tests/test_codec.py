@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from rune import codec
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "orjson":
+        orjson = pytest.importorskip("orjson")
+        monkeypatch.setattr(codec, "_orjson", orjson)
+    else:
+        monkeypatch.setattr(codec, "_orjson", None)
+    return request.param
+
+
+def test_round_trip_bytes(backend) -> None:
+    document = {"node": "ñode-1", "items": [1, 2.5, None, True], "nested": {"a": "b"}}
+
+    encoded = codec.dumps(document)
+
+    assert isinstance(encoded, bytes)
+    assert json.loads(encoded) == document
+    assert codec.loads(encoded) == document
+    assert codec.loads(memoryview(encoded)) == document
+    assert codec.backend() == backend
+
+
+def test_compact_and_pretty_match_stdlib(backend) -> None:
+    document = {"b": [1, {"c": "é"}], "a": {}}
+
+    assert codec.dumps(document) == json.dumps(
+        document, separators=(",", ":"), ensure_ascii=False
+    ).encode()
+    assert codec.dumps(document, pretty=True) == json.dumps(
+        document, indent=2, ensure_ascii=False
+    ).encode()
+
+
+def test_values_outside_orjson_fall_back_to_stdlib(backend) -> None:
+    assert codec.loads(codec.dumps({"big": 2**70})) == {"big": 2**70}
+    assert codec.dumps({1: "x"}) == b'{"1":"x"}'
+
+
+def test_invalid_documents_raise_json_decode_error(backend) -> None:
+    with pytest.raises(codec.JSONDecodeError):
+        codec.loads(b"{not json")
+
+
+def test_env_var_forces_stdlib(monkeypatch) -> None:
+    monkeypatch.setattr(codec, "_orjson", codec._UNRESOLVED)
+    monkeypatch.setenv(codec.CODEC_ENV, "json")
+
+    assert codec.backend() == "json"
+
+
+def test_fast_false_never_loads_orjson(monkeypatch) -> None:
+    monkeypatch.setattr(codec, "_orjson", codec._UNRESOLVED)
+
+    assert codec.dumps({"a": 1}, fast=False) == b'{"a":1}'
+    assert codec._orjson is codec._UNRESOLVED
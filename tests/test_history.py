@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+import pytest
+
+from rune import history, orchestrator
+from rune.history import HistoryError, HistoryQuery, HistoryStore
+from rune.rune_cli import main
+
+
+def _result(node: str, action: str = "noop", status: str = "success", trace: str = "t") -> dict:
+    return {
+        "status": status,
+        "action": action,
+        "node": node,
+        "transport": "ssh",
+        "message_metadata": {"message_id": f"m-{node}-{action}"},
+        "observability": {"trace_id": trace, "spans": [{"duration_ms": 12.5}]},
+        "plugin_output": None,
+        "error": None,
+    }
+
+
+def _store(path: Path, results: list[dict]) -> None:
+    store = HistoryStore(path)
+    for result in results:
+        store.record(result)
+    store.close()
+
+
+def test_store_writes_rows_in_wal_mode(tmp_path: Path):
+    path = tmp_path / "state" / "history.db"
+    _store(path, [_result("a"), _result("b", status="failed")])
+
+    connection = sqlite3.connect(path)
+    assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    indexes = {row[0] for row in connection.execute("SELECT name FROM sqlite_master")}
+    assert {"executions_node", "executions_trace_id", "executions_recorded_at"} <= indexes
+    connection.close()
+
+    rows = list(history.query(path, HistoryQuery(), include_result=True))
+    assert [row["node"] for row in rows] == ["b", "a"]
+    assert rows[0]["status"] == "failed"
+    assert rows[0]["message_id"] == "m-b-noop"
+    assert rows[0]["duration_ms"] == 12.5
+    assert rows[0]["recorded_at"].endswith("Z")
+    assert rows[1]["result"] == _result("a")
+
+
+def test_rows_are_built_when_recorded(tmp_path: Path):
+    store = HistoryStore(tmp_path / "history.db")
+    result = _result("a")
+
+    store.record(result)
+    result["status"] = "failed"
+    result["observability"]["trace_id"] = "changed"
+    store.close()
+
+    (row,) = history.query(store.path, HistoryQuery(), include_result=True)
+    assert (row["status"], row["trace_id"]) == ("success", "t")
+    assert row["result"] == _result("a")
+
+
+def test_concurrent_records_are_committed_without_loss(tmp_path: Path):
+    store = HistoryStore(tmp_path / "history.db")
+
+    def produce(worker: int) -> None:
+        for index in range(250):
+            store.record(_result(f"node-{worker}-{index}"))
+
+    threads = [threading.Thread(target=produce, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.flush(timeout=10)
+
+    assert len(list(history.query(store.path, HistoryQuery(limit=None)))) == 2000
+    store.close()
+
+
+def test_query_filters_and_pagination(tmp_path: Path):
+    path = tmp_path / "history.db"
+    _store(
+        path,
+        [
+            _result("web-1", trace="t1"),
+            _result("web-1", action="restart-service", status="failed", trace="t1"),
+            _result("web-2", trace="t2"),
+            _result("web-1", trace="t3"),
+        ],
+    )
+
+    def ids(**filters) -> list[int]:
+        return [row["id"] for row in history.query(path, HistoryQuery(**filters))]
+
+    assert ids(node="web-1") == [4, 2, 1]
+    assert ids(trace_id="t1") == [2, 1]
+    assert ids(node="web-1", status="failed") == [2]
+    assert ids(message_id="m-web-2-noop") == [3]
+    assert ids(limit=2) == [4, 3]
+    assert ids(limit=2, before_id=3) == [2, 1]
+    assert ids(since=history.parse_time("1h")) == [4, 3, 2, 1]
+    assert ids(until=history.parse_time("1h")) == []
+
+
+def test_parse_time():
+    assert history.parse_time("90s", now=1000.0) == 910.0
+    assert history.parse_time("2h", now=10_000.0) == 2800.0
+    assert history.parse_time("1970-01-01T00:01:00") == 60.0
+    assert history.parse_time("1970-01-01T01:00:00+01:00") == 0.0
+    with pytest.raises(HistoryError, match="invalid time"):
+        history.parse_time("yesterday")
+
+
+def test_run_action_records_to_default_store(monkeypatch, tmp_path: Path):
+    path = tmp_path / "history.db"
+    monkeypatch.setenv(history.HISTORY_DB_ENV, str(path))
+    try:
+        result = orchestrator.run_action(
+            action="noop", node="n", use_ssm=False, dry_run=True, params={}
+        )
+    finally:
+        history.close_default_store()
+
+    (row,) = history.query(path, HistoryQuery())
+    assert row["status"] == "dry_run"
+    assert row["trace_id"] == result.observability["trace_id"]
+    assert row["message_id"] == result.message_metadata["message_id"]
+    monkeypatch.delenv(history.HISTORY_DB_ENV)
+    assert history.get_default_store() is None
+
+
+def test_cli_history_streams_rows(monkeypatch, tmp_path: Path, capsys):
+    path = tmp_path / "history.db"
+    _store(path, [_result("a"), _result("b"), _result("a", status="failed")])
+    monkeypatch.setenv(history.HISTORY_DB_ENV, str(path))
+
+    assert main(["history", "--node", "a", "--since", "10m"]) == 0
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(row["id"], row["status"]) for row in rows] == [(3, "failed"), (1, "success")]
+    assert "result" not in rows[0]
+
+    assert main(["history", "--limit", "1", "--before", "3", "--full"]) == 0
+    (row,) = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert row["id"] == 2 and row["result"] == _result("b")
+
+
+def test_cli_history_errors(monkeypatch, tmp_path: Path, capsys):
+    monkeypatch.delenv(history.HISTORY_DB_ENV, raising=False)
+    assert main(["history"]) == 2
+    assert "RUNE_HISTORY_DB" in capsys.readouterr().err
+
+    assert main(["history", "--db", str(tmp_path / "missing.db")]) == 2
+    assert "does not exist" in capsys.readouterr().err
+
+    _store(tmp_path / "history.db", [])
+    assert main(["history", "--db", str(tmp_path / "history.db"), "--since", "soon"]) == 2
+    assert "invalid time" in capsys.readouterr().err
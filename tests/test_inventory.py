@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from rune import inventory
+from rune.inventory import Inventory, InventoryError, InventoryNode, load_inventory
+from rune.rune_cli import main
+
+NODES = [
+    {"name": "nomad-1", "region": "us-east-1", "role": "nomad", "tags": ["canary"]},
+    {"name": "nomad-2", "region": "us-east-1", "role": "nomad", "tags": ["gpu"]},
+    {"name": "nomad-3", "region": "us-west-2", "role": "nomad", "transport": "ssm"},
+    {"name": "consul-1", "region": "us-east-1", "role": "consul", "bastion": True},
+]
+
+
+def _write_json(tmp_path: Path, nodes: list[dict] = NODES) -> Path:
+    path = tmp_path / "inventory.json"
+    path.write_text(json.dumps(nodes))
+    return path
+
+
+@pytest.fixture(autouse=True)
+def _cache_dir(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv(inventory.CACHE_DIR_ENV, str(tmp_path / "cache"))
+
+
+@pytest.mark.parametrize(
+    ("selector", "expected"),
+    [
+        ("role=nomad,region=us-east-1,!tag:canary", ["nomad-2"]),
+        ("region=us-west-2|us-east-1,role!=nomad", ["consul-1"]),
+        ("tag:canary", ["nomad-1"]),
+        ("!tag:canary,!tag:gpu", ["nomad-3", "consul-1"]),
+        ("transport!=ssm", ["nomad-1", "nomad-2", "consul-1"]),
+        ("bastion=true", ["consul-1"]),
+        ("name=nomad-3|nope", ["nomad-3"]),
+        ("*", ["nomad-1", "nomad-2", "nomad-3", "consul-1"]),
+        ("!*", []),
+        ("role=web", []),
+    ],
+)
+def test_selectors(tmp_path: Path, selector: str, expected: list[str]):
+    assert load_inventory(_write_json(tmp_path)).select(selector) == expected
+
+
+def test_invalid_selectors(tmp_path: Path):
+    loaded = load_inventory(_write_json(tmp_path))
+    for selector in ("role", "role=", "", "tag:", "role=nomad,,region=x"):
+        with pytest.raises(InventoryError, match="invalid selector term"):
+            loaded.select(selector)
+    with pytest.raises(InventoryError, match="unknown attribute 'rol'"):
+        loaded.select("rol=nomad")
+
+
+def test_sparse_and_dense_keys_agree():
+    nodes = [
+        InventoryNode(f"n{i}", {"rack": f"r{i % 100}", "zone": f"z{i % 2}"}, ("odd",) * (i % 2))
+        for i in range(1000)
+    ]
+    loaded = Inventory(nodes)
+    assert loaded.select("rack=r7|r42") == [
+        node.name for node in nodes if node.attributes["rack"] in {"r7", "r42"}
+    ]
+    assert loaded.select("zone=z1,!tag:odd") == []
+    assert len(loaded.select("zone=z0,rack!=r0")) == 490
+
+
+def test_csv_and_yaml_inventories(tmp_path: Path):
+    csv_path = tmp_path / "fleet.csv"
+    csv_path.write_text(
+        "name,region,role,tags\nweb-1,eu-west-1,web,canary;blue\nweb-2,eu-west-1,web,\n"
+    )
+    assert load_inventory(csv_path).select("tag:blue") == ["web-1"]
+    assert load_inventory(csv_path).node("web-2").to_dict() == {
+        "name": "web-2",
+        "region": "eu-west-1",
+        "role": "web",
+        "tags": [],
+    }
+
+    pytest.importorskip("yaml")
+    yaml_path = tmp_path / "fleet.yaml"
+    yaml_path.write_text(
+        "nodes:\n  - name: db-1\n    role: db\n    tags: [pci]\n  - name: db-2\n    role: db\n"
+    )
+    assert load_inventory(yaml_path).select("role=db,!tag:pci") == ["db-2"]
+
+
+@pytest.mark.parametrize(
+    ("name", "content", "message"),
+    [
+        ("dup.json", '[{"name": "a"}, {"name": "a"}]', "more than once"),
+        ("nested.json", '[{"name": "a", "labels": {"x": 1}}]', "must be a scalar"),
+        ("anon.json", '[{"role": "web"}]', "has no name"),
+        ("shape.json", '{"hosts": []}', "'nodes' list"),
+        ("broken.json", "[", "cannot parse"),
+        ("noname.csv", "host,role\na,web\n", "no 'name' column"),
+        ("fleet.toml", "", "unsupported inventory format"),
+    ],
+)
+def test_invalid_inventories(tmp_path: Path, name: str, content: str, message: str):
+    path = tmp_path / name
+    path.write_text(content)
+    with pytest.raises(InventoryError, match=message):
+        load_inventory(path)
+
+
+def test_compiled_index_is_cached_until_the_file_changes(tmp_path: Path, monkeypatch):
+    path = _write_json(tmp_path)
+    load_inventory(path)
+    (cache_file,) = (tmp_path / "cache").iterdir()
+
+    def no_parse(path: Path):
+        raise AssertionError("inventory was parsed again")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(inventory, "_parse", no_parse)
+        cached = load_inventory(path)
+    assert cached.select("role=nomad,!tag:canary") == ["nomad-2", "nomad-3"]
+    assert cached.node("consul-1").attributes == {
+        "region": "us-east-1",
+        "role": "consul",
+        "bastion": "true",
+    }
+
+    _write_json(tmp_path, [*NODES, {"name": "nomad-4", "role": "nomad"}])
+    os.utime(path, ns=(1, 1))
+    assert load_inventory(path).select("role=nomad") == [
+        "nomad-1",
+        "nomad-2",
+        "nomad-3",
+        "nomad-4",
+    ]
+
+    cache_file.write_bytes(b"not a pickle")
+    assert len(load_inventory(path)) == 5
+
+
+def test_cli_select_fans_out_to_matching_nodes(tmp_path: Path, monkeypatch, capsys):
+    monkeypatch.setenv(inventory.INVENTORY_ENV, str(_write_json(tmp_path)))
+
+    code = main(["run", "noop", "--select", "role=nomad,!tag:canary", "--dry-run"])
+
+    document = json.loads(capsys.readouterr().out)
+    assert code == 0
+    assert [result["node"] for result in document["results"]] == ["nomad-2", "nomad-3"]
+
+
+def test_cli_select_errors(tmp_path: Path, monkeypatch, capsys):
+    monkeypatch.delenv(inventory.INVENTORY_ENV, raising=False)
+    assert main(["run", "noop", "--select", "role=nomad"]) == 2
+    assert "pass --inventory" in capsys.readouterr().err
+
+    path = str(_write_json(tmp_path))
+    assert main(["run", "noop", "--select", "role=web", "--inventory", path]) == 2
+    assert "matched no inventory nodes" in capsys.readouterr().err
+    assert main(["run", "noop", "--select", "role=nomad", "--node", "x"]) == 2
+
+
+def test_cli_inventory_lists_nodes(tmp_path: Path, capsys):
+    path = str(_write_json(tmp_path))
+
+    assert main(["inventory", "--inventory", path, "--select", "tag:gpu"]) == 0
+    assert json.loads(capsys.readouterr().out) == {"count": 1, "nodes": ["nomad-2"]}
+
+    assert main(["inventory", "--inventory", path, "--select", "tag:gpu", "--full"]) == 0
+    (node,) = json.loads(capsys.readouterr().out)["nodes"]
+    assert node == {"name": "nomad-2", "region": "us-east-1", "role": "nomad", "tags": ["gpu"]}
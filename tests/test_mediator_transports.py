@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import time
 from pathlib import Path
 from typing import Any
 
+import pytest
+
 from rune import mediator
 from rune.models import TransportResult
 
@@ -166,3 +170,236 @@ def test_ssm_transport_path(monkeypatch, tmp_path: Path):
     )
     assert result.status == "success"
     assert result.plugin_output["payload"]["output_data"]["via"] == "ssm"
+
+
+def test_execute_action_async_uses_async_transport(monkeypatch, tmp_path: Path):
+    async def fake_transport(**_: Any) -> TransportResult:
+        output = _base_request() | {
+            "payload": {"result": "success", "output_data": {"via": "async"}},
+            "error": None,
+        }
+        return TransportResult(stdout=json.dumps(output), stderr="", exit_code=0)
+
+    monkeypatch.setattr(mediator, "run_remote_plugin_ssh_async", fake_transport)
+    result = asyncio.run(
+        mediator.execute_action_async(
+            action="noop",
+            node="n1",
+            plugin_path=tmp_path / "noop.sh",
+            payload=_base_request(),
+            transport="ssh",
+        )
+    )
+    assert result.status == "success"
+    assert result.plugin_output["payload"]["output_data"]["via"] == "async"
+
+
+def _success_stdout() -> str:
+    output = _base_request() | {"payload": {"result": "success", "output_data": {}}, "error": None}
+    return json.dumps(output)
+
+
+def _flaky_transport(outcomes: list[TransportResult]):
+    calls: list[int] = []
+
+    def fake_transport(**_: Any) -> TransportResult:
+        calls.append(1)
+        return outcomes[len(calls) - 1]
+
+    return fake_transport, calls
+
+
+def _with_retries(max_retries: int) -> dict[str, Any]:
+    return _base_request() | {
+        "quality_of_service": {"max_retries": max_retries, "retry_delay_ms": 0}
+    }
+
+
+@pytest.mark.parametrize(
+    "failure",
+    [
+        TransportResult(stdout="", stderr="connection refused", exit_code=255),
+        TransportResult(stdout="", stderr="timed out", exit_code=124),
+        TransportResult(stdout="  \n", stderr="", exit_code=0),
+    ],
+)
+def test_transport_failures_are_retried(monkeypatch, tmp_path: Path, failure: TransportResult):
+    success = TransportResult(stdout=_success_stdout(), stderr="", exit_code=0)
+    fake_transport, calls = _flaky_transport([failure, failure, success])
+    monkeypatch.setattr(mediator, "run_remote_plugin_ssh", fake_transport)
+
+    result = mediator.execute_action(
+        action="noop",
+        node="n1",
+        plugin_path=tmp_path / "noop.sh",
+        payload=_with_retries(3),
+        transport="ssh",
+    )
+
+    assert result.status == "success"
+    assert len(calls) == 3
+    assert [attempt["retryable"] for attempt in result.attempts] == [True, True, False]
+    assert all(attempt["duration_ms"] >= 0 for attempt in result.attempts)
+
+
+def test_retries_stop_at_max_retries(monkeypatch, tmp_path: Path):
+    failure = TransportResult(stdout="", stderr="unreachable", exit_code=255)
+    fake_transport, calls = _flaky_transport([failure] * 5)
+    monkeypatch.setattr(mediator, "run_remote_plugin_ssh", fake_transport)
+
+    result = mediator.execute_action(
+        action="noop",
+        node="n1",
+        plugin_path=tmp_path / "noop.sh",
+        payload=_with_retries(2),
+        transport="ssh",
+    )
+
+    assert result.status == "failed"
+    assert len(calls) == 3
+    assert [attempt["attempt"] for attempt in result.attempts] == [1, 2, 3]
+
+
+def test_plugin_errors_are_never_retried(monkeypatch, tmp_path: Path):
+    output = _base_request() | {
+        "payload": {"result": "error", "output_data": {}},
+        "error": {"code": 7, "message": "service missing"},
+    }
+    failure = TransportResult(stdout=json.dumps(output), stderr="", exit_code=7)
+    fake_transport, calls = _flaky_transport([failure] * 3)
+    monkeypatch.setattr(mediator, "run_remote_plugin_ssh", fake_transport)
+
+    result = mediator.execute_action(
+        action="noop",
+        node="n1",
+        plugin_path=tmp_path / "noop.sh",
+        payload=_with_retries(2),
+        transport="ssh",
+    )
+
+    assert result.error is not None and result.error.code == 7
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("exit_code", [124, 255])
+def test_plugin_errors_under_transport_exit_codes_are_not_retried(
+    monkeypatch, tmp_path: Path, exit_code: int
+):
+    output = _base_request() | {
+        "payload": {"result": "error", "output_data": {}},
+        "error": {"code": exit_code, "message": "gave up waiting for the service"},
+    }
+    failure = TransportResult(stdout=json.dumps(output), stderr="", exit_code=exit_code)
+    fake_transport, calls = _flaky_transport([failure] * 3)
+    monkeypatch.setattr(mediator, "run_remote_plugin_ssh", fake_transport)
+
+    result = mediator.execute_action(
+        action="noop",
+        node="n1",
+        plugin_path=tmp_path / "noop.sh",
+        payload=_with_retries(2),
+        transport="ssh",
+    )
+
+    assert result.error is not None and result.error.code == exit_code
+    assert len(calls) == 1
+    assert result.attempts[0]["retryable"] is False
+
+
+def test_partial_output_before_a_timeout_is_retried(monkeypatch, tmp_path: Path):
+    class TrackedResult(TransportResult):
+        closed: list[str] = []
+
+        def close(self) -> None:
+            self.closed.append(str(self.stdout))
+
+    partial = TrackedResult(stdout='{"message_metadata": {', stderr="", exit_code=124)
+    success = TrackedResult(stdout=_success_stdout(), stderr="", exit_code=0)
+    fake_transport, calls = _flaky_transport([partial, success])
+    monkeypatch.setattr(mediator, "run_remote_plugin_ssh", fake_transport)
+
+    result = mediator.execute_action(
+        action="noop",
+        node="n1",
+        plugin_path=tmp_path / "noop.sh",
+        payload=_with_retries(2),
+        transport="ssh",
+    )
+
+    assert result.status == "success"
+    assert len(calls) == 2
+    # The discarded attempt is closed before retrying, the final one after parsing.
+    assert TrackedResult.closed == [partial.stdout, success.stdout]
+
+
+def test_async_retries_back_off(monkeypatch, tmp_path: Path):
+    failure = TransportResult(stdout="", stderr="unreachable", exit_code=255)
+    success = TransportResult(stdout=_success_stdout(), stderr="", exit_code=0)
+    outcomes = [failure, failure, success]
+    delays: list[float] = []
+
+    async def fake_transport(**_: Any) -> TransportResult:
+        return outcomes.pop(0)
+
+    async def fake_sleep(delay: float) -> None:
+        delays.append(delay)
+
+    monkeypatch.setattr(mediator, "run_remote_plugin_ssh_async", fake_transport)
+    monkeypatch.setattr(mediator.asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(mediator.random, "uniform", lambda low, high: high)
+    payload = _base_request() | {"quality_of_service": {"max_retries": 3, "retry_delay_ms": 100}}
+
+    result = asyncio.run(
+        mediator.execute_action_async(
+            action="noop",
+            node="n1",
+            plugin_path=tmp_path / "noop.sh",
+            payload=payload,
+            transport="ssh",
+        )
+    )
+
+    assert result.status == "success"
+    assert delays == [0.1, 0.2]
+
+
+def test_backoff_is_capped_and_jittered(monkeypatch):
+    monkeypatch.setattr(mediator.random, "uniform", lambda low, high: low)
+    assert mediator._backoff_delay(1000, 1) == 0.5
+    assert mediator._backoff_delay(1000, 20) == mediator.MAX_RETRY_DELAY_MS / 2000
+
+
+def test_missing_or_invalid_quality_of_service_means_one_attempt():
+    assert mediator._retry_policy(_base_request()) == (0, 0)
+    assert mediator._retry_policy({"quality_of_service": {"max_retries": "x"}}) == (0, 0)
+    assert mediator._retry_policy({"quality_of_service": {"max_retries": 99}})[0] == 10
+
+
+def test_deadline_bounds_transport_timeout_and_retries(monkeypatch, tmp_path: Path):
+    timeouts: list[float | None] = []
+
+    def fake_transport(timeout: float | None = None, **_: Any) -> TransportResult:
+        timeouts.append(timeout)
+        return TransportResult(stdout="", stderr="unreachable", exit_code=255)
+
+    monkeypatch.setattr(mediator, "run_remote_plugin_ssh", fake_transport)
+    deadline_ms = int(time.time() * 1000) + 2_000
+    payload = _base_request() | {
+        "quality_of_service": {
+            "max_retries": 5,
+            "retry_delay_ms": 5_000,
+            "deadline_unix_ms": deadline_ms,
+        }
+    }
+
+    result = mediator.execute_action(
+        action="noop",
+        node="n1",
+        plugin_path=tmp_path / "noop.sh",
+        payload=payload,
+        transport="ssh",
+    )
+
+    # The first backoff (2.5-5 s) would overrun the 2 s budget, so no retry is attempted.
+    assert len(result.attempts) == 1
+    assert timeouts[0] is not None and 0 < timeouts[0] <= 2
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import gc
+import threading
+
+import pytest
+
+from rune import mediator, metrics, orchestrator
+from rune.metrics import MetricsRegistry, parse_textfile, write_textfile
+from rune.models import TransportResult
+from rune.rune_cli import main
+
+
+def test_counter_sums_thread_shards_and_retires_them():
+    registry = MetricsRegistry()
+    counter = registry.counter("test_events_total", "Events.", ("kind",))
+
+    def work() -> None:
+        for _ in range(1000):
+            counter.inc("a")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.inc("b", amount=2.5)
+    gc.collect()
+
+    assert counter.value("a") == 8000
+    assert counter.value("b") == 2.5
+    assert counter.value("missing") == 0
+    # Only the main thread's shard is still live; the workers' were folded into one.
+    assert len(counter._live) == 1
+
+
+def test_counter_rejects_wrong_label_count():
+    counter = MetricsRegistry().counter("test_total", "Test.", ("a", "b"))
+    with pytest.raises(ValueError, match="expects labels"):
+        counter.inc("only-one")
+
+
+def test_duplicate_registration_is_rejected():
+    registry = MetricsRegistry()
+    registry.counter("test_total", "Test.")
+    with pytest.raises(ValueError, match="already registered"):
+        registry.histogram("test_total", "Test.")
+
+
+def test_render_histogram_is_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "Latency.", ("op",), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, 'say "hi"')
+
+    assert histogram.count('say "hi"') == 4
+    assert registry.render().splitlines() == [
+        "# HELP test_seconds Latency.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{op="say \\"hi\\"",le="0.1"} 2',
+        'test_seconds_bucket{op="say \\"hi\\"",le="1"} 3',
+        'test_seconds_bucket{op="say \\"hi\\"",le="+Inf"} 4',
+        'test_seconds_sum{op="say \\"hi\\""} 3.65',
+        'test_seconds_count{op="say \\"hi\\""} 4',
+    ]
+
+
+def test_render_skips_metrics_without_samples():
+    registry = MetricsRegistry()
+    registry.counter("test_unused_total", "Unused.")
+    assert registry.render() == ""
+
+
+def test_write_textfile_adds_to_previous_totals(tmp_path):
+    path = tmp_path / "collector" / "rune.prom"
+    first = MetricsRegistry()
+    first.counter("test_runs_total", "Runs.", ("status",)).inc("success")
+    first.histogram("test_seconds", "Latency.", buckets=(1,)).observe(0.5)
+    write_textfile(path, first)
+
+    second = MetricsRegistry()
+    second.counter("test_runs_total", "Runs.", ("status",)).inc("success", amount=2)
+    second.counter("test_runs_total_unrelated", "Unrelated.")
+    second.histogram("test_seconds", "Latency.", buckets=(1,))
+    write_textfile(path, second)
+
+    text = path.read_text()
+    samples = parse_textfile(text)
+    assert samples['test_runs_total{status="success"}'] == 3
+    # Series only present in the file are kept with their HELP/TYPE header.
+    assert samples['test_seconds_bucket{le="1"}'] == 1
+    assert samples["test_seconds_count"] == 1
+    assert "# TYPE test_seconds histogram" in text
+    assert not list(tmp_path.glob("collector/.*.tmp"))
+
+
+def test_run_action_records_executions_and_duration():
+    before = metrics.ACTION_EXECUTIONS.value("noop", "ssh", "dry_run")
+    count_before = metrics.ACTION_DURATION.count("noop", "ssh")
+    orchestrator.run_action(action="noop", node="n", use_ssm=False, dry_run=True, params={})
+    assert metrics.ACTION_EXECUTIONS.value("noop", "ssh", "dry_run") == before + 1
+    assert metrics.ACTION_DURATION.count("noop", "ssh") == count_before + 1
+
+
+def test_mediator_records_transport_time_output_size_and_violations(monkeypatch):
+    monkeypatch.setattr(
+        mediator,
+        "run_remote_plugin_ssh",
+        lambda **_: TransportResult(stdout=b"not json", stderr="", exit_code=0),
+    )
+    violations = metrics.PROTOCOL_VIOLATIONS.value("malformed_json")
+    attempts = metrics.TRANSPORT_DURATION.count("ssh")
+    outputs = metrics.OUTPUT_BYTES.count("noop")
+
+    result = mediator.execute_action(
+        action="noop", node="n", plugin_path=orchestrator.PLUGINS_DIR, payload={}, transport="ssh"
+    )
+
+    assert result.error is not None
+    assert metrics.PROTOCOL_VIOLATIONS.value("malformed_json") == violations + 1
+    assert metrics.TRANSPORT_DURATION.count("ssh") == attempts + 1
+    assert metrics.OUTPUT_BYTES.count("noop") == outputs + 1
+
+
+def test_cli_writes_metrics_textfile(monkeypatch, tmp_path, capsys):
+    path = tmp_path / "rune.prom"
+    monkeypatch.setenv(metrics.TEXTFILE_ENV, str(path))
+    assert main(["run", "noop", "--node", "n", "--dry-run"]) == 0
+    capsys.readouterr()
+    samples = parse_textfile(path.read_text())
+    key = 'rune_action_executions_total{action="noop",transport="ssh",status="dry_run"}'
+    assert samples[key] >= 1
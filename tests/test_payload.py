@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+import pytest
+
+from rune import codec, orchestrator, payload
+from rune.mediator import MediatorResult
+from rune.payload import PayloadTemplate, encode_request, template_for, template_scope
+
+PARAMS = [
+    {},
+    {"service": "docker", "lines": 500, "paths": ["/var/log/syslog", "/var/log/kern.log"]},
+    {
+        "unicode": "héllo ✓ 😀",
+        "quote": 'say "hi"\n\t\\',
+        "nested": {"a": [1, 2.5, None, True]},
+    },
+    {"big": 2**70, "float": 1e16, "small": 1e-7},
+    {"looks_like_a_field": '"message_id"', "trace_id": "x"},
+]
+
+QOS = {"max_retries": 2, "retry_delay_ms": 250, "timeout_ms": 60000, "deadline_unix_ms": 1}
+
+
+@pytest.fixture(params=["orjson", "json"])
+def backend(request, monkeypatch):
+    if request.param == "orjson":
+        orjson = pytest.importorskip("orjson")
+        monkeypatch.setattr(codec, "_orjson", orjson)
+    else:
+        monkeypatch.setattr(codec, "_orjson", None)
+    return request.param
+
+
+@pytest.mark.parametrize("params", PARAMS)
+@pytest.mark.parametrize("quality_of_service", [None, QOS])
+def test_rendered_bytes_match_encoding_the_dict(backend, params, quality_of_service):
+    template = PayloadTemplate("gather-logs", params, quality_of_service)
+
+    for node in ["web-01", "i-0123456789abcdef0", 'odd "node"\\name', "nœud-✓", ""]:
+        request = template.render(node)
+        assert request.encoded == codec.dumps(dict(request))
+        assert request.encoded == codec.dumps(
+            {
+                "message_metadata": request["message_metadata"],
+                "routing": {
+                    "event_type": "gather-logs",
+                    "source_module": "orchestrator",
+                    "target_node": node,
+                },
+                "payload": {
+                    "schema_version": "rcs_v1",
+                    "content_type": "application/json",
+                    "data": {"input_parameters": params},
+                },
+                "observability": request["observability"],
+                **(
+                    {}
+                    if quality_of_service is None
+                    else {"quality_of_service": request["quality_of_service"]}
+                ),
+            }
+        )
+        assert encode_request(request) is request.encoded
+
+
+def test_each_render_gets_fresh_identifiers_and_deadline():
+    template = PayloadTemplate("noop", {"mode": "easy"}, QOS)
+
+    first, second = template.render("a"), template.render("b")
+
+    assert first["message_metadata"]["message_id"] != second["message_metadata"]["message_id"]
+    assert first["observability"]["span_id"] != second["observability"]["span_id"]
+    assert first["quality_of_service"]["deadline_unix_ms"] > QOS["deadline_unix_ms"]
+    assert first["quality_of_service"]["timeout_ms"] == 60000
+    assert codec.loads(second.encoded)["routing"]["target_node"] == "b"
+
+
+def test_editing_one_rendered_request_leaves_the_others_alone():
+    params = {"mode": "easy"}
+    template = PayloadTemplate("noop", params, QOS)
+    first, second = template.render("a"), template.render("b")
+
+    first["payload"]["data"]["input_parameters"]["mode"] = "hard"
+    first["payload"]["data"]["extra"] = True
+    first["quality_of_service"]["max_retries"] = 9
+    first["routing"]["target_node"] = "z"
+    third = template.render("c")
+
+    assert params == {"mode": "easy"}
+    for request in (second, third):
+        assert request["payload"]["data"] == {"input_parameters": {"mode": "easy"}}
+        assert request["quality_of_service"]["max_retries"] == 2
+        assert codec.loads(request.encoded) == dict(request)
+    assert second["routing"]["target_node"] == "b"
+
+
+def test_templates_are_shared_within_a_scope_only():
+    params = {"mode": "easy"}
+
+    assert template_for("noop", params) is not template_for("noop", params)
+    with template_scope():
+        shared = template_for("noop", params, QOS)
+        assert template_for("noop", params, {**QOS, "deadline_unix_ms": 2}) is shared
+        assert template_for("noop", dict(params), QOS) is not shared
+        assert template_for("noop", params, {**QOS, "max_retries": 0}) is not shared
+        assert template_for("other", params, QOS) is not shared
+    assert template_for("noop", params, QOS) is not shared
+
+
+def test_plain_dicts_are_encoded_with_the_codec():
+    assert encode_request({"a": 1}) == b'{"a":1}'
+
+
+def test_fanout_encodes_the_parameters_once(monkeypatch):
+    built: list[PayloadTemplate] = []
+    sent: list[bytes] = []
+
+    class CountingTemplate(PayloadTemplate):
+        def __init__(self, *args: Any) -> None:
+            super().__init__(*args)
+            built.append(self)
+
+    async def fake_execute_action(**kwargs: Any) -> MediatorResult:
+        sent.append(encode_request(kwargs["payload"]))
+        await asyncio.sleep(0)
+        return MediatorResult(
+            status="success",
+            action="noop",
+            node=kwargs["node"],
+            transport="ssh",
+            plugin_output={"payload": {"result": "success"}},
+            error=None,
+        )
+
+    monkeypatch.setattr(payload, "PayloadTemplate", CountingTemplate)
+    monkeypatch.setattr(orchestrator, "execute_action_async", fake_execute_action)
+    nodes = [f"n{index}" for index in range(20)]
+
+    fanout = orchestrator.run_action_fanout(
+        action="noop", nodes=nodes, use_ssm=False, dry_run=False, params={"mode": "easy"}
+    )
+
+    assert fanout.summary()["succeeded"] == 20
+    assert len(built) == 1
+    assert [codec.loads(body)["routing"]["target_node"] for body in sent] == nodes
+    message_ids = {codec.loads(body)["message_metadata"]["message_id"] for body in sent}
+    assert message_ids == {result.message_metadata["message_id"] for result in fanout.results}
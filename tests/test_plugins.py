@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import json
 import subprocess
+import time
 from pathlib import Path
 
 import pytest
@@ -62,3 +63,129 @@ def test_plugin_executes(plugin: str, tmp_path: Path):
         assert output["payload"]["output_data"]["entries_collected"] >= 1
     if plugin == "noop.sh":
         assert output["payload"]["output_data"]["input_parameters"] == params
+
+
+FIXTURES = sorted(Path("plugins/tests").glob("noop_input_*.json"))
+
+
+@pytest.mark.parametrize("fixture", FIXTURES, ids=lambda path: path.stem)
+def test_noop_fixtures(fixture: Path):
+    request = json.loads(fixture.read_text())
+    result = subprocess.run(
+        ["bash", "plugins/noop.sh"],
+        input=fixture.read_text(),
+        text=True,
+        capture_output=True,
+        check=False,
+    )
+    output = json.loads(result.stdout)
+    assert output["message_metadata"] == request["message_metadata"]
+    assert output["observability"] == request["observability"]
+    if request["payload"]["input_parameters"]["fail"] == "true":
+        assert result.returncode == 3
+        assert output["payload"] is None
+        assert output["error"]["code"] == 3
+    else:
+        assert result.returncode == 0
+        data = output["payload"]["output_data"]
+        assert data["input_parameters"] == request["payload"]["input_parameters"]
+        assert data["context"] == request["payload"]["context"]
+        assert data["echo"]["correlation_id"] == request["message_metadata"]["correlation_id"]
+
+
+def _run_library(script: str, request: object) -> subprocess.CompletedProcess[str]:
+    library = Path("plugins/lib/rune_bpcs.sh").resolve()
+    return subprocess.run(
+        ["bash", "-c", f"source {library}\nrune_init\n{script}"],
+        input=request if isinstance(request, str) else json.dumps(request),
+        text=True,
+        capture_output=True,
+        check=False,
+    )
+
+
+def test_bpcs_lookups():
+    request = {
+        "message_metadata": {"message_id": "m1"},
+        "payload": {
+            "input_parameters": {
+                "text": "two\nlines",
+                "flag": True,
+                "off": False,
+                "nothing": None,
+                "num": 1.5,
+                "obj": {"a": [1, 2]},
+            },
+            "context": {"node": "local"},
+        },
+        "observability": {"trace_id": "t1"},
+    }
+    script = """
+for key in text flag off nothing num obj missing; do
+  printf '%s|%s|%s\\0' "$key" "$(rune_param "$key" dflt)" "$(rune_param_json "$key" '{ "d": 1 }')"
+done
+printf 'ctx|%s|%s\\0' "$(rune_ctx node x)" "$(rune_ctx_json missing)"
+printf 'meta|%s|%s\\0' "$(rune_meta message_id x)" "$(rune_meta trace_id x)"
+printf 'obs|%s|%s\\0' "$(rune_obs trace_id x)" "$(rune_obs missing x)"
+"""
+    result = _run_library(script, request)
+    assert result.returncode == 0, result.stderr
+    rows = {row.split("|")[0]: row.split("|")[1:] for row in result.stdout.split("\0") if row}
+    assert rows["text"] == ["two\nlines", '"two\\nlines"']
+    assert rows["flag"] == ["true", "true"]
+    # Matches jq's `//` operator: false and null fall back to the default.
+    assert rows["off"] == ["dflt", '{"d":1}']
+    assert rows["nothing"] == ["dflt", '{"d":1}']
+    assert rows["num"] == ["1.5", "1.5"]
+    assert rows["obj"] == ['{"a":[1,2]}', '{"a":[1,2]}']
+    assert rows["missing"] == ["dflt", '{"d":1}']
+    assert rows["ctx"] == ["local", "null"]
+    assert rows["meta"] == ["m1", "t1"]
+    assert rows["obs"] == ["t1", "x"]
+
+
+def test_bpcs_finish_builds_output_from_accumulator():
+    script = 'rune_out service sshd; rune_out "note=a=b"; rune_finish "done"'
+    result = _run_library(script, {"payload": {}})
+    assert result.returncode == 0, result.stderr
+    output = json.loads(result.stdout)
+    assert output["payload"]["output_data"] == {
+        "service": "sshd",
+        "note": "a=b",
+        "message": "done",
+    }
+    assert output["message_metadata"]["message_id"]
+    assert output["observability"]["trace_id"].startswith("trace-")
+
+
+def test_bpcs_finish_reports_recorded_error():
+    script = "rune_out step restart; rune_err 2 restart failed; rune_finish"
+    result = _run_library(script, {"payload": {}})
+    assert result.returncode == 2
+    output = json.loads(result.stdout)
+    assert output["payload"] is None
+    assert output["error"] == {
+        "code": 2,
+        "message": "restart failed",
+        "details": {"step": "restart"},
+    }
+
+
+@pytest.mark.parametrize("raw", ["", "[1]", "not json"])
+def test_bpcs_init_rejects_invalid_input(raw: str):
+    result = _run_library("rune_ok fine", raw)
+    assert result.returncode == 1
+    assert json.loads(result.stdout)["error"]["message"].startswith("Invalid input")
+
+
+def test_bpcs_remaining_ms_tracks_deadline():
+    deadline_ms = int(time.time() * 1000) + 60_000
+    future = _run_library(
+        "rune_remaining_ms", {"quality_of_service": {"deadline_unix_ms": deadline_ms}}
+    )
+    past = _run_library("rune_remaining_ms", {"quality_of_service": {"deadline_unix_ms": 1}})
+    unset = _run_library("rune_remaining_ms; rune_param missing dflt", {"payload": {}})
+
+    assert 50_000 < int(future.stdout) <= 60_000
+    assert past.stdout == "0\n"
+    assert unset.stdout == "dflt\n"
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from rune import orchestrator, registry
+
+HEADER = """#!/usr/bin/env bash
+# rune:action {name}
+# rune:description Restart a systemd unit.
+# rune:version 1.2.0
+# rune:timeout 45
+# rune:param service string required Unit to restart.
+# rune:param wait boolean
+set -euo pipefail
+# rune:action ignored-after-header
+"""
+
+
+def _plugin(directory: Path, filename: str, name: str) -> Path:
+    path = directory / filename
+    path.write_text(HEADER.format(name=name))
+    return path
+
+
+def test_parse_plugin_header(tmp_path: Path):
+    plugin = _plugin(tmp_path, "restart.sh", "restart-service")
+
+    assert registry.parse_plugin_header(plugin) == {
+        "name": "restart-service",
+        "description": "Restart a systemd unit.",
+        "version": "1.2.0",
+        "timeout": 45.0,
+        "params": {
+            "service": {"type": "string", "required": True, "description": "Unit to restart."},
+            "wait": {"type": "boolean", "required": False, "description": ""},
+        },
+        "idempotent": False,
+        "cache_ttl": None,
+        "max_retries": 0,
+        "retry_delay_ms": 1000,
+    }
+
+
+def test_parse_cache_policy(tmp_path: Path):
+    plugin = tmp_path / "diag.sh"
+    plugin.write_text(
+        "#!/bin/bash\n# rune:action diag\n# rune:idempotent true\n# rune:cache-ttl 120\n"
+    )
+
+    header = registry.parse_plugin_header(plugin)
+
+    assert header is not None
+    assert (header["idempotent"], header["cache_ttl"]) == (True, 120.0)
+
+
+def test_files_without_action_header_are_not_plugins(tmp_path: Path):
+    library = tmp_path / "helpers.sh"
+    library.write_text("#!/usr/bin/env bash\n# shared helpers\nhelper() { :; }\n")
+
+    assert registry.parse_plugin_header(library) is None
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "# rune:timeout soon",
+        "# rune:cache-ttl 0",
+        "# rune:idempotent yes",
+        "# rune:max-retries -1",
+        "# rune:param count int",
+        "# rune:param lonely",
+        "# rune:owner ops",
+    ],
+)
+def test_malformed_headers_skip_the_plugin_with_a_warning(tmp_path: Path, line: str):
+    (tmp_path / "bad.sh").write_text(f"#!/bin/bash\n# rune:action bad\n{line}\n")
+    _plugin(tmp_path, "good.sh", "good")
+
+    with pytest.warns(RuntimeWarning, match="bad.sh"):
+        actions = registry.discover_actions([tmp_path])
+
+    assert list(actions) == ["good"]
+
+
+def test_earlier_directories_take_precedence(tmp_path: Path):
+    first, second = tmp_path / "first", tmp_path / "second"
+    first.mkdir()
+    second.mkdir()
+    _plugin(first, "a.sh", "shared")
+    _plugin(second, "b.sh", "shared")
+    _plugin(second, "c.sh", "only-second")
+
+    actions = registry.discover_actions([first, second])
+
+    assert actions["shared"].plugin_path == first / "a.sh"
+    assert list(actions) == ["only-second", "shared"]
+
+
+def test_manifest_cache_skips_parsing_unchanged_plugins(monkeypatch, tmp_path: Path):
+    plugins = tmp_path / "plugins"
+    plugins.mkdir()
+    _plugin(plugins, "one.sh", "one")
+    cache = tmp_path / "cache" / "manifest.json"
+
+    first = registry.discover_actions([plugins], cache)
+    assert json.loads(cache.read_text())["directories"][str(plugins)]["files"]["one.sh"]
+
+    def fail_parse(path: Path) -> None:
+        raise AssertionError(f"{path} should have come from the manifest cache")
+
+    monkeypatch.setattr(registry, "parse_plugin_header", fail_parse)
+    assert registry.discover_actions([plugins], cache) == first
+
+
+def test_manifest_cache_picks_up_new_and_modified_plugins(tmp_path: Path):
+    plugins = tmp_path / "plugins"
+    plugins.mkdir()
+    one = _plugin(plugins, "one.sh", "one")
+    cache = tmp_path / "manifest.json"
+    registry.discover_actions([plugins], cache)
+
+    one.write_text(HEADER.format(name="renamed") + "# grew\n")
+    _plugin(plugins, "two.sh", "two")
+    os.utime(plugins, ns=(1, 1))
+
+    assert list(registry.discover_actions([plugins], cache)) == ["renamed", "two"]
+
+
+def test_unwritable_cache_still_discovers(tmp_path: Path):
+    _plugin(tmp_path, "one.sh", "one")
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_text("")
+
+    actions = registry.discover_actions([tmp_path], blocker / "manifest.json")
+
+    assert list(actions) == ["one"]
+
+
+def test_plugin_path_env_extends_registry(monkeypatch, tmp_path: Path):
+    extra = tmp_path / "extra"
+    extra.mkdir()
+    _plugin(extra, "restart.sh", "restart-service")
+    monkeypatch.setenv(registry.PLUGIN_PATH_ENV, str(extra))
+    monkeypatch.setenv(registry.MANIFEST_CACHE_ENV, str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(registry, "_REGISTRY", None)
+
+    names = [action.name for action in orchestrator.list_actions()]
+
+    assert names == ["gather-logs", "noop", "restart-service"]
+    assert orchestrator.ACTION_REGISTRY["restart-service"].timeout == 45.0
+
+
+def test_gather_logs_is_cacheable():
+    header = registry.parse_plugin_header(registry.PLUGINS_DIR / "gather-logs.sh")
+
+    assert header is not None
+    assert (header["idempotent"], header["cache_ttl"]) == (True, 300.0)
+    metadata = registry.discover_actions([registry.PLUGINS_DIR])["gather-logs"]
+    assert orchestrator._cache_key_for(metadata, "n", "ssh", {}, use_cache=True) is not None
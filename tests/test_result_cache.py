@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from rune import orchestrator, registry, result_cache
+from rune.models import ActionMetadata, MediatorResult, build_message_metadata, build_observability
+from rune.result_cache import ResultCache, cache_key
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cache_key_ignores_param_order():
+    assert cache_key("a", "n", "ssh", {"x": 1, "y": [1, 2]}) == cache_key(
+        "a", "n", "ssh", {"y": [1, 2], "x": 1}
+    )
+    assert cache_key("a", "n", "ssh", {}) != cache_key("a", "n", "ssm", {})
+    assert cache_key("a", "n1", "ssh", {}) != cache_key("a", "n2", "ssh", {})
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = ResultCache(clock=clock)
+    cache.put("k", "success", {"out": 1}, ttl=10)
+
+    clock.now += 9.9
+    assert cache.get("k") is not None
+    clock.now += 0.1
+    assert cache.get("k") is None
+    assert len(cache) == 0
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", "success", None, ttl=60)
+    cache.put("b", "success", None, ttl=60)
+    assert cache.get("a") is not None
+
+    cache.put("c", "success", None, ttl=60)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_disk_entries_are_shared_between_instances(tmp_path: Path):
+    ResultCache(directory=tmp_path).put("k", "success", {"out": 1}, ttl=60)
+
+    entry = ResultCache(directory=tmp_path).get("k")
+
+    assert entry is not None
+    assert entry.plugin_output == {"out": 1}
+
+
+@pytest.mark.parametrize("raw", ["lots", "-5", "0"])
+def test_invalid_cache_size_falls_back_to_the_default(monkeypatch, raw: str):
+    monkeypatch.setenv(result_cache.CACHE_SIZE_ENV, raw)
+    monkeypatch.delenv(result_cache.CACHE_DIR_ENV, raising=False)
+    result_cache.set_default_cache(None)
+    try:
+        with pytest.warns(RuntimeWarning, match=result_cache.CACHE_SIZE_ENV):
+            cache = result_cache.get_default_cache()
+        assert cache.max_entries == result_cache.DEFAULT_MAX_ENTRIES
+    finally:
+        result_cache.set_default_cache(None)
+
+    monkeypatch.setenv(result_cache.CACHE_SIZE_ENV, "7")
+    try:
+        assert result_cache.get_default_cache().max_entries == 7
+    finally:
+        result_cache.set_default_cache(None)
+
+
+def test_disk_prunes_oldest_and_drops_corrupt_entries(tmp_path: Path):
+    cache = ResultCache(directory=tmp_path, max_disk_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, "success", None, ttl=60)
+    assert sorted(path.stem for path in tmp_path.glob("*.json")) == ["b", "c"]
+
+    (tmp_path / "b.json").write_text("{not json")
+    assert ResultCache(directory=tmp_path).get("b") is None
+    assert not (tmp_path / "b.json").exists()
+
+
+@pytest.fixture
+def cached_actions(monkeypatch, tmp_path: Path) -> dict[str, ActionMetadata]:
+    actions = {
+        "diag": ActionMetadata(
+            name="diag",
+            description="Read-only diagnostic",
+            plugin_path=tmp_path / "diag.sh",
+            idempotent=True,
+            cache_ttl=300,
+        ),
+        "restart": ActionMetadata(
+            name="restart",
+            description="Mutating action",
+            plugin_path=tmp_path / "restart.sh",
+            cache_ttl=300,
+        ),
+    }
+    monkeypatch.setattr(registry, "_REGISTRY", actions)
+    monkeypatch.setattr(result_cache, "_DEFAULT_CACHE", ResultCache())
+    return actions
+
+
+def _counting_mediator(monkeypatch, status: str = "success") -> list[str]:
+    calls: list[str] = []
+
+    def fake_execute_action(action: str, node: str, **_: Any) -> MediatorResult:
+        calls.append(action)
+        return MediatorResult(
+            status=status,
+            action=action,
+            node=node,
+            transport="ssh",
+            plugin_output={
+                "message_metadata": build_message_metadata(),
+                "observability": build_observability(),
+                "payload": {"result": "success", "output_data": {"call": len(calls)}},
+                "error": None,
+            },
+            error=None,
+        )
+
+    monkeypatch.setattr(orchestrator, "execute_action", fake_execute_action)
+    return calls
+
+
+def _run(action: str, use_cache: bool = True, **params: Any):
+    return orchestrator.run_action(
+        action=action, node="n1", use_ssm=False, dry_run=False, params=params, use_cache=use_cache
+    )
+
+
+def test_idempotent_action_hits_cache(monkeypatch, cached_actions):
+    calls = _counting_mediator(monkeypatch)
+
+    first = _run("diag", lines="10")
+    second = _run("diag", lines="10")
+
+    assert calls == ["diag"]
+    key = second.observability["cache"]["key"]
+    assert first.observability["cache"] == {"hit": False, "key": key, "stored": True}
+    assert second.observability["cache"]["hit"] is True
+    assert second.plugin_output == first.plugin_output
+    assert second.message_metadata["message_id"] != first.message_metadata["message_id"]
+
+
+def test_mutating_a_result_does_not_alter_the_cache(monkeypatch, cached_actions):
+    _counting_mediator(monkeypatch)
+
+    first = _run("diag", lines="10")
+    first.plugin_output["payload"]["output_data"]["call"] = "leader"
+    second = _run("diag", lines="10")
+    second.plugin_output["payload"]["output_data"]["call"] = "hit"
+    third = _run("diag", lines="10")
+
+    assert third.observability["cache"]["hit"] is True
+    assert third.plugin_output["payload"]["output_data"] == {"call": 1}
+
+
+def test_cache_is_opt_in_and_keyed_by_params(monkeypatch, cached_actions):
+    calls = _counting_mediator(monkeypatch)
+
+    _run("diag", lines="10")
+    uncached = _run("diag", use_cache=False, lines="10")
+    _run("diag", lines="20")
+
+    assert calls == ["diag", "diag", "diag"]
+    assert "cache" not in uncached.observability
+
+
+def test_mutating_actions_and_failures_are_never_cached(monkeypatch, cached_actions):
+    calls = _counting_mediator(monkeypatch, status="failed")
+
+    _run("restart")
+    _run("restart")
+    _run("diag")
+    failed = _run("diag")
+
+    assert calls == ["restart", "restart", "diag", "diag"]
+    assert failed.observability["cache"]["stored"] is False
@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import http.client
+import json
+import socket
+import threading
+from typing import Any
+
+import pytest
+
+import rune.rune_cli as rune_cli
+from rune import server as server_module
+from rune.models import OrchestrationResult
+from rune.rune_cli import main
+from rune.server import RuneServer
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path: str) -> None:
+        super().__init__("localhost")
+        self._path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self._path)
+
+
+def _connect(server: RuneServer) -> http.client.HTTPConnection:
+    address = server.address
+    if isinstance(address, str):
+        return _UnixConnection(address)
+    return http.client.HTTPConnection(*address, timeout=10)
+
+
+def _request(
+    connection: http.client.HTTPConnection, method: str, path: str, body: Any = None
+) -> tuple[int, dict[str, Any]]:
+    encoded = None if body is None else json.dumps(body).encode()
+    connection.request(method, path, body=encoded)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def _start(server: RuneServer) -> threading.Thread:
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+@pytest.fixture
+def running_server():
+    server = RuneServer(("127.0.0.1", 0), drain_timeout=5)
+    thread = _start(server)
+    yield server
+    server.shutdown()
+    thread.join(timeout=5)
+
+
+def test_health_and_actions(running_server):
+    connection = _connect(running_server)
+    status, health = _request(connection, "GET", "/v1/health")
+    assert status == 200
+    assert health["status"] == "ok"
+    assert health["in_flight"] == 0
+
+    # Same keep-alive connection serves the next request.
+    status, document = _request(connection, "GET", "/v1/actions")
+    assert status == 200
+    by_name = {action["name"]: action for action in document["actions"]}
+    assert by_name["noop"]["plugin_path"].endswith("noop.sh")
+
+
+def test_metrics_endpoint(running_server):
+    connection = _connect(running_server)
+    _request(connection, "POST", "/v1/run", {"action": "noop", "node": "a", "dry_run": True})
+    connection.request("GET", "/metrics")
+    response = connection.getresponse()
+    assert response.status == 200
+    assert response.getheader("Content-Type").startswith("text/plain; version=0.0.4")
+    text = response.read().decode()
+    assert "# TYPE rune_action_executions_total counter" in text
+    assert 'rune_action_executions_total{action="noop",transport="ssh",status="dry_run"}' in text
+
+
+def test_run_dry_run_and_fanout(running_server):
+    connection = _connect(running_server)
+    status, result = _request(
+        connection,
+        "POST",
+        "/v1/run",
+        {"action": "noop", "node": "alpha", "dry_run": True, "params": {"key": "value"}},
+    )
+    assert status == 200
+    assert result["status"] == "dry_run"
+    assert result["node"] == "alpha"
+
+    status, fanout = _request(
+        connection,
+        "POST",
+        "/v1/run",
+        {"action": "noop", "nodes": ["alpha", "beta", "alpha"], "dry_run": True},
+    )
+    assert status == 200
+    assert [entry["node"] for entry in fanout["results"]] == ["alpha", "beta"]
+    assert fanout["summary"]["failed"] == 0
+
+
+def test_run_executes_plugin(running_server):
+    status, result = _request(
+        _connect(running_server), "POST", "/v1/run", {"action": "noop", "node": "localhost"}
+    )
+    assert status == 200
+    assert result["status"] == "success"
+
+
+@pytest.mark.parametrize(
+    ("body", "message"),
+    [
+        ([], "JSON object"),
+        ({"node": "alpha"}, "'action'"),
+        ({"action": "noop"}, "exactly one of"),
+        ({"action": "noop", "node": "a", "nodes": ["b"]}, "exactly one of"),
+        ({"action": "noop", "node": "a", "dry_run": "yes"}, "'dry_run'"),
+        ({"action": "noop", "node": "a", "max_retries": -1}, "'max_retries'"),
+        ({"action": "noop", "nodes": ["a"], "concurrency": 0}, "'concurrency'"),
+        ({"action": "noop", "node": "a", "verbose": True}, "unknown fields: verbose"),
+    ],
+)
+def test_run_rejects_invalid_requests(running_server, body, message):
+    status, document = _request(_connect(running_server), "POST", "/v1/run", body)
+    assert status == 400
+    assert document["error"]["code"] == 400
+    assert message in document["error"]["message"]
+
+
+def test_unknown_route_and_method(running_server):
+    connection = _connect(running_server)
+    assert _request(connection, "GET", "/v1/nope")[0] == 404
+    assert _request(connection, "GET", "/v1/run")[0] == 405
+
+    connection.request("POST", "/v1/run", body=b"{not json")
+    response = connection.getresponse()
+    assert response.status == 400
+    assert "not valid JSON" in json.loads(response.read())["error"]["message"]
+
+
+def test_reload_rediscovers_plugins(running_server, monkeypatch, tmp_path):
+    plugin = tmp_path / "extra.sh"
+    plugin.write_text("#!/usr/bin/env bash\n# rune:action extra-action\n")
+    monkeypatch.setenv("RUNE_PLUGIN_PATH", str(tmp_path))
+    monkeypatch.setenv("RUNE_MANIFEST_CACHE", str(tmp_path / "manifest.json"))
+
+    connection = _connect(running_server)
+    status, _ = _request(connection, "POST", "/v1/reload")
+    assert status == 200
+    _, document = _request(connection, "GET", "/v1/actions")
+    assert "extra-action" in {action["name"] for action in document["actions"]}
+
+    monkeypatch.delenv("RUNE_PLUGIN_PATH")
+    _request(connection, "POST", "/v1/reload")
+
+
+def test_shutdown_drains_in_flight_requests(monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_run_action(**kwargs: Any) -> OrchestrationResult:
+        started.set()
+        release.wait(timeout=5)
+        return OrchestrationResult(
+            status="success",
+            action=kwargs["action"],
+            node=kwargs["node"],
+            transport="ssh",
+            message_metadata={},
+            observability={},
+            plugin_output=None,
+            error=None,
+        )
+
+    monkeypatch.setattr(server_module, "run_action", slow_run_action)
+    server = RuneServer(("127.0.0.1", 0), drain_timeout=5)
+    serving = _start(server)
+
+    in_flight: dict[str, Any] = {}
+    draining = _connect(server)
+    _request(draining, "GET", "/v1/health")
+
+    def client() -> None:
+        in_flight["response"] = _request(
+            _connect(server), "POST", "/v1/run", {"action": "noop", "node": "alpha"}
+        )
+
+    requester = threading.Thread(target=client)
+    requester.start()
+    assert started.wait(timeout=5)
+
+    drained: list[bool] = []
+    stopper = threading.Thread(target=lambda: drained.append(server.shutdown()))
+    stopper.start()
+    stopper.join(timeout=0.3)
+    assert stopper.is_alive()
+
+    # Connections already open are told to go away instead of starting new work.
+    status, document = _request(draining, "GET", "/v1/actions")
+    assert status == 503
+    assert document["error"]["code"] == 503
+
+    release.set()
+    requester.join(timeout=5)
+    stopper.join(timeout=5)
+    serving.join(timeout=5)
+    assert drained == [True]
+    assert in_flight["response"][0] == 200
+    assert in_flight["response"][1]["status"] == "success"
+    assert not serving.is_alive()
+
+
+def test_shutdown_reports_requests_still_running_after_drain_timeout(monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+
+    def stuck_run_action(**_: Any) -> OrchestrationResult:
+        started.set()
+        release.wait(timeout=5)
+        raise RuntimeError("released")
+
+    monkeypatch.setattr(server_module, "run_action", stuck_run_action)
+    server = RuneServer(("127.0.0.1", 0), drain_timeout=0.1)
+    serving = _start(server)
+
+    def client() -> None:
+        try:
+            _request(_connect(server), "POST", "/v1/run", {"action": "noop", "node": "alpha"})
+        except (OSError, http.client.HTTPException):
+            pass
+
+    requester = threading.Thread(target=client, daemon=True)
+    requester.start()
+    assert started.wait(timeout=5)
+    try:
+        assert server.shutdown() is False
+    finally:
+        release.set()
+    serving.join(timeout=5)
+
+
+def test_unix_socket_server(tmp_path):
+    path = tmp_path / "rune.sock"
+    server = RuneServer(path)
+    serving = _start(server)
+    try:
+        assert server.url == f"unix:{path}"
+        assert path.stat().st_mode & 0o777 == 0o600
+        status, health = _request(_connect(server), "GET", "/v1/health")
+        assert status == 200
+        assert health["status"] == "ok"
+    finally:
+        server.shutdown()
+        serving.join(timeout=5)
+    assert not path.exists()
+
+
+def test_unix_socket_replaces_stale_socket_but_not_live_one(tmp_path):
+    path = tmp_path / "rune.sock"
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(str(path))
+    stale.close()
+
+    server = RuneServer(path)
+    try:
+        with pytest.raises(OSError, match="already listening"):
+            RuneServer(path)
+    finally:
+        server.shutdown()
+
+
+def test_cli_serve_builds_address(monkeypatch, tmp_path, capsys):
+    calls: list[tuple[Any, dict[str, Any]]] = []
+    monkeypatch.setattr(server_module, "serve", lambda address, **kw: calls.append((address, kw)))
+
+    main(["serve"])
+    main(["serve", "--port", "9000", "--drain-timeout", "2.5", "--access-log"])
+    main(["serve", "--socket", str(tmp_path / "rune.sock")])
+    assert calls == [
+        (("127.0.0.1", 8470), {"drain_timeout": 30.0, "access_log": False}),
+        (("127.0.0.1", 9000), {"drain_timeout": 2.5, "access_log": True}),
+        (tmp_path / "rune.sock", {"drain_timeout": 30.0, "access_log": False}),
+    ]
+
+    assert rune_cli.main(["serve", "--socket", "x.sock", "--port", "1"]) == 2
+    assert "cannot be combined" in capsys.readouterr().err
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Any
+
+import pytest
+
+from rune import orchestrator
+from rune.models import MediatorResult, build_message_metadata, build_observability
+from rune.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_threads_share_one_execution():
+    flight: SingleFlight[int] = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow() -> int:
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 42
+
+    results: list[tuple[int, bool]] = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", slow)))
+    leader.start()
+    started.wait(5)
+    followers = [
+        threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(3)
+    ]
+    for follower in followers:
+        follower.start()
+    while flight._calls["k"].waiters < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert calls == [1]
+    assert sorted(results) == [(42, False), (42, True), (42, True), (42, True)]
+    assert len(flight) == 0
+    assert flight.do("k", lambda: 7) == (7, False)
+
+
+def test_thread_followers_receive_leader_exception():
+    flight: SingleFlight[int] = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    errors: list[BaseException] = []
+
+    def boom() -> int:
+        started.set()
+        release.wait(5)
+        raise RuntimeError("transport exploded")
+
+    def call() -> None:
+        try:
+            flight.do("k", boom)
+        except RuntimeError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    started.wait(5)
+    threads.append(threading.Thread(target=call))
+    threads[1].start()
+    while flight._calls["k"].waiters < 1:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert [str(error) for error in errors] == ["transport exploded"] * 2
+
+
+def test_async_callers_share_one_execution():
+    flight: AsyncSingleFlight[str] = AsyncSingleFlight()
+    calls = []
+
+    async def slow(value: str) -> str:
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    async def scenario() -> list[tuple[str, bool]]:
+        return await asyncio.gather(
+            flight.do("a", lambda: slow("a")),
+            flight.do("a", lambda: slow("a")),
+            flight.do("b", lambda: slow("b")),
+        )
+
+    assert asyncio.run(scenario()) == [("a", False), ("a", True), ("b", False)]
+    assert calls == ["a", "b"]
+    assert len(flight) == 0
+
+
+def test_async_followers_receive_leader_exception():
+    flight: AsyncSingleFlight[str] = AsyncSingleFlight()
+
+    async def boom() -> str:
+        await asyncio.sleep(0.01)
+        raise RuntimeError("transport exploded")
+
+    async def scenario() -> list[Any]:
+        return await asyncio.gather(
+            flight.do("k", boom), flight.do("k", boom), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+    assert [str(result) for result in results] == ["transport exploded"] * 2
+
+
+def test_cancelled_async_leader_hands_the_call_to_a_follower():
+    flight: AsyncSingleFlight[str] = AsyncSingleFlight()
+    calls = []
+
+    async def slow() -> str:
+        calls.append("k")
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def scenario() -> tuple[Any, ...]:
+        leader = asyncio.create_task(flight.do("k", slow))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(flight.do("k", slow)) for _ in range(2)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await asyncio.gather(leader, *followers, return_exceptions=True)
+
+    cancelled, *results = asyncio.run(scenario())
+    assert isinstance(cancelled, asyncio.CancelledError)
+    assert sorted(results) == [("value", False), ("value", True)]
+    assert calls == ["k", "k"]
+    assert len(flight) == 0
+
+
+def _counting_async_mediator(monkeypatch) -> list[str]:
+    calls: list[str] = []
+
+    async def fake_execute_action_async(action: str, node: str, **_: Any) -> MediatorResult:
+        calls.append(node)
+        await asyncio.sleep(0.01)
+        return MediatorResult(
+            status="success",
+            action=action,
+            node=node,
+            transport="ssh",
+            plugin_output={
+                "message_metadata": build_message_metadata(),
+                "observability": build_observability(),
+                "payload": {"result": "success", "output_data": {}},
+                "error": None,
+            },
+            error=None,
+            attempts=[{"attempt": 1, "exit_code": 0}],
+        )
+
+    monkeypatch.setattr(orchestrator, "execute_action_async", fake_execute_action_async)
+    return calls
+
+
+def _run_async(node: str = "n1", **params: Any):
+    return orchestrator.run_action_async(
+        action="noop", node=node, use_ssm=False, dry_run=False, params=params
+    )
+
+
+def test_identical_in_flight_actions_are_coalesced(monkeypatch):
+    calls = _counting_async_mediator(monkeypatch)
+
+    async def storm():
+        return await asyncio.gather(*(_run_async(mode="easy") for _ in range(20)))
+
+    results = asyncio.run(storm())
+
+    assert calls == ["n1"]
+    leader, *followers = results
+    leader_id = leader.message_metadata["message_id"]
+    assert "coalesced_with" not in leader.observability
+    assert {result.observability["coalesced_with"] for result in followers} == {leader_id}
+    assert len({result.message_metadata["message_id"] for result in results}) == 20
+    assert all(result.plugin_output == leader.plugin_output for result in followers)
+
+    # Every caller owns its result: changing one leaves the others untouched.
+    followers[0].plugin_output["payload"]["output_data"]["mutated"] = True
+    followers[0].observability["attempts"][0]["exit_code"] = 99
+    for result in [leader, *followers[1:]]:
+        assert result.plugin_output["payload"]["output_data"] == {}
+        assert result.observability["attempts"] == [{"attempt": 1, "exit_code": 0}]
+
+
+@pytest.mark.parametrize(
+    "other",
+    [
+        {"node": "n2", "mode": "easy"},
+        {"node": "n1", "mode": "advanced"},
+    ],
+)
+def test_different_requests_are_not_coalesced(monkeypatch, other):
+    calls = _counting_async_mediator(monkeypatch)
+
+    async def pair():
+        return await asyncio.gather(_run_async(mode="easy"), _run_async(**other))
+
+    asyncio.run(pair())
+
+    assert len(calls) == 2
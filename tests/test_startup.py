@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+# Generous enough for a loaded CI runner; the CLI currently imports in ~30 ms.
+STARTUP_BUDGET_MS = float(os.environ.get("RUNE_STARTUP_BUDGET_MS", "150"))
+
+TRANSPORT_MODULES = {"rune.mediator", "rune.transport_ssh", "rune.transport_ssm", "rune.bundle"}
+
+PROBE = """
+import io, json, sys, time
+from contextlib import redirect_stdout
+
+started = time.perf_counter()
+from rune.rune_cli import main
+import_ms = (time.perf_counter() - started) * 1000
+
+with redirect_stdout(io.StringIO()):
+    exit_code = main(sys.argv[1:])
+print(json.dumps({"exit_code": exit_code, "import_ms": import_ms, "modules": sorted(sys.modules)}))
+"""
+
+
+def _probe(*argv: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR))
+    completed = subprocess.run(
+        [sys.executable, "-c", PROBE, *argv],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout)
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ("list-actions",),
+        ("run", "noop", "--node", "n1", "--dry-run"),
+        ("run", "noop", "--nodes", "n1,n2", "--dry-run"),
+    ],
+)
+def test_cli_paths_without_execution_never_import_transports(argv: tuple[str, ...]):
+    result = _probe(*argv)
+    assert result["exit_code"] == 0
+    assert TRANSPORT_MODULES.isdisjoint(result["modules"])
+
+
+def test_list_actions_skips_process_and_event_loop_machinery():
+    modules = set(_probe("list-actions")["modules"])
+    assert {"asyncio", "subprocess", "uuid"}.isdisjoint(modules)
+
+
+def test_version_lookup_is_lazy():
+    result = _probe("list-actions")
+    assert "importlib.metadata" not in result["modules"]
+
+    import rune
+
+    assert isinstance(rune.__version__, str)
+
+
+def test_cli_import_within_budget():
+    best = min(_probe("list-actions")["import_ms"] for _ in range(3))
+    assert best < STARTUP_BUDGET_MS, f"rune CLI import took {best:.1f} ms"
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any
+
+from rune import mediator, orchestrator, tracing
+from rune.models import MediatorResult, TransportResult, build_observability
+from rune.rune_cli import main
+
+
+def _by_name(spans: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    return {entry["name"]: entry for entry in spans}
+
+
+def test_span_outside_trace_records_nothing():
+    with tracing.span("orphan", detail=1) as attributes:
+        attributes["extra"] = True
+    assert attributes == {"detail": 1, "extra": True}
+
+
+def test_trace_nests_spans_and_attaches_them():
+    observability = build_observability()
+    with tracing.trace("request") as trace:
+        with tracing.span("outer"):
+            with tracing.span("inner", step=1) as attributes:
+                attributes["exit_code"] = 0
+        with tracing.span("sibling"):
+            pass
+    spans = trace.attach(observability)
+
+    assert observability["spans"] is spans
+    assert [entry["name"] for entry in spans] == ["request", "outer", "inner", "sibling"]
+    root, outer, inner, sibling = spans
+    assert root["span_id"] == observability["span_id"]
+    assert root["parent_span_id"] is None
+    assert isinstance(root["start_unix_nano"], int)
+    assert outer["parent_span_id"] == root["span_id"]
+    assert inner["parent_span_id"] == outer["span_id"]
+    assert sibling["parent_span_id"] == root["span_id"]
+    assert inner["attributes"] == {"step": 1, "exit_code": 0}
+    assert "attributes" not in outer
+    assert 0 <= outer["start_ms"] <= inner["start_ms"]
+    assert inner["duration_ms"] <= outer["duration_ms"] <= root["duration_ms"]
+
+
+def test_span_marks_errors():
+    with tracing.trace("request") as trace:
+        try:
+            with tracing.span("failing"):
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+    spans = trace.attach({"span_id": "root"})
+    assert spans[1]["attributes"] == {"error": True}
+
+
+def test_concurrent_tasks_keep_separate_traces():
+    async def request(name: str, delay: float) -> list[dict[str, Any]]:
+        with tracing.trace(name) as trace:
+            with tracing.span(f"{name}.phase"):
+                await asyncio.sleep(delay)
+        return trace.attach({"span_id": name})
+
+    async def main_async() -> list[list[dict[str, Any]]]:
+        return await asyncio.gather(request("a", 0.02), request("b", 0.01))
+
+    first, second = asyncio.run(main_async())
+    assert [entry["name"] for entry in first] == ["a", "a.phase"]
+    assert [entry["name"] for entry in second] == ["b", "b.phase"]
+    assert first[1]["parent_span_id"] == "a"
+
+
+def test_run_action_records_orchestrator_and_mediator_spans(monkeypatch):
+    outputs = iter(
+        [
+            TransportResult(stdout="", stderr="unreachable", exit_code=255),
+            TransportResult(
+                stdout=json.dumps(
+                    {
+                        "message_metadata": {},
+                        "observability": {},
+                        "payload": {"result": "success", "output_data": {}},
+                        "error": None,
+                    }
+                ),
+                stderr="",
+                exit_code=0,
+            ),
+        ]
+    )
+    monkeypatch.setattr(mediator, "run_remote_plugin_ssh", lambda **_: next(outputs))
+    monkeypatch.setattr(mediator.time, "sleep", lambda _: None)
+    monkeypatch.setattr(orchestrator, "execute_action", mediator.execute_action)
+
+    result = orchestrator.run_action(
+        action="noop", node="node1", use_ssm=False, dry_run=False, params={}, max_retries=1
+    )
+
+    spans = result.observability["spans"]
+    names = [entry["name"] for entry in spans]
+    assert names[0] == "run_action"
+    assert names.count("mediator.attempt") == 2
+    assert "mediator.backoff" in names
+    by_name = _by_name(spans)
+    execute = by_name["orchestrator.execute"]
+    assert execute["attributes"] == {"coalesced": False}
+    assert by_name["orchestrator.build_payload"]["parent_span_id"] == spans[0]["span_id"]
+    assert by_name["mediator.parse_output"]["parent_span_id"] == execute["span_id"]
+    attempts = [entry for entry in spans if entry["name"] == "mediator.attempt"]
+    assert [entry["attributes"] for entry in attempts] == [
+        {"attempt": 1, "exit_code": 255},
+        {"attempt": 2, "exit_code": 0},
+    ]
+
+
+def test_async_run_action_records_spans(monkeypatch):
+    async def fake_execute_action_async(**_: Any) -> MediatorResult:
+        with tracing.span("transport.exec"):
+            pass
+        return MediatorResult(
+            status="failed",
+            action="noop",
+            node="n",
+            transport="ssh",
+            plugin_output=None,
+            error=None,
+        )
+
+    monkeypatch.setattr(orchestrator, "execute_action_async", fake_execute_action_async)
+    result = asyncio.run(
+        orchestrator.run_action_async(
+            action="noop", node="n", use_ssm=False, dry_run=False, params={}
+        )
+    )
+    by_name = _by_name(result.observability["spans"])
+    assert (
+        by_name["transport.exec"]["parent_span_id"]
+        == by_name["orchestrator.execute"]["span_id"]
+    )
+
+
+def test_local_transport_records_exec_span():
+    result = orchestrator.run_action(
+        action="noop", node="localhost", use_ssm=False, dry_run=False, params={}
+    )
+    by_name = _by_name(result.observability["spans"])
+    assert by_name["transport.exec"]["attributes"] == {"exit_code": 0}
+    assert (
+        by_name["transport.exec"]["parent_span_id"] == by_name["mediator.attempt"]["span_id"]
+    )
+
+
+def test_export_otlp_writes_one_request_per_line(tmp_path):
+    path = tmp_path / "traces" / "spans.jsonl"
+    tracing.set_export_file(path)
+    try:
+        for node in ("alpha", "beta"):
+            orchestrator.run_action(
+                action="noop", node=node, use_ssm=False, dry_run=True, params={}
+            )
+    finally:
+        tracing.set_export_file(None)
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(lines) == 2
+    spans = lines[0]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    root, preflight = spans
+    assert len(root["traceId"]) == 32
+    assert len(root["spanId"]) == 16
+    assert root["parentSpanId"] == ""
+    assert preflight["parentSpanId"] == root["spanId"]
+    assert int(root["startTimeUnixNano"]) <= int(preflight["startTimeUnixNano"])
+    assert int(preflight["endTimeUnixNano"]) <= int(root["endTimeUnixNano"])
+    assert {"key": "rune.node", "value": {"stringValue": "alpha"}} in root["attributes"]
+    assert root["status"] == {"code": 1}
+
+
+def test_export_file_from_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv(tracing.TRACE_FILE_ENV, str(tmp_path / "env.jsonl"))
+    assert tracing.export_file() == tmp_path / "env.jsonl"
+    monkeypatch.delenv(tracing.TRACE_FILE_ENV)
+    assert tracing.export_file() is None
+
+
+def test_cli_trace_file(tmp_path, capsys):
+    path = tmp_path / "spans.jsonl"
+    try:
+        assert main(["run", "noop", "--node", "n", "--dry-run", "--trace-file", str(path)]) == 0
+    finally:
+        tracing.set_export_file(None)
+    capsys.readouterr()
+    assert len(path.read_text().splitlines()) == 1
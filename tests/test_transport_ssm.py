@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from rune import orchestrator, transport_ssm
+from rune.payload import PayloadTemplate
+from rune.transport_ssm import SsmConfig, run_remote_plugin_ssm, run_remote_plugin_ssm_async
+
+FAST = SsmConfig(batch_window=0.02, poll_initial=0.02, poll_max=0.1)
+
+
+class ClientError(Exception):
+    """Shape of botocore's ClientError as far as the transport looks at it."""
+
+    def __init__(self, code: str) -> None:
+        super().__init__(f"An error occurred ({code})")
+        self.response = {"Error": {"Code": code}}
+
+
+class LocalSsm:
+    """Stand-in for the SSM API that runs each command's script locally per instance."""
+
+    def __init__(
+        self,
+        *,
+        page_size: int = 50,
+        throttle: dict[str, int] | None = None,
+        undeliverable: frozenset[str] = frozenset(),
+    ) -> None:
+        self.page_size = page_size
+        self.throttle = Counter(throttle or {})
+        self.undeliverable = undeliverable
+        self.calls: Counter[str] = Counter()
+        self.commands: list[list[str]] = []
+        self.scripts: list[str] = []
+        self.cancelled: list[tuple[str, list[str]]] = []
+        self._invocations: dict[str, dict[str, dict[str, Any]]] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _api(self, name: str) -> None:
+        with self._lock:
+            self.calls[name] += 1
+            if self.throttle[name] > 0:
+                self.throttle[name] -= 1
+                raise ClientError("ThrottlingException")
+
+    def send_command(self, *, DocumentName, InstanceIds, Parameters, Comment):  # noqa: N803
+        self._api("send_command")
+        assert DocumentName == "AWS-RunShellScript"
+        assert len(InstanceIds) == len(set(InstanceIds)) <= 50
+        command_id = f"cmd-{next(self._ids)}"
+        (script,) = Parameters["commands"]
+        timeout = int(Parameters["executionTimeout"][0])
+        invocations = {}
+        for instance in InstanceIds:
+            status = "Undeliverable" if instance in self.undeliverable else "InProgress"
+            invocations[instance] = {"InstanceId": instance, "Status": status, "ResponseCode": -1}
+            if status == "InProgress":
+                threading.Thread(
+                    target=self._execute,
+                    args=(invocations[instance], script, timeout),
+                    daemon=True,
+                ).start()
+        with self._lock:
+            self.commands.append(list(InstanceIds))
+            self.scripts.append(script)
+            self._invocations[command_id] = invocations
+        return {"Command": {"CommandId": command_id}}
+
+    def _execute(self, invocation: dict[str, Any], script: str, timeout: int) -> None:
+        env = dict(os.environ, AWS_SSM_INSTANCE_ID=invocation["InstanceId"])
+        try:
+            completed = subprocess.run(
+                ["bash", "-c", script], env=env, capture_output=True, text=True, timeout=timeout
+            )
+        except subprocess.TimeoutExpired:
+            invocation.update(Status="TimedOut")
+            return
+        invocation.update(
+            StandardOutputContent=completed.stdout[: transport_ssm.OUTPUT_LIMIT],
+            StandardErrorContent=completed.stderr[: transport_ssm.OUTPUT_LIMIT],
+            ResponseCode=completed.returncode,
+            Status="Success" if completed.returncode == 0 else "Failed",
+        )
+
+    def list_command_invocations(self, *, CommandId, MaxResults, NextToken=None):  # noqa: N803
+        self._api("list_command_invocations")
+        start = int(NextToken or 0)
+        size = min(MaxResults, self.page_size)
+        invocations = list(self._invocations[CommandId].values())
+        page = [
+            {"InstanceId": i["InstanceId"], "Status": i["Status"]}
+            for i in invocations[start : start + size]
+        ]
+        response: dict[str, Any] = {"CommandInvocations": page}
+        if start + size < len(invocations):
+            response["NextToken"] = str(start + size)
+        return response
+
+    def get_command_invocation(self, *, CommandId, InstanceId):  # noqa: N803
+        self._api("get_command_invocation")
+        return dict(self._invocations[CommandId][InstanceId])
+
+    def cancel_command(self, *, CommandId, InstanceIds):  # noqa: N803
+        self._api("cancel_command")
+        self.cancelled.append((CommandId, InstanceIds))
+
+
+def _instances(count: int) -> list[str]:
+    return [f"i-{index:017x}" for index in range(1, count + 1)]
+
+
+def _plugin(tmp_path: Path, body: str) -> Path:
+    plugin = tmp_path / "plugin.sh"
+    plugin.write_text(body)
+    return plugin
+
+
+ECHO = (
+    'input=$(cat)\n'
+    'printf \'{"instance": "%s", "input": %s}\' "$AWS_SSM_INSTANCE_ID" "$input"\n'
+)
+
+
+def _run_many(
+    client: LocalSsm,
+    plugin: Path,
+    nodes: list[str],
+    requests: list[dict[str, Any]] | None = None,
+    **kwargs: Any,
+) -> list:
+    if requests is None:
+        template = PayloadTemplate("echo", {"lines": 5})
+        requests = [template.render(node) for node in nodes]
+
+    async def run() -> list:
+        return await asyncio.gather(
+            *(
+                run_remote_plugin_ssm_async(
+                    node, plugin, request, client=client, config=FAST, **kwargs
+                )
+                for node, request in zip(nodes, requests)
+            )
+        )
+
+    return asyncio.run(run())
+
+
+def test_batches_targets_and_maps_results_back(tmp_path: Path):
+    client = LocalSsm(page_size=7)
+    nodes = _instances(120)
+
+    template = PayloadTemplate("echo", {"lines": 5})
+    requests = [template.render(node) for node in nodes]
+
+    results = _run_many(client, _plugin(tmp_path, ECHO), nodes, requests)
+
+    assert sorted(len(targets) for targets in client.commands) == [20, 50, 50]
+    for node, request, result in zip(nodes, requests, results):
+        assert result.exit_code == 0, result.stderr
+        assert json.loads(result.stdout) == {"instance": node, "input": request}
+    assert client.calls["send_command"] == 3
+    assert client.calls["get_command_invocation"] == 120
+
+
+def test_polling_and_sending_back_off_on_throttling(tmp_path: Path):
+    client = LocalSsm(throttle={"send_command": 2, "list_command_invocations": 3})
+    nodes = _instances(3)
+
+    results = _run_many(client, _plugin(tmp_path, ECHO), nodes)
+
+    assert [result.exit_code for result in results] == [0, 0, 0]
+    assert client.calls["send_command"] == 3
+    assert len(client.commands) == 1
+
+
+def test_requests_with_different_parameters_use_separate_commands(tmp_path: Path):
+    client = LocalSsm()
+    nodes = _instances(3)
+    requests = [{"node": node, "secret": f"token-{node}"} for node in nodes]
+
+    results = _run_many(client, _plugin(tmp_path, ECHO), nodes, requests)
+
+    assert sorted(client.commands) == [[node] for node in nodes]
+    for node, request, result in zip(nodes, requests, results):
+        assert json.loads(result.stdout) == {"instance": node, "input": request}
+    shared = _run_many(client, _plugin(tmp_path, ECHO), nodes, [{"same": 1}] * 3)
+    assert [json.loads(result.stdout)["input"] for result in shared] == [{"same": 1}] * 3
+    assert client.commands[-1] == nodes
+
+
+def test_same_instance_twice_uses_separate_commands(tmp_path: Path):
+    client = LocalSsm()
+    node = _instances(1)[0]
+
+    results = _run_many(client, _plugin(tmp_path, ECHO), [node, node])
+
+    assert [result.exit_code for result in results] == [0, 0]
+    assert client.commands == [[node], [node]]
+
+
+def test_invocation_statuses_map_to_transport_results(tmp_path: Path):
+    failing, unreachable = _instances(2)
+    client = LocalSsm(undeliverable=frozenset({unreachable}))
+    plugin = _plugin(tmp_path, 'echo "{}"; echo "broken" >&2; exit 3\n')
+
+    failed, undelivered = _run_many(client, plugin, [failing, unreachable])
+
+    assert (failed.exit_code, failed.stdout.strip(), failed.stderr.strip()) == (3, "{}", "broken")
+    assert undelivered.exit_code == transport_ssm.SSM_FAILURE_EXIT_CODE
+    assert "Undeliverable" in undelivered.stderr
+
+
+def test_truncated_output_is_flagged(tmp_path: Path):
+    client = LocalSsm()
+    plugin = _plugin(tmp_path, "head -c 30000 /dev/zero | tr '\\0' x\n")
+
+    (result,) = _run_many(client, plugin, _instances(1))
+
+    assert result.stdout_truncated and not result.stderr_truncated
+
+
+def test_timeout_cancels_the_instance(tmp_path: Path):
+    client = LocalSsm()
+    (node,) = _instances(1)
+
+    (result,) = _run_many(client, _plugin(tmp_path, "sleep 5\n"), [node], timeout=0.3)
+
+    assert result.exit_code == transport_ssm.SSM_TIMEOUT_EXIT_CODE
+    assert client.cancelled == [("cmd-1", [node])]
+
+
+def test_rejects_targets_that_are_not_instance_ids(tmp_path: Path):
+    result = run_remote_plugin_ssm("web-01", tmp_path / "noop.sh", {}, client=LocalSsm())
+
+    payload = json.loads(result.stdout)
+    assert result.exit_code == 1
+    assert payload["error"]["code"] == 400
+
+
+@pytest.fixture
+def local_ssm():
+    client = LocalSsm()
+    transport_ssm.set_default_client(client)
+    yield client
+    transport_ssm.set_default_client(None)
+
+
+def test_fanout_over_ssm_uses_one_command_per_batch(local_ssm: LocalSsm):
+    nodes = _instances(40)
+
+    fanout = orchestrator.run_action_fanout(
+        action="noop", nodes=nodes, use_ssm=True, dry_run=False, params={}, concurrency=40
+    )
+
+    assert fanout.summary()["succeeded"] == 40, fanout.to_dict()
+    assert len(local_ssm.commands) == 1
+    for result in fanout.results:
+        assert result.transport == "ssm"
+        echoed = result.plugin_output["message_metadata"]["message_id"]
+        assert echoed == result.message_metadata["message_id"]
@@ -1,11 +1,27 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import os
+import shlex
+import shutil
 import subprocess
+import sys
+import time
+import types
 from pathlib import Path
 
-from rune.transport_ssh import run_remote_plugin_ssh
+import pytest
+
+from rune import artifacts, transport_ssh, transport_ssm
+from rune.bundle import build_bundle
+from rune.transport_ssh import (
+    SshConnectionPool,
+    SshPoolConfig,
+    collect_artifacts,
+    run_remote_plugin_ssh,
+    run_remote_plugin_ssh_async,
+)
 from rune.transport_ssm import run_remote_plugin_ssm
 
 
@@ -21,50 +37,311 @@ def test_run_remote_plugin_ssh_success(tmp_path: Path):
 
 def test_run_remote_plugin_ssh_timeout(monkeypatch, tmp_path: Path):
     plugin = tmp_path / "timeout.sh"
-    plugin.write_text("echo 'noop'")
-
-    def fake_run(*_: object, **__: object):  # pragma: no cover - patched
-        raise subprocess.TimeoutExpired(cmd="bash", timeout=60)
+    plugin.write_text("sleep 5\necho 'noop'")
 
-    monkeypatch.setattr(subprocess, "run", fake_run)
+    monkeypatch.setattr(transport_ssh, "DEFAULT_TIMEOUT", 0.2)
     result = run_remote_plugin_ssh("node", plugin, {})
     assert result.exit_code == 124
     assert "timed out" in result.stderr
 
 
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # A killed child of the plugin may linger as a zombie until init reaps it.
+    stat = Path(f"/proc/{pid}/stat")
+    return not (stat.exists() and stat.read_text().split(") ")[1].startswith("Z"))
+
+
+def test_run_remote_plugin_ssh_timeout_kills_process_group(tmp_path: Path):
+    plugin = tmp_path / "spawner.sh"
+    pid_file = tmp_path / "grandchild.pid"
+    plugin.write_text(f"sleep 30 &\necho $! > {pid_file}\nwait\n")
+
+    started = time.monotonic()
+    result = run_remote_plugin_ssh("node", plugin, {}, timeout=0.3)
+
+    assert result.exit_code == 124
+    assert time.monotonic() - started < 5
+    grandchild = int(pid_file.read_text())
+    deadline = time.monotonic() + 2
+    while _alive(grandchild) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert not _alive(grandchild)
+
+
+def test_run_remote_plugin_ssh_expired_deadline_skips_execution(tmp_path: Path):
+    marker = tmp_path / "ran"
+    plugin = tmp_path / "touch.sh"
+    plugin.write_text(f"touch {marker}\n")
+
+    result = run_remote_plugin_ssh("node", plugin, {}, timeout=0)
+
+    assert result.exit_code == 124
+    assert "deadline exceeded" in result.stderr
+    assert not marker.exists()
+
+
 def test_run_remote_plugin_ssh_missing_binary(monkeypatch, tmp_path: Path):
     plugin = tmp_path / "missing.sh"
 
-    def fake_run(*_: object, **__: object):  # pragma: no cover - patched
+    async def fake_exec(*_: object, **__: object):  # pragma: no cover - patched
         raise FileNotFoundError("bash not found")
 
-    monkeypatch.setattr(subprocess, "run", fake_run)
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", fake_exec)
     result = run_remote_plugin_ssh("node", plugin, {})
     assert result.exit_code == 255
     assert "bash not found" in result.stderr
 
 
-def test_run_remote_plugin_ssm_no_credentials(tmp_path: Path, monkeypatch):
-    plugin = tmp_path / "noop.sh"
-    env = {
-        key: os.environ.pop(key, None)
-        for key in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN")
-    }
-    try:
-        result = run_remote_plugin_ssm("node", plugin, {})
-    finally:
-        for key, value in env.items():
-            if value is not None:
-                os.environ[key] = value
+def test_run_remote_plugin_ssh_async_runs_concurrently(tmp_path: Path):
+    plugin = tmp_path / "slow.sh"
+    plugin.write_text("#!/usr/bin/env bash\nsleep 0.3\necho '{\"result\":\"ok\"}'\n")
+
+    async def _run_many() -> list:
+        return await asyncio.gather(
+            *(run_remote_plugin_ssh_async(f"n{i}", plugin, {}) for i in range(5))
+        )
+
+    started = time.monotonic()
+    results = asyncio.run(_run_many())
+    assert all(result.exit_code == 0 for result in results)
+    assert time.monotonic() - started < 1.2
+
+
+def test_run_remote_plugin_ssm_without_boto3(monkeypatch, tmp_path: Path):
+    monkeypatch.setattr(transport_ssm, "_DEFAULT_CLIENT", None)
+    monkeypatch.setitem(sys.modules, "boto3", None)
+    result = run_remote_plugin_ssm("i-0123456789abcdef0", tmp_path / "noop.sh", {})
     assert result.exit_code == 1
     payload = json.loads(result.stdout)
-    assert payload["error"]["message"] == "AWS credentials not configured"
+    assert payload["error"] == {
+        "code": 501,
+        "message": "SSM transport requires boto3 (pip install 'rune[ssm]')",
+    }
 
 
-def test_run_remote_plugin_ssm_with_credentials(monkeypatch, tmp_path: Path):
-    plugin = tmp_path / "noop.sh"
-    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "abc")
-    result = run_remote_plugin_ssm("node", plugin, {"message_metadata": {}, "observability": {}})
+def test_run_remote_plugin_ssm_no_credentials(monkeypatch, tmp_path: Path):
+    session = types.SimpleNamespace(get_credentials=lambda: None)
+    boto3 = types.ModuleType("boto3")
+    boto3.session = types.SimpleNamespace(Session=lambda: session)
+    botocore_config = types.ModuleType("botocore.config")
+    botocore_config.Config = dict
+    monkeypatch.setattr(transport_ssm, "_DEFAULT_CLIENT", None)
+    monkeypatch.setitem(sys.modules, "boto3", boto3)
+    monkeypatch.setitem(sys.modules, "botocore", types.ModuleType("botocore"))
+    monkeypatch.setitem(sys.modules, "botocore.config", botocore_config)
+    result = run_remote_plugin_ssm("i-0123456789abcdef0", tmp_path / "noop.sh", {})
     assert result.exit_code == 1
     payload = json.loads(result.stdout)
-    assert payload["error"]["message"] == "SSM transport not yet implemented"
+    assert payload["error"]["message"] == "AWS credentials not configured"
+
+
+FAKE_SSH = r"""#!/usr/bin/env bash
+# Minimal OpenSSH stand-in: honours -S/-M/-O and runs the remote command locally.
+log="$(dirname "$0")/ssh.log"
+control="" master=0 op=""
+while [[ $# -gt 0 ]]; do
+  case "$1" in
+    -S) control="$2"; shift 2 ;;
+    -O) op="$2"; shift 2 ;;
+    -o|-p|-i|-l|-F) shift 2 ;;
+    -M) master=1; shift ;;
+    -N|-f|-T|-q) shift ;;
+    *) break ;;
+  esac
+done
+host="$1"; shift
+if [[ -n "$op" ]]; then
+  echo "$op $host" >> "$log"
+  case "$op" in
+    check) [[ -e "$control" ]] ;;
+    exit) rm -f "$control" ;;
+  esac
+  exit
+fi
+if [[ "$master" == 1 ]]; then
+  echo "master $host" >> "$log"
+  touch "$control"
+  exit 0
+fi
+echo "session $host" >> "$log"
+exec bash -c "$*"
+"""
+
+
+@pytest.fixture(autouse=True)
+def _remote_bundle_dir(monkeypatch, tmp_path: Path) -> Path:
+    remote_dir = tmp_path / "remote-cache"
+    monkeypatch.setenv("RUNE_REMOTE_BUNDLE_DIR", str(remote_dir))
+    return remote_dir
+
+
+def _fake_ssh_pool(tmp_path: Path, **overrides: object) -> SshConnectionPool:
+    ssh_binary = tmp_path / "ssh"
+    ssh_binary.write_text(FAKE_SSH)
+    ssh_binary.chmod(0o755)
+    config = SshPoolConfig(
+        control_dir=tmp_path / "control", ssh_binary=str(ssh_binary), **overrides
+    )
+    return SshConnectionPool(config)
+
+
+def _ssh_log(tmp_path: Path) -> list[str]:
+    return (tmp_path / "ssh.log").read_text().splitlines()
+
+
+def test_ssh_pool_reuses_master_connection(tmp_path: Path):
+    pool = _fake_ssh_pool(tmp_path)
+    noop = Path("plugins/noop.sh").resolve()
+    for _ in range(3):
+        result = run_remote_plugin_ssh("node-a", noop, {"payload": {}}, pool=pool)
+        assert result.exit_code == 0, result.stderr
+        assert json.loads(result.stdout)["payload"]["result"] == "success"
+
+    log = _ssh_log(tmp_path)
+    assert log.count("master node-a") == 1
+    # First run: cache miss, upload, run. Later runs execute straight from the cache.
+    assert log.count("session node-a") == 5
+    assert pool.stats.masters_started == 1
+
+
+def test_ssh_bundle_uploaded_only_when_absent(tmp_path: Path, _remote_bundle_dir: Path):
+    pool = _fake_ssh_pool(tmp_path)
+    noop = Path("plugins/noop.sh").resolve()
+    digest = build_bundle(noop).digest
+
+    run_remote_plugin_ssh("node-a", noop, {"payload": {}}, pool=pool)
+    cached = _remote_bundle_dir / digest
+    assert (cached / ".complete").exists()
+    assert (cached / "noop.sh").exists()
+    assert (cached / "lib" / "rune_bpcs.sh").exists()
+
+    (tmp_path / "ssh.log").unlink()
+    result = run_remote_plugin_ssh("node-b", noop, {"payload": {}}, pool=pool)
+    assert result.exit_code == 0, result.stderr
+    assert _ssh_log(tmp_path) == ["master node-b", "session node-b"]
+
+
+def test_ssh_bundle_reuploaded_when_remote_cache_is_wiped(
+    tmp_path: Path, _remote_bundle_dir: Path
+):
+    pool = _fake_ssh_pool(tmp_path)
+    plugin = tmp_path / "echo.sh"
+    plugin.write_text("echo '{}'\n")
+
+    run_remote_plugin_ssh("node-a", plugin, {}, pool=pool)
+    shutil.rmtree(_remote_bundle_dir)
+    result = run_remote_plugin_ssh("node-a", plugin, {}, pool=pool)
+    assert result.exit_code == 0, result.stderr
+    assert result.stdout.strip() == b"{}"
+
+
+def test_ssh_pool_restarts_dead_master(tmp_path: Path):
+    pool = _fake_ssh_pool(tmp_path, health_check_interval=0.0)
+    plugin = tmp_path / "echo.sh"
+    plugin.write_text("echo '{}'\n")
+
+    run_remote_plugin_ssh("node-a", plugin, {}, pool=pool)
+    run_remote_plugin_ssh("node-a", plugin, {}, pool=pool)
+    assert "check node-a" in _ssh_log(tmp_path)
+    assert pool.stats.masters_started == 1
+
+    for control_socket in (tmp_path / "control").iterdir():
+        control_socket.unlink()
+    run_remote_plugin_ssh("node-a", plugin, {}, pool=pool)
+    assert _ssh_log(tmp_path).count("master node-a") == 2
+
+
+def test_ssh_pool_evicts_idle_masters(tmp_path: Path):
+    pool = _fake_ssh_pool(tmp_path, idle_timeout=0.0)
+    plugin = tmp_path / "echo.sh"
+    plugin.write_text("echo '{}'\n")
+
+    run_remote_plugin_ssh("node-a", plugin, {}, pool=pool)
+    assert asyncio.run(pool.evict_idle()) == 1
+    assert "exit node-a" in _ssh_log(tmp_path)
+    assert not any((tmp_path / "control").iterdir())
+
+
+def test_ssh_pool_limits_sessions_per_host(tmp_path: Path):
+    pool = _fake_ssh_pool(tmp_path, max_sessions_per_host=2)
+    plugin = tmp_path / "slow.sh"
+    plugin.write_text("sleep 0.1\necho '{}'\n")
+
+    async def _run_many() -> list:
+        return await asyncio.gather(
+            *(run_remote_plugin_ssh_async("node-a", plugin, {}, pool=pool) for _ in range(6)),
+            *(run_remote_plugin_ssh_async("node-b", plugin, {}, pool=pool) for _ in range(2)),
+        )
+
+    results = asyncio.run(_run_many())
+    assert all(result.exit_code == 0 for result in results)
+    assert pool.stats.peak_sessions == {"node-a": 2, "node-b": 2}
+
+
+def test_ssh_artifacts_streamed_back_and_removed_from_node(monkeypatch, tmp_path: Path):
+    remote_root = tmp_path / "remote-artifacts"
+    monkeypatch.setenv(artifacts.REMOTE_ARTIFACT_DIR_ENV, str(remote_root))
+    monkeypatch.setenv(artifacts.ARTIFACT_ROOT_ENV, str(tmp_path / "local"))
+    log = tmp_path / "node.log"
+    log.write_text("remote log\n")
+    pool = _fake_ssh_pool(tmp_path)
+    payload = {
+        "message_metadata": {"message_id": "m-42"},
+        "payload": {"input_parameters": {"extra_paths": [str(log)], "include_journal": False}},
+    }
+
+    result = run_remote_plugin_ssh(
+        "node-a", Path("plugins/gather-logs.sh").resolve(), payload, pool=pool
+    )
+    assert result.exit_code == 0, result.stderr
+    output_data = json.loads(result.stdout)["payload"]["output_data"]
+    assert output_data["artifact_path"] == str(remote_root / "m-42" / "logs.tar.gz")
+
+    (reference,) = collect_artifacts("node-a", payload, output_data["artifacts"], pool=pool)
+    local = tmp_path / "local" / "m-42" / "logs.tar.gz"
+    assert reference["path"] == str(local)
+    assert local.stat().st_size == reference["size"]
+    assert not (remote_root / "m-42").exists()
+    assert not (tmp_path / "local" / "m-42" / ".transfer.tar.gz").exists()
+
+    with pytest.raises(artifacts.ArtifactError, match="no artifacts found"):
+        collect_artifacts("node-a", payload, output_data["artifacts"], pool=pool)
+
+
+def test_remote_run_script_bounds_plugin_with_timeout(tmp_path: Path):
+    bundle_dir = tmp_path / "bundle"
+    bundle_dir.mkdir()
+    (bundle_dir / ".complete").touch()
+    (bundle_dir / "hang.sh").write_text("sleep 30\n")
+
+    script = transport_ssh._remote_run_script(
+        str(bundle_dir), "hang.sh", 0.4, str(tmp_path / "artifacts")
+    )
+    started = time.monotonic()
+    completed = subprocess.run(["bash", "-c", script], capture_output=True, timeout=10)
+
+    assert completed.returncode == 124
+    assert time.monotonic() - started < 5
+
+
+@pytest.mark.skipif(
+    "RUNE_TEST_SSH_TARGET" not in os.environ,
+    reason="set RUNE_TEST_SSH_TARGET (e.g. localhost) to test against a real sshd",
+)
+def test_ssh_pool_against_real_sshd(tmp_path: Path):
+    options = tuple(shlex.split(os.environ.get("RUNE_TEST_SSH_OPTIONS", "")))
+    pool = SshConnectionPool(SshPoolConfig(control_dir=tmp_path / "c", ssh_options=options))
+    target = os.environ["RUNE_TEST_SSH_TARGET"]
+    noop = Path("plugins/noop.sh").resolve()
+    try:
+        for _ in range(2):
+            result = run_remote_plugin_ssh(target, noop, {"payload": {}}, pool=pool)
+            assert result.exit_code == 0, result.stderr
+            assert json.loads(result.stdout)["payload"]["result"] == "success"
+        assert pool.stats.masters_started == 1
+    finally:
+        pool.close()
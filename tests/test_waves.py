@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any
+
+import pytest
+
+from rune import orchestrator
+from rune.mediator import MediatorResult
+from rune.models import StructuredError
+from rune.rune_cli import main
+from rune.waves import WavePlan, plan_waves, run_action_waves
+
+
+def _fake_fleet(
+    monkeypatch, failing: set[str] | None = None, delays: dict[str, float] | None = None
+):
+    """Patch the mediator; return the order nodes started in and the peak concurrency."""
+
+    state: dict[str, Any] = {"started": [], "active": 0, "peak": 0}
+
+    async def fake_execute_action(**kwargs: Any) -> MediatorResult:
+        node = kwargs["node"]
+        state["started"].append(node)
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep((delays or {}).get(node, 0.01))
+        state["active"] -= 1
+        failed = node in (failing or set())
+        return MediatorResult(
+            status="failed" if failed else "success",
+            action="noop",
+            node=node,
+            transport="ssh",
+            plugin_output={"payload": {"result": "error" if failed else "success"}},
+            error=StructuredError(code=500, message="boom") if failed else None,
+        )
+
+    monkeypatch.setattr(orchestrator, "execute_action_async", fake_execute_action)
+    return state
+
+
+def _nodes(count: int) -> list[str]:
+    return [f"n{index:02d}" for index in range(count)]
+
+
+def _run(nodes: list[str], plan: WavePlan, concurrency: int = 32):
+    return run_action_waves(
+        action="noop",
+        nodes=nodes,
+        use_ssm=False,
+        dry_run=False,
+        params={},
+        plan=plan,
+        concurrency=concurrency,
+    )
+
+
+def test_plan_waves_by_size_percent_and_canary():
+    nodes = _nodes(10)
+    assert [len(wave) for wave in plan_waves(nodes, WavePlan(size=4))] == [4, 4, 2]
+    assert [len(wave) for wave in plan_waves(nodes, WavePlan(percent=25))] == [3, 3, 3, 1]
+    waves = plan_waves(nodes, WavePlan(size=5, canary=1))
+    assert waves == [["n00"], nodes[1:6], nodes[6:]]
+    with pytest.raises(ValueError, match="exactly one"):
+        WavePlan()
+    with pytest.raises(ValueError, match="advance_at"):
+        WavePlan(size=1, advance_at=0)
+
+
+def test_all_waves_run_when_healthy(monkeypatch):
+    state = _fake_fleet(monkeypatch)
+    nodes = _nodes(12)
+
+    result = _run(nodes, WavePlan(size=4, canary=2))
+
+    assert [r.node for r in result.results] == nodes
+    assert [(w["size"], w["canary"], w["finished"]) for w in result.waves] == [
+        (2, True, 2),
+        (4, False, 4),
+        (4, False, 4),
+        (2, False, 2),
+    ]
+    assert result.skipped == [] and result.aborted_reason is None
+    assert state["peak"] <= 8
+    assert result.summary()["succeeded"] == 12
+
+
+def test_next_wave_overlaps_the_tail_of_the_current_one(monkeypatch):
+    # n03 is slow: the second wave starts once 3 of the first 4 nodes are done.
+    state = _fake_fleet(monkeypatch, delays={"n03": 0.3})
+    nodes = _nodes(8)
+
+    result = _run(nodes, WavePlan(size=4, advance_at=0.75))
+
+    assert result.summary()["succeeded"] == 8
+    assert result.waves[1]["started_ms"] < 300
+    assert state["peak"] > 4
+
+
+def test_breaker_aborts_remaining_waves(monkeypatch):
+    nodes = _nodes(30)
+    _fake_fleet(monkeypatch, failing=set(nodes[5:9]))
+
+    result = _run(nodes, WavePlan(size=5, max_failure_rate=0.2, window=10, min_samples=5))
+
+    assert result.aborted_reason is not None and "threshold" in result.aborted_reason
+    # Two failures in the second wave already push the window past 20%.
+    assert result.skipped == nodes[10:]
+    assert len(result.waves) == 2
+    assert [r.node for r in result.results] == nodes[:10]
+    summary = result.summary()
+    assert summary["aborted"] and summary["skipped"] == 20
+
+
+def test_failed_canary_stops_the_rollout(monkeypatch):
+    nodes = _nodes(10)
+    state = _fake_fleet(monkeypatch, failing={"n00"})
+
+    result = _run(nodes, WavePlan(size=5, canary=1))
+
+    assert state["started"] == ["n00"]
+    assert result.skipped == nodes[1:]
+    assert "of the canary" in result.aborted_reason
+
+
+def test_nodes_queued_when_the_breaker_trips_are_skipped(monkeypatch):
+    nodes = _nodes(6)
+    _fake_fleet(monkeypatch, failing={"n00"})
+
+    result = _run(nodes, WavePlan(size=6, min_samples=1), concurrency=1)
+
+    assert [r.node for r in result.results] == ["n00"]
+    assert result.skipped == nodes[1:]
+
+
+def test_cli_waves(monkeypatch, capsys):
+    _fake_fleet(monkeypatch, failing={"n00"})
+
+    code = main(
+        ["run", "noop", "--nodes", ",".join(_nodes(4)), "--wave-size", "50%", "--canary", "1"]
+    )
+
+    document = json.loads(capsys.readouterr().out)
+    assert code == 1
+    assert document["summary"]["aborted"] is True
+    assert document["skipped_nodes"] == _nodes(4)[1:]
+    assert [wave["canary"] for wave in document["waves"]] == [True]
+
+
+def test_cli_wave_size_errors(capsys):
+    assert main(["run", "noop", "--node", "n1", "--wave-size", "2"]) == 2
+    assert "--wave-size requires --nodes" in capsys.readouterr().err
+    assert main(["run", "noop", "--nodes", "a,b", "--wave-size", "0%"]) == 2
+    assert main(["run", "noop", "--nodes", "a,b", "--wave-size", "1", "--advance-at", "0"]) == 2
+    assert "advance_at" in capsys.readouterr().err